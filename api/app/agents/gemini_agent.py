@@ -6,15 +6,23 @@ across all providers — Agno handles the protocol differences.
 
 Provider is selected by CHAT_PROVIDER in .env.
 """
+import asyncio
+import copy
 import json
 import logging
 import re
+import threading
+import time
 from pathlib import Path
-from typing import Iterator
+from typing import AsyncIterator, Callable
 
-from agno.agent import Agent, RunEvent, RunOutputEvent
+from agno.agent import Agent, RunEvent
 
 from app.config import settings
+from app.lib import client_context, rate_limit
+from app.lib.client_context import suggestion_note
+from app.lib.conversation_memory import ConversationMemory
+from app.lib.response_cache import Probe, is_cacheable, make_probe
 
 logger = logging.getLogger(__name__)
 PROMPT_DIR = Path(__file__).parent / "prompts"
@@ -49,35 +57,41 @@ def _resolve_client_name(client_name: str) -> tuple[str, str | None]:
     )
     if partial:
         candidates = [r["name"] for r in partial]
-        note = (
-            f"「{client_name}」さんは登録されていません。"
-            f"もしかして「{'」「'.join(candidates)}」さんのことですか？"
-            f" 以下は「{candidates[0]}」さんの情報です。"
-        )
-        return candidates[0], note
+        return candidates[0], suggestion_note(client_name, candidates)
 
     return client_name, None
 
 
+def _profile_section(client_name: str, key: str, default=None) -> str:
+    """Answer a per-client search tool from the session's profile bundle."""
+    profile, suggestion = client_context.lookup(client_name)
+    result = {
+        "client_name": profile["name"] if profile else client_name,
+        key: profile[key] if profile else [],
+    }
+    if suggestion:
+        result["_suggestion"] = suggestion
+    return json.dumps(result, ensure_ascii=False, default=default)
+
+
 def search_client_info(client_name: str) -> str:
     """クライアントの基本情報（名前、生年月日、血液型、障害・状態）を検索します。
 
     Args:
         client_name: クライアント名
     """
-    from app.lib.db_operations import run_query
-
-    client_name, suggestion = _resolve_client_name(client_name)
-    records = run_query("""
-        MATCH (c:Client {name: $name})
-        OPTIONAL MATCH (c)-[:HAS_CONDITION]->(cond:Condition)
-        RETURN c.name AS name, c.dob AS dob, c.bloodType AS bloodType,
-               collect(DISTINCT cond.name) AS conditions
-    """, {"name": client_name})
-    if not records:
+    profile, suggestion = client_context.lookup(client_name)
+    if profile is None:
         return json.dumps({"error": f"「{client_name}」さんの情報が見つかりません。"}, ensure_ascii=False)
-    r = records[0]
-    result = {k: str(v) if v is not None else None for k, v in r.items()}
+    result = {
+        k: str(v) if v is not None else None
+        for k, v in {
+            "name": profile["name"],
+            "dob": profile.get("dob"),
+            "bloodType": profile.get("bloodType"),
+            "conditions": profile["conditions"],
+        }.items()
+    }
     if suggestion:
         result["_suggestion"] = suggestion
     return json.dumps(result, ensure_ascii=False)
@@ -89,19 +103,7 @@ def search_emergency_contacts(client_name: str) -> str:
     Args:
         client_name: クライアント名
     """
-    from app.lib.db_operations import run_query
-    client_name, suggestion = _resolve_client_name(client_name)
-
-    records = run_query("""
-        MATCH (c:Client {name: $name})-[rel:HAS_KEY_PERSON]->(kp:KeyPerson)
-        RETURN kp.name AS name, kp.relationship AS relationship,
-               kp.phone AS phone, rel.rank AS rank
-        ORDER BY rel.rank ASC
-    """, {"name": client_name})
-    result = {"client_name": client_name, "contacts": [dict(r) for r in records]}
-    if suggestion:
-        result["_suggestion"] = suggestion
-    return json.dumps(result, ensure_ascii=False, default=str)
+    return _profile_section(client_name, "contacts", default=str)
 
 
 def search_ng_actions(client_name: str) -> str:
@@ -110,19 +112,7 @@ def search_ng_actions(client_name: str) -> str:
     Args:
         client_name: クライアント名
     """
-    from app.lib.db_operations import run_query
-    client_name, suggestion = _resolve_client_name(client_name)
-
-    records = run_query("""
-        MATCH (c:Client {name: $name})-[:MUST_AVOID]->(ng:NgAction)
-        RETURN ng.action AS action, ng.reason AS reason, ng.riskLevel AS riskLevel
-        ORDER BY CASE ng.riskLevel
-            WHEN 'LifeThreatening' THEN 1 WHEN 'Panic' THEN 2 ELSE 3 END
-    """, {"name": client_name})
-    result = {"client_name": client_name, "ng_actions": [dict(r) for r in records]}
-    if suggestion:
-        result["_suggestion"] = suggestion
-    return json.dumps(result, ensure_ascii=False)
+    return _profile_section(client_name, "ng_actions")
 
 
 def search_care_preferences(client_name: str) -> str:
@@ -131,17 +121,7 @@ def search_care_preferences(client_name: str) -> str:
     Args:
         client_name: クライアント名
     """
-    from app.lib.db_operations import run_query
-    client_name, suggestion = _resolve_client_name(client_name)
-
-    records = run_query("""
-        MATCH (c:Client {name: $name})-[:REQUIRES]->(cp:CarePreference)
-        RETURN cp.category AS category, cp.instruction AS instruction, cp.priority AS priority
-    """, {"name": client_name})
-    result = {"client_name": client_name, "care_preferences": [dict(r) for r in records]}
-    if suggestion:
-        result["_suggestion"] = suggestion
-    return json.dumps(result, ensure_ascii=False)
+    return _profile_section(client_name, "care_preferences")
 
 
 def search_hospital(client_name: str) -> str:
@@ -150,17 +130,7 @@ def search_hospital(client_name: str) -> str:
     Args:
         client_name: クライアント名
     """
-    from app.lib.db_operations import run_query
-    client_name, suggestion = _resolve_client_name(client_name)
-
-    records = run_query("""
-        MATCH (c:Client {name: $name})-[:TREATED_AT]->(h:Hospital)
-        RETURN h.name AS name, h.phone AS phone, h.address AS address
-    """, {"name": client_name})
-    result = {"client_name": client_name, "hospitals": [dict(r) for r in records]}
-    if suggestion:
-        result["_suggestion"] = suggestion
-    return json.dumps(result, ensure_ascii=False, default=str)
+    return _profile_section(client_name, "hospitals", default=str)
 
 
 def search_guardian(client_name: str) -> str:
@@ -169,17 +139,7 @@ def search_guardian(client_name: str) -> str:
     Args:
         client_name: クライアント名
     """
-    from app.lib.db_operations import run_query
-    client_name, suggestion = _resolve_client_name(client_name)
-
-    records = run_query("""
-        MATCH (c:Client {name: $name})-[:HAS_LEGAL_REP]->(g:Guardian)
-        RETURN g.name AS name, g.type AS type, g.phone AS phone, g.organization AS organization
-    """, {"name": client_name})
-    result = {"client_name": client_name, "guardians": [dict(r) for r in records]}
-    if suggestion:
-        result["_suggestion"] = suggestion
-    return json.dumps(result, ensure_ascii=False, default=str)
+    return _profile_section(client_name, "guardians", default=str)
 
 
 def search_support_logs(client_name: str, limit: int = 5) -> str:
@@ -469,6 +429,9 @@ def _create_model(provider: str | None = None):
     if provider is None:
         provider = settings.chat_provider
 
+    if settings.llm_backend == "fake":
+        from app.lib.fake_llm import FakeChatModel
+        return FakeChatModel()
     if provider == "claude":
         from agno.models.anthropic import Claude
         return Claude(
@@ -495,34 +458,122 @@ def _create_model(provider: str | None = None):
         )
 
 
+# ---------------------------------------------------------------------------
+# Per-provider model pool — SDK clients are built once per provider; sessions
+# get a shallow copy (their own model object sharing the client) and carry
+# only their own history.
+# ---------------------------------------------------------------------------
+
+_model_pool: dict[str, object] = {}
+_model_pool_lock = threading.Lock()
+
+
+def _warm_model(provider: str):
+    model = _create_model(provider)
+    for getter in ("get_client", "get_async_client"):
+        fn = getattr(model, getter, None)
+        if fn is None:
+            continue
+        try:
+            fn()
+        except Exception as e:
+            logger.warning("Model client warmup failed (%s.%s): %s", provider, getter, e)
+    return model
+
+
+def get_pooled_model(provider: str | None = None):
+    """Return a session-private model that shares the provider's pre-built SDK client."""
+    if provider is None:
+        provider = settings.chat_provider
+    with _model_pool_lock:
+        template = _model_pool.get(provider)
+    if template is None:
+        template = _warm_model(provider)
+        with _model_pool_lock:
+            template = _model_pool.setdefault(provider, template)
+    return copy.copy(template)
+
+
+def warm_model_pool(providers: list[str] | None = None) -> None:
+    """Build the SDK clients for ``providers`` (default: the configured provider)."""
+    for provider in providers or [settings.chat_provider]:
+        get_pooled_model(provider)
+
+
+def reset_model_pool() -> None:
+    """Drop every pooled model (rebuilt on next use, e.g. after key changes)."""
+    with _model_pool_lock:
+        _model_pool.clear()
+
+
 def _get_chat_agent() -> Agent:
     """Create a chat agent with the configured model and DB tools (stateless)."""
     return Agent(
-        model=_create_model(),
+        model=get_pooled_model(),
         tools=TOOLS,
         instructions=[CHAT_SYSTEM_PROMPT],
         markdown=True,
     )
 
 
-def create_session_agent(session_id: str) -> Agent:
+def create_session_agent(session_id: str, provider: str | None = None) -> Agent:
     """セッション対応のチャットエージェントを作成。
 
-    InMemoryDb を使って会話履歴を自動管理し、
-    前のターンのコンテキスト（クライアント名など）を保持する。
+    会話履歴は Agno の DB ではなく、セッションの ConversationMemory
+    （app.lib.conversation_memory）から毎ターン chat_events が渡す。
+    モデルはプロバイダごとのプールから取得するので、SDK クライアントは再生成しない。
     """
-    from agno.db.in_memory import InMemoryDb
-
-    db = InMemoryDb()
     return Agent(
-        model=_create_model(),
+        model=get_pooled_model(provider),
         tools=TOOLS,
         instructions=[CHAT_SYSTEM_PROMPT],
         markdown=True,
-        db=db,
         session_id=session_id,
-        add_history_to_context=True,
-        num_history_runs=6,  # 直近6ターン分を保持
+        add_history_to_context=False,
+    )
+
+
+def switch_session_model(agent: Agent, provider: str) -> None:
+    """Swap a session agent's model in place (history lives in the session's memory)."""
+    agent.model = get_pooled_model(provider)
+
+
+_SUMMARY_PROMPT = """あなたは福祉相談の会話記録を要約するアシスタントです。
+既存の要約と新しいやり取りを統合し、今後の回答に必要な事実だけを箇条書きで残してください。
+- 対象クライアント名、相談内容、確認済みの事実、未解決の依頼を優先する
+- 推測や一般論は書かない
+- 日本語で、{budget} トークン程度以内
+"""
+
+
+async def summarize_conversation(summary: str, turns: list, provider: str | None = None) -> str:
+    """Fold evicted conversation turns into the running summary (no tools)."""
+    lines = [f"## 既存の要約\n{summary or '（なし）'}", "## 新しいやり取り"]
+    for turn in turns:
+        lines.append(f"ユーザー: {turn.user}")
+        if turn.assistant:
+            lines.append(f"アシスタント: {turn.assistant}")
+    agent = Agent(
+        model=get_pooled_model(provider),
+        instructions=[_SUMMARY_PROMPT.format(budget=settings.chat_memory_summary_tokens)],
+        markdown=False,
+    )
+    # Background work: queued behind chat turns when the model is busy
+    with rate_limit.priority(rate_limit.Priority.BATCH):
+        response = await rate_limit.for_model(agent.model).acall(agent.arun, "\n".join(lines))
+    return response.content if response and isinstance(response.content, str) else ""
+
+
+def create_conversation_memory(provider: Callable[[], str | None] | None = None) -> ConversationMemory:
+    """Session memory sized from settings, summarizing with the session's current provider."""
+
+    async def summarize(summary: str, turns: list) -> str:
+        return await summarize_conversation(summary, turns, provider() if provider else None)
+
+    return ConversationMemory(
+        token_budget=settings.chat_memory_token_budget,
+        summary_budget=settings.chat_memory_summary_tokens,
+        summarize=summarize,
     )
 
 
@@ -554,29 +605,167 @@ def parse_json_from_response(response_text: str) -> dict | None:
     return None
 
 
+_extraction_cache = None
+
+
+def get_extraction_cache():
+    """Process-wide ExtractionCache configured from settings."""
+    global _extraction_cache
+    if _extraction_cache is None:
+        from app.lib.extraction_cache import ExtractionCache
+
+        path = settings.extraction_cache_path or Path(__file__).resolve().parents[2] / "cache" / "extraction.sqlite3"
+        _extraction_cache = ExtractionCache(
+            Path(path),
+            ttl_seconds=settings.extraction_cache_ttl_seconds,
+            max_entries=settings.extraction_cache_max_entries,
+        )
+    return _extraction_cache
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    """Process-wide chat ResponseCache configured from settings."""
+    global _response_cache
+    if _response_cache is None:
+        from app.lib.response_cache import ResponseCache
+
+        _response_cache = ResponseCache(
+            threshold=settings.chat_response_cache_threshold,
+            max_entries=settings.chat_response_cache_max_entries,
+            ttl_seconds=settings.chat_response_cache_ttl_seconds,
+        )
+    return _response_cache
+
+
+async def lookup_cached_answer(
+    message: str,
+    client: str | None = None,
+    context_client: str | None = None,
+) -> tuple[str | None, Probe | None]:
+    """Cached answer for ``message``, and the probe to store a fresh one.
+
+    ``client`` はメッセージ中で名指しされたクライアント、``context_client`` は
+    会話で話題になっているクライアント（名指しがないときのキャッシュの対象）。
+
+    同一の質問は埋め込みなしで即座に返す。それ以外は質問を埋め込み、
+    類似度で探す（埋め込みに失敗したら完全一致のみ）。キャッシュ対象外の
+    質問は (None, None)。
+    """
+    if not settings.chat_response_cache_enabled or not is_cacheable(message):
+        return None, None
+    from app.lib.embedding import embed_text
+
+    cache = get_response_cache()
+    probe = make_probe(message, client, context_client)
+    answer = cache.get_exact(probe)
+    if answer is not None:
+        return answer, probe
+    probe.vector = await embed_text(message, task_type="RETRIEVAL_QUERY")
+    return cache.get_similar(probe), probe
+
+
+def get_generative_model():
+    """Gemini model for one-shot generate_content calls (extraction, safety, intake, transcription).
+
+    ``settings.llm_backend = "fake"`` のときは API を呼ばない決定的な代替
+    （app.lib.fake_llm）を返す。
+    """
+    if settings.llm_backend == "fake":
+        from app.lib.fake_llm import FakeGenerativeModel
+        return FakeGenerativeModel(settings.gemini_model)
+    import google.generativeai as genai
+    genai.configure(api_key=settings.gemini_api_key or settings.google_api_key)
+    return genai.GenerativeModel(settings.gemini_model)
+
+
 async def extract_from_text(text: str, client_name: str | None = None) -> dict | None:
     """Extract structured graph data from narrative text.
 
     Uses Gemini directly (not Agno) for extraction since this requires
     a specific JSON schema prompt, not conversational tools.
+    Results are cached by (text hash, client name, model, prompt hash).
     """
-    import google.generativeai as genai
+    from app.lib.extraction_cache import make_key
+    from app.services.narrative_intake_service import compute_source_hash
 
     prompt = get_extraction_prompt()
+    cache = get_extraction_cache()
+    cache_key = make_key(compute_source_hash(text), client_name, settings.gemini_model, prompt)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     user_message = text
     if client_name:
         user_message = f"【対象クライアント: {client_name}】\n\n{text}"
     try:
-        genai.configure(api_key=settings.gemini_api_key or settings.google_api_key)
-        model = genai.GenerativeModel(settings.gemini_model)
-        response = model.generate_content(
+        model = get_generative_model()
+        # Blocking SDK call runs off the event loop so chunk extractions overlap
+        response = await rate_limit.gemini().acall(
+            asyncio.to_thread,
+            model.generate_content,
             [{"role": "user", "parts": [prompt + "\n\n" + user_message]}],
             generation_config={"temperature": 0},
         )
-        return parse_json_from_response(response.text)
+        result = parse_json_from_response(response.text)
     except Exception as e:
         logger.error(f"Extraction failed: {e}")
         return None
+    if result is not None:
+        cache.put(cache_key, result)
+    return result
+
+
+async def extract_from_text_chunked(
+    text: str,
+    client_name: str | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> dict | None:
+    """Map-reduce extraction for long narratives.
+
+    Splits the text with chunking.split_into_chunks, extracts the chunks
+    concurrently (at most ``settings.extraction_concurrency`` LLM calls at once)
+    and merges the chunk graphs with graph_merge.merge_graphs. Short texts are a
+    single chunk and behave exactly like extract_from_text.
+
+    ``on_progress(done, total)`` is called once before extraction starts and
+    after each chunk finishes. Returns None if any chunk fails (successful
+    chunks are cached, so a retry only re-extracts the failed ones).
+    """
+    from app.lib.chunking import split_into_chunks
+    from app.lib.graph_merge import merge_graphs
+
+    chunks = split_into_chunks(text, max_tokens=settings.extraction_chunk_tokens)
+    total = len(chunks)
+    if on_progress:
+        on_progress(0, total)
+    if total == 1:
+        result = await extract_from_text(text, client_name)
+        if on_progress:
+            on_progress(1, 1)
+        return result
+
+    semaphore = asyncio.Semaphore(max(1, settings.extraction_concurrency))
+    done = 0
+
+    async def run(chunk: str) -> dict | None:
+        nonlocal done
+        async with semaphore:
+            graph = await extract_from_text(chunk, client_name)
+        done += 1
+        if on_progress:
+            on_progress(done, total)
+        return graph
+
+    graphs = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    failed = [i for i, g in enumerate(graphs) if g is None]
+    if failed:
+        logger.error("Chunked extraction failed for chunks %s of %d", failed, total)
+        return None
+    return merge_graphs(graphs)
 
 
 async def chat(message: str, history: list[dict] | None = None, agent: Agent | None = None) -> str:
@@ -591,7 +780,7 @@ async def chat(message: str, history: list[dict] | None = None, agent: Agent | N
         _agent = agent or _get_chat_agent()
 
         # Run agent（セッション対応エージェントの場合、履歴は自動管理される）
-        response = _agent.run(message)
+        response = await rate_limit.for_model(getattr(_agent, "model", None)).acall(asyncio.to_thread, _agent.run, message)
 
         # テキストコンテンツの抽出
         if response and response.content:
@@ -603,20 +792,101 @@ async def chat(message: str, history: list[dict] | None = None, agent: Agent | N
         return f"エラーが発生しました: {e}"
 
 
-async def chat_stream(message: str) -> Iterator[str]:
-    """Stream chat response using Agno Agent.
+async def chat_events(
+    message: str,
+    agent: Agent | None = None,
+    memory: ConversationMemory | None = None,
+    cache_probe: Probe | None = None,
+) -> AsyncIterator[dict]:
+    """Stream an agent run as WebSocket-ready events, as they arrive.
+
+    Yields:
+        - ``{"type": "stream", "content": delta}`` for each content delta
+        - ``{"type": "tool_start", "tool": name, "call_id": id}`` when a tool call starts
+        - ``{"type": "tool_end", "tool": name, "call_id": id, "error": bool}`` when it finishes
 
-    Yields text chunks as they arrive from the model.
+    モデル・ツールのエラーは例外にせず、エラーメッセージを stream として返す。
+    呼び出し側のタスクがキャンセルされると、実行中の run も閉じる。
+
+    memory を渡すと、その直近ウィンドウ・要約・ピン留めを文脈として渡し、
+    完了したターン（回答テキストのみ）とトークン数・遅延を記録する。
+    キャンセルされたターン・エラーになったターンは会話に残さない。
+
+    cache_probe（lookup_cached_answer の戻り値）を渡すと、ツールのエラーなく
+    完了した回答を回答キャッシュに格納する。
+
+    run 全体でモデルのレート制御（rate_limit）の枠を 1 つ使う。優先度は
+    呼び出し側の rate_limit.set_priority に従う。
     """
+    _agent = agent or _get_chat_agent()
+    context_tokens = 0
+    if memory is not None:
+        _agent.additional_input = memory.context_messages() or None
+        _agent.additional_context = memory.system_context()
+        context_tokens = memory.context_tokens()
+    started = time.monotonic()
+    produced = False
+    failed_run = False
+    tool_failed = False
+    reply: list[str] = []
+    metrics = None
+    governor = rate_limit.for_model(getattr(_agent, "model", None))
+    slot = await governor.acquire_async()
+    outcome = None
+    stream = _agent.arun(message, stream=True, stream_events=True)
     try:
-        agent = _get_chat_agent()
-        stream: Iterator[RunOutputEvent] = agent.run(message, stream=True)
-        for chunk in stream:
-            if chunk.event == RunEvent.run_content and chunk.content:
-                yield chunk.content
+        async for event in stream:
+            kind = event.event
+            if kind == RunEvent.run_content and isinstance(event.content, str) and event.content:
+                produced = True
+                reply.append(event.content)
+                yield {"type": "stream", "content": event.content}
+            elif kind in (RunEvent.tool_call_started, RunEvent.tool_call_completed, RunEvent.tool_call_error):
+                tool = getattr(event, "tool", None)
+                info = {
+                    "tool": getattr(tool, "tool_name", None) or "",
+                    "call_id": getattr(tool, "tool_call_id", None) or "",
+                }
+                if kind == RunEvent.tool_call_started:
+                    yield {"type": "tool_start", **info}
+                else:
+                    failed = kind == RunEvent.tool_call_error or bool(getattr(tool, "tool_call_error", False))
+                    tool_failed = tool_failed or failed
+                    yield {"type": "tool_end", **info, "error": failed}
+            elif kind == RunEvent.run_completed:
+                metrics = getattr(event, "metrics", None)
+            elif kind == RunEvent.run_error:
+                logger.error("Chat run failed (%s): %s", settings.chat_provider, event.content)
+                outcome = "throttled" if rate_limit.is_throttle(str(event.content)) else "error"
+                produced = failed_run = True
+                yield {"type": "stream", "content": f"エラーが発生しました: {event.content}"}
     except Exception as e:
-        logger.error(f"Stream chat failed: {e}", exc_info=True)
-        yield f"エラーが発生しました: {e}"
+        logger.error(f"Stream chat failed ({settings.chat_provider}): {e}", exc_info=True)
+        outcome = "throttled" if rate_limit.is_throttle(e) else "error"
+        produced = failed_run = True
+        yield {"type": "stream", "content": f"エラーが発生しました: {e}"}
+    else:
+        outcome = outcome or "ok"
+    finally:
+        try:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        finally:
+            governor.release(slot, outcome or "cancelled")
+    if not produced:
+        yield {"type": "stream", "content": "回答を生成できませんでした。"}
+    if cache_probe is not None and reply and not (failed_run or tool_failed):
+        get_response_cache().put(cache_probe, "".join(reply))
+    if memory is not None:
+        if not failed_run:
+            memory.add_turn(message, "".join(reply))
+        memory.record_stats(
+            context_tokens,
+            int((time.monotonic() - started) * 1000),
+            getattr(metrics, "input_tokens", None),
+            getattr(metrics, "output_tokens", None),
+        )
 
 
 async def check_safety_compliance(narrative: str, ng_actions: list) -> dict:
@@ -627,15 +897,14 @@ async def check_safety_compliance(narrative: str, ng_actions: list) -> dict:
     if not ng_actions:
         return {"is_violation": False, "warning": None, "risk_level": "None"}
 
-    import google.generativeai as genai
-
     safety_prompt = (PROMPT_DIR / "safety.md").read_text(encoding="utf-8")
     safety_prompt = safety_prompt.replace("{ng_actions}", json.dumps(ng_actions, ensure_ascii=False))
     safety_prompt = safety_prompt.replace("{narrative}", narrative)
     try:
-        genai.configure(api_key=settings.gemini_api_key or settings.google_api_key)
-        model = genai.GenerativeModel(settings.gemini_model)
-        response = model.generate_content(
+        model = get_generative_model()
+        response = await rate_limit.gemini().acall(
+            asyncio.to_thread,
+            model.generate_content,
             [{"role": "user", "parts": [safety_prompt]}],
             generation_config={"temperature": 0},
         )
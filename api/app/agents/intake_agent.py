@@ -6,14 +6,19 @@ the 7-pillar manifesto, then extracts and registers to Neo4j.
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 import re
+import zlib
 from pathlib import Path
 
-from app.agents.gemini_agent import extract_from_text, parse_json_from_response
+from app.agents.gemini_agent import extract_from_text, get_generative_model, parse_json_from_response
 from app.agents.validator import validate_schema
 from app.config import settings
+from app.lib import rate_limit
 from app.lib.db_operations import register_to_database
+from app.lib.session_store import MemorySessionStore, SessionStore, SqliteSessionStore
 
 logger = logging.getLogger(__name__)
 
@@ -146,7 +151,6 @@ class IntakeSession:
         self.extracted_graph: dict | None = None
         self.is_complete: bool = False
         self._awaiting_confirmation: bool = False
-        self._last_active: float = _time.time()
 
     # -- Phase navigation --------------------------------------------------
 
@@ -184,6 +188,33 @@ class IntakeSession:
             parts.append("")
         return "\n".join(parts)
 
+    # -- Serialization (shared session stores) ------------------------------
+
+    def to_bytes(self) -> bytes:
+        """Compact serialization: zlib-compressed JSON."""
+        state = {
+            "id": self.session_id,
+            "phase": self.current_phase,
+            "text": self.collected_text,
+            "responses": {str(k): v for k, v in self.phase_responses.items()},
+            "graph": self.extracted_graph,
+            "complete": self.is_complete,
+            "confirm": self._awaiting_confirmation,
+        }
+        return zlib.compress(json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "IntakeSession":
+        state = json.loads(zlib.decompress(data))
+        session = cls(state["id"])
+        session.current_phase = state["phase"]
+        session.collected_text = state["text"]
+        session.phase_responses = {int(k): v for k, v in state["responses"].items()}
+        session.extracted_graph = state["graph"]
+        session.is_complete = state["complete"]
+        session._awaiting_confirmation = state["confirm"]
+        return session
+
     def get_progress(self) -> dict:
         """Return progress info for the frontend."""
         total = len(INTAKE_PHASES)
@@ -198,38 +229,40 @@ class IntakeSession:
 
 
 # ---------------------------------------------------------------------------
-# Session storage (in-process; sufficient for single-server deployment)
+# Session storage (app.lib.session_store; backend chosen by settings)
 # ---------------------------------------------------------------------------
 
-import time as _time
 
-_sessions: dict[str, IntakeSession] = {}
-_SESSION_TTL_SEC = 1800  # 30分
+def _create_session_store() -> SessionStore:
+    ttl = settings.intake_session_ttl_seconds
+    if settings.intake_session_store == "sqlite":
+        path = settings.intake_session_path or Path(__file__).resolve().parents[2] / "cache" / "intake_sessions.sqlite3"
+        return SqliteSessionStore(Path(path), ttl, encode=IntakeSession.to_bytes, decode=IntakeSession.from_bytes)
+    return MemorySessionStore(ttl)
+
+
+_sessions: SessionStore = _create_session_store()
 
 
 def get_or_create_session(session_id: str) -> IntakeSession:
-    """Return an existing session or create a new one. Expired sessions are cleaned up."""
-    _cleanup_expired_sessions()
-    if session_id not in _sessions:
-        _sessions[session_id] = IntakeSession(session_id)
+    """Return an existing session or create a new one (expired sessions are gone)."""
+    session = _sessions.get(session_id)
+    if session is None:
+        session = IntakeSession(session_id)
+        _sessions[session_id] = session
         logger.info("Created new intake session: %s", session_id)
-    session = _sessions[session_id]
-    session._last_active = _time.time()
     return session
 
 
-def cleanup_session(session_id: str) -> None:
-    """Remove a session from memory (called on completion or disconnect)."""
-    _sessions.pop(session_id, None)
+def save_session(session: IntakeSession) -> None:
+    """Write the session back (needed for shared stores; refreshes its TTL)."""
+    if not session.is_complete:
+        _sessions[session.session_id] = session
 
 
-def _cleanup_expired_sessions() -> None:
-    """Remove sessions older than TTL."""
-    now = _time.time()
-    expired = [sid for sid, s in _sessions.items() if now - getattr(s, "_last_active", 0) > _SESSION_TTL_SEC]
-    for sid in expired:
-        logger.info("Expired intake session: %s", sid)
-        _sessions.pop(sid, None)
+def cleanup_session(session_id: str) -> None:
+    """Remove a session from the store (called on completion or disconnect)."""
+    _sessions.pop(session_id, None)
 
 
 # ---------------------------------------------------------------------------
@@ -242,17 +275,16 @@ async def _evaluate_phase_response(pillar: str, required_info: str, response: st
 
     Returns ``"SUFFICIENT"`` or a follow-up question in Japanese.
     """
-    import google.generativeai as genai
-
     prompt = PHASE_EVAL_PROMPT.format(
         pillar=pillar,
         required_info=required_info,
         response=response,
     )
     try:
-        genai.configure(api_key=settings.gemini_api_key or settings.google_api_key)
-        model = genai.GenerativeModel(settings.gemini_model)
-        result = model.generate_content(
+        model = get_generative_model()
+        result = await rate_limit.gemini().acall(
+            asyncio.to_thread,
+            model.generate_content,
             [{"role": "user", "parts": [prompt]}],
             generation_config={"temperature": 0},
         )
@@ -278,7 +310,13 @@ async def handle_intake_message(session_id: str, user_text: str) -> dict:
         - ``registered_count``: count of registered nodes (when complete)
     """
     session = get_or_create_session(session_id)
+    try:
+        return await _handle(session, user_text)
+    finally:
+        save_session(session)
+
 
+async def _handle(session: IntakeSession, user_text: str) -> dict:
     # -- Phase 0: first contact, send welcome + phase-1 question -----------
     if session.current_phase == 0:
         session.current_phase = 1
@@ -463,6 +501,7 @@ async def _do_registration(session: IntakeSession) -> dict:
                 f"登録ノード数: {registered_count}\n"
                 f"登録タイプ: {', '.join(result.get('registered_types', []))}"
             )
+            session.is_complete = True
             cleanup_session(session.session_id)
             return {
                 "response": response,
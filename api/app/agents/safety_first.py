@@ -1,11 +1,20 @@
-"""Safety First: emergency keyword detection + direct DB search (no LLM).
+"""Safety First: emergency keyword detection + pre-rendered emergency bundle (no LLM).
 
-一刻を争う危機（「助けて」「倒れた」等）のみ発動し、直接DBから情報を返す。
+一刻を争う危機（「助けて」「倒れた」等）のみ発動し、LLM を介さず緊急情報を返す。
 「パニックになっています」等の状況報告はエージェント（LLM）に任せ、
 エージェントが場面に応じて適切な情報を判断・提供する。
+
+危機・情報照会キーワードと登録済みクライアント名（app.lib.client_names の
+氏名・読み・別名）は 1 つの Aho-Corasick オートマトンにまとめてあり、
+scan() がメッセージを 1 回走査するだけで危機判定とクライアント名を返す。
+オートマトンはクライアント名の世代が変わったときだけ作り直す。
 """
 import re
-from app.lib.db_operations import run_query
+import threading
+from dataclasses import dataclass
+
+from app.lib import client_names, emergency
+from app.lib.aho_corasick import AhoCorasick
 
 # LLM を介さず直接DBから情報を返す「最後の砦」
 # ここに該当するのは、一刻を争い LLM の判断を待てない場面のみ。
@@ -23,19 +32,80 @@ CRISIS_KEYWORDS = {
 # 情報照会としてエージェント（LLM）に回すべきキーワード（Safety First を発動しない）
 INQUIRY_INDICATORS = {"教えて", "調べて", "確認", "一覧", "リスト", "知りたい"}
 
+# 未登録の名前向けのフォールバック（漢字2〜4文字 + さん）
+_HONORIFIC_NAME = re.compile(r"([一-龯]{2,4})\s?さん")
+
+_CRISIS, _INQUIRY, _CLIENT = "crisis", "inquiry", "client"
+
+
+@dataclass(frozen=True)
+class Scan:
+    """Result of one pass over a message."""
+
+    crisis: bool
+    inquiry: bool
+    client: str | None  # registered name, or the honorific-regex fallback
+
+    @property
+    def is_emergency(self) -> bool:
+        return self.crisis and not self.inquiry
+
+
+_automaton_lock = threading.Lock()
+_automaton: tuple[int, AhoCorasick] | None = None
+
+
+def _get_automaton() -> AhoCorasick:
+    global _automaton
+    generation = client_names.current_generation()
+    cached = _automaton
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    with _automaton_lock:
+        if _automaton is not None and _automaton[0] == generation:
+            return _automaton[1]
+        generation, forms = client_names.snapshot()
+        patterns = [(kw, (_CRISIS, kw)) for kw in CRISIS_KEYWORDS]
+        patterns += [(kw, (_INQUIRY, kw)) for kw in INQUIRY_INDICATORS]
+        patterns += [(form, (_CLIENT, name)) for name, names in forms.items() for form in names]
+        automaton = AhoCorasick(patterns)
+        _automaton = (generation, automaton)
+        return automaton
+
+
+def scan(text: str) -> Scan:
+    """危機・情報照会キーワードとクライアント名を 1 回の走査で検出する。
+
+    複数のクライアント名があれば最も左（同じ位置なら最長）の登録名を採る。
+    登録名に一致しなければ「漢字2〜4文字 + さん」の正規表現で補う。
+    """
+    crisis = inquiry = False
+    best: tuple[int, int, str] | None = None  # (start, -length, name)
+    for match in _get_automaton().iter(text):
+        kind, value = match.value
+        if kind == _CRISIS:
+            crisis = True
+        elif kind == _INQUIRY:
+            inquiry = True
+        else:
+            key = (match.start, match.start - match.end, value)
+            if best is None or key < best:
+                best = key
+    client = best[2] if best else None
+    if client is None:
+        fallback = _HONORIFIC_NAME.search(text)
+        client = fallback.group(1) if fallback else None
+    return Scan(crisis, inquiry, client)
+
 
 def is_emergency(text: str) -> bool:
     """一刻を争う危機かどうかを判定。情報照会・状況報告は除外しエージェントに任せる。"""
-    # まず情報照会かどうかを確認
-    if any(kw in text for kw in INQUIRY_INDICATORS):
-        return False
-    return any(kw in text for kw in CRISIS_KEYWORDS)
+    return scan(text).is_emergency
 
 
 def extract_client_name(text: str) -> str | None:
-    """テキストからクライアント名（漢字2〜4文字 + さん）を抽出する。"""
-    match = re.search(r"([一-龯]{2,4})\s?さん", text)
-    return match.group(1) if match else None
+    """テキストからクライアント名（登録名・読み・別名、または漢字2〜4文字 + さん）を抽出する。"""
+    return scan(text).client
 
 
 def _find_client_name(text: str, message_history: list[str] | None = None) -> str | None:
@@ -53,67 +123,50 @@ def _find_client_name(text: str, message_history: list[str] | None = None) -> st
     return None
 
 
-def handle_emergency(text: str, message_history: list[str] | None = None) -> str:
-    """緊急情報を直接DBから取得して返す。
+def handle_emergency(
+    text: str,
+    message_history: list[str] | None = None,
+    client_name: str | None = None,
+) -> str:
+    """緊急情報を返す（LLM を介さず、app.lib.emergency の組み立て済みバンドルから）。
 
-    現在のメッセージにクライアント名がない場合、会話履歴から探す。
+    client_name が渡されればそれを使う（チャットは scan() 済みの結果を渡す）。
+    なければ現在のメッセージ、次に会話履歴から探す。
     """
-    client_name = _find_client_name(text, message_history)
+    client_name = client_name or _find_client_name(text, message_history)
     if not client_name:
         return "クライアント名を特定できません。「〇〇さんの緊急情報」のように指定してください。"
 
-    records = run_query("""
-        MATCH (c:Client {name: $name})
-        OPTIONAL MATCH (c)-[:MUST_AVOID]->(ng:NgAction)
-        OPTIONAL MATCH (c)-[:REQUIRES]->(cp:CarePreference)
-        OPTIONAL MATCH (c)-[kpRel:HAS_KEY_PERSON]->(kp:KeyPerson)
-        OPTIONAL MATCH (c)-[:TREATED_AT]->(h:Hospital)
-        OPTIONAL MATCH (c)-[:HAS_LEGAL_REP]->(g:Guardian)
-        RETURN c, collect(DISTINCT ng) AS ng_actions,
-               collect(DISTINCT cp) AS care_prefs,
-               collect(DISTINCT kp {.*, rank: kpRel.rank}) AS key_persons,
-               collect(DISTINCT h) AS hospitals, collect(DISTINCT g) AS guardians
-    """, {"name": client_name})
-    if not records:
+    bundle = emergency.get_bundle(client_name)
+    if bundle is None:
         return f"「{client_name}」さんの情報が見つかりません。"
 
-    r = records[0]
     parts = [f"## {client_name}さんの緊急情報\n"]
 
-    # 禁忌事項
-    ng_actions = r.get("ng_actions", [])
-    if ng_actions:
+    # 禁忌事項（riskLevel 順）
+    if bundle.ng_actions:
         parts.append("### ⚠️ 禁忌事項（絶対にしてはいけないこと）")
-        for ng in ng_actions:
-            ng = dict(ng)
-            parts.append(f"- **{ng.get('action','')}** [{ng.get('riskLevel','')}]: {ng.get('reason','')}")
+        for ng in bundle.ng_actions:
+            parts.append(f"- **{ng.action}** [{ng.risk_level}]: {ng.reason or ''}")
     else:
         parts.append("### 禁忌事項\n登録されていません。")
 
     # 推奨ケア
-    care_prefs = r.get("care_prefs", [])
-    if care_prefs:
+    if bundle.care_preferences:
         parts.append("\n### 推奨ケア")
-        for cp in care_prefs:
-            cp = dict(cp)
-            parts.append(f"- {cp.get('category','')}: {cp.get('instruction','')}")
+        for cp in bundle.care_preferences:
+            parts.append(f"- {cp.category}: {cp.instruction}")
 
-    # 緊急連絡先
-    key_persons = r.get("key_persons", [])
-    if key_persons:
+    # 緊急連絡先（rank 順）
+    if bundle.key_persons:
         parts.append("\n### 緊急連絡先")
-        # rankでソート
-        sorted_kps = sorted(key_persons, key=lambda kp: dict(kp).get("rank", 99))
-        for kp in sorted_kps:
-            kp = dict(kp)
-            parts.append(f"- {kp.get('name','')} ({kp.get('relationship','')}): {kp.get('phone','N/A')}")
+        for kp in bundle.key_persons:
+            parts.append(f"- {kp.name} ({kp.relationship or ''}): {kp.phone or 'N/A'}")
 
     # かかりつけ病院
-    hospitals = r.get("hospitals", [])
-    if hospitals:
+    if bundle.hospitals:
         parts.append("\n### かかりつけ病院")
-        for h in hospitals:
-            h = dict(h)
-            parts.append(f"- {h.get('name','')} TEL: {h.get('phone','N/A')}")
+        for h in bundle.hospitals:
+            parts.append(f"- {h.get('name', '')} TEL: {h.get('phone', 'N/A')}")
 
     return "\n".join(parts)
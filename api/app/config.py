@@ -24,6 +24,73 @@ class Settings(BaseSettings):
     # チャットで使用するプロバイダー: "gemini" / "claude" / "openai" / "ollama"
     chat_provider: str = "gemini"
 
+    # ダッシュボード集計（app.lib.stats）の全件再集計間隔（秒）
+    stats_reconcile_interval: int = 300
+
+    # バックグラウンドジョブ（app.lib.jobs: 文字起こし・埋め込み等）の同時実行数
+    job_concurrency: int = 2
+
+    # 長い音声の分割文字起こし（app.lib.transcription）: 区切り長（秒）と同時実行数
+    transcription_segment_seconds: int = 600
+    transcription_concurrency: int = 4
+
+    # LLM 抽出結果キャッシュ（app.lib.extraction_cache）。パス未指定時は api/cache/ 配下
+    extraction_cache_path: str = ""
+    extraction_cache_ttl_seconds: int = 30 * 24 * 3600
+    extraction_cache_max_entries: int = 2000
+
+    # 長文ナラティブの分割抽出（extract_from_text_chunked）
+    extraction_chunk_tokens: int = 3000
+    extraction_concurrency: int = 4
+
+    # インテークのセッション保存先（app.lib.session_store）: "memory" または
+    # "sqlite"（複数ワーカーで共有）。パス未指定時は api/cache/ 配下
+    intake_session_store: str = "memory"
+    intake_session_path: str = ""
+    intake_session_ttl_seconds: int = 1800
+
+    # チャットの会話メモリ（app.lib.conversation_memory）: 直近ターンの
+    # トークン予算と、押し出したターンの要約の上限
+    chat_memory_token_budget: int = 3000
+    chat_memory_summary_tokens: int = 600
+
+    # 定型質問の回答キャッシュ（app.lib.response_cache）: 質問の埋め込みの
+    # コサイン類似度がしきい値以上で、対象クライアントのデータが未変更なら再利用。
+    # TTL は最大 300 秒（他プロセスの書き込みは検知できないため）
+    chat_response_cache_enabled: bool = True
+    chat_response_cache_threshold: float = 0.93
+    chat_response_cache_ttl_seconds: int = 300
+    chat_response_cache_max_entries: int = 500
+
+    # LLM / 埋め込み呼び出しのレート制御（app.lib.rate_limit）: モデルごとの
+    # 分あたり開始数と同時実行数の上限（429 / 5xx で自動的に絞る）、再試行回数
+    llm_rate_limit_rpm: int = 600
+    llm_max_concurrency: int = 8
+    embedding_rate_limit_rpm: int = 1500
+    embedding_max_concurrency: int = 8
+    rate_limit_retries: int = 3
+
+    # 同時に走る同一の読み取り（run_query・embed_text・fetch_ecomap_data）を
+    # 1 回の実行にまとめる（app.lib.singleflight）
+    single_flight_enabled: bool = True
+
+    # オフライン負荷試験・CI 用の代替バックエンド
+    # llm_backend: "gemini" または "fake"（app.lib.fake_llm: 決定的な埋め込み・生成・チャット）
+    # graph_backend: "neo4j" または "memory"（app.lib.memory_graph: プロセス内グラフ）
+    llm_backend: str = "gemini"
+    graph_backend: str = "neo4j"
+    # fake の遅延（基準 + ばらつき。分布は "uniform" / "exponential"）・故障率・
+    # 同時実行上限（超過は 429。0 は無制限）・シード
+    fake_latency_ms: int = 50
+    fake_latency_jitter_ms: int = 50
+    fake_latency_distribution: str = "uniform"
+    fake_error_rate: float = 0.0
+    fake_max_concurrency: int = 0
+    fake_seed: int = 0
+    # memory の初期データ（合成クライアント数）とクエリあたりの遅延
+    memory_graph_clients: int = 20
+    memory_graph_latency_ms: int = 0
+
     backend_port: int = 8001
     frontend_port: int = 3001
 
@@ -0,0 +1,88 @@
+"""Aho-Corasick multi-pattern matcher.
+
+キーワードごとに ``kw in text`` を繰り返すと、パターン数 × テキスト長の
+走査になる。ここではパターン全体から 1 つのオートマトン（トライ + 失敗
+リンク）を作り、テキストを 1 回なめるだけで全パターンの出現を列挙する
+（O(テキスト長 + 出現数)）。
+
+各パターンには任意の値を結び付けられる。同じパターンに複数の値を
+登録した場合は、出現ごとにすべての値を返す。
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Generic, Iterable, Iterator, NamedTuple, TypeVar
+
+V = TypeVar("V")
+
+
+class Match(NamedTuple, Generic[V]):
+    start: int
+    end: int  # exclusive
+    value: V
+
+
+class AhoCorasick(Generic[V]):
+    """Automaton over ``(pattern, value)`` pairs; empty patterns are ignored."""
+
+    def __init__(self, patterns: Iterable[tuple[str, V]]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # Values of patterns ending exactly at a state, with the pattern length
+        self._out: list[tuple[int, list[V]] | None] = [None]
+        # Nearest proper suffix state that has an output (0 when none)
+        self._link: list[int] = [0]
+        self.size = 0
+        for pattern, value in patterns:
+            if pattern:
+                self._add(pattern, value)
+        self._build_links()
+
+    def _add(self, pattern: str, value: V) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(None)
+                self._link.append(0)
+            state = nxt
+        out = self._out[state]
+        if out is None:
+            self._out[state] = (len(pattern), [value])
+        else:
+            out[1].append(value)
+        self.size += 1
+
+    def _build_links(self) -> None:
+        goto, fail, out, link = self._goto, self._fail, self._out, self._link
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                link[nxt] = fail[nxt] if out[fail[nxt]] is not None else link[fail[nxt]]
+
+    def iter(self, text: str) -> Iterator[Match[V]]:
+        """Every occurrence of every pattern, in order of end position."""
+        goto, fail, out, link = self._goto, self._fail, self._out, self._link
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            hit = state if out[state] is not None else link[state]
+            while hit:
+                length, values = out[hit]
+                for value in values:
+                    yield Match(i + 1 - length, i + 1, value)
+                hit = link[hit]
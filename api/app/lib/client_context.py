@@ -0,0 +1,189 @@
+"""Per-session client profile bundles for the chat agent tools.
+
+チャットエージェントの検索ツール（基本情報・禁忌事項・推奨ケア・緊急連絡先・
+病院・後見人）はそれぞれ名前解決 + 個別の Cypher を実行しており、緊急時の
+プロンプトに従って 3〜4 個を続けて呼ぶと 6〜8 回の DB 往復になっていた。
+
+ここではクライアント名が解決されたときに、そのクライアントのプロフィール
+一式を 1 クエリで取得し、セッションの ClientContext に保持する。以降の
+ツールは書き込みで無効化されるまでバンドルから答える。
+
+- セッションの ClientContext は ``activate()`` で現在のターンに結び付ける
+  （ContextVar。エージェントが同期ツールを実行する asyncio.to_thread にも
+  引き継がれる）。アクティブなコンテキストがない呼び出しは都度取得する。
+- 無効化は db_operations.add_write_listener で受ける。対象クライアント名が
+  分かる書き込みはその名前だけ、分からない書き込みは全バンドルを無効にする。
+- 他プロセスの書き込みは通知されないので、取得から ``_MAX_AGE_SECONDS`` を
+  過ぎたバンドルは取り直す（emergency・response_cache と同じ上限）。
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from typing import Any, Callable
+
+from app.lib.db_operations import add_write_listener, run_query
+
+# Labels whose writes can change a profile bundle
+PROFILE_LABELS = {"Client", "Condition", "NgAction", "CarePreference", "KeyPerson", "Hospital", "Guardian"}
+
+# Writes made by other processes do not notify this one: bundles older than
+# this are fetched again
+_MAX_AGE_SECONDS = 300
+
+_RISK_ORDER = {"LifeThreatening": 1, "Panic": 2}
+
+_PROFILE_QUERY = """
+MATCH (c:Client {name: $name})
+RETURN c.name AS name, c.dob AS dob, c.bloodType AS bloodType,
+       COLLECT { MATCH (c)-[:HAS_CONDITION]->(cond:Condition) RETURN DISTINCT cond.name } AS conditions,
+       COLLECT { MATCH (c)-[:MUST_AVOID]->(ng:NgAction)
+                 RETURN {action: ng.action, reason: ng.reason, riskLevel: ng.riskLevel} } AS ng_actions,
+       COLLECT { MATCH (c)-[:REQUIRES]->(cp:CarePreference)
+                 RETURN {category: cp.category, instruction: cp.instruction, priority: cp.priority} } AS care_preferences,
+       COLLECT { MATCH (c)-[rel:HAS_KEY_PERSON]->(kp:KeyPerson)
+                 RETURN {name: kp.name, relationship: kp.relationship, phone: kp.phone, rank: rel.rank} } AS contacts,
+       COLLECT { MATCH (c)-[:TREATED_AT]->(h:Hospital)
+                 RETURN {name: h.name, phone: h.phone, address: h.address} } AS hospitals,
+       COLLECT { MATCH (c)-[:HAS_LEGAL_REP]->(g:Guardian)
+                 RETURN {name: g.name, type: g.type, phone: g.phone, organization: g.organization} } AS guardians
+"""
+
+_PARTIAL_QUERY = "MATCH (c:Client) WHERE c.name CONTAINS $partial RETURN c.name AS name LIMIT 5"
+
+_lock = threading.Lock()
+# Bumped by writes whose client is unknown (invalidates every bundle)
+_global_generation = 0
+# Bumped per client name by writes that name their client
+_client_generations: dict[str, int] = {}
+
+
+def _generation_of(names: set[str]) -> tuple:
+    with _lock:
+        return (_global_generation, *sorted((n, _client_generations.get(n, 0)) for n in names))
+
+
+def _snapshot() -> tuple[int, dict[str, int]]:
+    with _lock:
+        return _global_generation, dict(_client_generations)
+
+
+def _on_write(labels: set[str] | None, client_names: set[str] | None) -> None:
+    global _global_generation
+    if labels is not None and not labels & PROFILE_LABELS:
+        return
+    with _lock:
+        if client_names:
+            for name in client_names:
+                _client_generations[name] = _client_generations.get(name, 0) + 1
+        else:
+            _global_generation += 1
+
+
+add_write_listener(_on_write)
+
+
+def suggestion_note(requested: str, candidates: list[str]) -> str:
+    """Note shown when ``requested`` is not registered but similar names are."""
+    return (
+        f"「{requested}」さんは登録されていません。"
+        f"もしかして「{'」「'.join(candidates)}」さんのことですか？"
+        f" 以下は「{candidates[0]}」さんの情報です。"
+    )
+
+
+def _normalize(row: dict) -> dict[str, Any]:
+    profile = dict(row)
+    profile["conditions"] = [c for c in row.get("conditions") or [] if c]
+    profile["ng_actions"] = sorted(
+        (ng for ng in row.get("ng_actions") or [] if ng.get("action")),
+        key=lambda ng: _RISK_ORDER.get(ng.get("riskLevel") or "", 3),
+    )
+    profile["care_preferences"] = list(row.get("care_preferences") or [])
+    profile["contacts"] = sorted(
+        (kp for kp in row.get("contacts") or [] if kp.get("name")),
+        key=lambda kp: (kp.get("rank") is None, kp.get("rank") or 0),
+    )
+    profile["hospitals"] = [h for h in row.get("hospitals") or [] if h.get("name")]
+    profile["guardians"] = [g for g in row.get("guardians") or [] if g.get("name") or g.get("type")]
+    return profile
+
+
+def fetch_profile(client_name: str) -> tuple[dict[str, Any] | None, str | None]:
+    """Resolve ``client_name`` and load its profile bundle.
+
+    Returns:
+        (profile or None when no client matches, suggestion note for a partial match)
+    """
+    rows = run_query(_PROFILE_QUERY, {"name": client_name})
+    if rows:
+        return _normalize(rows[0]), None
+
+    # 姓（先頭2文字）で部分一致フォールバック
+    partial = run_query(_PARTIAL_QUERY, {"partial": client_name[:2]})
+    candidates = [r["name"] for r in partial if r.get("name")]
+    if not candidates:
+        return None, None
+    rows = run_query(_PROFILE_QUERY, {"name": candidates[0]})
+    return (_normalize(rows[0]) if rows else None), suggestion_note(client_name, candidates)
+
+
+class ClientContext:
+    """Profile bundles fetched during one chat session, keyed by requested name."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        # requested name → (generation, fetched at, profile, note)
+        self._entries: dict[str, tuple[tuple, float, dict | None, str | None]] = {}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.fetches = 0
+        # Registered name of the most recently resolved client (pinned in chat memory)
+        self.last_client: str | None = None
+
+    def lookup(self, client_name: str) -> tuple[dict[str, Any] | None, str | None]:
+        with self._lock:
+            entry = self._entries.get(client_name)
+        if entry is not None:
+            generation, fetched_at, profile, note = entry
+            names = {client_name, profile["name"]} if profile else {client_name}
+            fresh = self._clock() - fetched_at <= _MAX_AGE_SECONDS
+            if fresh and generation == _generation_of(names):
+                if profile:
+                    self.last_client = profile["name"]
+                return profile, note
+
+        # Generations are read before the query, so a write racing with it
+        # leaves the entry already stale
+        global_generation, client_generations = _snapshot()
+        fetched_at = self._clock()
+        profile, note = fetch_profile(client_name)
+        self.fetches += 1
+        names = {client_name, profile["name"]} if profile else {client_name}
+        generation = (global_generation, *sorted((n, client_generations.get(n, 0)) for n in names))
+        with self._lock:
+            self._entries[client_name] = (generation, fetched_at, profile, note)
+        if profile:
+            self.last_client = profile["name"]
+        return profile, note
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_current: contextvars.ContextVar[ClientContext | None] = contextvars.ContextVar("client_context", default=None)
+
+
+def activate(context: ClientContext) -> contextvars.Token:
+    """Bind ``context`` to the current task (a chat turn)."""
+    return _current.set(context)
+
+
+def lookup(client_name: str) -> tuple[dict[str, Any] | None, str | None]:
+    """Profile for ``client_name`` from the active session context (or a fresh fetch)."""
+    context = _current.get()
+    if context is None:
+        return fetch_profile(client_name)
+    return context.lookup(client_name)
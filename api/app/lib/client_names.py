@@ -0,0 +1,174 @@
+"""Registered client names (and their kana / aliases) for in-text matching.
+
+Safety First はメッセージ中のクライアント名を ``[一-龯]{2,4}さん`` の正規表現で
+拾っていたため、かな表記や別名・敬称なしの呼び方を取りこぼしていた。
+ここでは登録済みクライアントの表記ゆれ（氏名・空白なし氏名・読みの
+ひらがな/カタカナ・``aliases`` プロパティ）→ 登録名 の対応表を保持し、
+呼び出し側（safety_first）が Aho-Corasick のオートマトンにまとめる。
+
+- warm() で起動時に全件を読み込む。読み込み前（DB 未接続時など）は空で、
+  チャット処理の途中で DB を待つことはない。
+- Client への書き込み（db_operations.add_write_listener）は、対象名が
+  分かればその名前だけ読み直し、分からなければバックグラウンドで全件を
+  読み直す。``_MAX_AGE_SECONDS`` 経過時も同様（他プロセスの書き込み対策）。
+- 変更のたびに ``generation`` が進むので、呼び出し側はそれを見て
+  オートマトンを作り直す。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from app.lib.db_operations import add_write_listener, run_query
+
+logger = logging.getLogger(__name__)
+
+# Writes made by other processes do not notify this one
+_MAX_AGE_SECONDS = 300
+
+# Shorter kana readings match inside ordinary words (「たなか」 in 「またなかった」)
+_MIN_KANA_LENGTH = 3
+_MIN_NAME_LENGTH = 2
+
+_QUERY = """
+MATCH (c:Client)
+WHERE $names IS NULL OR c.name IN $names
+RETURN c.name AS name, c.kana AS kana, c.aliases AS aliases
+"""
+
+_lock = threading.Lock()
+# registered name -> surface forms
+_forms: dict[str, set[str]] = {}
+_loaded = False
+_built_at = 0.0
+_refreshing = False
+generation = 0
+
+
+def _katakana(hiragana: str) -> str:
+    return "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in hiragana)
+
+
+def surface_forms(name: str, kana: str | None = None, aliases: list[str] | None = None) -> set[str]:
+    """Ways ``name`` may be written in a chat message."""
+    forms = set()
+    for form in (name, "".join(name.split())):
+        if len(form) >= _MIN_NAME_LENGTH:
+            forms.add(form)
+    if kana:
+        kana = "".join(kana.split())
+        if len(kana) >= _MIN_KANA_LENGTH:
+            forms.update((kana, _katakana(kana)))
+    for alias in aliases or []:
+        alias = (alias or "").strip()
+        if len(alias) >= _MIN_NAME_LENGTH:
+            forms.add(alias)
+    return forms
+
+
+def _load(names: list[str] | None = None) -> dict[str, set[str]]:
+    rows = run_query(_QUERY, {"names": names})
+    forms: dict[str, set[str]] = {}
+    for row in rows:
+        name = row.get("name")
+        if not name:
+            continue
+        aliases = row.get("aliases")
+        if isinstance(aliases, str):
+            aliases = [aliases]
+        forms[name] = surface_forms(name, row.get("kana"), aliases)
+    return forms
+
+
+def warm() -> int:
+    """Load every client's forms synchronously. Returns the client count."""
+    global _forms, _loaded, _built_at, generation
+    forms = _load()
+    with _lock:
+        _forms = forms
+        _loaded = True
+        _built_at = time.monotonic()
+        generation += 1
+    return len(forms)
+
+
+def reset() -> None:
+    """Forget every name (nothing matches until the next warm())."""
+    global _forms, _loaded, generation
+    with _lock:
+        _forms = {}
+        _loaded = False
+        generation += 1
+
+
+def _rebuild() -> None:
+    global _refreshing, _built_at
+    try:
+        warm()
+    except Exception as exc:
+        logger.warning("Client name refresh failed: %s", exc)
+        with _lock:
+            _built_at = time.monotonic()  # retry after another _MAX_AGE_SECONDS
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def _schedule_rebuild() -> None:
+    global _refreshing
+    with _lock:
+        if _refreshing or not _loaded:
+            return
+        _refreshing = True
+    threading.Thread(target=_rebuild, name="client-names-refresh", daemon=True).start()
+
+
+def _refresh_names(names: set[str]) -> None:
+    global generation
+    try:
+        forms = _load(sorted(names))
+    except Exception as exc:
+        logger.warning("Client name update failed: %s", exc)
+        _schedule_rebuild()
+        return
+    with _lock:
+        if not _loaded:
+            return
+        for name in names:
+            _forms.pop(name, None)
+        _forms.update(forms)
+        generation += 1
+
+
+def _on_write(labels: set[str] | None, client_names: set[str] | None) -> None:
+    if labels is not None and "Client" not in labels:
+        return
+    with _lock:
+        loaded = _loaded
+    if not loaded:
+        return
+    if client_names:
+        _refresh_names(client_names)
+    else:
+        _schedule_rebuild()
+
+
+add_write_listener(_on_write)
+
+
+def current_generation() -> int:
+    """Cheap change check; also starts a background refresh once the names are old."""
+    with _lock:
+        expired = _loaded and time.monotonic() - _built_at > _MAX_AGE_SECONDS
+        result = generation
+    if expired:
+        _schedule_rebuild()
+    return result
+
+
+def snapshot() -> tuple[int, dict[str, set[str]]]:
+    """(generation, {registered name: surface forms}); empty before warm()."""
+    with _lock:
+        return generation, {name: set(forms) for name, forms in _forms.items()}
@@ -0,0 +1,146 @@
+"""Compact columnar wire format for graph visualization payloads.
+
+Graph explore and ecomap responses repeat label strings, property keys and
+long elementIds for every node and edge. With ``?format=compact`` the
+routers return the same data dictionary-encoded instead:
+
+- labels / property keys / relationship types are sent once in lookup tables
+  and referenced by integer index,
+- nodes and edges are parallel arrays (one list per field),
+- edges reference nodes by their position in the node arrays,
+- properties are flat ``[key_index, value, key_index, value, ...]`` lists.
+
+The body is MessagePack when the client sends ``Accept: application/x-msgpack``
+and the optional ``msgpack`` package is installed; otherwise JSON, gzip'd when
+the client accepts it.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+from typing import Any
+
+from fastapi import Request, Response
+
+from app.schemas.ecomap import EcomapData
+from app.schemas.graph import GraphExploreResponse
+
+COMPACT_VERSION = 1
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+# Bodies smaller than this are not worth compressing.
+_GZIP_MIN_BYTES = 512
+
+
+class _Interner:
+    """Assigns consecutive integer ids to distinct values."""
+
+    def __init__(self) -> None:
+        self.values: list[Any] = []
+        self._index: dict[Any, int] = {}
+
+    def __call__(self, value: Any) -> int:
+        idx = self._index.get(value)
+        if idx is None:
+            idx = len(self.values)
+            self._index[value] = idx
+            self.values.append(value)
+        return idx
+
+
+def _encode_props(props: dict, keys: _Interner) -> list:
+    flat: list = []
+    for k, v in props.items():
+        flat.append(keys(k))
+        flat.append(v)
+    return flat
+
+
+def encode_graph(data: GraphExploreResponse) -> dict:
+    """Columnar form of a GraphExploreResponse. Edges whose endpoints are absent are dropped."""
+    labels, keys, types = _Interner(), _Interner(), _Interner()
+    position = {n.id: i for i, n in enumerate(data.nodes)}
+
+    nodes = {
+        "label": [labels(n.label) for n in data.nodes],
+        "name": [n.name for n in data.nodes],
+        "props": [_encode_props(n.properties, keys) for n in data.nodes],
+    }
+    edges: dict[str, list] = {"source": [], "target": [], "type": [], "props": []}
+    for e in data.edges:
+        if e.source not in position or e.target not in position:
+            continue
+        edges["source"].append(position[e.source])
+        edges["target"].append(position[e.target])
+        edges["type"].append(types(e.type))
+        edges["props"].append(_encode_props(e.properties, keys))
+
+    return {
+        "v": COMPACT_VERSION,
+        "labels": labels.values,
+        "keys": keys.values,
+        "types": types.values,
+        "nodes": nodes,
+        "edges": edges,
+        "truncated": data.truncated,
+    }
+
+
+def encode_ecomap(data: EcomapData) -> dict:
+    """Columnar form of EcomapData. Colors are sent once per category."""
+    categories, node_labels, keys, rel_labels = _Interner(), _Interner(), _Interner(), _Interner()
+    position = {n.id: i for i, n in enumerate(data.nodes)}
+    colors: dict[str, str] = {}
+    for n in data.nodes:
+        colors.setdefault(n.category, n.color)
+
+    nodes = {
+        "label": [n.label for n in data.nodes],
+        "node_label": [node_labels(n.node_label) for n in data.nodes],
+        "category": [categories(n.category) for n in data.nodes],
+        "props": [_encode_props(n.properties, keys) for n in data.nodes],
+    }
+    edges: dict[str, list] = {"source": [], "target": [], "label": []}
+    for e in data.edges:
+        if e.source not in position or e.target not in position:
+            continue
+        edges["source"].append(position[e.source])
+        edges["target"].append(position[e.target])
+        edges["label"].append(rel_labels(e.label))
+
+    return {
+        "v": COMPACT_VERSION,
+        "client_name": data.client_name,
+        "template": data.template,
+        "categories": categories.values,
+        "colors": [colors[c] for c in categories.values],
+        "node_labels": node_labels.values,
+        "keys": keys.values,
+        "rel_labels": rel_labels.values,
+        "nodes": nodes,
+        "edges": edges,
+    }
+
+
+def _msgpack():
+    try:
+        import msgpack  # noqa: PLC0415 — optional dependency
+    except ImportError:
+        return None
+    return msgpack
+
+
+def render(payload: dict, request: Request) -> Response:
+    """Serialize a compact payload according to the client's Accept headers."""
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if MSGPACK_MEDIA_TYPE in request.headers.get("accept", ""):
+        msgpack = _msgpack()
+        if msgpack is not None:
+            return Response(msgpack.packb(payload), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(body) >= _GZIP_MIN_BYTES and "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type="application/json", headers=headers)
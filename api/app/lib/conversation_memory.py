@@ -0,0 +1,249 @@
+"""Bounded, summarized conversation memory for chat sessions.
+
+チャットセッションは Agno の InMemoryDb に会話全体（ツール結果を含む）を
+持ち、``num_history_runs`` 分をそのままプロンプトに積んでいた。ツール結果の
+JSON が大きいため、長い相談ではターンごとにプロンプトが伸び、LLM の遅延と
+コストも伸び続ける。ここではセッションごとに次の 3 層で文脈を組み立てる:
+
+- ウィンドウ — 直近のユーザー発話と回答テキスト（ツール結果は含めない）。
+  推定トークン数が ``token_budget`` を超えたら古いターンから押し出す。
+- 要約 — 押し出したターンはバックグラウンドで ``summarize`` に渡し、
+  ``summary_budget`` 以内の要約に畳み込む。要約が終わるまでの間や要約に
+  失敗したときは、発話の抜粋で代用する（ターンの応答を待たせない）。
+- ピン留め — 解決済みのクライアント名や進行中の緊急事態など、要約で
+  落ちては困る事実。常に文脈の先頭に置く。
+
+プロンプトに載る量は ``token_budget + summary_budget`` + ピン留めで頭打ちに
+なるので、相談が長くなってもターンあたりの遅延は一定に保たれる。
+``report()`` はターンごとのトークン数と遅延をまとめて返す。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from app.lib.chunking import count_tokens_approximate
+
+logger = logging.getLogger(__name__)
+
+# Characters of each evicted user message kept by the extractive fallback
+_EXCERPT_CHARS = 80
+
+
+@dataclass
+class Turn:
+    user: str
+    assistant: str
+    tokens: int
+
+
+@dataclass
+class TurnStats:
+    context_tokens: int
+    latency_ms: int
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+
+
+Summarizer = Callable[[str, list[Turn]], Awaitable[str]]
+
+
+def _truncate_to_budget(text: str, budget: int, keep_end: bool = False) -> str:
+    """Trim ``text`` (by characters) until its estimated tokens fit ``budget``."""
+    if count_tokens_approximate(text) <= budget:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        part = text[-mid:] if keep_end else text[:mid]
+        if count_tokens_approximate(part) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    part = text[-lo:] if keep_end else text[:lo]
+    return ("…" + part) if keep_end else (part + "…")
+
+
+def extractive_summary(summary: str, turns: list[Turn]) -> str:
+    """LLM を使わない要約: 既存の要約に、各ターンのユーザー発話の抜粋を追記する。"""
+    lines = [summary] if summary else []
+    for turn in turns:
+        text = " ".join(turn.user.split())
+        if text:
+            lines.append(f"- {text[:_EXCERPT_CHARS]}")
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    """Token-budgeted window + rolling summary + pinned facts for one session.
+
+    Turns are added after each completed reply with :meth:`add_turn`. The
+    prompt for the next turn is :meth:`context_messages` (the window) plus
+    :meth:`system_context` (pins and summary). Summarization runs as a task on
+    the running event loop, one at a time; call :meth:`aclose` when the
+    session ends.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 3000,
+        summary_budget: int = 600,
+        summarize: Summarizer | None = None,
+    ) -> None:
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self._summarize = summarize
+        self._window: deque[Turn] = deque()
+        self._window_tokens = 0
+        self._pending: list[Turn] = []
+        self._summary = ""
+        self._summarizer_task: asyncio.Task | None = None
+        self.pins: dict[str, str] = {}
+        self.stats: list[TurnStats] = []
+        self.summarized_turns = 0
+        self.summary_failures = 0
+
+    # -- pinned facts -------------------------------------------------------
+
+    def pin(self, key: str, value: str) -> None:
+        self.pins[key] = value
+
+    def unpin(self, key: str) -> None:
+        self.pins.pop(key, None)
+
+    # -- turns --------------------------------------------------------------
+
+    def add_turn(self, user: str, assistant: str) -> None:
+        """Append a completed exchange; evict old turns past the budget."""
+        tokens = count_tokens_approximate(user) + count_tokens_approximate(assistant)
+        self._window.append(Turn(user, assistant, tokens))
+        self._window_tokens += tokens
+        evicted = []
+        # Always keep the newest turn, even when it alone exceeds the budget
+        while self._window_tokens > self.token_budget and len(self._window) > 1:
+            turn = self._window.popleft()
+            self._window_tokens -= turn.tokens
+            evicted.append(turn)
+        if evicted:
+            self._pending.extend(evicted)
+            self._schedule_summary()
+
+    def record_stats(
+        self,
+        context_tokens: int,
+        latency_ms: int,
+        input_tokens: int | None = None,
+        output_tokens: int | None = None,
+    ) -> None:
+        self.stats.append(TurnStats(context_tokens, latency_ms, input_tokens, output_tokens))
+
+    # -- prompt -------------------------------------------------------------
+
+    def context_messages(self) -> list[dict]:
+        """The window as alternating user / assistant messages."""
+        messages = []
+        for turn in self._window:
+            messages.append({"role": "user", "content": turn.user})
+            if turn.assistant:
+                messages.append({"role": "assistant", "content": turn.assistant})
+        return messages
+
+    @property
+    def summary(self) -> str:
+        """Current summary, including an excerpt of turns still being summarized."""
+        if not self._pending:
+            return self._summary
+        return _truncate_to_budget(
+            extractive_summary(self._summary, self._pending), self.summary_budget, keep_end=True
+        )
+
+    def system_context(self) -> str | None:
+        """Pinned facts and the summary, for the agent's system message."""
+        parts = []
+        if self.pins:
+            parts.append("## 会話の前提（確定事項）")
+            parts.extend(f"- {key}: {value}" for key, value in self.pins.items())
+        summary = self.summary
+        if summary:
+            parts.append("## これまでの会話の要約")
+            parts.append(summary)
+        return "\n".join(parts) if parts else None
+
+    @property
+    def is_empty(self) -> bool:
+        """No turns, summary or pins yet (nothing but the question shapes the answer)."""
+        return not (self._window or self._pending or self._summary or self.pins)
+
+    def context_tokens(self) -> int:
+        """Estimated tokens this memory adds to the next prompt."""
+        return self._window_tokens + count_tokens_approximate(self.system_context() or "")
+
+    # -- summarization ------------------------------------------------------
+
+    def _schedule_summary(self) -> None:
+        if self._summarizer_task is not None and not self._summarizer_task.done():
+            return  # the running task picks up the new pending turns
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._fold(extractive_summary(self._summary, self._pending), len(self._pending))
+            return
+        self._summarizer_task = loop.create_task(self._run_summaries())
+
+    async def _run_summaries(self) -> None:
+        while self._pending:
+            batch = list(self._pending)
+            summary = None
+            if self._summarize is not None:
+                try:
+                    summary = await self._summarize(self._summary, batch)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.summary_failures += 1
+                    logger.warning("Conversation summary failed, using excerpt: %s", e)
+            if not summary:
+                summary = extractive_summary(self._summary, batch)
+            self._fold(summary, len(batch))
+
+    def _fold(self, summary: str, count: int) -> None:
+        self._summary = _truncate_to_budget(summary.strip(), self.summary_budget, keep_end=True)
+        del self._pending[:count]
+        self.summarized_turns += count
+
+    async def wait_for_summary(self) -> None:
+        """Wait until pending turns have been folded into the summary."""
+        if self._summarizer_task is not None:
+            await asyncio.gather(self._summarizer_task, return_exceptions=True)
+
+    async def aclose(self) -> None:
+        task = self._summarizer_task
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    # -- reporting ----------------------------------------------------------
+
+    def report(self) -> dict:
+        """Per-session token and latency report."""
+        latencies = sorted(s.latency_ms for s in self.stats)
+        known_in = [s.input_tokens for s in self.stats if s.input_tokens is not None]
+        known_out = [s.output_tokens for s in self.stats if s.output_tokens is not None]
+        return {
+            "turns": len(self.stats),
+            "window_turns": len(self._window),
+            "window_tokens": self._window_tokens,
+            "summarized_turns": self.summarized_turns,
+            "summary_tokens": count_tokens_approximate(self._summary),
+            "summary_failures": self.summary_failures,
+            "pins": dict(self.pins),
+            "context_tokens_max": max((s.context_tokens for s in self.stats), default=0),
+            "input_tokens": sum(known_in) if known_in else None,
+            "output_tokens": sum(known_out) if known_out else None,
+            "latency_ms_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_ms_max": latencies[-1] if latencies else None,
+        }
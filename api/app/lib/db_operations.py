@@ -5,14 +5,16 @@ from __future__ import annotations
 import hashlib
 import json
 import logging
+import re
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Callable, Iterator
 
 from neo4j import GraphDatabase, Driver
 from neo4j.time import Date as Neo4jDate, DateTime as Neo4jDateTime, Time as Neo4jTime, Duration as Neo4jDuration
 
 from app.config import settings
-from app.lib.normalize import normalize_name, normalize_text, normalize_condition, name_to_kana
+from app.lib.normalize import kana_row, normalize_name, normalize_text, normalize_condition, name_to_kana
+from app.lib.singleflight import SingleFlight, make_key
 
 logger = logging.getLogger(__name__)
 
@@ -90,9 +92,17 @@ _driver: Driver | None = None
 
 
 def get_driver() -> Driver:
-    """Return the singleton Neo4j driver, creating it on first call."""
+    """Return the singleton Neo4j driver, creating it on first call.
+
+    ``settings.graph_backend = "memory"`` のときは Neo4j の代わりに
+    プロセス内グラフ（app.lib.memory_graph）のドライバーを返す。
+    """
     global _driver
-    if _driver is None:
+    if _driver is None and settings.graph_backend == "memory":
+        from app.lib import memory_graph
+        _driver = memory_graph.get_driver()
+        logger.info("In-memory graph backend: %s", memory_graph.get_graph().stats())
+    elif _driver is None:
         _driver = GraphDatabase.driver(
             settings.neo4j_uri,
             auth=(settings.neo4j_username, settings.neo4j_password),
@@ -125,6 +135,110 @@ def is_db_available() -> bool:
         return False
 
 
+# ---------------------------------------------------------------------------
+# Write listeners
+# ---------------------------------------------------------------------------
+
+# Callback(labels, client_names) invoked after a graph write. Either argument
+# is None when it cannot be determined, meaning "assume everything changed".
+WriteListener = Callable[[set[str] | None, set[str] | None], None]
+
+_write_listeners: list[WriteListener] = []
+
+_LABEL_TOKEN_RE = re.compile(r":\s*`?(\w+)")
+
+
+def add_write_listener(listener: WriteListener) -> None:
+    """Register a callback notified after graph writes (used by read caches)."""
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def remove_write_listener(listener: WriteListener) -> None:
+    """Unregister a callback added with add_write_listener()."""
+    if listener in _write_listeners:
+        _write_listeners.remove(listener)
+
+
+# Bumped by every graph write; part of the read coalescing key so a read
+# issued after a write never joins a read that started before it
+_write_generation = 0
+
+
+def _notify_write(labels: set[str] | None, client_names: set[str] | None) -> None:
+    global _write_generation
+    _write_generation += 1
+    for listener in list(_write_listeners):
+        try:
+            listener(labels, client_names)
+        except Exception as exc:
+            logger.warning("Write listener %r failed: %s", listener, exc)
+
+
+def _labels_in_query(query: str) -> set[str] | None:
+    """Known node labels referenced by a Cypher statement (None if none are recognised)."""
+    labels = {tok for tok in _LABEL_TOKEN_RE.findall(query) if tok in ALLOWED_LABELS}
+    return labels or None
+
+
+# ---------------------------------------------------------------------------
+# Client list index
+# ---------------------------------------------------------------------------
+
+# Composite range index serving "WHERE c.kanaRow = $row ORDER BY c.name".
+CLIENT_KANA_ROW_INDEX = "client_kana_row_name_idx"
+
+
+def ensure_client_indexes() -> None:
+    """Create the Client kanaRow/name index if it doesn't exist (idempotent)."""
+    try:
+        run_query(
+            f"CREATE INDEX {CLIENT_KANA_ROW_INDEX} IF NOT EXISTS "
+            "FOR (c:Client) ON (c.kanaRow, c.name)"
+        )
+    except Exception as exc:
+        logger.warning("Failed to create index %s: %s", CLIENT_KANA_ROW_INDEX, exc)
+
+
+def backfill_client_kana(batch_size: int = 500) -> int:
+    """Persist ``kana`` / ``kanaRow`` on Client nodes that don't have a row key yet.
+
+    Runs once per startup; after the first pass only clients written
+    outside _register_node are touched. Names without a kana row (and
+    nameless clients) get an empty key so they are not revisited; updates go
+    by elementId. Returns the number of updated clients.
+    """
+    updated = 0
+    while True:
+        rows = run_query(
+            """
+            MATCH (c:Client)
+            WHERE c.kanaRow IS NULL
+            RETURN elementId(c) AS id, c.name AS name, c.kana AS kana
+            LIMIT $limit
+            """,
+            {"limit": batch_size},
+        )
+        if not rows:
+            return updated
+        batch = []
+        for row in rows:
+            name = row.get("name") or ""
+            kana = row.get("kana") or name_to_kana(name)
+            batch.append({"id": row["id"], "kana": kana or None, "row": kana_row(name, kana) or ""})
+        run_query(
+            """
+            UNWIND $batch AS b
+            MATCH (c:Client) WHERE elementId(c) = b.id
+            SET c.kana = coalesce(c.kana, b.kana), c.kanaRow = b.row
+            """,
+            {"batch": batch},
+        )
+        updated += len(batch)
+        if len(rows) < batch_size:
+            return updated
+
+
 # ---------------------------------------------------------------------------
 # Query execution
 # ---------------------------------------------------------------------------
@@ -153,15 +267,82 @@ def _sanitize_record(record_dict: dict) -> dict:
     return {k: _sanitize_value(v) for k, v in record_dict.items()}
 
 
-def run_query(query: str, params: dict | None = None) -> list[dict]:
+def _write_counters(result: Any) -> Any | None:
+    """Return the SummaryCounters of a result if the query wrote anything."""
+    try:
+        counters = result.consume().counters
+    except AttributeError:
+        return None
+    return counters if counters.contains_updates else None
+
+
+def _returned_id(result: Any) -> str:
+    """Return the ``id`` column of a single-row result ("" if unavailable)."""
+    try:
+        record = result.single()
+    except AttributeError:
+        return ""
+    return str(record["id"]) if record is not None else ""
+
+
+_WRITE_CLAUSE_RE = re.compile(
+    r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|FOREACH|LOAD\s+CSV|IN\s+TRANSACTIONS)\b", re.IGNORECASE
+)
+
+_read_flight = SingleFlight("run_query")
+
+
+def is_read_query(query: str) -> bool:
+    """Whether a Cypher statement has no write clause (procedure names included)."""
+    return _WRITE_CLAUSE_RE.search(query) is None
+
+
+def write_generation() -> int:
+    """Counter bumped by every graph write made through this process."""
+    return _write_generation
+
+
+def run_query(query: str, params: dict | None = None, client_names: set[str] | None = None) -> list[dict]:
     """Execute a Cypher query and return all records as a list of dicts.
 
     Neo4j 固有の日付・時刻型は自動的に文字列へ変換される。
+    書き込みクエリの場合はダッシュボード集計（app.lib.stats）にも反映する。
+    書き込み対象のクライアントが分かっている場合は ``client_names`` を渡すと、
+    読み取りキャッシュの無効化がそのクライアントに限定される。
+    同じ読み取りクエリ・パラメータが実行中なら、その結果を共有する
+    （app.lib.singleflight）。
     """
+    if settings.single_flight_enabled and is_read_query(query):
+        key = make_key(query, params or {}, _write_generation)
+        return _read_flight.do(key, _run_query, query, params)
+    return _run_query(query, params, client_names)
+
+
+def _run_query(query: str, params: dict | None = None, client_names: set[str] | None = None) -> list[dict]:
     driver = get_driver()
     with driver.session() as session:
         result = session.run(query, params or {})
-        return [_sanitize_record(record.data()) for record in result]
+        records = [_sanitize_record(record.data()) for record in result]
+        counters = _write_counters(result)
+    if counters is not None:
+        from app.lib import stats
+        stats.record_write(query, counters)
+        _notify_write(_labels_in_query(query), client_names)
+    return records
+
+
+def stream_query(query: str, params: dict | None = None, fetch_size: int = 100) -> Iterator[dict]:
+    """Execute a read query and yield records as the driver receives them.
+
+    run_query() の逐次版。セッションはイテレーション中ずっと開いたままになり、
+    レコードは fetch_size 件ずつサーバーから取得される（大きな部分グラフの
+    ストリーミング応答用）。
+    """
+    driver = get_driver()
+    with driver.session(fetch_size=fetch_size) as session:
+        result = session.run(query, params or {})
+        for record in result:
+            yield _sanitize_record(record.data())
 
 
 # ---------------------------------------------------------------------------
@@ -172,11 +353,11 @@ def _register_node(
     session: Any,
     label: str,
     properties: dict,
-) -> bool:
-    """Register a single node; return True on success."""
+) -> str | None:
+    """Register a single node; return its elementId on success, None if skipped."""
     if label not in ALLOWED_LABELS:
         logger.warning("Skipping node with disallowed label: %r", label)
-        return False
+        return None
 
     props = {k: v for k, v in properties.items() if v is not None}
 
@@ -195,6 +376,11 @@ def _register_node(
                     kana = name_to_kana(name_val)
                     if kana:
                         props["kana"] = kana
+            # Kana-row key backs the server-side filter of GET /api/clients
+            if label == "Client" and props.get("name"):
+                row = kana_row(props["name"], props.get("kana"))
+                if row:
+                    props["kanaRow"] = row
         elif label == "Condition":
             if "name" in props and isinstance(props["name"], str):
                 props["name"] = normalize_condition(props["name"])
@@ -222,27 +408,32 @@ def _register_node(
             logger.warning(
                 "Skipping %s node — missing merge key(s): %s", label, missing
             )
-            return False
+            return None
         merge_props = {k: props[k] for k in keys}
         extra_props = {k: v for k, v in props.items() if k not in keys}
         cypher = (
             f"MERGE (n:{label} {{{', '.join(f'{k}: ${k}' for k in keys)}}})\n"
             f"ON CREATE SET n += $extra_props\n"
             f"ON MATCH SET n += $extra_props\n"
-            f"RETURN n"
+            f"RETURN elementId(n) AS id"
         )
         params = {**merge_props, "extra_props": extra_props}
-        session.run(cypher, params)
+        result = session.run(cypher, params)
     else:
         # CREATE-only labels
         # Auto-generate sourceHash for dedup if not already present
         if label in _HASHABLE_CREATE_LABELS and "sourceHash" not in props:
             hash_input = json.dumps(props, sort_keys=True, ensure_ascii=False, default=str)
             props["sourceHash"] = hashlib.sha256(hash_input.encode("utf-8")).hexdigest()
-        cypher = f"CREATE (n:{label} $props) RETURN n"
-        session.run(cypher, {"props": props})
+        cypher = f"CREATE (n:{label} $props) RETURN elementId(n) AS id"
+        result = session.run(cypher, {"props": props})
 
-    return True
+    element_id = _returned_id(result)
+    counters = _write_counters(result)
+    if counters is not None and counters.nodes_created:
+        from app.lib import stats
+        stats.record_node_created(label, props)
+    return element_id
 
 
 def _register_relationship(
@@ -282,13 +473,26 @@ def _register_relationship(
         f"ON MATCH SET r += $props\n"
         f"RETURN r"
     )
-    session.run(
+    result = session.run(
         cypher,
         {"from_value": from_value, "to_value": to_value, "props": properties},
     )
+    counters = _write_counters(result)
+    if counters is not None and counters.relationships_created:
+        from app.lib import stats
+        stats.record_relationships_created(rel_type, int(counters.relationships_created))
     return True
 
 
+def _clients_linked_to(session: Any, element_ids: list[str]) -> set[str]:
+    """Names of the clients directly linked to any of ``element_ids``."""
+    result = session.run(
+        "MATCH (c:Client)--(n) WHERE elementId(n) IN $ids RETURN DISTINCT c.name AS name",
+        {"ids": element_ids},
+    )
+    return {record["name"] for record in result if record["name"]}
+
+
 # ---------------------------------------------------------------------------
 # Main registration function
 # ---------------------------------------------------------------------------
@@ -309,6 +513,8 @@ def register_to_database(
         - ``client_name``: Name of the primary Client node (or ``None``)
         - ``registered_count``: Number of successfully registered nodes
         - ``registered_types``: List of node labels that were registered
+        - ``node_ids``: elementId of each input node, aligned with ``nodes``
+          (None for skipped nodes)
         - ``error``: Error message (only present when status is ``"error"``)
     """
     nodes: list[dict] = extracted_graph.get("nodes", []) or []
@@ -317,12 +523,15 @@ def register_to_database(
     client_name: str | None = None
     registered_count = 0
     registered_types: list[str] = []
+    node_ids: list[str | None] = [None] * len(nodes)
+    touched_labels: set[str] = set()
+    touched_clients: set[str] = set()
 
     try:
         driver = get_driver()
         with driver.session() as session:
             # --- Register nodes ---
-            for node in nodes:
+            for i, node in enumerate(nodes):
                 label = node.get("label", "")
                 properties = node.get("properties", {}) or {}
 
@@ -330,10 +539,14 @@ def register_to_database(
                 if label == "Client" and "name" in properties:
                     client_name = normalize_name(properties.get("name", ""))
 
-                if _register_node(session, label, properties):
+                node_ids[i] = _register_node(session, label, properties)
+                if node_ids[i] is not None:
                     registered_count += 1
+                    touched_labels.add(label)
                     if label not in registered_types:
                         registered_types.append(label)
+                    if label == "Client" and properties.get("name"):
+                        touched_clients.add(normalize_name(properties["name"]))
 
             # --- Build temp_id map for source_temp_id/target_temp_id resolution ---
             temp_id_map = {}
@@ -382,7 +595,21 @@ def register_to_database(
                     else:
                         logger.warning("Cannot resolve temp_ids for relationship: %r", rel)
                         continue
-                _register_relationship(session, rel)
+                if _register_relationship(session, rel):
+                    for side in ("from", "to"):
+                        touched_labels.add(rel[f"{side}_label"])
+                        if rel[f"{side}_label"] == "Client":
+                            touched_clients.add(normalize_name(str(rel[f"{side}_value"])))
+
+            # --- Other clients of shared nodes ---
+            # Hospitals, key persons, NG actions etc. are MERGEd by name and
+            # updated in place, so clients already linked to them changed too
+            shared_ids = [
+                node_ids[i] for i, node in enumerate(nodes)
+                if node_ids[i] is not None and node.get("label") in MERGE_KEYS and node.get("label") != "Client"
+            ]
+            if shared_ids:
+                touched_clients.update(_clients_linked_to(session, shared_ids))
 
             # --- Audit log ---
             if client_name:
@@ -401,6 +628,7 @@ def register_to_database(
             "client_name": client_name,
             "registered_count": registered_count,
             "registered_types": registered_types,
+            "node_ids": node_ids,
         }
 
     except Exception as exc:
@@ -410,9 +638,14 @@ def register_to_database(
             "client_name": client_name,
             "registered_count": registered_count,
             "registered_types": registered_types,
+            "node_ids": node_ids,
             "error": str(exc),
         }
 
+    finally:
+        if touched_labels:
+            _notify_write(touched_labels, touched_clients)
+
 
 # ---------------------------------------------------------------------------
 # Audit log
@@ -443,7 +676,7 @@ def _create_audit_log_in_session(
         "MERGE (a)-[:AUDIT_FOR]->(c)\n"
         "RETURN a"
     )
-    session.run(
+    result = session.run(
         cypher,
         {
             "user_name": user_name,
@@ -455,6 +688,13 @@ def _create_audit_log_in_session(
             "client_name": client_name,
         },
     )
+    counters = _write_counters(result)
+    if counters is not None:
+        from app.lib import stats
+        if counters.nodes_created:
+            stats.record_node_created("AuditLog", {})
+        if counters.relationships_created:
+            stats.record_relationships_created("AUDIT_FOR", int(counters.relationships_created))
 
 
 def create_audit_log(
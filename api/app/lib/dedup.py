@@ -5,10 +5,10 @@ are defined in app.lib.normalize to avoid circular imports with db_operations.
 They are re-exported here for backward compatibility.
 """
 import logging
-from difflib import SequenceMatcher
-from typing import Any
+from typing import Any, NamedTuple
 
-from app.lib.embedding import embed_text
+from app.lib.embedding import embed_text, embed_texts_batch
+from app.lib import kana_index
 from app.lib.db_operations import run_query
 
 # Re-export normalization functions from normalize module for backward compat.
@@ -38,7 +38,9 @@ def find_similar_by_kana(
 ) -> list[dict[str, Any]]:
     """Find existing nodes with similar kana (phonetic) readings.
 
-    Uses SequenceMatcher to compare hiragana readings converted by name_to_kana().
+    Compares hiragana readings converted by name_to_kana() against the
+    in-memory bigram index in app.lib.kana_index (every node of the label,
+    verified with SequenceMatcher).
     Returns list of dicts: {name, kana, similarity, nodeId, matchType}
     sorted by similarity descending.
 
@@ -66,34 +68,11 @@ def find_similar_by_kana(
         return []
 
     try:
-        rows = run_query(
-            f"MATCH (n:{label}) WHERE n.kana IS NOT NULL "
-            f"RETURN n.name AS name, n.kana AS kana, elementId(n) AS nodeId "
-            f"LIMIT 500",
-            {},
-        )
+        return kana_index.search(label, input_kana, threshold=threshold, limit=limit)
     except Exception as exc:
         logger.warning("find_similar_by_kana query failed: %s", exc)
         return []
 
-    candidates = []
-    for row in rows:
-        existing_kana = row.get("kana", "")
-        if not existing_kana:
-            continue
-        ratio = SequenceMatcher(None, input_kana, existing_kana).ratio()
-        if ratio >= threshold:
-            candidates.append({
-                "name": row["name"],
-                "kana": existing_kana,
-                "similarity": round(ratio, 3),
-                "nodeId": row["nodeId"],
-                "matchType": "kana",
-            })
-
-    candidates.sort(key=lambda x: x["similarity"], reverse=True)
-    return candidates[:limit]
-
 
 async def find_semantic_duplicates(
     text: str,
@@ -161,3 +140,80 @@ async def find_semantic_duplicates(
             exc,
         )
         return []
+
+
+class SemanticQuery(NamedTuple):
+    """One text to check against a vector index (see find_semantic_duplicates_batch)."""
+
+    text: str
+    label: str
+    index_name: str
+    threshold: float = 0.85
+
+
+async def find_semantic_duplicates_batch(
+    queries: list[SemanticQuery],
+    top_k: int = 5,
+) -> list[list[dict[str, Any]]]:
+    """Batch version of find_semantic_duplicates.
+
+    All distinct texts are embedded with one embed_texts_batch call, and each
+    vector index is queried once with an UNWIND over every text that targets
+    it, so checking N nodes costs one embedding round trip and one query per
+    index instead of N of each.
+
+    Returns one candidate list per query, aligned with ``queries`` (same shape
+    and threshold semantics as find_semantic_duplicates). Queries whose
+    embedding or lookup fails get an empty list.
+    """
+    results: list[list[dict[str, Any]]] = [[] for _ in queries]
+    texts = sorted({q.text for q in queries if q.text})
+    if not texts:
+        return results
+
+    try:
+        embeddings = dict(zip(texts, await embed_texts_batch(texts, task_type="SEMANTIC_SIMILARITY")))
+    except Exception as exc:
+        logger.warning("find_semantic_duplicates_batch embedding failed: %s", exc)
+        return results
+
+    by_index: dict[tuple[str, str], list[int]] = {}
+    for i, q in enumerate(queries):
+        if q.text and embeddings.get(q.text) is not None:
+            by_index.setdefault((q.index_name, q.label), []).append(i)
+
+    for (index_name, label), positions in by_index.items():
+        text_prop = _LABEL_TEXT_PROPERTY.get(label, "text")
+        if not text_prop.isidentifier():
+            logger.warning("Invalid text_prop %r for label %s", text_prop, label)
+            continue
+        cypher = (
+            "UNWIND $items AS item "
+            "CALL db.index.vector.queryNodes($index_name, $top_k, item.embedding) "
+            "YIELD node, score "
+            "WITH item, node, score WHERE score >= item.threshold "
+            f"RETURN item.i AS i, node.{text_prop} AS text, score, elementId(node) AS nodeId "
+            "ORDER BY i, score DESC"
+        )
+        items = [
+            {"i": i, "embedding": embeddings[queries[i].text], "threshold": queries[i].threshold}
+            for i in positions
+        ]
+        try:
+            rows = run_query(cypher, {"index_name": index_name, "top_k": top_k, "items": items})
+        except Exception as exc:
+            logger.warning(
+                "find_semantic_duplicates_batch failed for label=%s index=%s: %s",
+                label,
+                index_name,
+                exc,
+            )
+            continue
+        for row in rows or []:
+            i = row.get("i")
+            if i is None or not 0 <= i < len(queries):
+                continue
+            if row.get("score", 0) >= queries[i].threshold:
+                results[i].append({"text": row.get("text"), "score": row["score"], "nodeId": row.get("nodeId")})
+
+    return results
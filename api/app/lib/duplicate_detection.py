@@ -0,0 +1,273 @@
+"""Scalable duplicate clustering for offline scans.
+
+scripts/detect_merge_duplicates.py の全件スキャン用エンジン。全ペアを
+SequenceMatcher で比較すると O(n²) になるため:
+
+1. ブロッキング — 読み（かな）は文字 bigram の MinHash を LSH（banding）に
+   かけ、同じバケットに入ったペアだけを候補にする。埋め込みを持つノードは
+   呼び出し側がベクトル近傍（Neo4j vector index）で候補ペアを作る。
+2. スコアリング — 候補ペアだけ長さ・bigram 数の下限で絞り込んでから
+   SequenceMatcher で厳密に採点
+   （``workers`` > 1 ならプロセスプールで並列）。
+3. クラスタリング — しきい値以上のペアを union-find でまとめる。
+
+ハッシュは zlib.crc32 と固定シードの線形ハッシュなので、プロセス間・実行間で
+同じシグネチャになる。DB には依存しない。
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import random
+import zlib
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Hashable, Iterable
+
+logger = logging.getLogger(__name__)
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 96 permutations in 32 bands of 3 rows: a pair with bigram Jaccard 0.6
+# (one changed character in a 7-kana name) becomes a candidate with
+# probability 1 - (1 - 0.6**3)**32 ≈ 0.9996.
+NUM_PERM = 96
+BANDS = 32
+
+# Buckets larger than this are dominated by a shared common prefix (family
+# name); their members still meet in the other bands.
+MAX_BUCKET = 1000
+
+_SCORE_CHUNK = 20_000
+
+
+class UnionFind:
+    """Disjoint-set forest with path halving and union by size."""
+
+    def __init__(self) -> None:
+        self._parent: dict[Hashable, Hashable] = {}
+        self._size: dict[Hashable, int] = {}
+
+    def find(self, x: Hashable) -> Hashable:
+        parent = self._parent
+        if x not in parent:
+            parent[x] = x
+            self._size[x] = 1
+            return x
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: Hashable, b: Hashable) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self._size[ra] < self._size[rb]:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._size[ra] += self._size[rb]
+
+    def groups(self) -> list[list[Hashable]]:
+        """Sets with two or more members, each sorted, largest first."""
+        members: dict[Hashable, list[Hashable]] = defaultdict(list)
+        for x in self._parent:
+            members[self.find(x)].append(x)
+        clusters = [sorted(m, key=str) for m in members.values() if len(m) >= 2]
+        clusters.sort(key=lambda m: (-len(m), str(m[0])))
+        return clusters
+
+
+# ---------------------------------------------------------------------------
+# MinHash / LSH
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=8)
+def _permutations(num_perm: int, seed: int = 1) -> tuple[tuple[int, int], ...]:
+    rng = random.Random(seed)
+    return tuple((rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm))
+
+
+def shingles(text: str, n: int = 2) -> set[int]:
+    """Hashed character n-grams of ``text`` with start/end markers."""
+    padded = f"\x02{text}\x03"
+    return {zlib.crc32(padded[i:i + n].encode("utf-8")) for i in range(max(1, len(padded) - n + 1))}
+
+
+def minhash(text: str, num_perm: int = NUM_PERM, seed: int = 1) -> tuple[int, ...]:
+    """MinHash signature of the character bigrams of ``text``."""
+    grams = shingles(text)
+    return tuple(
+        min(((a * g + b) % _PRIME) & _MAX_HASH for g in grams)
+        for a, b in _permutations(num_perm, seed)
+    )
+
+
+def lsh_candidates(
+    signatures: dict[Hashable, tuple[int, ...]],
+    bands: int = BANDS,
+    max_bucket: int = MAX_BUCKET,
+) -> set[tuple[Hashable, Hashable]]:
+    """Pairs of keys whose signatures agree on every row of at least one band."""
+    if not signatures:
+        return set()
+    num_perm = len(next(iter(signatures.values())))
+    rows = num_perm // bands
+    candidates: set[tuple[Hashable, Hashable]] = set()
+    skipped = 0
+    for band in range(bands):
+        buckets: dict[tuple[int, ...], list[Hashable]] = defaultdict(list)
+        lo = band * rows
+        for key, sig in signatures.items():
+            buckets[sig[lo:lo + rows]].append(key)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if len(members) > max_bucket:
+                skipped += 1
+                continue
+            members.sort(key=str)
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    candidates.add((a, b))
+    if skipped:
+        logger.info("LSH: skipped %d oversized bucket(s) (> %d members)", skipped, max_bucket)
+    return candidates
+
+
+# ---------------------------------------------------------------------------
+# Scoring and clustering
+# ---------------------------------------------------------------------------
+
+def _bigrams(text: str) -> set[str] | Counter:
+    """Padded bigrams as a set, or a Counter when some bigram repeats."""
+    padded = f"\x02{text}\x03"
+    grams = [padded[i:i + 2] for i in range(len(padded) - 1)]
+    distinct = set(grams)
+    return distinct if len(distinct) == len(grams) else Counter(grams)
+
+
+def _shared_bigrams(a: set[str] | Counter, b: set[str] | Counter) -> int:
+    if isinstance(a, set) and isinstance(b, set):
+        return len(a & b)
+    a = a if isinstance(a, Counter) else Counter(a)
+    b = b if isinstance(b, Counter) else Counter(b)
+    return sum((a & b).values())
+
+
+def _score_pairs(pairs: list[tuple[str, str]], threshold: float) -> list[tuple[str, str, float]]:
+    """Exact SequenceMatcher ratios of the pairs at or above ``threshold``.
+
+    Two lossless filters run first: a length bound, and the q-gram count bound
+    (ratio >= threshold implies indel distance <= d, and each inserted or
+    deleted character destroys at most two padded bigrams).
+    """
+    grams: dict[str, set[str] | Counter] = {}
+    scored = []
+    for a, b in pairs:
+        la, lb = len(a), len(b)
+        if 2 * min(la, lb) < threshold * (la + lb):
+            continue
+        distance = la + lb - 2 * math.ceil(threshold * (la + lb) / 2)
+        ga = grams.get(a)
+        if ga is None:
+            ga = grams[a] = _bigrams(a)
+        gb = grams.get(b)
+        if gb is None:
+            gb = grams[b] = _bigrams(b)
+        if _shared_bigrams(ga, gb) < max(la, lb) + 1 - 2 * distance:
+            continue
+        ratio = SequenceMatcher(None, a, b).ratio()
+        if ratio >= threshold:
+            scored.append((a, b, round(ratio, 3)))
+    return scored
+
+
+def _chunks(items: list, size: int) -> Iterable[list]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def cluster_similar_strings(
+    items: list[tuple[Hashable, str]],
+    threshold: float = 0.9,
+    num_perm: int = NUM_PERM,
+    bands: int = BANDS,
+    workers: int = 1,
+) -> tuple[list[list[Hashable]], dict[tuple[str, str], float]]:
+    """Cluster ``(id, text)`` items whose texts are identical or similar.
+
+    Identical texts always share a cluster. Distinct texts are paired by
+    MinHash/LSH blocking and joined when their SequenceMatcher ratio is at
+    least ``threshold``.
+
+    Returns:
+        (clusters of ids, {(text_a, text_b): ratio} for the similar pairs found)
+    """
+    by_text: dict[str, list[Hashable]] = defaultdict(list)
+    for item_id, text in items:
+        if text:
+            by_text[text].append(item_id)
+    texts = sorted(by_text)
+
+    if workers > 1 and len(texts) > _SCORE_CHUNK:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            sigs = list(pool.map(_minhash_batch, _chunks(texts, _SCORE_CHUNK), [num_perm] * len(texts), chunksize=1))
+        signatures = {t: s for batch in sigs for t, s in batch}
+    else:
+        signatures = {t: minhash(t, num_perm) for t in texts}
+
+    candidates = list(lsh_candidates(signatures, bands))
+    logger.info("LSH: %d distinct texts, %d candidate pairs", len(texts), len(candidates))
+
+    if workers > 1 and len(candidates) > _SCORE_CHUNK:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            batches = pool.map(
+                _score_pairs,
+                _chunks(candidates, _SCORE_CHUNK),
+                [threshold] * (len(candidates) // _SCORE_CHUNK + 1),
+            )
+            scored = [p for batch in batches for p in batch]
+    else:
+        scored = _score_pairs(candidates, threshold)
+
+    uf = UnionFind()
+    for ids in by_text.values():
+        for item_id in ids:
+            uf.find(item_id)
+        for item_id in ids[1:]:
+            uf.union(ids[0], item_id)
+    for a, b, _ in scored:
+        uf.union(by_text[a][0], by_text[b][0])
+    return uf.groups(), {(a, b): ratio for a, b, ratio in scored}
+
+
+def _minhash_batch(texts: list[str], num_perm: int) -> list[tuple[str, tuple[int, ...]]]:
+    return [(t, minhash(t, num_perm)) for t in texts]
+
+
+def cluster_pairs(
+    pairs: Iterable[tuple[Hashable, Hashable, float]],
+    threshold: float,
+    groups: Iterable[Iterable[Hashable]] = (),
+) -> list[list[Hashable]]:
+    """Union-find over scored pairs (>= threshold) plus pre-grouped ids.
+
+    Used for vector-neighbour blocking, where the caller already has the
+    cosine similarity of each neighbour pair.
+    """
+    uf = UnionFind()
+    for group in groups:
+        group = list(group)
+        for item_id in group:
+            uf.find(item_id)
+        for item_id in group[1:]:
+            uf.union(group[0], item_id)
+    for a, b, score in pairs:
+        if score >= threshold:
+            uf.union(a, b)
+    return uf.groups()
@@ -1,10 +1,17 @@
 """Ecomap data from Neo4j. No draw.io — frontend renders with React Flow."""
 import logging
-from app.lib.db_operations import run_query
+from typing import Iterator
+
+from app.config import settings
+from app.lib import db_operations
+from app.lib.db_operations import stream_query
+from app.lib.singleflight import SingleFlight
 from app.schemas.ecomap import EcomapData, EcomapEdge, EcomapNode
 
 logger = logging.getLogger(__name__)
 
+_ecomap_flight = SingleFlight("fetch_ecomap_data")
+
 TEMPLATES = {
     "full_view": {
         "name": "全体像", "description": "クライアントの全支援ネットワーク",
@@ -71,17 +78,20 @@ def _sanitize_properties(props: dict) -> dict:
     return result
 
 
-def fetch_ecomap_data(client_name: str, template: str = "full_view") -> EcomapData:
+def iter_ecomap(client_name: str, template: str = "full_view") -> Iterator[EcomapNode | EcomapEdge]:
+    """エコマップのノードとエッジを、各カテゴリのクエリ結果が届いた順に返す。
+
+    先頭は必ずクライアントノード。各ノードの直後にクライアントからのエッジが続く。
+    """
     tmpl = TEMPLATES.get(template, TEMPLATES["full_view"])
-    nodes = [EcomapNode(
+    yield EcomapNode(
         id="client",
         label=client_name,
         node_label="Client",
         category="client",
         color=CATEGORY_COLORS["client"],
         properties={},
-    )]
-    edges = []
+    )
     seen_ids: set[str] = set()
 
     for cat in tmpl["categories"]:
@@ -89,8 +99,7 @@ def fetch_ecomap_data(client_name: str, template: str = "full_view") -> EcomapDa
             continue
         pattern, var, neo4j_label, rel_label = CATEGORY_QUERIES[cat]
         query = f"MATCH {pattern} WHERE c.name = $name RETURN DISTINCT {var} AS node, elementId({var}) AS eid"
-        records = run_query(query, {"name": client_name})
-        for r in records:
+        for r in stream_query(query, {"name": client_name}):
             raw_id = r["eid"]
             nid = _sanitize_id(raw_id)
             # 重複ノードをスキップ
@@ -100,13 +109,31 @@ def fetch_ecomap_data(client_name: str, template: str = "full_view") -> EcomapDa
 
             nd = _sanitize_properties(dict(r["node"]))
             display = nd.get("name") or nd.get("action") or nd.get("instruction") or nd.get("type") or str(nd)
-            nodes.append(EcomapNode(
+            yield EcomapNode(
                 id=nid,
                 label=str(display)[:30],
                 node_label=neo4j_label,
                 category=cat,
                 color=CATEGORY_COLORS.get(cat, "#888"),
                 properties=nd,
-            ))
-            edges.append(EcomapEdge(source="client", target=nid, label=rel_label))
+            )
+            yield EcomapEdge(source="client", target=nid, label=rel_label)
+
+
+def fetch_ecomap_data(client_name: str, template: str = "full_view") -> EcomapData:
+    """エコマップ全体を返す。同じクライアント・テンプレートの取得が実行中なら結果を共有する。"""
+    if settings.single_flight_enabled:
+        key = (client_name, template, db_operations.write_generation())
+        return _ecomap_flight.do(key, _fetch_ecomap_data, client_name, template)
+    return _fetch_ecomap_data(client_name, template)
+
+
+def _fetch_ecomap_data(client_name: str, template: str) -> EcomapData:
+    nodes: list[EcomapNode] = []
+    edges: list[EcomapEdge] = []
+    for item in iter_ecomap(client_name, template):
+        if isinstance(item, EcomapNode):
+            nodes.append(item)
+        else:
+            edges.append(item)
     return EcomapData(client_name=client_name, template=template, nodes=nodes, edges=edges)
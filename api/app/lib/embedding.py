@@ -1,14 +1,25 @@
-"""Embedding module using Gemini Embedding 2 + Neo4j Vector Index."""
+"""Embedding module using Gemini Embedding 2 + Neo4j Vector Index.
+
+embed_content calls go through the shared rate limiter (app.lib.rate_limit):
+throttled requests wait and are retried instead of becoming None. Concurrent
+embed_text calls for the same text share one request (app.lib.singleflight).
+"""
+import asyncio
 import logging
 from typing import Optional
 
 from app.config import settings
+from app.lib import rate_limit
 from app.lib.db_operations import run_query
+from app.lib.singleflight import SingleFlight, make_key
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_DIMENSIONS = 768
 
+# Maximum texts per embed_content request
+_EMBED_BATCH_SIZE = 100
+
 VECTOR_INDEXES = {
     "support_log_vector_index": {"label": "SupportLog", "property": "embedding", "dimensions": DEFAULT_DIMENSIONS},
     "care_preference_embedding": {"label": "CarePreference", "property": "embedding", "dimensions": DEFAULT_DIMENSIONS},
@@ -19,10 +30,14 @@ VECTOR_INDEXES = {
 }
 
 _client = None
+_embed_flight = SingleFlight("embed_text")
 
 
 def _get_client():
     global _client
+    if settings.llm_backend == "fake":
+        from app.lib.fake_llm import FakeGenaiClient
+        return FakeGenaiClient()
     if _client is None:
         try:
             from google import genai
@@ -41,11 +56,20 @@ async def embed_text(
     """Generate embedding using Gemini Embedding 2."""
     if not text or not text.strip():
         return None
+    if settings.single_flight_enabled:
+        key = make_key(settings.embedding_model, text, task_type, dimensions)
+        return await _embed_flight.do_async(key, _embed_text, text, task_type, dimensions)
+    return await _embed_text(text, task_type, dimensions)
+
+
+async def _embed_text(text: str, task_type: str, dimensions: int) -> Optional[list[float]]:
     client = _get_client()
     if not client:
         return None
     try:
-        response = client.models.embed_content(
+        response = await rate_limit.gemini_embedding().acall(
+            asyncio.to_thread,
+            client.models.embed_content,
             model=settings.embedding_model,
             contents=text,
             config={"task_type": task_type, "output_dimensionality": dimensions},
@@ -61,11 +85,33 @@ async def embed_texts_batch(
     task_type: str = "RETRIEVAL_DOCUMENT",
     dimensions: int = DEFAULT_DIMENSIONS,
 ) -> list[Optional[list[float]]]:
-    """Batch embedding generation."""
-    results = []
-    for text in texts:
-        emb = await embed_text(text, task_type, dimensions)
-        results.append(emb)
+    """Batch embedding generation.
+
+    Sends up to ``_EMBED_BATCH_SIZE`` texts per embed_content call instead of one
+    call per text. Results align with ``texts``; blank texts and texts in a
+    failed batch get None.
+    """
+    results: list[Optional[list[float]]] = [None] * len(texts)
+    positions = [i for i, t in enumerate(texts) if t and t.strip()]
+    if not positions:
+        return results
+    client = _get_client()
+    if not client:
+        return results
+    for start in range(0, len(positions), _EMBED_BATCH_SIZE):
+        batch = positions[start:start + _EMBED_BATCH_SIZE]
+        try:
+            response = await rate_limit.gemini_embedding().acall(
+                asyncio.to_thread,
+                client.models.embed_content,
+                model=settings.embedding_model,
+                contents=[texts[i] for i in batch],
+                config={"task_type": task_type, "output_dimensionality": dimensions},
+            )
+            for i, emb in zip(batch, response.embeddings):
+                results[i] = emb.values
+        except Exception as e:
+            logger.error(f"Batch embedding failed ({len(batch)} texts): {e}")
     return results
 
 
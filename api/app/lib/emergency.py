@@ -0,0 +1,248 @@
+"""Pre-rendered emergency bundles served from memory.
+
+緊急時情報（禁忌事項・推奨ケア・キーパーソン・病院・後見人）は最も遅延に
+敏感な読み取りなので、リクエスト時に Neo4j へ問い合わせず、クライアントごとに
+組み立て済みの EmergencyInfo をメモリから返す。
+
+- warm() で起動時に全クライアント分を構築する。
+- 該当ラベルへの書き込み（db_operations.add_write_listener）を受けて、
+  対象クライアントが分かる場合はそのバンドルを即座に作り直す。分からない場合
+  （run_query 経由の ad-hoc 書き込み等）は全バンドルを捨て、次の読み取りは
+  ライブクエリに回しつつバックグラウンドで全件を再構築する（確定した書き込みは
+  次の読み取りに必ず反映する）。
+- 他プロセスの書き込みは通知されないので、``_MAX_AGE_SECONDS`` 経過時は
+  既存バンドルを返しつつバックグラウンドで全件を再構築する。
+- キャッシュにないクライアントはライブクエリで取得して格納する。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from app.lib.db_operations import add_write_listener, run_query
+from app.schemas.client import CarePreference, EmergencyInfo, KeyPerson, NgAction
+
+logger = logging.getLogger(__name__)
+
+# Labels whose writes can change an emergency bundle
+EMERGENCY_LABELS = {"Client", "NgAction", "CarePreference", "KeyPerson", "Hospital", "Guardian"}
+
+# Bundles older than this are served while a background refresh runs
+# (covers writes made by other processes, which do not notify this one).
+_MAX_AGE_SECONDS = 300
+
+_RISK_ORDER = {"LifeThreatening": 1, "Panic": 2}
+
+_lock = threading.Lock()
+_bundles: dict[str, EmergencyInfo] = {}
+_built_at = 0.0
+_refreshing = False
+# Clients rebuilt individually while a full refresh is in flight; the full
+# refresh must not overwrite them with the older snapshot it loaded.
+_touched_during_refresh: set[str] = set()
+# Bumped by reset() and by writes for unknown clients; refreshes and live
+# reads started before the bump discard their result.
+_generation = 0
+
+_BUNDLE_QUERY = """
+MATCH (c:Client)
+WHERE $names IS NULL OR c.name IN $names
+RETURN c.name AS name,
+       COLLECT { MATCH (c)-[:MUST_AVOID]->(ng:NgAction)
+                 RETURN {action: ng.action, reason: ng.reason, riskLevel: ng.riskLevel} } AS ng_actions,
+       COLLECT { MATCH (c)-[:REQUIRES]->(cp:CarePreference)
+                 RETURN {category: cp.category, instruction: cp.instruction, priority: cp.priority} } AS care_preferences,
+       COLLECT { MATCH (c)-[kpRel:HAS_KEY_PERSON]->(kp:KeyPerson)
+                 RETURN {name: kp.name, relationship: kp.relationship, phone: kp.phone, rank: kpRel.rank} } AS key_persons,
+       COLLECT { MATCH (c)-[:TREATED_AT]->(h:Hospital) RETURN h {.*} } AS hospitals,
+       head(COLLECT { MATCH (c)-[:HAS_LEGAL_REP]->(g:Guardian) RETURN g {.*} }) AS guardian
+"""
+
+
+# ---------------------------------------------------------------------------
+# Parsing (shared with the clients router)
+# ---------------------------------------------------------------------------
+
+def parse_ng_actions(raw: list[dict]) -> list[NgAction]:
+    """NgAction の生データをパースし、riskLevel 順にソートして返す。"""
+    filtered = [n for n in raw if n.get("action")]
+    filtered.sort(key=lambda n: _RISK_ORDER.get(n.get("riskLevel", ""), 3))
+    return [
+        NgAction(
+            action=n["action"],
+            reason=n.get("reason"),
+            risk_level=n.get("riskLevel") or "Discomfort",
+        )
+        for n in filtered
+    ]
+
+
+def parse_care_preferences(raw: list[dict]) -> list[CarePreference]:
+    """CarePreference の生データをパースして返す。"""
+    return [
+        CarePreference(
+            category=cp["category"],
+            instruction=cp["instruction"],
+            priority=cp.get("priority"),
+        )
+        for cp in raw
+        if cp.get("category")
+    ]
+
+
+def parse_key_persons(raw: list[dict]) -> list[KeyPerson]:
+    """KeyPerson の生データをパースし、rank 順にソートして返す。"""
+    filtered = [kp for kp in raw if kp.get("name")]
+    filtered.sort(key=lambda kp: kp.get("rank") or 999)
+    return [
+        KeyPerson(
+            name=kp["name"],
+            relationship=kp.get("relationship"),
+            phone=kp.get("phone"),
+            rank=kp.get("rank"),
+        )
+        for kp in filtered
+    ]
+
+
+def _render(row: dict) -> EmergencyInfo:
+    hospitals = [h for h in row.get("hospitals") or [] if h]
+    return EmergencyInfo(
+        client_name=row["name"],
+        ng_actions=parse_ng_actions(row.get("ng_actions") or []),
+        care_preferences=parse_care_preferences(row.get("care_preferences") or []),
+        key_persons=parse_key_persons(row.get("key_persons") or []),
+        hospital=hospitals[0] if hospitals else None,
+        hospitals=hospitals,
+        guardian=row.get("guardian"),
+    )
+
+
+def _load(names: list[str] | None) -> dict[str, EmergencyInfo]:
+    """Build bundles for ``names`` (all clients when None) with one query."""
+    rows = run_query(_BUNDLE_QUERY, {"names": names})
+    return {row["name"]: _render(row) for row in rows if row.get("name")}
+
+
+# ---------------------------------------------------------------------------
+# Refresh
+# ---------------------------------------------------------------------------
+
+def reset() -> None:
+    """Drop every bundle."""
+    global _built_at, _generation
+    with _lock:
+        _generation += 1
+        _bundles.clear()
+        _touched_during_refresh.clear()
+        _built_at = 0.0
+
+
+def _swap_all(bundles: dict[str, EmergencyInfo], generation: int) -> None:
+    global _built_at
+    with _lock:
+        if generation != _generation:
+            return
+        keep = {name: _bundles[name] for name in _touched_during_refresh if name in _bundles}
+        for name in _touched_during_refresh:
+            bundles.pop(name, None)
+        _touched_during_refresh.clear()
+        _bundles.clear()
+        _bundles.update(bundles)
+        _bundles.update(keep)
+        _built_at = time.monotonic()
+
+
+def _rebuild_all() -> None:
+    global _refreshing
+    try:
+        with _lock:
+            _touched_during_refresh.clear()
+            generation = _generation
+        _swap_all(_load(None), generation)
+    except Exception as exc:
+        logger.warning("Emergency bundle refresh failed: %s", exc)
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def _schedule_refresh() -> None:
+    global _refreshing
+    with _lock:
+        if _refreshing:
+            return
+        _refreshing = True
+    threading.Thread(target=_rebuild_all, name="emergency-refresh", daemon=True).start()
+
+
+def _refresh_clients(names: set[str]) -> None:
+    """Rebuild the bundles of ``names`` now; deleted clients are dropped."""
+    try:
+        bundles = _load(sorted(names))
+    except Exception as exc:
+        # 古い情報を返し続けないよう、次回はライブクエリに回す
+        logger.warning("Emergency bundle rebuild failed for %s: %s", sorted(names), exc)
+        bundles = {}
+    with _lock:
+        for name in names:
+            _bundles.pop(name, None)
+        _bundles.update(bundles)
+        _touched_during_refresh.update(names)
+
+
+def _on_write(labels: set[str] | None, client_names: set[str] | None) -> None:
+    global _generation
+    if labels is not None and not (labels & EMERGENCY_LABELS):
+        return
+    if client_names:
+        _refresh_clients(client_names)
+        return
+    # Any bundle may be affected: reads go to the live query until the rebuild
+    with _lock:
+        _generation += 1
+        _bundles.clear()
+        _touched_during_refresh.clear()
+    _schedule_refresh()
+
+
+add_write_listener(_on_write)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def warm() -> int:
+    """Build every client's bundle synchronously. Returns the number of bundles."""
+    with _lock:
+        _touched_during_refresh.clear()
+        generation = _generation
+    bundles = _load(None)
+    count = len(bundles)
+    _swap_all(bundles, generation)
+    return count
+
+
+def get_bundle(name: str) -> EmergencyInfo | None:
+    """緊急時情報を返す。メモリにあれば即座に返し、なければライブクエリで取得する。
+
+    クライアントが存在しない場合は None。
+    """
+    with _lock:
+        bundle = _bundles.get(name)
+        expired = time.monotonic() - _built_at > _MAX_AGE_SECONDS
+        generation = _generation
+    if bundle is not None:
+        if expired:
+            _schedule_refresh()
+        return bundle
+
+    bundle = _load([name]).get(name)
+    if bundle is not None:
+        with _lock:
+            if generation == _generation:
+                _bundles[name] = bundle
+    return bundle
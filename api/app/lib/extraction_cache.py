@@ -0,0 +1,138 @@
+# NOTE: A copy of this module exists at lib/extraction_cache.py for the legacy lib/ path.
+# Keep both in sync when making changes.
+"""Persistent cache of LLM extraction results.
+
+同じナラティブの再アップロード、validate → register の往復、/extract と
+/extract-stream の併用などで、同一入力に対する抽出が繰り返し LLM に送られる。
+抽出結果を SQLite に保存し、(入力テキストのハッシュ, クライアント名, モデル,
+抽出プロンプトのハッシュ) が一致すれば LLM を呼ばずに返す。
+
+- TTL を過ぎたエントリはミス扱いで削除する。
+- ``max_entries`` を超えたら最終アクセスが古いものから削除する（LRU）。
+- ヒット数・ミス数をプロセス内で数え、stats() で参照できる。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extraction_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+
+def make_key(source_hash: str, client_name: str | None, model: str, prompt: str) -> str:
+    """キャッシュキー。プロンプトを変更すると別キーになる。"""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    raw = "\x1f".join([source_hash, client_name or "", model, prompt_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """SQLite-backed extraction cache with TTL and an entry bound."""
+
+    def __init__(self, path: Path, ttl_seconds: float, max_entries: int) -> None:
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, commit on success and always close it."""
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(_SCHEMA)
+                self._initialized = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        try:
+            with self._lock, self._db() as conn:
+                row = conn.execute(
+                    "SELECT value, created_at FROM extraction_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+                    row = None
+                if row is not None:
+                    conn.execute("UPDATE extraction_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as exc:
+            logger.warning("Extraction cache read failed: %s", exc)
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict) -> None:
+        now = time.time()
+        try:
+            with self._lock, self._db() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extraction_cache (key, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now, now),
+                )
+                conn.execute("DELETE FROM extraction_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                conn.execute(
+                    "DELETE FROM extraction_cache WHERE key IN ("
+                    " SELECT key FROM extraction_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Extraction cache write failed: %s", exc)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            try:
+                with self._db() as conn:
+                    conn.execute("DELETE FROM extraction_cache")
+            except sqlite3.Error as exc:
+                logger.warning("Extraction cache clear failed: %s", exc)
+
+    def stats(self) -> dict[str, Any]:
+        try:
+            with self._lock, self._db() as conn:
+                entries = conn.execute("SELECT count(*) FROM extraction_cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = 0
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": "extraction",
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries,
+            }
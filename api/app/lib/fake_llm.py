@@ -0,0 +1,251 @@
+"""Deterministic local stand-ins for Gemini (embeddings, generation, chat).
+
+``settings.llm_backend = "fake"`` にすると、埋め込み（app.lib.embedding）・
+抽出 / 安全チェック / インテーク評価 / 文字起こし（get_generative_model）・
+チャット（_create_model）が API を呼ばずにここの実装を使う。API の利用枠を
+使わずにアプリ全体の負荷試験ができ、CI でも動く。
+
+- 遅延と故障は provider_sim.SimulatedEndpoint で決まる（``fake_latency_ms``・
+  ``fake_latency_jitter_ms``・``fake_latency_distribution``・``fake_error_rate``・
+  ``fake_max_concurrency``・``fake_seed``）。上限超過は 429、故障は 503 になり、
+  本物と同じくレート制御（app.lib.rate_limit）の再試行を通る。
+- 埋め込みは文字 bigram の特徴ハッシュから作る単位ベクトル。同じ文は同じ
+  ベクトル、似た文は近いベクトルになるので、類似検索や回答キャッシュも
+  意味のある動きをする。
+- 生成はプロンプトの種類（抽出・安全チェック・フェーズ評価・文字起こし）に
+  応じた決まった形の応答を返す。
+- チャットモデルは Agno の Model として動き、メッセージ中の「○○さん」に
+  対して search_client_info ツールを 1 回呼んでから回答する（ツールと DB の
+  経路も負荷に含まれる）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+import threading
+from dataclasses import dataclass
+from datetime import date
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Iterator
+
+from agno.models.base import Model
+from agno.models.response import ModelResponse
+
+from app.config import settings
+from app.lib.provider_sim import SimulatedEndpoint
+
+_endpoint: SimulatedEndpoint | None = None
+_endpoint_lock = threading.Lock()
+
+
+def get_endpoint() -> SimulatedEndpoint:
+    """The simulated endpoint shared by every fake call, built from settings."""
+    global _endpoint
+    with _endpoint_lock:
+        if _endpoint is None:
+            _endpoint = SimulatedEndpoint(
+                max_concurrency=settings.fake_max_concurrency or 1_000_000,
+                latency=settings.fake_latency_ms / 1000,
+                jitter=settings.fake_latency_jitter_ms / 1000,
+                failure_rate=settings.fake_error_rate,
+                distribution=settings.fake_latency_distribution,
+                seed=settings.fake_seed,
+            )
+        return _endpoint
+
+
+def reset() -> None:
+    """Rebuild the endpoint from settings on next use (counters start over)."""
+    global _endpoint
+    with _endpoint_lock:
+        _endpoint = None
+
+
+# -- embeddings -------------------------------------------------------------
+
+def embedding_vector(text: str, dimensions: int = 768) -> list[float]:
+    """Unit vector from hashed character bigrams of ``text`` (deterministic)."""
+    text = "".join(text.split())
+    grams = [text[i:i + 2] for i in range(max(1, len(text) - 1))] or [""]
+    vector = [0.0] * dimensions
+    for gram in grams:
+        digest = hashlib.blake2b(f"{settings.fake_seed}\n{gram}".encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "big") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class _FakeModels:
+    def embed_content(self, model: str, contents: str | list[str], config: dict | None = None) -> Any:
+        texts = [contents] if isinstance(contents, str) else list(contents)
+        dimensions = (config or {}).get("output_dimensionality") or 768
+        get_endpoint()("embed\n" + "\n".join(texts))
+        return SimpleNamespace(
+            embeddings=[SimpleNamespace(values=embedding_vector(t, dimensions)) for t in texts]
+        )
+
+
+class FakeGenaiClient:
+    """Stand-in for ``google.genai.Client`` (``client.models.embed_content``)."""
+
+    def __init__(self) -> None:
+        self.models = _FakeModels()
+
+
+# -- generation -------------------------------------------------------------
+
+_TARGET_CLIENT_RE = re.compile(r"【対象クライアント:\s*(.+?)】")
+_HONORIFIC_RE = re.compile(r"([一-龯ぁ-んァ-ヶー]{2,8})さん")
+
+
+def _prompt_text(contents: Any) -> str:
+    """Text parts of a generate_content request (files and other parts skipped)."""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        contents = contents.get("parts", [])
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(t for t in map(_prompt_text, contents) if t)
+    return ""
+
+
+def _extraction(text: str) -> dict:
+    match = _TARGET_CLIENT_RE.search(text) or _HONORIFIC_RE.search(text)
+    client = match.group(1).strip() if match else "テスト利用者"
+    body = text.rsplit("】", 1)[-1].strip() if "】" in text else text[-200:]
+    return {
+        "nodes": [
+            {"temp_id": "c1", "label": "Client", "properties": {"name": client}},
+            {"temp_id": "s1", "label": "Supporter", "properties": {"name": "擬似支援者"}},
+            {
+                "temp_id": "log1",
+                "label": "SupportLog",
+                "properties": {
+                    "date": date.today().isoformat(),
+                    "situation": "日常記録",
+                    "action": "記録のみ",
+                    "effectiveness": "Neutral",
+                    "note": body[:100],
+                },
+            },
+        ],
+        "relationships": [
+            {"source_temp_id": "s1", "target_temp_id": "log1", "type": "LOGGED", "properties": {}},
+            {"source_temp_id": "log1", "target_temp_id": "c1", "type": "ABOUT", "properties": {}},
+        ],
+    }
+
+
+def generate_text(prompt: str) -> str:
+    """Canned reply for the kind of prompt the app sends."""
+    if "SUFFICIENT" in prompt:
+        return "SUFFICIENT"
+    if "is_violation" in prompt:
+        return json.dumps({"is_violation": False, "warning": None, "risk_level": "None"})
+    if "文字起こし" in prompt:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"（擬似文字起こし {digest}）本日の様子を確認しました。"
+    if '"nodes"' in prompt or "temp_id" in prompt:
+        return "```json\n" + json.dumps(_extraction(prompt), ensure_ascii=False) + "\n```"
+    return "（擬似応答）" + hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+
+
+class FakeGenerativeModel:
+    """Stand-in for ``google.generativeai.GenerativeModel``."""
+
+    def __init__(self, model_name: str = "fake") -> None:
+        self.model_name = model_name
+
+    def generate_content(self, contents: Any, generation_config: Any = None, **kwargs: Any) -> Any:
+        prompt = _prompt_text(contents)
+        get_endpoint()("generate\n" + prompt)
+        return SimpleNamespace(text=generate_text(prompt))
+
+
+# -- chat -------------------------------------------------------------------
+
+# Characters per streamed content delta
+_STREAM_CHUNK = 8
+
+
+def _message_text(message: Any) -> str:
+    content = getattr(message, "content", None)
+    return content if isinstance(content, str) else ""
+
+
+@dataclass
+class FakeChatModel(Model):
+    """Agno model that answers deterministically, calling one lookup tool first."""
+
+    id: str = "fake-chat"
+    name: str = "FakeChat"
+    provider: str = "Fake"
+
+    def _respond(self, messages: list, tools: list | None) -> ModelResponse:
+        last = messages[-1] if messages else None
+        role = getattr(last, "role", None)
+        if role == "user" and tools:
+            names = {t.get("function", {}).get("name") for t in tools}
+            match = _HONORIFIC_RE.search(_message_text(last))
+            if match and "search_client_info" in names:
+                call_id = "call_" + hashlib.sha256(_message_text(last).encode("utf-8")).hexdigest()[:12]
+                return ModelResponse(
+                    role="assistant",
+                    tool_calls=[{
+                        "id": call_id,
+                        "type": "function",
+                        "function": {
+                            "name": "search_client_info",
+                            "arguments": json.dumps({"client_name": match.group(1)}, ensure_ascii=False),
+                        },
+                    }],
+                )
+        if role == "tool":
+            result = _message_text(last)
+            content = f"（擬似回答）登録情報を確認しました（{len(result)} 文字）。"
+        else:
+            question = next((_message_text(m) for m in reversed(messages) if getattr(m, "role", None) == "user"), "")
+            content = generate_text(question)
+        return ModelResponse(role="assistant", content=content)
+
+    def _payload(self, messages: list) -> str:
+        return "chat\n" + "\n".join(_message_text(m) for m in messages[-4:])
+
+    def invoke(self, messages: list, assistant_message: Any = None, tools: list | None = None, **kwargs: Any) -> ModelResponse:
+        get_endpoint()(self._payload(messages))
+        return self._respond(messages, tools)
+
+    async def ainvoke(
+        self, messages: list, assistant_message: Any = None, tools: list | None = None, **kwargs: Any
+    ) -> ModelResponse:
+        await get_endpoint().acall(self._payload(messages))
+        return self._respond(messages, tools)
+
+    @staticmethod
+    def _deltas(response: ModelResponse) -> list[ModelResponse]:
+        """A text reply as a few content deltas, like a streaming provider."""
+        if response.tool_calls or not response.content:
+            return [response]
+        text = response.content
+        return [ModelResponse(role="assistant", content=text[i:i + _STREAM_CHUNK]) for i in range(0, len(text), _STREAM_CHUNK)]
+
+    def invoke_stream(
+        self, messages: list, assistant_message: Any = None, tools: list | None = None, **kwargs: Any
+    ) -> Iterator[ModelResponse]:
+        yield from self._deltas(self.invoke(messages, assistant_message, tools))
+
+    async def ainvoke_stream(
+        self, messages: list, assistant_message: Any = None, tools: list | None = None, **kwargs: Any
+    ) -> AsyncIterator[ModelResponse]:
+        for delta in self._deltas(await self.ainvoke(messages, assistant_message, tools)):
+            yield delta
+
+    def _parse_provider_response(self, response: Any, **kwargs: Any) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return response
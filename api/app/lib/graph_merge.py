@@ -0,0 +1,90 @@
+"""Deterministic merge of graphs extracted from overlapping text chunks.
+
+長いナラティブをチャンクごとに抽出すると、同じ人物・禁忌事項などが複数の
+チャンクに現れ、temp_id もチャンク間で衝突する。ここでは:
+
+- MERGE_KEYS を持つラベルは、マージキーの正規化値（name は normalize_name、
+  Condition は normalize_condition、その他は normalize_text）で同一視する。
+- それ以外（SupportLog 等の CREATE 専用ラベル、マージキー欠落ノード）は
+  正規化した全プロパティが一致する場合のみ同一視する（チャンクの重なり文対策）。
+- 同一視したノードのプロパティは、チャンク順で最初に現れた非空値を採用する。
+- temp_id は衝突しなければ元の値を使い、衝突すれば ``_c{チャンク番号}`` を付ける。
+- リレーションは付け替えた temp_id で (source, target, type) ごとに重複排除する。
+
+入力順が同じなら出力は常に同じになる。
+"""
+
+from __future__ import annotations
+
+import json
+
+from app.lib.db_operations import MERGE_KEYS
+from app.lib.normalize import normalize_condition, normalize_name, normalize_text
+
+
+def _normalize_value(label: str, key: str, value) -> str:
+    if key == "name":
+        return normalize_condition(value) if label == "Condition" else normalize_name(value)
+    return normalize_text(str(value))
+
+
+def node_identity(label: str, properties: dict) -> tuple:
+    """Key under which two extracted nodes are considered the same entity."""
+    keys = MERGE_KEYS.get(label)
+    if keys and all(properties.get(k) for k in keys):
+        return (label, "merge", tuple(_normalize_value(label, k, properties[k]) for k in keys))
+    content = {
+        k: normalize_text(v) if isinstance(v, str) else v
+        for k, v in properties.items()
+        if v not in (None, "", [])
+    }
+    return (label, "content", json.dumps(content, ensure_ascii=False, sort_keys=True, default=str))
+
+
+def merge_graphs(graphs: list[dict]) -> dict:
+    """Merge chunk graphs (``{nodes, relationships}``) into one graph."""
+    nodes: list[dict] = []
+    by_identity: dict[tuple, dict] = {}
+    used_ids: set[str] = set()
+    relationships: list[dict] = []
+    rel_index: dict[tuple[str, str, str], dict] = {}
+
+    for chunk_no, graph in enumerate(graphs):
+        id_map: dict[str, str] = {}
+        for node in graph.get("nodes") or []:
+            label = node.get("label", "")
+            props = dict(node.get("properties") or {})
+            identity = node_identity(label, props)
+            merged = by_identity.get(identity)
+            if merged is None:
+                temp_id = str(node.get("temp_id") or f"n{len(nodes)}")
+                if temp_id in used_ids:
+                    temp_id = f"{temp_id}_c{chunk_no}"
+                used_ids.add(temp_id)
+                merged = {"temp_id": temp_id, "label": label, "properties": props}
+                by_identity[identity] = merged
+                nodes.append(merged)
+            else:
+                for key, value in props.items():
+                    if merged["properties"].get(key) in (None, "", []):
+                        merged["properties"][key] = value
+            if node.get("temp_id") is not None:
+                id_map[str(node["temp_id"])] = merged["temp_id"]
+
+        for rel in graph.get("relationships") or []:
+            source = id_map.get(str(rel.get("source_temp_id")))
+            target = id_map.get(str(rel.get("target_temp_id")))
+            if source is None or target is None:
+                continue
+            key = (source, target, rel.get("type", ""))
+            existing = rel_index.get(key)
+            props = dict(rel.get("properties") or {})
+            if existing is None:
+                existing = {"source_temp_id": source, "target_temp_id": target, "type": key[2], "properties": props}
+                rel_index[key] = existing
+                relationships.append(existing)
+            else:
+                for k, v in props.items():
+                    existing["properties"].setdefault(k, v)
+
+    return {"nodes": nodes, "relationships": relationships}
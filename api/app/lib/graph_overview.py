@@ -0,0 +1,205 @@
+"""Cached degree ranking and first-screen payloads for the graph explorer.
+
+The overview (no start node) and label-sample modes of GET /api/graph/explore
+used to compute the degree of every node of every allowed label and sort them
+on each request. Instead, the per-label degree ranking is computed once and
+kept in memory together with the expanded subgraph rows for each requested
+(label, max_nodes) pair.
+
+After a graph write (see db_operations.add_write_listener) or once
+``_MAX_AGE_SECONDS`` elapse, cached entries are served stale while a single
+background thread rebuilds the ranking and every cached payload.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+
+from app.lib.db_operations import add_write_listener, run_query
+
+logger = logging.getLogger(__name__)
+
+# Highest maxNodes the explore endpoint accepts; rankings keep this many per label.
+MAX_RANKED = 500
+
+_MAX_AGE_SECONDS = 600
+# Distinct (label, max_nodes) payloads kept; the oldest is evicted first.
+_MAX_PAYLOADS = 64
+
+_lock = threading.Lock()
+_ranking: dict[str, list[tuple[str, int]]] | None = None
+_payloads: dict[tuple[str | None, int], list[dict]] = {}
+_built_at = 0.0
+_stale = False
+_refreshing = False
+_labels: set[str] = set()
+
+_NODE_PROJECTION = """
+    [n IN all_nodes WHERE n IS NOT NULL | {
+        id: elementId(n),
+        labels: labels(n),
+        properties: properties(n)
+    }] AS nodes,
+    [r IN all_rels WHERE r IS NOT NULL | {
+        id: elementId(r),
+        source: elementId(startNode(r)),
+        target: elementId(endNode(r)),
+        type: type(r),
+        properties: properties(r)
+    }] AS edges
+"""
+
+
+def configure(labels: set[str]) -> None:
+    """Set the labels the explorer may show and subscribe to graph writes."""
+    global _labels
+    _labels = set(labels)
+    add_write_listener(_on_write)
+
+
+def reset() -> None:
+    """Drop every cached ranking and payload."""
+    global _ranking, _built_at, _stale
+    with _lock:
+        _ranking = None
+        _payloads.clear()
+        _built_at = 0.0
+        _stale = False
+
+
+def _on_write(labels: set[str] | None, client_names: set[str] | None) -> None:
+    global _stale
+    if labels is not None and not (labels & _labels):
+        return
+    with _lock:
+        _stale = True
+
+
+# ---------------------------------------------------------------------------
+# Builders
+# ---------------------------------------------------------------------------
+
+def _load_ranking() -> dict[str, list[tuple[str, int]]]:
+    """Top ``MAX_RANKED`` nodes by degree for each allowed label."""
+    ranking: dict[str, list[tuple[str, int]]] = {}
+    for label in sorted(_labels):
+        rows = run_query(
+            f"""
+            MATCH (n:{label})
+            WITH n, COUNT {{ (n)--() }} AS degree
+            ORDER BY degree DESC
+            LIMIT $k
+            RETURN elementId(n) AS id, degree
+            """,
+            {"k": MAX_RANKED},
+        )
+        ranking[label] = [(r["id"], r["degree"]) for r in rows]
+    return ranking
+
+
+def _top_ids(ranking: dict[str, list[tuple[str, int]]], label: str | None, limit: int) -> list[str]:
+    if label is not None:
+        return [node_id for node_id, _ in ranking.get(label, [])[:limit]]
+    # Overview: merge the per-label rankings (a node may carry several labels)
+    merged: dict[str, int] = {}
+    for entries in ranking.values():
+        for node_id, degree in entries:
+            merged[node_id] = degree
+    return [node_id for node_id, _ in heapq.nlargest(limit, merged.items(), key=lambda kv: kv[1])]
+
+
+def _expand(ids: list[str], restrict_neighbours: bool) -> list[dict]:
+    """Fetch the ranked nodes plus their direct neighbours in the explore row shape."""
+    neighbour_filter = "WHERE any(lbl IN labels(m) WHERE lbl IN $allowed)" if restrict_neighbours else ""
+    return run_query(
+        f"""
+        MATCH (n)
+        WHERE elementId(n) IN $ids
+        OPTIONAL MATCH (n)-[r]-(m)
+        {neighbour_filter}
+        WITH
+            collect(DISTINCT n) + collect(DISTINCT m) AS all_nodes,
+            collect(DISTINCT r) AS all_rels
+        RETURN {_NODE_PROJECTION}
+        """,
+        {"ids": ids, "allowed": sorted(_labels)},
+    )
+
+
+def _build_payload(ranking: dict[str, list[tuple[str, int]]], label: str | None, max_nodes: int) -> list[dict]:
+    ids = _top_ids(ranking, label, max_nodes)
+    if not ids:
+        return []
+    # Overview keeps neighbours within the explorable labels; label samples show all.
+    return _expand(ids, restrict_neighbours=label is None)
+
+
+def _rebuild() -> None:
+    """Recompute the ranking and every cached payload, then swap them in."""
+    global _ranking, _built_at, _stale, _refreshing
+    try:
+        with _lock:
+            _stale = False
+            keys = list(_payloads)
+        ranking = _load_ranking()
+        payloads = {key: _build_payload(ranking, *key) for key in keys}
+        with _lock:
+            _ranking = ranking
+            _payloads.update(payloads)
+            _built_at = time.monotonic()
+    except Exception as exc:
+        logger.warning("Graph overview refresh failed: %s", exc)
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def _schedule_refresh() -> None:
+    global _refreshing
+    with _lock:
+        if _refreshing:
+            return
+        _refreshing = True
+    threading.Thread(target=_rebuild, name="graph-overview-refresh", daemon=True).start()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def warm(max_nodes: int = 100) -> None:
+    """Build the ranking and the default overview payload synchronously."""
+    get_rows(None, max_nodes)
+
+
+def get_rows(label: str | None, max_nodes: int) -> list[dict]:
+    """Explore rows (``[{"nodes": [...], "edges": [...]}]``) for overview/label-sample mode."""
+    global _ranking, _built_at
+    key = (label, max_nodes)
+    with _lock:
+        ranking = _ranking
+        cached = _payloads.get(key)
+        expired = _stale or time.monotonic() - _built_at > _MAX_AGE_SECONDS
+
+    if cached is not None:
+        if expired:
+            _schedule_refresh()
+        return cached
+
+    if ranking is None:
+        ranking = _load_ranking()
+        with _lock:
+            _ranking = ranking
+            _built_at = time.monotonic()
+    elif expired:
+        _schedule_refresh()
+
+    rows = _build_payload(ranking, label, max_nodes)
+    with _lock:
+        _payloads[key] = rows
+        while len(_payloads) > _MAX_PAYLOADS:
+            _payloads.pop(next(iter(_payloads)))
+    return rows
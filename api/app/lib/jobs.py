@@ -0,0 +1,146 @@
+"""In-process background job queue.
+
+Long-running work (audio transcription, registration, embedding) runs as
+asyncio tasks on the server's event loop instead of inside the request.
+At most ``settings.job_concurrency`` jobs run at once; the rest wait in
+``queued``. Clients poll ``GET /api/jobs/{id}`` or follow the SSE stream at
+``GET /api/jobs/{id}/events``.
+
+Progress uses the same ``{stage, progress, message}`` shape as the narrative
+SSE endpoint. A finished job ends in ``complete`` (with ``result``) or
+``error`` (with ``error``). Jobs are kept in memory only; the oldest finished
+jobs are evicted beyond ``_MAX_JOBS``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from app.config import settings
+from app.lib import rate_limit
+
+logger = logging.getLogger(__name__)
+
+_MAX_JOBS = 200
+
+FINAL_STAGES = {"complete", "error"}
+
+
+class Job:
+    """State of one background job. Mutated only from the event loop."""
+
+    def __init__(self, kind: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.stage = "queued"
+        self.progress = 0
+        self.message = ""
+        self.result: dict[str, Any] | None = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.stage in FINAL_STAGES
+
+    def update(self, stage: str, progress: int, message: str = "") -> None:
+        """Record progress and wake every subscriber."""
+        self.stage = stage
+        self.progress = progress
+        self.message = message
+        self.updated_at = time.time()
+        # Each update swaps in a fresh event so subscribers never clear each other's wakeups
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "stage": self.stage,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+JobRunner = Callable[[Job], Awaitable[dict[str, Any] | None]]
+
+_jobs: OrderedDict[str, Job] = OrderedDict()
+_semaphore: asyncio.Semaphore | None = None
+_semaphore_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(max(1, settings.job_concurrency))
+        _semaphore_loop = loop
+    return _semaphore
+
+
+def _evict() -> None:
+    while len(_jobs) > _MAX_JOBS:
+        oldest = next((job_id for job_id, job in _jobs.items() if job.done), None)
+        if oldest is None:
+            return
+        del _jobs[oldest]
+
+
+async def _run(job: Job, runner: JobRunner) -> None:
+    # LLM / embedding calls made by jobs queue behind interactive ones
+    rate_limit.set_priority(rate_limit.Priority.BATCH)
+    async with _get_semaphore():
+        job.update("running", 1, "処理を開始しました")
+        try:
+            result = await runner(job)
+        except Exception as exc:
+            logger.error("Job %s (%s) failed: %s", job.id, job.kind, exc, exc_info=True)
+            job.error = str(exc)
+            job.update("error", job.progress, str(exc))
+            return
+        job.result = result
+        job.update("complete", 100, "完了")
+
+
+def submit(kind: str, runner: JobRunner) -> Job:
+    """Queue ``runner(job)`` on the running event loop and return the job immediately."""
+    job = Job(kind)
+    _jobs[job.id] = job
+    _evict()
+    job._task = asyncio.create_task(_run(job, runner))
+    return job
+
+
+def get(job_id: str) -> Job | None:
+    return _jobs.get(job_id)
+
+
+def reset() -> None:
+    """Forget every job (running tasks are cancelled)."""
+    for job in _jobs.values():
+        if job._task is not None and not job._task.done():
+            job._task.cancel()
+    _jobs.clear()
+
+
+async def events(job: Job) -> AsyncIterator[dict[str, Any]]:
+    """Yield the job's snapshot now and after every update until it finishes."""
+    while True:
+        changed = job._changed
+        yield job.snapshot()
+        if job.done:
+            return
+        await changed.wait()
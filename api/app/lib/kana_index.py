@@ -0,0 +1,244 @@
+"""In-memory kana similarity index for fuzzy name matching.
+
+find_similar_by_kana は以前、``n.kana`` を最大 500 件だけ取得して全件に
+SequenceMatcher をかけていたため、501 件目以降の候補を黙って取りこぼし、
+チェックのたびに全件比較していた。ここではラベルごとに読み（ひらがな）の
+文字 bigram 転置インデックスを持ち:
+
+1. 入力の bigram（先頭・末尾マーカー付き）を共有するエントリだけを候補にする。
+2. q-gram の count filter（SequenceMatcher の比率 >= threshold なら共有 bigram
+   数に下限がある）で候補を絞る。
+3. 残った候補だけ SequenceMatcher で検証し、上位 ``limit`` 件を返す。
+
+インデックスは初回検索時に全件（LIMIT なし）から構築し、以降は
+db_operations.add_write_listener 経由で保守する。対象クライアント名が分かる
+書き込みはそのノードだけを差し替え、分からない書き込み（削除・ad-hoc クエリ）
+や ``_MAX_AGE_SECONDS`` 経過時はバックグラウンドで再構築する。
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Any, Iterable
+
+from app.lib.db_operations import add_write_listener, run_query
+
+logger = logging.getLogger(__name__)
+
+# Labels searched by the dedup service (dedup_service._KANA_LABELS)
+KANA_LABELS = {"Client", "KeyPerson", "Supporter", "Guardian"}
+
+# Writes made by other processes do not notify this one
+_MAX_AGE_SECONDS = 300
+
+_START, _END = "\x02", "\x03"
+
+
+def _grams(kana: str) -> Counter:
+    padded = f"{_START}{kana}{_END}"
+    return Counter(padded[i:i + 2] for i in range(len(padded) - 1))
+
+
+def _min_shared(len_a: int, len_b: int, threshold: float) -> int:
+    """Lower bound on shared bigrams for a SequenceMatcher ratio >= threshold.
+
+    ratio = 2M / (la + lb) where M is the number of matched characters, so the
+    strings are within indel distance d = la + lb - 2M. Each inserted or deleted
+    character destroys at most two padded bigrams.
+    """
+    matched = math.ceil(threshold * (len_a + len_b) / 2)
+    distance = len_a + len_b - 2 * matched
+    return max(len_a, len_b) + 1 - 2 * distance
+
+
+class KanaIndex:
+    """Bigram inverted index over (nodeId → name, kana) entries."""
+
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[str, str]] = {}
+        self._grams: dict[str, Counter] = {}
+        self._postings: dict[str, dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, node_id: str, name: str, kana: str) -> None:
+        self.remove(node_id)
+        if not kana:
+            return
+        grams = _grams(kana)
+        self._entries[node_id] = (name, kana)
+        self._grams[node_id] = grams
+        for gram, count in grams.items():
+            self._postings.setdefault(gram, {})[node_id] = count
+
+    def remove(self, node_id: str) -> None:
+        grams = self._grams.pop(node_id, None)
+        if grams is None:
+            return
+        del self._entries[node_id]
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.pop(node_id, None)
+                if not posting:
+                    del self._postings[gram]
+
+    def search(self, kana: str, threshold: float = 0.8, limit: int = 5) -> list[dict[str, Any]]:
+        """Entries whose kana has SequenceMatcher ratio >= threshold, best first."""
+        if not kana:
+            return []
+        query = _grams(kana)
+        shared: Counter = Counter()
+        for gram, count in query.items():
+            for node_id, other in self._postings.get(gram, {}).items():
+                shared[node_id] += min(count, other)
+
+        matches = []
+        for node_id, common in shared.items():
+            name, other_kana = self._entries[node_id]
+            if common < _min_shared(len(kana), len(other_kana), threshold):
+                continue
+            ratio = SequenceMatcher(None, kana, other_kana).ratio()
+            if ratio >= threshold:
+                matches.append({
+                    "name": name,
+                    "kana": other_kana,
+                    "similarity": round(ratio, 3),
+                    "nodeId": node_id,
+                    "matchType": "kana",
+                })
+        matches.sort(key=lambda m: (-m["similarity"], m["kana"], m["nodeId"]))
+        return matches[:limit]
+
+
+# ---------------------------------------------------------------------------
+# Per-label store maintained from writes
+# ---------------------------------------------------------------------------
+
+_lock = threading.Lock()
+_indexes: dict[str, KanaIndex] = {}
+_built_at: dict[str, float] = {}
+_stale: set[str] = set()
+_refreshing: set[str] = set()
+# Bumped by reset(); rebuilds started before a reset discard their result.
+_generation = 0
+
+
+def _load(label: str, names: list[str] | None = None) -> list[dict]:
+    return run_query(
+        f"MATCH (n:{label}) WHERE n.kana IS NOT NULL "
+        "AND ($names IS NULL OR n.name IN $names) "
+        "RETURN n.name AS name, n.kana AS kana, elementId(n) AS nodeId",
+        {"names": names},
+    )
+
+
+def _build(label: str, rows: Iterable[dict]) -> KanaIndex:
+    index = KanaIndex()
+    for row in rows:
+        if row.get("kana") and row.get("nodeId"):
+            index.add(row["nodeId"], row.get("name") or "", row["kana"])
+    return index
+
+
+def reset() -> None:
+    """Drop every index (rebuilt on the next search)."""
+    global _generation
+    with _lock:
+        _generation += 1
+        _indexes.clear()
+        _built_at.clear()
+        _stale.clear()
+
+
+def _rebuild(label: str) -> None:
+    try:
+        with _lock:
+            _stale.discard(label)
+            generation = _generation
+        index = _build(label, _load(label))
+        with _lock:
+            if generation == _generation:
+                _indexes[label] = index
+                _built_at[label] = time.monotonic()
+    except Exception as exc:
+        logger.warning("Kana index rebuild failed for %s: %s", label, exc)
+    finally:
+        with _lock:
+            _refreshing.discard(label)
+
+
+def _schedule_rebuild(label: str) -> None:
+    with _lock:
+        if label in _refreshing or label not in _indexes:
+            return
+        _refreshing.add(label)
+    threading.Thread(target=_rebuild, args=(label,), name="kana-index-refresh", daemon=True).start()
+
+
+def _refresh_names(label: str, names: set[str]) -> None:
+    """Re-read the nodes named ``names`` and replace their entries."""
+    with _lock:
+        index = _indexes.get(label)
+    if index is None:
+        return
+    try:
+        rows = _load(label, sorted(names))
+    except Exception as exc:
+        logger.warning("Kana index update failed for %s: %s", label, exc)
+        with _lock:
+            _stale.add(label)
+        _schedule_rebuild(label)
+        return
+    with _lock:
+        for node_id, (name, _) in list(index._entries.items()):
+            if name in names:
+                index.remove(node_id)
+        for row in rows:
+            if row.get("kana") and row.get("nodeId"):
+                index.add(row["nodeId"], row.get("name") or "", row["kana"])
+
+
+def _on_write(labels: set[str] | None, client_names: set[str] | None) -> None:
+    targets = KANA_LABELS if labels is None else labels & KANA_LABELS
+    for label in targets:
+        if label == "Client" and client_names:
+            _refresh_names(label, client_names)
+            continue
+        with _lock:
+            _stale.add(label)
+        _schedule_rebuild(label)
+
+
+add_write_listener(_on_write)
+
+
+def get_index(label: str) -> KanaIndex:
+    """Return the label's index, building it synchronously on first use."""
+    with _lock:
+        index = _indexes.get(label)
+        expired = label in _stale or time.monotonic() - _built_at.get(label, 0.0) > _MAX_AGE_SECONDS
+        generation = _generation
+    if index is not None:
+        if expired:
+            _schedule_rebuild(label)
+        return index
+    index = _build(label, _load(label))
+    with _lock:
+        if generation == _generation:
+            _indexes[label] = index
+            _built_at[label] = time.monotonic()
+    return index
+
+
+def search(label: str, kana: str, threshold: float = 0.8, limit: int = 5) -> list[dict[str, Any]]:
+    """Top ``limit`` nodes of ``label`` whose kana is similar to ``kana``."""
+    index = get_index(label)
+    with _lock:
+        return index.search(kana, threshold, limit)
@@ -0,0 +1,1920 @@
+"""In-process graph backend that speaks the Cypher subset this app uses.
+
+``settings.graph_backend = "memory"`` にすると、db_operations.get_driver() が
+Neo4j ドライバーの代わりにここの :class:`MemoryDriver` を返す。Neo4j なしで
+API 全体（一覧・詳細・緊急時情報・エコマップ・ダッシュボード・検索・登録）を
+動かせるので、CI や負荷試験で使う。
+
+- Cypher は小さなインタープリタで実行する。対応するのはアプリのクエリが
+  使う範囲: MATCH / OPTIONAL MATCH / WHERE / WITH / UNWIND / RETURN（集約・
+  DISTINCT・ORDER BY・SKIP・LIMIT）/ CREATE / MERGE（ON CREATE / ON MATCH）/
+  SET / UNION [ALL] / CALL { } / COLLECT { } / COUNT { }、リスト内包・マップ
+  投影、および db.index.vector.queryNodes・db.index.fulltext.queryNodes・
+  apoc.path.subgraphAll。可変長パスや DELETE は未対応で CypherError になる。
+- インデックス・制約の作成文はインデックス定義だけ記録する（ベクトル・
+  全文検索の手続きが対象ラベル・プロパティを引く）。
+- クエリは 1 つずつ直列に実行する（ロック 1 つ。トランザクションはない）。
+- 初期データは seed() の合成クライアント（``memory_graph_clients`` 人）。
+  ``memory_graph_latency_ms`` でクエリごとの往復遅延を足せる。
+"""
+
+from __future__ import annotations
+
+import functools
+import itertools
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Iterator
+
+from app.config import settings
+from app.lib.normalize import kana_row
+
+
+class CypherError(Exception):
+    """Query the in-memory backend cannot parse or run."""
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+@dataclass(eq=False)
+class Node:
+    id: int
+    labels: list[str]
+    props: dict[str, Any]
+
+    @property
+    def element_id(self) -> str:
+        return f"4:mem:{self.id}"
+
+
+@dataclass(eq=False)
+class Relationship:
+    id: int
+    type: str
+    start: Node
+    end: Node
+    props: dict[str, Any]
+
+    @property
+    def element_id(self) -> str:
+        return f"5:mem:{self.id}"
+
+
+@dataclass
+class Counters:
+    """The subset of neo4j ``SummaryCounters`` the app reads."""
+
+    nodes_created: int = 0
+    relationships_created: int = 0
+    properties_set: int = 0
+    labels_added: int = 0
+
+    @property
+    def contains_updates(self) -> bool:
+        return bool(self.nodes_created or self.relationships_created or self.properties_set or self.labels_added)
+
+
+class MemoryGraph:
+    """Nodes, relationships and index definitions; run() executes one query."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._ids = itertools.count()
+        self.nodes: dict[int, Node] = {}
+        self.relationships: dict[int, Relationship] = {}
+        self._by_label: dict[str, dict[int, Node]] = {}
+        self._out: dict[int, list[Relationship]] = {}
+        self._in: dict[int, list[Relationship]] = {}
+        # index name → (label, property) / (labels, properties)
+        self.vector_indexes: dict[str, tuple[str, str]] = {}
+        self.fulltext_indexes: dict[str, tuple[list[str], list[str]]] = {}
+        self.queries = 0
+        self.errors: Counter[str] = Counter()
+
+    # -- storage ------------------------------------------------------------
+
+    def create_node(self, labels: list[str], props: dict[str, Any]) -> Node:
+        node = Node(next(self._ids), list(labels), {k: v for k, v in props.items() if v is not None})
+        self.nodes[node.id] = node
+        for label in node.labels:
+            self._by_label.setdefault(label, {})[node.id] = node
+        self._out[node.id] = []
+        self._in[node.id] = []
+        return node
+
+    def create_relationship(self, start: Node, rel_type: str, end: Node, props: dict[str, Any] | None = None) -> Relationship:
+        rel = Relationship(next(self._ids), rel_type, start, end, {k: v for k, v in (props or {}).items() if v is not None})
+        self.relationships[rel.id] = rel
+        self._out[start.id].append(rel)
+        self._in[end.id].append(rel)
+        return rel
+
+    def add_label(self, node: Node, label: str) -> bool:
+        if label in node.labels:
+            return False
+        node.labels.append(label)
+        self._by_label.setdefault(label, {})[node.id] = node
+        return True
+
+    def with_label(self, label: str) -> list[Node]:
+        return list(self._by_label.get(label, {}).values())
+
+    def element(self, element_id: str) -> Node | Relationship | None:
+        prefix, _, number = str(element_id).rpartition(":")
+        if not number.isdigit():
+            return None
+        table = self.relationships if prefix.startswith("5") else self.nodes
+        return table.get(int(number))
+
+    def adjacent(self, node: Node, direction: str) -> Iterator[tuple[Relationship, Node]]:
+        if direction in ("out", "both"):
+            for rel in self._out.get(node.id, ()):
+                yield rel, rel.end
+        if direction in ("in", "both"):
+            for rel in self._in.get(node.id, ()):
+                if direction == "both" and rel.start is rel.end:
+                    continue
+                yield rel, rel.start
+
+    # -- queries ------------------------------------------------------------
+
+    def run(self, query: str, params: dict | None = None) -> tuple[list[dict[str, Any]], Counters]:
+        """Execute ``query``; returns (records, counters). Records may hold Node values."""
+        counters = Counters()
+        with self._lock:
+            self.queries += 1
+            try:
+                if _SCHEMA_RE.match(query):
+                    self._define_index(query)
+                    return [], counters
+                plan = _parse(query)
+                env = _Env(self, params or {}, counters)
+                return _run_union(env, plan, [{}]), counters
+            except CypherError:
+                self.errors[" ".join(query.split())[:120]] += 1
+                raise
+
+    def _define_index(self, query: str) -> None:
+        text = " ".join(query.split())
+        if match := _VECTOR_INDEX_RE.search(text):
+            self.vector_indexes[match.group(1)] = (match.group(2), match.group(3))
+        elif match := _FULLTEXT_INDEX_RE.search(text):
+            labels = match.group(2).split("|")
+            props = [p.strip().split(".", 1)[-1] for p in match.group(3).split(",") if p.strip()]
+            self.fulltext_indexes[match.group(1)] = (labels, props)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "nodes": len(self.nodes),
+                "relationships": len(self.relationships),
+                "queries": self.queries,
+                "errors": sum(self.errors.values()),
+            }
+
+
+_SCHEMA_RE = re.compile(r"\s*(CREATE|DROP)\s+(\w+\s+)?(INDEX|CONSTRAINT)\b", re.IGNORECASE)
+_VECTOR_INDEX_RE = re.compile(
+    r"CREATE VECTOR INDEX (\w+) (?:IF NOT EXISTS )?FOR \(\w+:(\w+)\) ON \(\w+\.(\w+)\)", re.IGNORECASE
+)
+_FULLTEXT_INDEX_RE = re.compile(
+    r"CREATE FULLTEXT INDEX (\w+) (?:IF NOT EXISTS )?FOR \(\w+:([\w|]+)\) ON EACH \[([^\]]*)\]", re.IGNORECASE
+)
+
+
+# ---------------------------------------------------------------------------
+# Tokenizer
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+|//[^\n]*)
+    |(?P<num>\d+\.\d+|\d+)
+    |(?P<str>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+    |(?P<param>\$\w+)
+    |(?P<name>`[^`]+`|[^\W\d]\w*)
+    |(?P<op>->|<-|<>|<=|>=|\+=|\.\.|[-+*/%=<>()\[\]{}:,.|;])
+    """,
+    re.VERBOSE,
+)
+
+_ESCAPES = {"n": "\n", "t": "\t", "'": "'", '"': '"', "\\": "\\"}
+
+
+@dataclass(frozen=True)
+class _Tok:
+    kind: str
+    value: Any
+
+    @property
+    def upper(self) -> str:
+        return self.value.upper() if self.kind == "name" else ""
+
+
+def _tokenize(query: str) -> list[_Tok]:
+    tokens: list[_Tok] = []
+    pos = 0
+    while pos < len(query):
+        match = _TOKEN_RE.match(query, pos)
+        if match is None:
+            raise CypherError(f"Unexpected character {query[pos]!r} at {pos}")
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "ws":
+            continue
+        if kind == "num":
+            tokens.append(_Tok("num", float(text) if "." in text else int(text)))
+        elif kind == "str":
+            tokens.append(_Tok("str", re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(1)), text[1:-1])))
+        elif kind == "param":
+            tokens.append(_Tok("param", text[1:]))
+        elif kind == "name":
+            tokens.append(_Tok("name", text.strip("`")))
+        else:
+            tokens.append(_Tok("op", text))
+    tokens.append(_Tok("eof", None))
+    return tokens
+
+
+# ---------------------------------------------------------------------------
+# AST
+# ---------------------------------------------------------------------------
+
+_AGGREGATES = {"count", "collect", "sum", "avg", "min", "max"}
+
+
+class _Expr:
+    def ev(self, env: "_Env", row: dict, group: list[dict] | None = None) -> Any:
+        raise NotImplementedError
+
+    def has_agg(self) -> bool:
+        return any(child.has_agg() for child in self.children())
+
+    def children(self) -> list["_Expr"]:
+        return []
+
+
+@dataclass
+class _Lit(_Expr):
+    value: Any
+
+    def ev(self, env, row, group=None):
+        return self.value
+
+
+@dataclass
+class _Param(_Expr):
+    name: str
+
+    def ev(self, env, row, group=None):
+        if self.name not in env.params:
+            raise CypherError(f"Expected parameter ${self.name}")
+        return env.params[self.name]
+
+
+@dataclass
+class _Var(_Expr):
+    name: str
+
+    def ev(self, env, row, group=None):
+        if self.name not in row:
+            raise CypherError(f"Variable `{self.name}` not defined")
+        return row[self.name]
+
+
+@dataclass
+class _Prop(_Expr):
+    target: _Expr
+    key: str
+
+    def children(self):
+        return [self.target]
+
+    def ev(self, env, row, group=None):
+        value = self.target.ev(env, row, group)
+        if value is None:
+            return None
+        if isinstance(value, (Node, Relationship)):
+            return value.props.get(self.key)
+        if isinstance(value, dict):
+            return value.get(self.key)
+        raise CypherError(f"Cannot read property {self.key!r} of {type(value).__name__}")
+
+
+@dataclass
+class _Index(_Expr):
+    target: _Expr
+    index: _Expr | None
+    end: _Expr | None = None
+    is_slice: bool = False
+
+    def children(self):
+        return [e for e in (self.target, self.index, self.end) if e is not None]
+
+    def ev(self, env, row, group=None):
+        value = self.target.ev(env, row, group)
+        if value is None:
+            return None
+        if self.is_slice:
+            start = self.index.ev(env, row, group) if self.index else None
+            end = self.end.ev(env, row, group) if self.end else None
+            return value[start:end]
+        key = self.index.ev(env, row, group)
+        if isinstance(value, (dict, Node, Relationship)):
+            return (value.props if isinstance(value, (Node, Relationship)) else value).get(key)
+        try:
+            return value[key]
+        except IndexError:
+            return None
+
+
+@dataclass
+class _ListLit(_Expr):
+    items: list[_Expr]
+
+    def children(self):
+        return self.items
+
+    def ev(self, env, row, group=None):
+        return [item.ev(env, row, group) for item in self.items]
+
+
+@dataclass
+class _MapLit(_Expr):
+    items: list[tuple[str, _Expr]]
+
+    def children(self):
+        return [e for _, e in self.items]
+
+    def ev(self, env, row, group=None):
+        return {k: e.ev(env, row, group) for k, e in self.items}
+
+
+@dataclass
+class _MapProjection(_Expr):
+    target: _Expr
+    # ("all", None) | ("prop", key) | ("entry", (key, expr))
+    items: list[tuple[str, Any]]
+
+    def children(self):
+        return [self.target] + [v[1] for kind, v in self.items if kind == "entry"]
+
+    def ev(self, env, row, group=None):
+        value = self.target.ev(env, row, group)
+        if value is None:
+            return None
+        props = value.props if isinstance(value, (Node, Relationship)) else value
+        out: dict[str, Any] = {}
+        for kind, item in self.items:
+            if kind == "all":
+                out.update(props)
+            elif kind == "prop":
+                out[item] = props.get(item)
+            else:
+                out[item[0]] = item[1].ev(env, row, group)
+        return out
+
+
+@dataclass
+class _Comprehension(_Expr):
+    var: str
+    source: _Expr
+    where: _Expr | None
+    projection: _Expr | None
+
+    def children(self):
+        return [self.source]
+
+    def ev(self, env, row, group=None):
+        values = self.source.ev(env, row, group)
+        if values is None:
+            return None
+        out = []
+        for value in values:
+            scope = {**row, self.var: value}
+            if self.where is not None and self.where.ev(env, scope) is not True:
+                continue
+            out.append(self.projection.ev(env, scope) if self.projection else value)
+        return out
+
+
+@dataclass
+class _Quantifier(_Expr):
+    kind: str  # ANY / ALL / NONE / SINGLE
+    var: str
+    source: _Expr
+    predicate: _Expr
+
+    def children(self):
+        return [self.source]
+
+    def ev(self, env, row, group=None):
+        values = self.source.ev(env, row, group)
+        if values is None:
+            return None
+        hits = sum(1 for value in values if self.predicate.ev(env, {**row, self.var: value}) is True)
+        if self.kind == "ANY":
+            return hits > 0
+        if self.kind == "ALL":
+            return hits == len(values)
+        if self.kind == "NONE":
+            return hits == 0
+        return hits == 1
+
+
+@dataclass
+class _Unary(_Expr):
+    op: str
+    operand: _Expr
+
+    def children(self):
+        return [self.operand]
+
+    def ev(self, env, row, group=None):
+        value = self.operand.ev(env, row, group)
+        if self.op == "NOT":
+            return None if value is None else not value
+        if self.op == "-":
+            return None if value is None else -value
+        if self.op == "IS NULL":
+            return value is None
+        return value is not None  # IS NOT NULL
+
+
+@dataclass
+class _Binary(_Expr):
+    op: str
+    left: _Expr
+    right: _Expr
+
+    def children(self):
+        return [self.left, self.right]
+
+    def ev(self, env, row, group=None):
+        op = self.op
+        if op in ("AND", "OR", "XOR"):
+            return _logic(op, self.left.ev(env, row, group), lambda: self.right.ev(env, row, group))
+        left = self.left.ev(env, row, group)
+        right = self.right.ev(env, row, group)
+        if op == "IN":
+            if right is None or left is None:
+                return None
+            return any(_equals(left, item) for item in right)
+        if left is None or right is None:
+            return None
+        if op == "=":
+            return _equals(left, right)
+        if op == "<>":
+            return not _equals(left, right)
+        if op in ("<", "<=", ">", ">="):
+            try:
+                return {"<": left < right, "<=": left <= right, ">": left > right, ">=": left >= right}[op]
+            except TypeError:
+                return None
+        if op == "CONTAINS":
+            return isinstance(left, str) and isinstance(right, str) and right in left
+        if op == "STARTS WITH":
+            return isinstance(left, str) and isinstance(right, str) and left.startswith(right)
+        if op == "ENDS WITH":
+            return isinstance(left, str) and isinstance(right, str) and left.endswith(right)
+        if op == "+":
+            if isinstance(left, list) or isinstance(right, list):
+                return (left if isinstance(left, list) else [left]) + (right if isinstance(right, list) else [right])
+            if isinstance(left, str) or isinstance(right, str):
+                return f"{left}{right}"
+            return left + right
+        if op == "-":
+            return left - right
+        if op == "*":
+            return left * right
+        if op == "/":
+            if isinstance(left, int) and isinstance(right, int):
+                return int(left / right)
+            return left / right
+        if op == "%":
+            return left % right
+        raise CypherError(f"Unsupported operator {op}")
+
+
+@dataclass
+class _Call(_Expr):
+    name: str
+    args: list[_Expr]
+    distinct: bool = False
+    star: bool = False
+
+    def has_agg(self):
+        return self.name in _AGGREGATES or super().has_agg()
+
+    def children(self):
+        return self.args
+
+    def ev(self, env, row, group=None):
+        if self.name in _AGGREGATES:
+            if group is None:
+                raise CypherError(f"Aggregate {self.name}() outside a projection")
+            return _aggregate(self, env, group)
+        return _call_function(self.name, [a.ev(env, row, group) for a in self.args], env)
+
+
+@dataclass
+class _Subquery(_Expr):
+    kind: str  # COLLECT / COUNT / EXISTS
+    query: "_Union"
+
+    def ev(self, env, row, group=None):
+        rows = _run_union(env, self.query, [dict(row)])
+        if self.kind == "COLLECT":
+            return [next(iter(r.values())) for r in rows]
+        if self.kind == "COUNT":
+            return len(rows)
+        return bool(rows)
+
+
+@dataclass
+class _NodePat:
+    var: str | None
+    labels: list[str]
+    props: _Expr | None
+
+
+@dataclass
+class _RelPat:
+    var: str | None
+    types: list[str]
+    props: _Expr | None
+    direction: str  # out / in / both
+
+
+@dataclass
+class _Path:
+    nodes: list[_NodePat]
+    rels: list[_RelPat]
+
+    def variables(self) -> list[str]:
+        return [p.var for p in [*self.nodes, *self.rels] if p.var]
+
+    def reversed(self) -> "_Path":
+        flip = {"out": "in", "in": "out", "both": "both"}
+        rels = [_RelPat(r.var, r.types, r.props, flip[r.direction]) for r in reversed(self.rels)]
+        return _Path(list(reversed(self.nodes)), rels)
+
+
+@dataclass
+class _Item:
+    expr: _Expr
+    alias: str
+
+
+@dataclass
+class _Projection:
+    items: list[_Item]
+    distinct: bool = False
+    order: list[tuple[_Expr, bool]] = field(default_factory=list)
+    skip: _Expr | None = None
+    limit: _Expr | None = None
+    where: _Expr | None = None
+    star: bool = False
+
+
+@dataclass
+class _Clause:
+    kind: str
+    # MATCH: patterns, optional, where / UNWIND: expr, var / WITH, RETURN: projection
+    # CREATE: patterns / MERGE: patterns[0], on_create, on_match / SET: sets
+    # CALL: proc, args, yields, where / SUBQUERY: query
+    patterns: list[_Path] = field(default_factory=list)
+    optional: bool = False
+    where: _Expr | None = None
+    expr: _Expr | None = None
+    var: str | None = None
+    projection: _Projection | None = None
+    sets: list[tuple] = field(default_factory=list)
+    on_create: list[tuple] = field(default_factory=list)
+    on_match: list[tuple] = field(default_factory=list)
+    proc: str = ""
+    args: list[_Expr] = field(default_factory=list)
+    yields: list[tuple[str, str]] = field(default_factory=list)
+    query: "_Union | None" = None
+
+
+@dataclass
+class _Union:
+    parts: list[list[_Clause]]
+    distinct: bool = False
+
+    @property
+    def returns(self) -> bool:
+        return bool(self.parts) and bool(self.parts[0]) and self.parts[0][-1].kind == "RETURN"
+
+
+# ---------------------------------------------------------------------------
+# Parser
+# ---------------------------------------------------------------------------
+
+_CLAUSE_WORDS = {"MATCH", "OPTIONAL", "UNWIND", "WITH", "RETURN", "CREATE", "MERGE", "SET", "CALL", "UNION", "WHERE", "ORDER", "SKIP", "LIMIT", "ON", "YIELD", "DELETE", "DETACH", "REMOVE", "FOREACH"}
+
+
+class _Parser:
+    def __init__(self, query: str) -> None:
+        self.tokens = _tokenize(query)
+        self.pos = 0
+
+    # -- token helpers --------------------------------------------------------
+
+    def peek(self, offset: int = 0) -> _Tok:
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self) -> _Tok:
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def at_op(self, *ops: str, offset: int = 0) -> bool:
+        tok = self.peek(offset)
+        return tok.kind == "op" and tok.value in ops
+
+    def at_kw(self, *words: str, offset: int = 0) -> bool:
+        return self.peek(offset).upper in words
+
+    def accept_op(self, op: str) -> bool:
+        if self.at_op(op):
+            self.pos += 1
+            return True
+        return False
+
+    def accept_kw(self, *words: str) -> bool:
+        """Consume ``words`` if they come next, in order."""
+        if all(self.at_kw(w, offset=i) for i, w in enumerate(words)):
+            self.pos += len(words)
+            return True
+        return False
+
+    def expect_op(self, op: str) -> None:
+        if not self.accept_op(op):
+            raise CypherError(f"Expected {op!r}, got {self.peek().value!r}")
+
+    def expect_kw(self, *words: str) -> None:
+        if not self.accept_kw(*words):
+            raise CypherError(f"Expected {' '.join(words)}, got {self.peek().value!r}")
+
+    def name(self) -> str:
+        tok = self.next()
+        if tok.kind != "name":
+            raise CypherError(f"Expected a name, got {tok.value!r}")
+        return tok.value
+
+    # -- queries --------------------------------------------------------------
+
+    def union(self, closing: str | None = None) -> _Union:
+        parts = [self.single(closing)]
+        distinct = False
+        while self.accept_kw("UNION"):
+            distinct = distinct or not self.accept_kw("ALL")
+            parts.append(self.single(closing))
+        return _Union(parts, distinct)
+
+    def single(self, closing: str | None) -> list[_Clause]:
+        clauses: list[_Clause] = []
+        while True:
+            tok = self.peek()
+            if tok.kind == "eof" or (closing and self.at_op(closing)) or self.at_kw("UNION"):
+                return clauses
+            if self.accept_op(";"):
+                continue
+            clauses.append(self.clause())
+
+    def clause(self) -> _Clause:
+        if self.accept_kw("OPTIONAL", "MATCH"):
+            return self.match(optional=True)
+        if self.accept_kw("MATCH"):
+            return self.match(optional=False)
+        if self.accept_kw("UNWIND"):
+            expr = self.expr()
+            self.expect_kw("AS")
+            return _Clause("UNWIND", expr=expr, var=self.name())
+        if self.accept_kw("WITH"):
+            return _Clause("WITH", projection=self.projection(allow_where=True))
+        if self.accept_kw("RETURN"):
+            return _Clause("RETURN", projection=self.projection(allow_where=False))
+        if self.accept_kw("CREATE"):
+            return _Clause("CREATE", patterns=self.patterns())
+        if self.accept_kw("MERGE"):
+            clause = _Clause("MERGE", patterns=[self.path()])
+            while self.at_kw("ON"):
+                if self.accept_kw("ON", "CREATE", "SET"):
+                    clause.on_create += self.set_items()
+                else:
+                    self.expect_kw("ON", "MATCH", "SET")
+                    clause.on_match += self.set_items()
+            return clause
+        if self.accept_kw("SET"):
+            return _Clause("SET", sets=self.set_items())
+        if self.accept_kw("CALL"):
+            if self.accept_op("{"):
+                query = self.union(closing="}")
+                self.expect_op("}")
+                return _Clause("SUBQUERY", query=query)
+            return self.procedure()
+        raise CypherError(f"Unsupported clause at {self.peek().value!r}")
+
+    def match(self, optional: bool) -> _Clause:
+        patterns = self.patterns()
+        where = self.expr() if self.accept_kw("WHERE") else None
+        return _Clause("MATCH", patterns=patterns, optional=optional, where=where)
+
+    def procedure(self) -> _Clause:
+        parts = [self.name()]
+        while self.accept_op("."):
+            parts.append(self.name())
+        self.expect_op("(")
+        args: list[_Expr] = []
+        if not self.at_op(")"):
+            args.append(self.expr())
+            while self.accept_op(","):
+                args.append(self.expr())
+        self.expect_op(")")
+        yields: list[tuple[str, str]] = []
+        where = None
+        if self.accept_kw("YIELD"):
+            while True:
+                column = self.name()
+                yields.append((column, self.name() if self.accept_kw("AS") else column))
+                if not self.accept_op(","):
+                    break
+            if self.accept_kw("WHERE"):
+                where = self.expr()
+        return _Clause("CALL", proc=".".join(parts), args=args, yields=yields, where=where)
+
+    def projection(self, allow_where: bool) -> _Projection:
+        proj = _Projection(items=[], distinct=self.accept_kw("DISTINCT"))
+        if self.accept_op("*"):
+            proj.star = True
+            if not self.accept_op(","):
+                return self._projection_tail(proj, allow_where)
+        while True:
+            start = self.pos
+            expr = self.expr()
+            if self.accept_kw("AS"):
+                alias = self.name()
+            else:
+                alias = self._default_alias(expr, start)
+            proj.items.append(_Item(expr, alias))
+            if not self.accept_op(","):
+                break
+        return self._projection_tail(proj, allow_where)
+
+    def _projection_tail(self, proj: _Projection, allow_where: bool) -> _Projection:
+        if self.accept_kw("ORDER", "BY"):
+            while True:
+                expr = self.expr()
+                descending = False
+                if self.accept_kw("DESC") or self.accept_kw("DESCENDING"):
+                    descending = True
+                else:
+                    self.accept_kw("ASC") or self.accept_kw("ASCENDING")
+                proj.order.append((expr, descending))
+                if not self.accept_op(","):
+                    break
+        if self.accept_kw("SKIP"):
+            proj.skip = self.expr()
+        if self.accept_kw("LIMIT"):
+            proj.limit = self.expr()
+        if allow_where and self.accept_kw("WHERE"):
+            proj.where = self.expr()
+        return proj
+
+    def _default_alias(self, expr: _Expr, start: int) -> str:
+        if isinstance(expr, _Var):
+            return expr.name
+        if isinstance(expr, _Prop) and isinstance(expr.target, _Var):
+            return f"{expr.target.name}.{expr.key}"
+        return " ".join(str(t.value) for t in self.tokens[start:self.pos])
+
+    def set_items(self) -> list[tuple]:
+        items: list[tuple] = []
+        while True:
+            var = self.name()
+            if self.accept_op("."):
+                key = self.name()
+                self.expect_op("=")
+                items.append(("prop", var, key, self.expr()))
+            elif self.accept_op("+="):
+                items.append(("merge", var, None, self.expr()))
+            elif self.accept_op("="):
+                items.append(("replace", var, None, self.expr()))
+            elif self.at_op(":"):
+                labels = []
+                while self.accept_op(":"):
+                    labels.append(self.name())
+                items.append(("labels", var, labels, None))
+            else:
+                raise CypherError(f"Unsupported SET item at {self.peek().value!r}")
+            if not self.accept_op(","):
+                return items
+
+    # -- patterns ------------------------------------------------------------
+
+    def patterns(self) -> list[_Path]:
+        paths = [self.path()]
+        while self.accept_op(","):
+            paths.append(self.path())
+        return paths
+
+    def path(self) -> _Path:
+        if self.peek().kind == "name" and self.at_op("=", offset=1):
+            raise CypherError("Named paths are not supported")
+        nodes = [self.node_pattern()]
+        rels: list[_RelPat] = []
+        while self.at_op("-", "<-"):
+            rels.append(self.rel_pattern())
+            nodes.append(self.node_pattern())
+        return _Path(nodes, rels)
+
+    def node_pattern(self) -> _NodePat:
+        self.expect_op("(")
+        var = self.name() if self.peek().kind == "name" else None
+        labels: list[str] = []
+        while self.accept_op(":"):
+            labels.append(self.name())
+        props = self.pattern_props()
+        self.expect_op(")")
+        return _NodePat(var, labels, props)
+
+    def pattern_props(self) -> _Expr | None:
+        if self.at_op("{"):
+            return self.map_literal()
+        if self.peek().kind == "param":
+            return _Param(self.next().value)
+        return None
+
+    def rel_pattern(self) -> _RelPat:
+        incoming = self.next().value == "<-"
+        var, types, props = None, [], None
+        if self.accept_op("["):
+            if self.peek().kind == "name":
+                var = self.name()
+            if self.accept_op(":"):
+                types.append(self.name())
+                while self.accept_op("|"):
+                    self.accept_op(":")
+                    types.append(self.name())
+            if self.at_op("*"):
+                raise CypherError("Variable-length relationships are not supported")
+            props = self.pattern_props()
+            self.expect_op("]")
+        if self.accept_op("->"):
+            if incoming:
+                raise CypherError("Relationship with two arrowheads")
+            return _RelPat(var, types, props, "out")
+        self.expect_op("-")
+        return _RelPat(var, types, props, "in" if incoming else "both")
+
+    # -- expressions ---------------------------------------------------------
+
+    def expr(self) -> _Expr:
+        return self.or_expr()
+
+    def or_expr(self) -> _Expr:
+        left = self.xor_expr()
+        while self.accept_kw("OR"):
+            left = _Binary("OR", left, self.xor_expr())
+        return left
+
+    def xor_expr(self) -> _Expr:
+        left = self.and_expr()
+        while self.accept_kw("XOR"):
+            left = _Binary("XOR", left, self.and_expr())
+        return left
+
+    def and_expr(self) -> _Expr:
+        left = self.not_expr()
+        while self.accept_kw("AND"):
+            left = _Binary("AND", left, self.not_expr())
+        return left
+
+    def not_expr(self) -> _Expr:
+        if self.accept_kw("NOT"):
+            return _Unary("NOT", self.not_expr())
+        return self.comparison()
+
+    def comparison(self) -> _Expr:
+        left = self.additive()
+        while True:
+            if self.at_op("=", "<>", "<", "<=", ">", ">="):
+                left = _Binary(self.next().value, left, self.additive())
+            elif self.accept_kw("IS", "NOT", "NULL"):
+                left = _Unary("IS NOT NULL", left)
+            elif self.accept_kw("IS", "NULL"):
+                left = _Unary("IS NULL", left)
+            elif self.accept_kw("NOT", "IN"):
+                left = _Unary("NOT", _Binary("IN", left, self.additive()))
+            elif self.accept_kw("IN"):
+                left = _Binary("IN", left, self.additive())
+            elif self.accept_kw("CONTAINS"):
+                left = _Binary("CONTAINS", left, self.additive())
+            elif self.accept_kw("STARTS", "WITH"):
+                left = _Binary("STARTS WITH", left, self.additive())
+            elif self.accept_kw("ENDS", "WITH"):
+                left = _Binary("ENDS WITH", left, self.additive())
+            else:
+                return left
+
+    def additive(self) -> _Expr:
+        left = self.multiplicative()
+        while self.at_op("+", "-"):
+            left = _Binary(self.next().value, left, self.multiplicative())
+        return left
+
+    def multiplicative(self) -> _Expr:
+        left = self.unary()
+        while self.at_op("*", "/", "%"):
+            left = _Binary(self.next().value, left, self.unary())
+        return left
+
+    def unary(self) -> _Expr:
+        if self.accept_op("-"):
+            return _Unary("-", self.unary())
+        return self.postfix(self.atom())
+
+    def postfix(self, expr: _Expr) -> _Expr:
+        while True:
+            if self.at_op(".") and self.peek(1).kind == "name":
+                self.next()
+                expr = _Prop(expr, self.name())
+            elif self.at_op("["):
+                self.next()
+                start = None if self.at_op("..") else self.expr()
+                if self.accept_op(".."):
+                    end = None if self.at_op("]") else self.expr()
+                    self.expect_op("]")
+                    expr = _Index(expr, start, end, is_slice=True)
+                else:
+                    self.expect_op("]")
+                    expr = _Index(expr, start)
+            elif self.at_op("{") and self.at_op(".", offset=1):
+                expr = self.map_projection(expr)
+            else:
+                return expr
+
+    def map_projection(self, target: _Expr) -> _Expr:
+        self.expect_op("{")
+        items: list[tuple[str, Any]] = []
+        while not self.accept_op("}"):
+            if self.accept_op("."):
+                if self.accept_op("*"):
+                    items.append(("all", None))
+                else:
+                    items.append(("prop", self.name()))
+            else:
+                key = self.name()
+                if self.accept_op(":"):
+                    items.append(("entry", (key, self.expr())))
+                else:
+                    items.append(("entry", (key, _Var(key))))
+            self.accept_op(",")
+        return _MapProjection(target, items)
+
+    def map_literal(self) -> _MapLit:
+        self.expect_op("{")
+        items: list[tuple[str, _Expr]] = []
+        while not self.accept_op("}"):
+            key = self.next()
+            if key.kind not in ("name", "str"):
+                raise CypherError(f"Bad map key {key.value!r}")
+            self.expect_op(":")
+            items.append((key.value, self.expr()))
+            self.accept_op(",")
+        return _MapLit(items)
+
+    def atom(self) -> _Expr:
+        tok = self.peek()
+        if tok.kind in ("num", "str"):
+            self.next()
+            return _Lit(tok.value)
+        if tok.kind == "param":
+            self.next()
+            return _Param(tok.value)
+        if self.at_op("("):
+            self.next()
+            expr = self.expr()
+            self.expect_op(")")
+            return expr
+        if self.at_op("["):
+            return self.list_expr()
+        if self.at_op("{"):
+            return self.map_literal()
+        if tok.kind != "name":
+            raise CypherError(f"Unexpected {tok.value!r}")
+        upper = tok.upper
+        if upper in ("TRUE", "FALSE"):
+            self.next()
+            return _Lit(upper == "TRUE")
+        if upper == "NULL":
+            self.next()
+            return _Lit(None)
+        if upper == "CASE":
+            return self.case_expr()
+        if upper in ("COLLECT", "COUNT", "EXISTS") and self.at_op("{", offset=1):
+            self.pos += 2
+            if self.at_op("("):
+                clause = self.match(optional=False)
+                ret = _Clause("RETURN", projection=_Projection(items=[_Item(_Lit(1), "x")]))
+                query = _Union([[clause, ret]])
+            else:
+                query = self.union(closing="}")
+            self.expect_op("}")
+            return _Subquery(upper, query)
+        self.next()
+        if upper in ("ANY", "ALL", "NONE", "SINGLE") and self.at_op("(") and self.at_kw("IN", offset=2):
+            self.expect_op("(")
+            var = self.name()
+            self.expect_kw("IN")
+            source = self.expr()
+            self.expect_kw("WHERE")
+            predicate = self.expr()
+            self.expect_op(")")
+            return _Quantifier(upper, var, source, predicate)
+        if self.at_op("("):
+            return self.function_call(tok.value)
+        return _Var(tok.value)
+
+    def function_call(self, name: str) -> _Expr:
+        self.expect_op("(")
+        call = _Call(name.lower(), [])
+        if self.accept_op("*"):
+            call.star = True
+        else:
+            call.distinct = self.accept_kw("DISTINCT")
+            if not self.at_op(")"):
+                call.args.append(self.expr())
+                while self.accept_op(","):
+                    call.args.append(self.expr())
+        self.expect_op(")")
+        return call
+
+    def list_expr(self) -> _Expr:
+        self.expect_op("[")
+        if self.peek().kind == "name" and self.at_kw("IN", offset=1):
+            var = self.name()
+            self.expect_kw("IN")
+            source = self.expr()
+            where = self.expr() if self.accept_kw("WHERE") else None
+            projection = self.expr() if self.accept_op("|") else None
+            self.expect_op("]")
+            return _Comprehension(var, source, where, projection)
+        items: list[_Expr] = []
+        while not self.accept_op("]"):
+            items.append(self.expr())
+            self.accept_op(",")
+        return _ListLit(items)
+
+    def case_expr(self) -> _Expr:
+        self.expect_kw("CASE")
+        subject = None if self.at_kw("WHEN") else self.expr()
+        branches: list[tuple[_Expr, _Expr]] = []
+        while self.accept_kw("WHEN"):
+            condition = self.expr()
+            self.expect_kw("THEN")
+            branches.append((condition, self.expr()))
+        default = self.expr() if self.accept_kw("ELSE") else _Lit(None)
+        self.expect_kw("END")
+        return _Case(subject, branches, default)
+
+
+@dataclass
+class _Case(_Expr):
+    subject: _Expr | None
+    branches: list[tuple[_Expr, _Expr]]
+    default: _Expr
+
+    def children(self):
+        return [e for pair in self.branches for e in pair] + [self.default] + ([self.subject] if self.subject else [])
+
+    def ev(self, env, row, group=None):
+        subject = self.subject.ev(env, row, group) if self.subject else None
+        for condition, result in self.branches:
+            value = condition.ev(env, row, group)
+            if (self.subject is not None and _equals(subject, value)) or (self.subject is None and value is True):
+                return result.ev(env, row, group)
+        return self.default.ev(env, row, group)
+
+
+@functools.lru_cache(maxsize=512)
+def _parse(query: str) -> _Union:
+    parser = _Parser(query)
+    plan = parser.union()
+    if parser.peek().kind != "eof":
+        raise CypherError(f"Unexpected {parser.peek().value!r}")
+    return plan
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _Env:
+    graph: MemoryGraph
+    params: dict[str, Any]
+    counters: Counters
+
+
+def _logic(op: str, left: Any, right: Callable[[], Any]) -> Any:
+    if op == "AND":
+        if left is False:
+            return False
+        value = right()
+        if value is False:
+            return False
+        return None if left is None or value is None else True
+    if op == "OR":
+        if left is True:
+            return True
+        value = right()
+        if value is True:
+            return True
+        return None if left is None or value is None else False
+    value = right()
+    return None if left is None or value is None else bool(left) != bool(value)
+
+
+def _equals(left: Any, right: Any) -> bool:
+    if isinstance(left, (Node, Relationship)) or isinstance(right, (Node, Relationship)):
+        return left is right
+    if isinstance(left, bool) != isinstance(right, bool):
+        return False
+    return left == right
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable stand-in used for DISTINCT and grouping."""
+    if isinstance(value, Node):
+        return ("node", value.id)
+    if isinstance(value, Relationship):
+        return ("rel", value.id)
+    if isinstance(value, list):
+        return ("list", tuple(_freeze(v) for v in value))
+    if isinstance(value, dict):
+        return ("map", tuple(sorted((k, _freeze(v)) for k, v in value.items())))
+    return (type(value).__name__, value)
+
+
+def _aggregate(call: _Call, env: _Env, group: list[dict]) -> Any:
+    if call.star:
+        return len(group)
+    values = [call.args[0].ev(env, row) for row in group]
+    values = [v for v in values if v is not None]
+    if call.distinct:
+        seen: set = set()
+        unique = []
+        for value in values:
+            key = _freeze(value)
+            if key not in seen:
+                seen.add(key)
+                unique.append(value)
+        values = unique
+    name = call.name
+    if name == "count":
+        return len(values)
+    if name == "collect":
+        return values
+    if name == "sum":
+        return sum(values)
+    if name == "avg":
+        return sum(values) / len(values) if values else None
+    if name == "min":
+        return min(values) if values else None
+    return max(values) if values else None
+
+
+def _call_function(name: str, args: list[Any], env: _Env) -> Any:
+    first = args[0] if args else None
+    if name == "coalesce":
+        return next((a for a in args if a is not None), None)
+    if name in ("datetime", "localdatetime"):
+        return first if first is not None else datetime.now(timezone.utc).isoformat()
+    if name == "date":
+        return str(first)[:10] if first is not None else date.today().isoformat()
+    if name == "timestamp":
+        return int(time.time() * 1000)
+    if first is None and name not in ("range",):
+        return None
+    if name == "elementid":
+        return first.element_id
+    if name == "id":
+        return first.id
+    if name == "labels":
+        return list(first.labels)
+    if name == "type":
+        return first.type
+    if name == "properties":
+        return dict(first.props) if isinstance(first, (Node, Relationship)) else dict(first)
+    if name == "keys":
+        return list(first.props if isinstance(first, (Node, Relationship)) else first)
+    if name == "startnode":
+        return first.start
+    if name == "endnode":
+        return first.end
+    if name == "tostring":
+        return str(first).lower() if isinstance(first, bool) else str(first)
+    if name == "tointeger":
+        try:
+            return int(float(first))
+        except (TypeError, ValueError):
+            return None
+    if name == "tofloat":
+        try:
+            return float(first)
+        except (TypeError, ValueError):
+            return None
+    if name == "tolower":
+        return str(first).lower()
+    if name == "toupper":
+        return str(first).upper()
+    if name == "trim":
+        return str(first).strip()
+    if name == "left":
+        return first[: args[1]]
+    if name == "right":
+        return first[-args[1]:] if args[1] else ""
+    if name == "substring":
+        return first[args[1]: args[1] + args[2]] if len(args) > 2 else first[args[1]:]
+    if name == "replace":
+        return first.replace(args[1], args[2])
+    if name == "split":
+        return first.split(args[1])
+    if name in ("size", "length"):
+        return len(first)
+    if name == "head":
+        return first[0] if first else None
+    if name == "last":
+        return first[-1] if first else None
+    if name == "reverse":
+        return first[::-1]
+    if name == "abs":
+        return abs(first)
+    if name == "round":
+        return round(first, args[1]) if len(args) > 1 else float(round(first))
+    if name == "range":
+        step = args[2] if len(args) > 2 else 1
+        return list(range(args[0], args[1] + (1 if step > 0 else -1), step))
+    raise CypherError(f"Unknown function {name}()")
+
+
+def _truthy(value: Any) -> bool:
+    return value is True
+
+
+def _run_union(env: _Env, plan: _Union, seed: list[dict]) -> list[dict]:
+    out: list[dict] = []
+    for part in plan.parts:
+        out.extend(_run_clauses(env, part, [dict(r) for r in seed]))
+    if plan.distinct:
+        seen: set = set()
+        unique = []
+        for row in out:
+            key = _freeze(row)
+            if key not in seen:
+                seen.add(key)
+                unique.append(row)
+        out = unique
+    return out
+
+
+def _run_clauses(env: _Env, clauses: list[_Clause], rows: list[dict]) -> list[dict]:
+    returned = False
+    for clause in clauses:
+        kind = clause.kind
+        if kind == "MATCH":
+            rows = _match_clause(env, clause, rows)
+        elif kind == "UNWIND":
+            rows = [
+                {**row, clause.var: value}
+                for row in rows
+                for value in _as_list(clause.expr.ev(env, row))
+            ]
+        elif kind == "WITH":
+            rows = _project(env, clause.projection, rows)
+            if clause.projection.where is not None:
+                rows = [r for r in rows if _truthy(clause.projection.where.ev(env, r))]
+        elif kind == "RETURN":
+            rows = _project(env, clause.projection, rows)
+            returned = True
+        elif kind == "CREATE":
+            rows = [_create(env, clause.patterns, row) for row in rows]
+        elif kind == "MERGE":
+            rows = [r for row in rows for r in _merge(env, clause, row)]
+        elif kind == "SET":
+            for row in rows:
+                _apply_sets(env, clause.sets, row)
+        elif kind == "CALL":
+            rows = _procedure(env, clause, rows)
+        elif kind == "SUBQUERY":
+            rows = [
+                {**row, **sub}
+                for row in rows
+                for sub in (_run_union(env, clause.query, [row]) if clause.query.returns else _unit(env, clause.query, row))
+            ]
+    return rows if returned else []
+
+
+def _unit(env: _Env, query: _Union, row: dict) -> list[dict]:
+    """A CALL { } without RETURN runs for its side effects and keeps the row."""
+    _run_union(env, query, [row])
+    return [{}]
+
+
+def _as_list(value: Any) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+# -- matching -----------------------------------------------------------------
+
+def _match_clause(env: _Env, clause: _Clause, rows: list[dict]) -> list[dict]:
+    out: list[dict] = []
+    new_vars = [v for p in clause.patterns for v in p.variables()]
+    for row in rows:
+        found = list(_match_patterns(env, clause.patterns, row, set()))
+        if clause.where is not None:
+            found = [r for r in found if _truthy(clause.where.ev(env, r))]
+        if found:
+            out.extend(found)
+        elif clause.optional:
+            out.append({**{v: None for v in new_vars}, **row})
+    return out
+
+
+def _match_patterns(env: _Env, paths: list[_Path], row: dict, used: set[int]) -> Iterator[dict]:
+    if not paths:
+        yield row
+        return
+    for bound in _match_path(env, paths[0], row, used):
+        yield from _match_patterns(env, paths[1:], bound, used)
+
+
+def _anchored(path: _Path, row: dict) -> _Path:
+    """Start from the more selective end of the path."""
+    def score(pat: _NodePat) -> int:
+        if pat.var and row.get(pat.var) is not None:
+            return 2
+        return 1 if pat.props is not None else 0
+    if path.rels and score(path.nodes[-1]) > score(path.nodes[0]):
+        return path.reversed()
+    return path
+
+
+def _match_path(env: _Env, path: _Path, row: dict, used: set[int]) -> Iterator[dict]:
+    path = _anchored(path, row)
+    first = path.nodes[0]
+    for node in _node_candidates(env, first, row):
+        yield from _extend(env, path, 0, node, _bind(row, first.var, node), used)
+
+
+def _bind(row: dict, var: str | None, value: Any) -> dict:
+    if not var:
+        return row
+    return {**row, var: value}
+
+
+def _props_match(env: _Env, props: _Expr | None, element: Node | Relationship, row: dict) -> bool:
+    if props is None:
+        return True
+    wanted = props.ev(env, row)
+    return all(_equals(element.props.get(k), v) for k, v in wanted.items())
+
+
+def _node_matches(env: _Env, pat: _NodePat, node: Node, row: dict) -> bool:
+    if pat.var and pat.var in row and row[pat.var] is not node:
+        return False
+    return all(label in node.labels for label in pat.labels) and _props_match(env, pat.props, node, row)
+
+
+def _node_candidates(env: _Env, pat: _NodePat, row: dict) -> Iterator[Node]:
+    if pat.var and pat.var in row:
+        node = row[pat.var]
+        if isinstance(node, Node) and _node_matches(env, pat, node, row):
+            yield node
+        return
+    graph = env.graph
+    if pat.labels:
+        pool = min((graph.with_label(l) for l in pat.labels), key=len)
+    else:
+        pool = list(graph.nodes.values())
+    for node in pool:
+        if _node_matches(env, pat, node, row):
+            yield node
+
+
+def _extend(env: _Env, path: _Path, i: int, node: Node, row: dict, used: set[int]) -> Iterator[dict]:
+    if i == len(path.rels):
+        yield row
+        return
+    rel_pat = path.rels[i]
+    next_pat = path.nodes[i + 1]
+    for rel, other in env.graph.adjacent(node, rel_pat.direction):
+        if rel.id in used:
+            continue
+        if rel_pat.types and rel.type not in rel_pat.types:
+            continue
+        if rel_pat.var and rel_pat.var in row and row[rel_pat.var] is not rel:
+            continue
+        if not _props_match(env, rel_pat.props, rel, row) or not _node_matches(env, next_pat, other, row):
+            continue
+        bound = _bind(_bind(row, rel_pat.var, rel), next_pat.var, other)
+        used.add(rel.id)
+        try:
+            yield from _extend(env, path, i + 1, other, bound, used)
+        finally:
+            used.discard(rel.id)
+
+
+# -- writes -------------------------------------------------------------------
+
+def _eval_props(env: _Env, props: _Expr | None, row: dict) -> dict[str, Any]:
+    if props is None:
+        return {}
+    value = props.ev(env, row)
+    if not isinstance(value, dict):
+        raise CypherError("Property map expected")
+    return {k: v for k, v in value.items() if v is not None}
+
+
+def _create(env: _Env, paths: list[_Path], row: dict) -> dict:
+    row = dict(row)
+    for path in paths:
+        _create_path(env, path, row)
+    return row
+
+
+def _create_path(env: _Env, path: _Path, row: dict) -> None:
+    """Create the unbound parts of ``path``, binding them in ``row`` (in place)."""
+    graph, counters = env.graph, env.counters
+    previous: Node | None = None
+    for i, pat in enumerate(path.nodes):
+        if pat.var and isinstance(row.get(pat.var), Node):
+            node = row[pat.var]
+        else:
+            props = _eval_props(env, pat.props, row)
+            node = graph.create_node(pat.labels, props)
+            counters.nodes_created += 1
+            counters.labels_added += len(pat.labels)
+            counters.properties_set += len(props)
+            if pat.var:
+                row[pat.var] = node
+        if i:
+            rel_pat = path.rels[i - 1]
+            if len(rel_pat.types) != 1:
+                raise CypherError("A created relationship needs exactly one type")
+            start, end = (node, previous) if rel_pat.direction == "in" else (previous, node)
+            props = _eval_props(env, rel_pat.props, row)
+            rel = graph.create_relationship(start, rel_pat.types[0], end, props)
+            counters.relationships_created += 1
+            counters.properties_set += len(props)
+            if rel_pat.var:
+                row[rel_pat.var] = rel
+        previous = node
+
+
+def _merge(env: _Env, clause: _Clause, row: dict) -> list[dict]:
+    path = clause.patterns[0]
+    matches = list(_match_patterns(env, [path], row, set()))
+    if matches:
+        for match in matches:
+            _apply_sets(env, clause.on_match, match)
+        return matches
+    created = dict(row)
+    _create_path(env, path, created)
+    _apply_sets(env, clause.on_create, created)
+    return [created]
+
+
+def _apply_sets(env: _Env, items: list[tuple], row: dict) -> None:
+    values = [expr.ev(env, row) if expr is not None else None for _, _, _, expr in items]
+    for (kind, var, key, _), value in zip(items, values):
+        target = row.get(var)
+        if target is None:
+            continue
+        if not isinstance(target, (Node, Relationship)):
+            raise CypherError(f"Cannot SET on `{var}`")
+        if kind == "prop":
+            _set_prop(env, target, key, value)
+        elif kind in ("merge", "replace"):
+            if isinstance(value, (Node, Relationship)):
+                value = value.props
+            if kind == "replace":
+                target.props.clear()
+            for k, v in (value or {}).items():
+                _set_prop(env, target, k, v)
+        else:
+            for label in key:
+                if env.graph.add_label(target, label):
+                    env.counters.labels_added += 1
+
+
+def _set_prop(env: _Env, target: Node | Relationship, key: str, value: Any) -> None:
+    if value is None:
+        if target.props.pop(key, None) is not None:
+            env.counters.properties_set += 1
+        return
+    target.props[key] = value
+    env.counters.properties_set += 1
+
+
+# -- projection ---------------------------------------------------------------
+
+def _compare(a: Any, b: Any) -> int:
+    if _equals(a, b):
+        return 0
+    if a is None:
+        return 1
+    if b is None:
+        return -1
+    try:
+        return -1 if a < b else 1
+    except TypeError:
+        return -1 if type(a).__name__ < type(b).__name__ else 1
+
+
+def _project(env: _Env, proj: _Projection, rows: list[dict]) -> list[dict]:
+    # (output row, scope for ORDER BY)
+    results: list[tuple[dict, dict]] = []
+    if any(item.expr.has_agg() for item in proj.items):
+        keys = [item for item in proj.items if not item.expr.has_agg()]
+        groups: dict[Any, list[dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(_freeze(item.expr.ev(env, row)) for item in keys), []).append(row)
+        if not groups and not keys:
+            groups[()] = []
+        for group in groups.values():
+            first = group[0] if group else {}
+            out = {item.alias: item.expr.ev(env, first, group) for item in proj.items}
+            results.append((out, {**first, **out}))
+    else:
+        for row in rows:
+            out = dict(row) if proj.star else {}
+            out.update({item.alias: item.expr.ev(env, row) for item in proj.items})
+            results.append((out, {**row, **out}))
+    if proj.distinct:
+        seen: set = set()
+        unique = []
+        for out, scope in results:
+            key = _freeze(out)
+            if key not in seen:
+                seen.add(key)
+                unique.append((out, scope))
+        results = unique
+    if proj.order:
+        def order(a: tuple[dict, dict], b: tuple[dict, dict]) -> int:
+            for expr, descending in proj.order:
+                result = _compare(expr.ev(env, a[1]), expr.ev(env, b[1]))
+                if result:
+                    return -result if descending else result
+            return 0
+        results.sort(key=functools.cmp_to_key(order))
+    start = proj.skip.ev(env, {}) if proj.skip is not None else 0
+    stop = start + proj.limit.ev(env, {}) if proj.limit is not None else None
+    return [out for out, _ in results[start:stop]]
+
+
+# -- procedures ---------------------------------------------------------------
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _vector_query(env: _Env, index: str, k: int, vector: list[float]) -> list[dict]:
+    if index not in env.graph.vector_indexes:
+        raise CypherError(f"There is no such vector schema index: {index}")
+    label, prop = env.graph.vector_indexes[index]
+    scored = [
+        # Neo4j reports cosine similarity rescaled to [0, 1]
+        (node, (1 + _cosine(vector, node.props[prop])) / 2)
+        for node in env.graph.with_label(label)
+        if isinstance(node.props.get(prop), list) and len(node.props[prop]) == len(vector)
+    ]
+    scored.sort(key=lambda pair: -pair[1])
+    return [{"node": node, "score": score} for node, score in scored[:k]]
+
+
+def _fulltext_query(env: _Env, index: str, text: str) -> list[dict]:
+    if index not in env.graph.fulltext_indexes:
+        raise CypherError(f"There is no such fulltext schema index: {index}")
+    labels, props = env.graph.fulltext_indexes[index]
+    terms = [t for t in re.split(r"[\s　]+", str(text)) if t]
+    hits = []
+    for label in labels:
+        for node in env.graph.with_label(label):
+            body = " ".join(str(node.props.get(p, "")) for p in props)
+            score = float(sum(body.count(term) for term in terms))
+            if score:
+                hits.append({"node": node, "score": score})
+    hits.sort(key=lambda hit: -hit["score"])
+    return hits
+
+
+def _subgraph_all(env: _Env, start: Node, config: dict) -> list[dict]:
+    max_level = int((config or {}).get("maxLevel", -1))
+    limit = int((config or {}).get("limit", -1))
+    seen = {start.id: start}
+    frontier = [start]
+    level = 0
+    while frontier and (max_level < 0 or level < max_level):
+        level += 1
+        following = []
+        for node in frontier:
+            for _, other in env.graph.adjacent(node, "both"):
+                if other.id in seen:
+                    continue
+                if 0 <= limit <= len(seen):
+                    break
+                seen[other.id] = other
+                following.append(other)
+        frontier = following
+    rels = [r for r in env.graph.relationships.values() if r.start.id in seen and r.end.id in seen]
+    return [{"nodes": list(seen.values()), "relationships": rels}]
+
+
+def _procedure(env: _Env, clause: _Clause, rows: list[dict]) -> list[dict]:
+    out: list[dict] = []
+    for row in rows:
+        args = [a.ev(env, row) for a in clause.args]
+        if clause.proc == "db.index.vector.queryNodes":
+            results = _vector_query(env, *args)
+        elif clause.proc == "db.index.fulltext.queryNodes":
+            results = _fulltext_query(env, args[0], args[1])
+        elif clause.proc == "apoc.path.subgraphAll":
+            results = _subgraph_all(env, *args) if args[0] is not None else []
+        else:
+            raise CypherError(f"There is no procedure with the name `{clause.proc}`")
+        for result in results:
+            bound = {**row, **{alias: result[column] for column, alias in clause.yields}}
+            if clause.where is None or _truthy(clause.where.ev(env, bound)):
+                out.append(bound)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Driver facade
+# ---------------------------------------------------------------------------
+
+def _plain(value: Any) -> Any:
+    """Record value as the neo4j driver's ``record.data()`` would give it."""
+    if isinstance(value, (Node, Relationship)):
+        return {k: _plain(v) for k, v in value.props.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    return value
+
+
+class MemoryRecord:
+    def __init__(self, values: dict[str, Any]) -> None:
+        self._values = values
+
+    def data(self) -> dict[str, Any]:
+        return {k: _plain(v) for k, v in self._values.items()}
+
+    def keys(self) -> list[str]:
+        return list(self._values)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return _plain(self._values[key]) if key in self._values else default
+
+    def __getitem__(self, key: str) -> Any:
+        return _plain(self._values[key])
+
+
+class MemoryResult:
+    def __init__(self, records: list[dict[str, Any]], counters: Counters) -> None:
+        self._records = [MemoryRecord(r) for r in records]
+        self._counters = counters
+
+    def __iter__(self) -> Iterator[MemoryRecord]:
+        return iter(self._records)
+
+    def single(self) -> MemoryRecord | None:
+        return self._records[0] if self._records else None
+
+    def data(self) -> list[dict[str, Any]]:
+        return [r.data() for r in self._records]
+
+    def consume(self) -> Any:
+        return _Summary(self._counters)
+
+
+@dataclass
+class _Summary:
+    counters: Counters
+
+
+class MemorySession:
+    def __init__(self, graph: MemoryGraph, latency: float = 0.0) -> None:
+        self._graph = graph
+        self._latency = latency
+
+    def run(self, query: str, parameters: dict | None = None, **kwargs: Any) -> MemoryResult:
+        if self._latency:
+            time.sleep(self._latency)
+        records, counters = self._graph.run(query, {**(parameters or {}), **kwargs})
+        return MemoryResult(records, counters)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "MemorySession":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class MemoryDriver:
+    """Stand-in for ``neo4j.Driver`` over a :class:`MemoryGraph`."""
+
+    def __init__(self, graph: MemoryGraph, latency: float = 0.0) -> None:
+        self.graph = graph
+        self.latency = latency
+
+    def session(self, **kwargs: Any) -> MemorySession:
+        return MemorySession(self.graph, self.latency)
+
+    def verify_connectivity(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+_SURNAMES = [
+    ("田中", "たなか"), ("佐藤", "さとう"), ("鈴木", "すずき"), ("高橋", "たかはし"), ("伊藤", "いとう"),
+    ("渡辺", "わたなべ"), ("山本", "やまもと"), ("中村", "なかむら"), ("小林", "こばやし"), ("加藤", "かとう"),
+    ("吉田", "よしだ"), ("山田", "やまだ"), ("松本", "まつもと"), ("井上", "いのうえ"), ("木村", "きむら"),
+    ("林", "はやし"), ("清水", "しみず"), ("森", "もり"), ("池田", "いけだ"), ("橋本", "はしもと"),
+]
+_GIVEN = [
+    ("太郎", "たろう"), ("花子", "はなこ"), ("健太", "けんた"), ("美咲", "みさき"), ("翔", "しょう"),
+    ("結衣", "ゆい"), ("大輔", "だいすけ"), ("陽菜", "ひな"), ("悠真", "ゆうま"), ("さくら", "さくら"),
+    ("拓海", "たくみ"), ("葵", "あおい"), ("蓮", "れん"), ("凛", "りん"), ("湊", "みなと"),
+]
+_CONDITIONS = ["自閉スペクトラム症", "知的障害", "てんかん", "ダウン症", "ADHD", "統合失調症"]
+_NG_ACTIONS = [
+    ("大声を出す", "パニック誘発", "Panic"),
+    ("後ろから急に触る", "強い驚愕反応", "Panic"),
+    ("ナッツ類を与える", "アナフィラキシー", "LifeThreatening"),
+    ("予定を急に変更する", "混乱して不安定になる", "Discomfort"),
+    ("一人で入浴させる", "発作時の溺水リスク", "LifeThreatening"),
+    ("長時間待たせる", "自傷につながる", "Panic"),
+]
+_CARE = [
+    ("コミュニケーション", "ゆっくり短い言葉で話す"),
+    ("環境", "静かな部屋を用意する"),
+    ("食事", "刻み食にする"),
+    ("移動", "事前に写真で行き先を伝える"),
+    ("睡眠", "就寝前は照明を落とす"),
+]
+_RELATIONS = ["母", "父", "姉", "兄", "叔母"]
+_HOSPITALS = ["中央病院", "市民病院", "こころのクリニック", "北部医療センター", "東診療所"]
+_SUPPORTERS = ["佐々木", "山口", "石川", "前田", "藤田"]
+_SITUATIONS = [
+    ("パニック", "静かな部屋に移動", "Effective"),
+    ("食事", "一口ずつ声かけ", "Effective"),
+    ("外出", "散歩同行", "Neutral"),
+    ("入浴", "見守り", "Neutral"),
+    ("不眠", "照明を落として声かけ", "Ineffective"),
+]
+_CERTIFICATES = [("療育手帳", "A"), ("療育手帳", "B1"), ("精神障害者保健福祉手帳", "2級"), ("障害福祉サービス受給者証", "区分4")]
+
+
+def seed(
+    graph: MemoryGraph,
+    clients: int = 20,
+    seed: int = 0,
+    logs_per_client: int = 5,
+    embed: Callable[[str], list[float]] | None = None,
+) -> None:
+    """Fill ``graph`` with deterministic synthetic clients and their networks.
+
+    ``embed`` (text → vector) adds ``embedding`` / ``summaryEmbedding`` so the
+    vector search procedures have something to rank.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    with graph._lock:
+        shared: dict[tuple[str, str], Node] = {}
+
+        def merged(label: str, key: str, props: dict[str, Any]) -> Node:
+            if (label, key) not in shared:
+                shared[(label, key)] = graph.create_node([label], props)
+            return shared[(label, key)]
+
+        supporters = [merged("Supporter", n, {"name": n}) for n in _SUPPORTERS]
+        names = list(itertools.product(_SURNAMES, _GIVEN))
+        rng.shuffle(names)
+        for i in range(clients):
+            (surname, surname_kana), (given, given_kana) = names[i % len(names)]
+            suffix = "" if i < len(names) else str(i // len(names) + 1)
+            name = f"{surname}{given}{suffix}"
+            kana = surname_kana + given_kana
+            dob = date(rng.randint(1960, 2005), rng.randint(1, 12), rng.randint(1, 28)).isoformat()
+            conditions = rng.sample(_CONDITIONS, rng.randint(1, 2))
+            props = {
+                "name": name, "kana": kana, "kanaRow": kana_row(name, kana),
+                "dob": dob, "bloodType": rng.choice(["A", "B", "O", "AB"]),
+            }
+            if embed is not None:
+                props["summaryEmbedding"] = embed(f"{name} {' '.join(conditions)}")
+            client = graph.create_node(["Client"], props)
+            for condition in conditions:
+                graph.create_relationship(client, "HAS_CONDITION", merged("Condition", condition, {"name": condition}))
+            for action, reason, risk in rng.sample(_NG_ACTIONS, rng.randint(1, 3)):
+                ng = merged("NgAction", action, {"action": action, "reason": reason, "riskLevel": risk})
+                if embed is not None and "embedding" not in ng.props:
+                    ng.props["embedding"] = embed(f"{action} {reason}")
+                graph.create_relationship(client, "MUST_AVOID", ng)
+            for category, instruction in rng.sample(_CARE, rng.randint(1, 2)):
+                care = merged("CarePreference", instruction, {"category": category, "instruction": instruction, "priority": "高"})
+                graph.create_relationship(client, "REQUIRES", care)
+            for rank, relation in enumerate(rng.sample(_RELATIONS, rng.randint(1, 2)), start=1):
+                person = graph.create_node(["KeyPerson"], {
+                    "name": f"{surname}{relation}{i}", "relationship": relation,
+                    "phone": f"090-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                })
+                graph.create_relationship(client, "HAS_KEY_PERSON", person, {"rank": rank})
+            hospital = rng.choice(_HOSPITALS)
+            graph.create_relationship(client, "TREATED_AT", merged("Hospital", hospital, {"name": hospital, "phone": "03-0000-0000"}))
+            if rng.random() < 0.3:
+                guardian = graph.create_node(["Guardian"], {"name": f"後見人{i}", "type": "成年後見人"})
+                graph.create_relationship(client, "HAS_LEGAL_REP", guardian)
+            cert_type, grade = rng.choice(_CERTIFICATES)
+            certificate = graph.create_node(["Certificate"], {
+                "type": cert_type, "grade": grade,
+                "nextRenewalDate": (today + timedelta(days=rng.randint(1, 365))).isoformat(),
+            })
+            graph.create_relationship(client, "HAS_CERTIFICATE", certificate)
+            for j in range(logs_per_client):
+                situation, action, effectiveness = rng.choice(_SITUATIONS)
+                note = f"{name}さん: {situation}のため{action}。"
+                log_props = {
+                    "date": (today - timedelta(days=rng.randint(0, 60))).isoformat(),
+                    "situation": situation, "action": action,
+                    "effectiveness": effectiveness, "note": note,
+                }
+                if embed is not None:
+                    log_props["embedding"] = embed(note)
+                log = graph.create_node(["SupportLog"], log_props)
+                graph.create_relationship(rng.choice(supporters), "LOGGED", log)
+                graph.create_relationship(log, "ABOUT", client)
+    graph.run(
+        "CREATE FULLTEXT INDEX idx_supportlog_fulltext IF NOT EXISTS "
+        "FOR (n:SupportLog) ON EACH [n.note, n.situation, n.action]"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Shared instance
+# ---------------------------------------------------------------------------
+
+_graph: MemoryGraph | None = None
+_graph_lock = threading.Lock()
+
+
+def get_graph() -> MemoryGraph:
+    """The process-wide graph, seeded from settings on first use."""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            from app.lib.fake_llm import embedding_vector
+            graph = MemoryGraph()
+            seed(graph, clients=settings.memory_graph_clients, seed=settings.fake_seed, embed=embedding_vector)
+            _graph = graph
+        return _graph
+
+
+def get_driver() -> MemoryDriver:
+    return MemoryDriver(get_graph(), latency=settings.memory_graph_latency_ms / 1000)
+
+
+def reset() -> None:
+    """Discard the shared graph (re-seeded on next use)."""
+    global _graph
+    with _graph_lock:
+        _graph = None
@@ -0,0 +1,134 @@
+"""Deterministic stand-in for a quota-limited model endpoint.
+
+レート制御（app.lib.rate_limit）をオフラインで負荷試験するための擬似 API。
+実際の Gemini と同じように、同時実行数・秒あたりのリクエスト数の上限を
+超えた呼び出しには 429（``RESOURCE_EXHAUSTED``）を返す。応答・遅延・
+故障はすべて入力とシードから決まるので、同じ負荷をかければ同じ結果になる:
+
+    endpoint = SimulatedEndpoint(max_concurrency=4, requests_per_second=50)
+    gov = rate_limit.Governor("sim", rate_per_minute=6000, max_concurrency=16)
+    gov.call(endpoint, "payload")   # threads
+    await gov.acall(endpoint.acall, "payload")   # event loop
+    endpoint.stats()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable
+
+
+class SimulatedError(Exception):
+    """Error raised by the endpoint; ``code`` is the HTTP status it stands for."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def _fraction(*parts: object) -> float:
+    """Stable value in [0, 1) derived from ``parts``."""
+    digest = hashlib.sha256("\n".join(map(str, parts)).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+class SimulatedEndpoint:
+    """Quota-enforcing fake API; ``__call__`` blocks, ``acall`` awaits.
+
+    - More than ``max_concurrency`` calls in flight, or more than
+      ``requests_per_second`` starts in the last second → 429.
+    - ``failure_rate`` of attempts → 503. Whether the n-th attempt with a
+      payload fails is fixed by hash, so a retry may succeed.
+    - Latency is ``latency`` plus ``jitter`` seconds scaled by a value fixed per
+      payload: uniform in [0, 1), or exponential with mean 1 (a long tail)
+      when ``distribution="exponential"``.
+    - The response is a digest of the payload.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        requests_per_second: float | None = None,
+        latency: float = 0.01,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        distribution: str = "uniform",
+        seed: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.distribution = distribution
+        self.seed = seed
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._starts: deque[float] = deque()
+        self._in_flight = 0
+        self._attempts: Counter[bytes] = Counter()
+        self.peak_in_flight = 0
+        self.served = 0
+        self.throttled = 0
+        self.failed = 0
+
+    def _admit(self, payload: str) -> float:
+        """Start a call or raise; returns its latency."""
+        with self._lock:
+            now = self._clock()
+            while self._starts and now - self._starts[0] >= 1.0:
+                self._starts.popleft()
+            over_rate = self.requests_per_second is not None and len(self._starts) >= self.requests_per_second
+            if self._in_flight >= self.max_concurrency or over_rate:
+                self.throttled += 1
+                raise SimulatedError(429, "RESOURCE_EXHAUSTED")
+            key = hashlib.blake2b(payload.encode("utf-8"), digest_size=8).digest()
+            attempt = self._attempts[key]
+            self._attempts[key] += 1
+            if self.failure_rate and _fraction(self.seed, "fail", payload, attempt) < self.failure_rate:
+                self.failed += 1
+                raise SimulatedError(503, "UNAVAILABLE")
+            self._starts.append(now)
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+        u = _fraction(self.seed, "latency", payload)
+        if self.distribution == "exponential":
+            u = -math.log(1.0 - u)
+        return self.latency + self.jitter * u
+
+    def _finish(self, payload: str) -> str:
+        with self._lock:
+            self._in_flight -= 1
+            self.served += 1
+        return hashlib.sha256(f"{self.seed}\n{payload}".encode("utf-8")).hexdigest()
+
+    def __call__(self, payload: str) -> str:
+        delay = self._admit(payload)
+        try:
+            time.sleep(delay)
+        finally:
+            result = self._finish(payload)
+        return result
+
+    async def acall(self, payload: str) -> str:
+        delay = self._admit(payload)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            result = self._finish(payload)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "served": self.served,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "peak_in_flight": self.peak_in_flight,
+            }
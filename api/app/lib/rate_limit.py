@@ -0,0 +1,430 @@
+"""Process-wide rate limiting for LLM and embedding calls.
+
+Gemini への呼び出しは埋め込み・抽出・安全チェック・インテーク評価・
+文字起こし・チャットの各所から協調なしに出ていたため、ナラティブ登録が
+集中すると 429 が返り、埋め込みは黙って None になっていた。ここでは
+(プロバイダー, モデル) ごとに 1 つの :class:`Governor` を置き、すべての
+呼び出しをそこに通す:
+
+- トークンバケット — 分あたりの開始数を ``rate_per_minute`` に抑える
+  （``burst`` 件までは即時）。
+- AIMD 同時実行制限 — 成功のたびに上限を ``1 / 上限`` ずつ増やし（1 ウィンドウで
+  +1）、429 / 5xx では半分にしたうえで新規開始を一時停止する（停止時間は
+  連続するほど倍、``max_backoff`` まで）。減らす前に開始した呼び出しの 429 では
+  重ねて減らさない。
+- 優先度付き待ち行列 — 空きが出たら ``Priority`` の小さい順（同順位は到着順）に
+  渡す。緊急時のチャットがバックグラウンドの埋め込みより先に通る。優先度は
+  ContextVar で呼び出し側から伝える（:func:`priority` / :func:`set_priority`）。
+- 再試行 — :meth:`Governor.call` / :meth:`Governor.acall` は 429 / 5xx を
+  ``retries`` 回まで、一時停止が明けてから再試行する。
+
+同期呼び出し（スレッド）と非同期呼び出し（イベントループ）の両方が同じ
+Governor を共有する。状態は ``/api/system/rate-limits`` で確認できる。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    EMERGENCY = 0
+    INTERACTIVE = 1
+    NORMAL = 2
+    BATCH = 3
+
+
+_priority: ContextVar[Priority] = ContextVar("rate_limit_priority", default=Priority.NORMAL)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+def set_priority(level: Priority) -> None:
+    """Priority for calls made from the current task / context from now on."""
+    _priority.set(level)
+
+
+@contextmanager
+def priority(level: Priority) -> Iterator[None]:
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# -- error classification ---------------------------------------------------
+
+_THROTTLE_STATUS = {429, 500, 502, 503, 504}
+_THROTTLE_MARKERS = ("429", "RESOURCE_EXHAUSTED", "503", "UNAVAILABLE", "rate limit", "Rate limit", "quota")
+
+
+def is_throttle(error: BaseException | str) -> bool:
+    """Whether an SDK error (or a run's error message) means "slow down"."""
+    if not isinstance(error, str):
+        for attr in ("code", "status_code"):
+            try:
+                if int(getattr(error, attr, None)) in _THROTTLE_STATUS:
+                    return True
+            except (TypeError, ValueError):
+                pass
+    text = str(error)
+    return any(marker in text for marker in _THROTTLE_MARKERS)
+
+
+def _outcome_of(exc: BaseException) -> str:
+    if not isinstance(exc, Exception):
+        return "cancelled"  # CancelledError, KeyboardInterrupt: says nothing about the provider
+    return "throttled" if is_throttle(exc) else "error"
+
+
+# -- governor ---------------------------------------------------------------
+
+class Slot:
+    """One granted call; mark ``throttled()`` when the failure is not an exception."""
+
+    __slots__ = ("started_at", "waited", "outcome")
+
+    def __init__(self, started_at: float, waited: float) -> None:
+        self.started_at = started_at
+        self.waited = waited
+        self.outcome: str | None = None
+
+    def throttled(self) -> None:
+        self.outcome = "throttled"
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued_at", "slot", "cancelled", "event", "loop", "future")
+
+    def __init__(self, level: Priority, now: float) -> None:
+        self.priority = level
+        self.enqueued_at = now
+        self.slot: Slot | None = None
+        self.cancelled = False
+        self.event: threading.Event | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.future: asyncio.Future | None = None
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        elif self.future is not None and self.loop is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class Governor:
+    """Token bucket + AIMD concurrency limit + priority queue for one model.
+
+    ``acquire`` / ``release`` are the primitives; prefer the ``slot`` /
+    ``aslot`` context managers or ``call`` / ``acall``, which classify the
+    outcome from the exception.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_minute: float,
+        max_concurrency: int,
+        burst: int | None = None,
+        min_concurrency: int = 1,
+        retries: int = 3,
+        base_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.rate_per_minute = rate_per_minute
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.burst = max(1, burst if burst is not None else self.max_concurrency)
+        self.retries = retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._refilled_at = clock()
+        self.limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._backoff = 0.0
+        self._decreased_at = float("-inf")
+        self._waiters: list[tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        # metrics
+        self.calls = 0
+        self.throttled = 0
+        self.errors = 0
+        self.retried = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # -- scheduling (under self._lock) --------------------------------------
+
+    def _refill(self, now: float) -> None:
+        rate = self.rate_per_minute / 60.0
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * rate)
+        self._refilled_at = now
+
+    def _dispatch(self, now: float, caller: _Waiter | None = None) -> float | None:
+        """Grant slots to queued waiters in priority order.
+
+        Returns how long the head of the queue must wait for time to pass
+        (tokens, pause), or None when it waits for a release. The head is woken
+        to do that timed wait unless it is ``caller`` itself.
+        """
+        self._refill(now)
+        while self._waiters:
+            waiter = self._waiters[0][2]
+            if waiter.cancelled:
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_flight >= int(self.limit):
+                return None
+            if now < self._paused_until:
+                delay = self._paused_until - now
+            elif self._tokens < 1:
+                rate = self.rate_per_minute / 60.0
+                delay = (1 - self._tokens) / rate if rate > 0 else self.max_backoff
+            else:
+                heapq.heappop(self._waiters)
+                self._tokens -= 1
+                self._in_flight += 1
+                waited = now - waiter.enqueued_at
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                waiter.slot = Slot(now, waited)
+                if waiter is not caller:
+                    waiter.wake()
+                continue
+            if waiter is not caller:
+                waiter.wake()
+            return delay
+        return None
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        heapq.heappush(self._waiters, (int(waiter.priority), next(self._seq), waiter))
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Leave the queue (or hand back a slot granted meanwhile)."""
+        with self._lock:
+            if waiter.slot is not None:
+                self._in_flight -= 1
+            else:
+                waiter.cancelled = True
+            self._dispatch(self._clock())
+
+    # -- primitives ---------------------------------------------------------
+
+    def acquire(self, level: Priority | None = None) -> Slot:
+        """Block the calling thread until a slot is granted."""
+        waiter = _Waiter(current_priority() if level is None else level, self._clock())
+        waiter.event = threading.Event()
+        try:
+            with self._lock:
+                self._enqueue(waiter)
+            while True:
+                with self._lock:
+                    waiter.event.clear()
+                    delay = self._dispatch(self._clock(), waiter) if waiter.slot is None else None
+                    if waiter.slot is not None:
+                        return waiter.slot
+                waiter.event.wait(delay)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    async def acquire_async(self, level: Priority | None = None) -> Slot:
+        """Wait on the running event loop until a slot is granted."""
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(current_priority() if level is None else level, self._clock())
+        waiter.loop = loop
+        try:
+            with self._lock:
+                self._enqueue(waiter)
+            while True:
+                future = loop.create_future()
+                with self._lock:
+                    waiter.future = future
+                    delay = self._dispatch(self._clock(), waiter) if waiter.slot is None else None
+                    if waiter.slot is not None:
+                        return waiter.slot
+                try:
+                    await asyncio.wait_for(future, delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def release(self, slot: Slot, outcome: str = "ok") -> None:
+        """Return a slot; ``outcome`` is "ok", "throttled", "error" or "cancelled"."""
+        with self._lock:
+            now = self._clock()
+            self._in_flight -= 1
+            self.calls += 1
+            if outcome == "throttled":
+                self.throttled += 1
+                # One decrease per window: calls started before the last one add nothing
+                if slot.started_at >= self._decreased_at:
+                    self.limit = max(float(self.min_concurrency), self.limit / 2)
+                    self._backoff = min(self.max_backoff, self._backoff * 2 or self.base_backoff)
+                    self._paused_until = max(self._paused_until, now + self._backoff)
+                    self._decreased_at = now
+                    logger.warning(
+                        "%s throttled: concurrency %d, pausing %.1fs", self.name, int(self.limit), self._backoff
+                    )
+            elif outcome == "ok":
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+                self._backoff = 0.0
+            elif outcome == "error":
+                self.errors += 1
+            self._dispatch(now)
+
+    # -- wrappers -----------------------------------------------------------
+
+    @contextmanager
+    def slot(self, level: Priority | None = None) -> Iterator[Slot]:
+        granted = self.acquire(level)
+        try:
+            yield granted
+        except BaseException as exc:
+            self.release(granted, _outcome_of(exc))
+            raise
+        self.release(granted, granted.outcome or "ok")
+
+    @asynccontextmanager
+    async def aslot(self, level: Priority | None = None) -> AsyncIterator[Slot]:
+        granted = await self.acquire_async(level)
+        try:
+            yield granted
+        except BaseException as exc:
+            self.release(granted, _outcome_of(exc))
+            raise
+        self.release(granted, granted.outcome or "ok")
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """``fn(*args, **kwargs)`` in a slot, retrying throttled attempts."""
+        for attempt in range(self.retries + 1):
+            try:
+                with self.slot():
+                    return fn(*args, **kwargs)
+            except Exception as exc:
+                if attempt >= self.retries or not is_throttle(exc):
+                    raise
+                self._count_retry()
+        raise AssertionError("unreachable")
+
+    async def acall(self, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """``await fn(*args, **kwargs)`` in a slot, retrying throttled attempts.
+
+        Blocking SDK calls go through ``acall(asyncio.to_thread, sdk_fn, ...)``.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.aslot():
+                    return await fn(*args, **kwargs)
+            except Exception as exc:
+                if attempt >= self.retries or not is_throttle(exc):
+                    raise
+                self._count_retry()
+        raise AssertionError("unreachable")
+
+    def _count_retry(self) -> None:
+        with self._lock:
+            self.retried += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            now = self._clock()
+            granted = self.calls + self._in_flight
+            return {
+                "name": self.name,
+                "concurrency_limit": int(self.limit),
+                "max_concurrency": self.max_concurrency,
+                "rate_per_minute": self.rate_per_minute,
+                "in_flight": self._in_flight,
+                "queued": sum(1 for _, _, w in self._waiters if not w.cancelled),
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "errors": self.errors,
+                "retries": self.retried,
+                "wait_ms_avg": round(self._wait_total / granted * 1000, 1) if granted else 0.0,
+                "wait_ms_max": round(self._wait_max * 1000, 1),
+                "paused_ms": max(0, int((self._paused_until - now) * 1000)),
+            }
+
+
+# -- registry ---------------------------------------------------------------
+
+_registry_lock = threading.Lock()
+_governors: dict[tuple[str, str], Governor] = {}
+
+
+def governor(provider: str, model: str, kind: str = "llm") -> Governor:
+    """The process-wide governor for ``model`` of ``provider``.
+
+    ``kind`` ("llm" or "embedding") picks the settings the governor is
+    created with on first use.
+    """
+    key = (provider.lower(), model)
+    with _registry_lock:
+        gov = _governors.get(key)
+        if gov is None:
+            if kind == "embedding":
+                rpm, concurrency = settings.embedding_rate_limit_rpm, settings.embedding_max_concurrency
+            else:
+                rpm, concurrency = settings.llm_rate_limit_rpm, settings.llm_max_concurrency
+            gov = Governor(f"{key[0]}/{model}", rpm, concurrency, retries=settings.rate_limit_retries)
+            _governors[key] = gov
+        return gov
+
+
+def gemini() -> Governor:
+    """Governor for direct google.generativeai calls on ``settings.gemini_model``."""
+    return governor("google", settings.gemini_model)
+
+
+def gemini_embedding() -> Governor:
+    return governor("google", settings.embedding_model, kind="embedding")
+
+
+def for_model(model: Any) -> Governor:
+    """Governor for an Agno model (provider and id read from the model)."""
+    provider = getattr(model, "provider", None) or settings.chat_provider
+    return governor(str(provider), str(getattr(model, "id", None) or ""))
+
+
+def stats() -> list[dict[str, Any]]:
+    with _registry_lock:
+        governors = list(_governors.values())
+    return [gov.stats() for gov in governors]
+
+
+def reset() -> None:
+    """Forget every governor (tests; settings changes)."""
+    with _registry_lock:
+        _governors.clear()
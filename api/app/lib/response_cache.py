@@ -0,0 +1,255 @@
+"""Semantic answer cache for repeated chat questions.
+
+「○○さんの禁忌事項は？」「更新期限が近い手帳は？」のような定型の質問は、
+毎回 LLM のターンとツール呼び出しを丸ごと消費していた。ここでは回答を
+
+    (対象, データ版数) → [(質問の埋め込み, 正規化した質問, 回答)]
+
+で保持する。対象には質問文に出てくる話題（禁忌・推奨ケア・連絡先・病院・
+後見・期限、_TOPIC_KEYWORDS）の集合も含める。同じクライアントの別の話題の
+質問は埋め込みが近くなりやすく、類似度だけでは区別できないため。
+同じ対象・同じ版数のエントリのうち質問の埋め込みの
+コサイン類似度が ``threshold`` 以上のものがあれば、LLM を呼ばずに返す。
+同一の質問（正規化後）は埋め込みを待たずに返す。
+
+データ版数は db_operations.add_write_listener で保守する:
+
+- 質問文がクライアントを名指しする場合 — 対象はそのクライアント。版数は
+  日付・全体の版数（対象不明の書き込みで進む）・そのクライアントの版数
+  （対象が分かる書き込みで進む）。
+- 名指ししない質問（更新期限の一覧、話題のクライアントについての
+  「禁忌事項は？」など） — 対象は会話中のクライアント（ツールが解決した
+  クライアント、なければ前に名指しされたクライアント）。どのデータに依存するか
+  分からないので、版数は日付と、あらゆる書き込みで進む版数。対象が None に
+  なるのは会話の文脈がまだない（最初の質問の）ときだけで、文脈のある
+  セッションの対象なしの回答は他のセッションと共有しないのでキャッシュしない
+  （chat ルーター側で判定）。
+
+指示語や「もっと詳しく」のような、会話の流れに依存する短い追い質問は
+キャッシュしない（is_cacheable）。版数が変わったエントリは参照時に捨てる。
+版数が追えるのはこのプロセスの書き込みだけなので（他のワーカーやスクリプトの
+書き込みは通知されない）、回答は TTL にかかわらず ``_MAX_AGE_SECONDS`` で
+期限切れにする（emergency・client_names と同じ上限）。
+ヒット数（＝節約した LLM 呼び出し数）は stats() で /api/system/caches に出す。
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable
+
+from app.lib.db_operations import add_write_listener
+
+logger = logging.getLogger(__name__)
+
+# Writes made by other processes do not notify this one: no answer (which may
+# list NG actions or contacts) is served past this age, whatever the TTL
+_MAX_AGE_SECONDS = 300
+
+_lock = threading.Lock()
+# Bumped by writes whose client is unknown (invalidates every client's answers)
+_global_generation = 0
+# Bumped per client name by writes that name their client
+_client_generations: dict[str, int] = {}
+# Bumped by every write (answers that do not belong to one client)
+_any_generation = 0
+
+
+def _on_write(labels: set[str] | None, client_names: set[str] | None) -> None:
+    global _global_generation, _any_generation
+    with _lock:
+        _any_generation += 1
+        if client_names:
+            for name in client_names:
+                _client_generations[name] = _client_generations.get(name, 0) + 1
+        else:
+            _global_generation += 1
+
+
+add_write_listener(_on_write)
+
+
+def data_version(client: str | None) -> tuple:
+    """Stamp that changes whenever data an answer about ``client`` may use changes."""
+    today = date.today().isoformat()
+    with _lock:
+        if client is None:
+            return (today, _any_generation)
+        return (today, _global_generation, _client_generations.get(client, 0))
+
+
+# Follow-up wording whose meaning depends on the conversation so far
+_CONTEXT_MARKERS = (
+    "それ", "その", "あれ", "あの", "この", "これ", "さっき", "先ほど", "前の",
+    "もっと", "詳しく", "続き", "他には", "ほかには", "彼",
+)
+_MIN_QUESTION_CHARS = 5
+
+
+def is_cacheable(question: str) -> bool:
+    """Whether a question can be answered without the conversation around it."""
+    text = normalize_question(question)
+    return len(text) >= _MIN_QUESTION_CHARS and not any(m in text for m in _CONTEXT_MARKERS)
+
+
+def normalize_question(text: str) -> str:
+    """NFKC, no whitespace, no trailing question marks."""
+    text = "".join(unicodedata.normalize("NFKC", text).split())
+    return text.rstrip("?？。")
+
+
+# Topic → wording that asks about it. Questions about different facets of one
+# client embed close together; the topics keep them under different keys
+_TOPIC_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "禁忌": ("禁忌", "ng", "避け", "してはいけない", "ダメ"),
+    "推奨ケア": ("推奨ケア", "ケア", "配慮", "対応方法"),
+    "連絡先": ("連絡先", "キーパーソン", "家族", "電話"),
+    "病院": ("病院", "主治医", "医療機関", "通院"),
+    "後見": ("後見",),
+    "期限": ("期限", "更新"),
+}
+
+
+def question_topics(question: str) -> frozenset[str]:
+    """Topics of ``_TOPIC_KEYWORDS`` the (normalized) question asks about."""
+    text = normalize_question(question).lower()
+    return frozenset(
+        topic for topic, words in _TOPIC_KEYWORDS.items() if any(w in text for w in words)
+    )
+
+
+def _unit(vector: list[float]) -> list[float] | None:
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else None
+
+
+@dataclass
+class _Entry:
+    key: tuple
+    version: tuple
+    question: str
+    vector: list[float] | None
+    answer: str
+    stored_at: float
+
+
+@dataclass
+class Probe:
+    """A lookup's key material, reused to store the answer on a miss."""
+
+    key: tuple
+    version: tuple
+    question: str
+    vector: list[float] | None = None
+
+
+def make_probe(question: str, client: str | None = None, context_client: str | None = None) -> Probe:
+    """Probe for ``question``; ``client`` is named in it, ``context_client`` is the conversation's."""
+    topics = question_topics(question)
+    if client:
+        return Probe(("client", client, topics), data_version(client), normalize_question(question))
+    return Probe(("context", context_client, topics), data_version(None), normalize_question(question))
+
+
+class ResponseCache:
+    """Bounded LRU of answers, matched by key, data version and question similarity."""
+
+    def __init__(
+        self,
+        threshold: float = 0.93,
+        max_entries: int = 500,
+        ttl_seconds: float = _MAX_AGE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = min(ttl_seconds, _MAX_AGE_SECONDS)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._next_id = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def _live(self, probe: Probe, now: float) -> list[tuple[int, _Entry]]:
+        """Entries under the probe's key at its version; drops stale ones on the way."""
+        live = []
+        for key, entry in list(self._entries.items()):
+            if entry.key != probe.key:
+                continue
+            if entry.version != probe.version or now - entry.stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.invalidated += 1
+                continue
+            live.append((key, entry))
+        return live
+
+    def get_exact(self, probe: Probe) -> str | None:
+        """Answer for the same normalized question, without an embedding."""
+        with self._lock:
+            for key, entry in self._live(probe, self._clock()):
+                if entry.question == probe.question:
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry.answer
+        return None
+
+    def get_similar(self, probe: Probe) -> str | None:
+        """Best answer whose question embedding is within ``threshold``; counts a miss otherwise."""
+        vector = _unit(probe.vector) if probe.vector else None
+        with self._lock:
+            best_key, best_score = None, self.threshold
+            if vector is not None:
+                for key, entry in self._live(probe, self._clock()):
+                    if entry.vector is None or len(entry.vector) != len(vector):
+                        continue
+                    score = sum(a * b for a, b in zip(vector, entry.vector))
+                    if score >= best_score:
+                        best_key, best_score = key, score
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.semantic_hits += 1
+            return self._entries[best_key].answer
+
+    def put(self, probe: Probe, answer: str) -> None:
+        if not answer:
+            return
+        vector = _unit(probe.vector) if probe.vector else None
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.key == probe.key and entry.question == probe.question:
+                    del self._entries[key]
+            self._entries[self._next_id] = _Entry(
+                probe.key, probe.version, probe.question, vector, answer, self._clock()
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            total = hits + self.misses
+            return {
+                "name": "chat_response",
+                "hits": hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "saved_llm_calls": hits,
+            }
@@ -0,0 +1,252 @@
+"""TTL-expiring stores for conversation sessions (intake etc.).
+
+インテークのセッションはモジュール内の dict に置かれ、取得のたびに全件を
+走査して期限切れを消していた。また uvicorn のワーカーを複数にすると
+ワーカー間で状態が共有されない。ここでは同じインターフェース
+（dict 風の get / put / pop / ``in``）で 2 つのバックエンドを提供する:
+
+- MemorySessionStore — プロセス内。期限はヒープで管理し、期限切れの削除は
+  O(log n)（アクセスのたびに全件走査しない）。
+- SqliteSessionStore — 共有ファイル（WAL）。同一ホストの複数ワーカーから
+  使える。値は呼び出し側の ``encode`` / ``decode`` でバイト列にする。
+
+どちらも最終アクセスから ``ttl_seconds`` で失効する（get / put で延長）。
+SQLite バックエンドが返すのは保存時点のコピーなので、変更後は put で
+書き戻すこと。
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class SessionStore:
+    """Dict-like TTL store. Subclasses implement get / put / pop / clear / __len__."""
+
+    ttl_seconds: float
+
+    def get(self, key: str) -> Any | None:
+        raise NotImplementedError
+
+    def put(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.put(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store; expiry via a min-heap of (deadline, key).
+
+    Touching a key pushes a new heap entry; entries whose deadline no longer
+    matches are skipped when popped, and the heap is rebuilt once stale
+    entries outnumber live ones.
+    """
+
+    def __init__(self, ttl_seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._values: dict[str, tuple[Any, float]] = {}
+        self._heap: list[tuple[float, str]] = []
+
+    def _expire(self, now: float) -> None:
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, key = heapq.heappop(heap)
+            entry = self._values.get(key)
+            if entry is not None and entry[1] == deadline:
+                del self._values[key]
+                logger.info("Expired session: %s", key)
+
+    def _touch(self, key: str, value: Any, now: float) -> None:
+        deadline = now + self.ttl_seconds
+        self._values[key] = (value, deadline)
+        heapq.heappush(self._heap, (deadline, key))
+        if len(self._heap) > 2 * len(self._values) + 64:
+            self._heap = [(d, k) for k, (_, d) in self._values.items()]
+            heapq.heapify(self._heap)
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            self._touch(key, entry[0], now)
+            return entry[0]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            self._touch(key, value, now)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._values.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._heap.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(self._clock())
+            return len(self._values)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)"
+
+
+class SqliteSessionStore(SessionStore):
+    """Shared store in a SQLite file (WAL), usable from several worker processes.
+
+    Expired rows are removed through the ``expires_at`` index, at most once
+    per ``sweep_interval`` seconds per process.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_seconds: float,
+        encode: Callable[[Any], bytes],
+        decode: Callable[[bytes], Any],
+        sweep_interval: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._encode = encode
+        self._decode = decode
+        self._sweep_interval = sweep_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._last_sweep = 0.0
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, commit on success and always close it."""
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(_SCHEMA)
+                conn.execute(_INDEX)
+                self._initialized = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _sweep(self, conn: sqlite3.Connection, now: float) -> None:
+        if now - self._last_sweep < self._sweep_interval:
+            return
+        self._last_sweep = now
+        conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def get(self, key: str) -> Any | None:
+        now = self._clock()
+        try:
+            with self._lock, self._db() as conn:
+                self._sweep(conn, now)
+                row = conn.execute(
+                    "SELECT value FROM sessions WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute(
+                    "UPDATE sessions SET expires_at = ? WHERE key = ?", (now + self.ttl_seconds, key)
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Session store read failed: %s", exc)
+            return None
+        return self._decode(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        now = self._clock()
+        data = self._encode(value)
+        try:
+            with self._lock, self._db() as conn:
+                self._sweep(conn, now)
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, data, now + self.ttl_seconds),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Session store write failed: %s", exc)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        now = self._clock()
+        try:
+            with self._lock, self._db() as conn:
+                row = conn.execute(
+                    "SELECT value FROM sessions WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                conn.execute("DELETE FROM sessions WHERE key = ?", (key,))
+        except sqlite3.Error as exc:
+            logger.warning("Session store delete failed: %s", exc)
+            return default
+        return default if row is None else self._decode(row[0])
+
+    def clear(self) -> None:
+        try:
+            with self._lock, self._db() as conn:
+                conn.execute("DELETE FROM sessions")
+        except sqlite3.Error as exc:
+            logger.warning("Session store clear failed: %s", exc)
+
+    def __len__(self) -> int:
+        try:
+            with self._lock, self._db() as conn:
+                return conn.execute(
+                    "SELECT count(*) FROM sessions WHERE expires_at > ?", (self._clock(),)
+                ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
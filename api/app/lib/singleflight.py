@@ -0,0 +1,159 @@
+"""Single-flight coalescing of identical concurrent calls.
+
+ダッシュボード・チャット・エコマップが同じクライアントを同時に開くと、
+同じ run_query の読み取り、同じ文字列の embed_text、同じ fetch_ecomap_data が
+並行して走っていた。:class:`SingleFlight` は (操作, 引数) のキーごとに
+実行中の呼び出しを 1 つだけ持ち、同じキーで後から来た呼び出しはその完了を
+待って結果を共有する（完了後の呼び出しは新しく実行する。キャッシュではない）。
+
+- 同期呼び出し（スレッド）は :meth:`SingleFlight.do`、非同期呼び出しは
+  :meth:`SingleFlight.do_async`。同じキーを両方から待てるが、イベントループの
+  スレッドから同期で待つとループが止まるので、同じキーは片方に寄せること。
+- 後から来た呼び出しには結果のディープコピーを返す（呼び出し側が結果を
+  書き換えても互いに影響しない）。例外は全員に同じものを送出する。
+- 非同期の先頭呼び出しは別タスクで実行するので、先頭の呼び出し元が
+  キャンセルされても待っている側には結果が届く（待っている側がいなければ
+  実行も取り消す）。
+- 共有できた割合は stats() の ``dedup_ratio`` で ``/api/system/single-flight``
+  に出す。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import threading
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+_registry_lock = threading.Lock()
+_registry: dict[str, "SingleFlight"] = {}
+
+
+def make_key(*parts: Any) -> str:
+    """Hashable key for arguments that may contain dicts and lists."""
+    return json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers", "callbacks")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.followers = 0
+        self.callbacks: list[Callable[[], None]] = []
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    """Per-key in-flight call table shared by threads and event loops."""
+
+    def __init__(self, name: str, copy_result: bool = True) -> None:
+        self.name = name
+        self.copy_result = copy_result
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.shared = 0
+        with _registry_lock:
+            _registry[name] = self
+
+    def _join(self, key: Hashable) -> tuple[_Call, bool]:
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.shared += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def _finish(self, key: Hashable, call: _Call, result: Any, error: BaseException | None) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            call.result, call.error = result, error
+            call.done.set()
+            callbacks, call.callbacks = call.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def _share(self, call: _Call) -> Any:
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result) if self.copy_result else call.result
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """``fn(*args, **kwargs)``, or the result of the identical call already running."""
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+            return self._share(call)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            self._finish(key, call, None, exc)
+            raise
+        self._finish(key, call, result, None)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """``await fn(*args, **kwargs)``, or the result of the identical call already running."""
+        call, leader = self._join(key)
+        if not leader:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self._lock:
+                if not call.done.is_set():
+                    call.callbacks.append(lambda: loop.call_soon_threadsafe(_resolve, future))
+                else:
+                    future.set_result(None)
+            try:
+                await future
+            finally:
+                with self._lock:
+                    call.followers -= 1
+            return self._share(call)
+
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+
+        def finished(t: asyncio.Task) -> None:
+            if t.cancelled():
+                self._finish(key, call, None, asyncio.CancelledError())
+            else:
+                self._finish(key, call, t.result() if t.exception() is None else None, t.exception())
+
+        task.add_done_callback(finished)
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            with self._lock:
+                abandoned = call.followers == 0
+            if abandoned:
+                task.cancel()
+            raise
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "calls": self.calls,
+                "shared": self.shared,
+                "dedup_ratio": self.shared / self.calls if self.calls else 0.0,
+                "in_flight": len(self._calls),
+            }
+
+
+def stats() -> list[dict[str, Any]]:
+    with _registry_lock:
+        flights = list(_registry.values())
+    return [flight.stats() for flight in flights]
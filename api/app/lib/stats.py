@@ -0,0 +1,235 @@
+"""Materialized dashboard / graph counters.
+
+The dashboard and graph-explorer stats endpoints are polled by the frontend,
+so instead of recounting on every request they read an in-memory projection:
+
+- Write paths in db_operations bump the counters with the Neo4j result
+  summary of each write (only nodes/relationships actually created count).
+- Counters that cannot be derived from a write (per-label counts after an
+  ad-hoc ``run_query`` write, certificate renewal windows) are marked dirty
+  and refreshed on the next read with cheap count-store / indexed queries.
+- reconcile() recounts everything. It runs at startup and periodically from
+  run_reconciler() so that writes made by other workers or scripts converge.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any
+
+from app.lib.db_operations import ALLOWED_LABELS, run_query
+
+logger = logging.getLogger(__name__)
+
+# Certificates whose nextRenewalDate falls within this many days raise an alert.
+RENEWAL_WINDOW_DAYS = 90
+
+_lock = threading.Lock()
+_state: dict[str, Any] | None = None
+# Parts of the projection to refresh on the next read: "labels", "logs", "renewals"
+_dirty: set[str] = set()
+
+
+def reset() -> None:
+    """Drop the projection; the next read triggers a full reconcile."""
+    global _state
+    with _lock:
+        _state = None
+        _dirty.clear()
+
+
+# ---------------------------------------------------------------------------
+# Recount queries
+# ---------------------------------------------------------------------------
+
+def _count_labels() -> tuple[dict[str, int], int, int]:
+    """Per-label and total node/edge counts (all served by Neo4j's count store)."""
+    label_query = "\nUNION ALL\n".join(
+        f"MATCH (n:{label}) RETURN '{label}' AS label, count(n) AS cnt"
+        for label in sorted(ALLOWED_LABELS)
+    )
+    label_counts = {r["label"]: r["cnt"] for r in run_query(label_query) if r.get("cnt")}
+    node_rows = run_query("MATCH (n) RETURN count(n) AS cnt")
+    rel_rows = run_query("MATCH ()-[r]->() RETURN count(r) AS cnt")
+    total_nodes = node_rows[0]["cnt"] if node_rows else 0
+    total_edges = rel_rows[0]["cnt"] if rel_rows else 0
+    return label_counts, total_nodes, total_edges
+
+
+def _count_month_logs(month_start: str) -> int:
+    rows = run_query(
+        """
+        MATCH (sl:SupportLog)
+        WHERE sl.date >= $month_start
+        RETURN count(sl) AS cnt
+        """,
+        {"month_start": month_start},
+    )
+    return rows[0]["cnt"] if rows else 0
+
+
+def _load_renewals(today: str) -> Counter:
+    """Histogram of upcoming nextRenewalDate → number of (Client, Certificate) links."""
+    rows = run_query(
+        """
+        MATCH (c:Client)-[:HAS_CERTIFICATE]->(cert:Certificate)
+        WHERE cert.nextRenewalDate IS NOT NULL
+          AND cert.nextRenewalDate >= $today
+        RETURN cert.nextRenewalDate AS renewal_date, count(*) AS cnt
+        """,
+        {"today": today},
+    )
+    return Counter({str(r["renewal_date"]): r["cnt"] for r in rows if r.get("renewal_date")})
+
+
+def reconcile() -> dict[str, Any]:
+    """Recount every counter from the database and replace the projection."""
+    global _state
+    today = date.today()
+    month_start = today.replace(day=1).isoformat()
+
+    label_counts, total_nodes, total_edges = _count_labels()
+    state = {
+        "label_counts": label_counts,
+        "total_nodes": total_nodes,
+        "total_edges": total_edges,
+        "month_start": month_start,
+        "log_count_this_month": _count_month_logs(month_start),
+        "renewals": _load_renewals(today.isoformat()),
+        "reconciled_at": time.time(),
+    }
+    with _lock:
+        _state = state
+        _dirty.clear()
+    return state
+
+
+def _ensure_state() -> dict[str, Any]:
+    """Return the projection, refreshing only the parts that went stale."""
+    with _lock:
+        state = _state
+        dirty = set(_dirty)
+    if state is None:
+        return reconcile()
+
+    today = date.today()
+    month_start = today.replace(day=1).isoformat()
+    if "logs" in dirty or state["month_start"] != month_start:
+        count = _count_month_logs(month_start)
+        with _lock:
+            state["month_start"] = month_start
+            state["log_count_this_month"] = count
+    if "labels" in dirty:
+        label_counts, total_nodes, total_edges = _count_labels()
+        with _lock:
+            state.update(label_counts=label_counts, total_nodes=total_nodes, total_edges=total_edges)
+    if "renewals" in dirty:
+        renewals = _load_renewals(today.isoformat())
+        with _lock:
+            state["renewals"] = renewals
+    if dirty:
+        with _lock:
+            _dirty.difference_update(dirty)
+    return state
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+def dashboard_stats() -> dict[str, int]:
+    """Client count, support logs this month and renewal alerts in the window."""
+    state = _ensure_state()
+    today = date.today()
+    start, end = today.isoformat(), (today + timedelta(days=RENEWAL_WINDOW_DAYS)).isoformat()
+    with _lock:
+        renewal_alerts = sum(
+            cnt for renewal_date, cnt in state["renewals"].items() if start <= renewal_date <= end
+        )
+        return {
+            "client_count": state["label_counts"].get("Client", 0),
+            "log_count_this_month": state["log_count_this_month"],
+            "renewal_alerts": renewal_alerts,
+        }
+
+
+def graph_stats() -> dict[str, Any]:
+    """Total node/edge counts and per-label node counts."""
+    state = _ensure_state()
+    with _lock:
+        return {
+            "total_nodes": state["total_nodes"],
+            "total_edges": state["total_edges"],
+            "label_counts": dict(state["label_counts"]),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Write hooks (called from db_operations)
+# ---------------------------------------------------------------------------
+
+def record_node_created(label: str, properties: dict) -> None:
+    """Account for a node that a write actually created."""
+    with _lock:
+        if _state is None:
+            return
+        counts = _state["label_counts"]
+        counts[label] = counts.get(label, 0) + 1
+        _state["total_nodes"] += 1
+        if label == "SupportLog":
+            log_date = properties.get("date")
+            if log_date is not None and str(log_date) >= _state["month_start"]:
+                _state["log_count_this_month"] += 1
+        elif label == "Certificate":
+            _dirty.add("renewals")
+
+
+def record_relationships_created(rel_type: str, count: int = 1) -> None:
+    """Account for relationships that a write actually created."""
+    with _lock:
+        if _state is None or count <= 0:
+            return
+        _state["total_edges"] += count
+        if rel_type == "HAS_CERTIFICATE":
+            _dirty.add("renewals")
+
+
+def record_write(query: str, counters: Any) -> None:
+    """Account for an ad-hoc ``run_query`` write, whose created labels are unknown.
+
+    Per-label counts are re-read from the count store on the next read; the
+    indexed month/renewal recounts only run when the query touches them.
+    """
+    structural = any(
+        getattr(counters, attr, 0)
+        for attr in ("nodes_created", "nodes_deleted", "relationships_created",
+                     "relationships_deleted", "labels_added", "labels_removed")
+    )
+    with _lock:
+        if _state is None:
+            return
+        if structural:
+            _dirty.add("labels")
+        if "SupportLog" in query:
+            _dirty.add("logs")
+        if "Certificate" in query or "HAS_CERTIFICATE" in query:
+            _dirty.add("renewals")
+
+
+# ---------------------------------------------------------------------------
+# Periodic reconciliation
+# ---------------------------------------------------------------------------
+
+async def run_reconciler(interval_seconds: float) -> None:
+    """Recount all counters every ``interval_seconds`` until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(reconcile)
+        except Exception as exc:
+            logger.warning("Stats reconciliation failed: %s", exc)
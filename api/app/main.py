@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -5,7 +6,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.routers import dashboard, clients, narratives, narrative_intake, quicklog, chat, search, ecomap, meetings, system, dedup, graph
+from app.routers import dashboard, clients, narratives, narrative_intake, quicklog, chat, search, ecomap, meetings, system, dedup, graph, jobs
 
 logger = logging.getLogger(__name__)
 
@@ -23,16 +24,63 @@ async def lifespan(app: FastAPI):
             logger.info("Vector indexes verified")
         except Exception as e:
             logger.warning("Vector index setup failed: %s", e)
+        # クライアント一覧のかな行フィルタ用インデックスと既存データの補完
+        try:
+            from app.lib.db_operations import backfill_client_kana, ensure_client_indexes
+            ensure_client_indexes()
+            backfilled = backfill_client_kana()
+            if backfilled:
+                logger.info("Backfilled kana/kanaRow for %d clients", backfilled)
+        except Exception as e:
+            logger.warning("Client index setup failed: %s", e)
+        # グラフエクスプローラー初期表示（次数ランキング）のキャッシュ構築
+        try:
+            from app.lib import graph_overview
+            graph_overview.warm()
+        except Exception as e:
+            logger.warning("Graph overview warmup failed: %s", e)
+        # 緊急時情報バンドルの事前構築（緊急時の読み取りを Neo4j から切り離す）
+        try:
+            from app.lib import emergency
+            count = emergency.warm()
+            logger.info("Emergency bundles warmed for %d clients", count)
+        except Exception as e:
+            logger.warning("Emergency bundle warmup failed: %s", e)
+        # チャット文中のクライアント名照合（Safety First）用の登録名一覧
+        try:
+            from app.lib import client_names
+            count = client_names.warm()
+            logger.info("Client name matcher loaded %d clients", count)
+        except Exception as e:
+            logger.warning("Client name warmup failed: %s", e)
+        # ダッシュボード集計の初期構築
+        try:
+            from app.lib import stats
+            stats.reconcile()
+        except Exception as e:
+            logger.warning("Stats projection warmup failed: %s", e)
     else:
         logger.warning("Neo4j not available at %s", settings.neo4j_uri)
 
+    # ダッシュボード集計は初回読み込み時にも構築されるので、ここでは定期再集計のみ起動
+    from app.lib import stats
+    reconciler = asyncio.create_task(stats.run_reconciler(settings.stats_reconcile_interval))
+
     if settings.gemini_api_key or settings.google_api_key:
         logger.info("Gemini API key configured")
     else:
         logger.warning("GEMINI_API_KEY not set")
 
+    # チャット用モデルの SDK クライアントを事前構築（接続ごとの生成を避ける）
+    try:
+        from app.agents.gemini_agent import warm_model_pool
+        await asyncio.to_thread(warm_model_pool)
+    except Exception as e:
+        logger.warning("Chat model warmup failed: %s", e)
+
     yield
 
+    reconciler.cancel()
     from app.lib.db_operations import close_driver
     close_driver()
 
@@ -54,6 +102,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -69,6 +118,7 @@ app.include_router(meetings.router)
 app.include_router(system.router)
 app.include_router(dedup.router)
 app.include_router(graph.router)
+app.include_router(jobs.router)
 
 
 @app.get("/api/health")
@@ -1,27 +1,36 @@
 """Chat router -- WebSocket chat with intake mode, emergency routing, and dynamic LLM switching.
 
 Provider-agnostic: Gemini / Claude / OpenAI / Ollama switchable at runtime.
-Session-aware: Agno InMemoryDb keeps conversation history across turns.
+Session-aware: each connection keeps a bounded ConversationMemory (recent
+turns within a token budget, a background summary of older turns, and pinned
+facts such as the resolved client), so per-turn prompt size stays constant.
 Intake mode: 7-pillar guided intake via ``mode: "intake"`` in message payload.
+Streaming: agent token deltas and tool-call start/finish events are forwarded
+as they arrive. Each message runs as its own task; a new message or a
+disconnect cancels the running chat turn (intake turns are allowed to finish
+so registration is never interrupted).
 """
 
+import asyncio
 import json
 import logging
 import uuid
+from collections import deque
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from app.agents.gemini_agent import (
-    CHAT_SYSTEM_PROMPT,
-    TOOLS,
-    _create_model,
-    chat,
+    chat_events,
+    create_conversation_memory,
     create_session_agent,
+    lookup_cached_answer,
+    switch_session_model,
 )
 from app.agents.intake_agent import cleanup_session, handle_intake_message
 from app.agents.model_switch import detect_model_switch
-from app.agents.safety_first import handle_emergency, is_emergency
+from app.agents.safety_first import handle_emergency, scan
 from app.config import settings
+from app.lib import client_context, rate_limit
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/chat", tags=["chat"])
@@ -33,179 +42,309 @@ _PROVIDER_LABELS = {
     "ollama": "Ollama (ローカル)",
 }
 
+# Frames queued per connection before senders wait for the client to catch up
+_OUTBOX_LIMIT = 64
+
+# Pinned fact that marks a crisis in progress (emergency priority, no answer cache)
+_EMERGENCY_PIN = "進行中の緊急事態"
+# Non-crisis turns after which the crisis is considered over and unpinned
+_EMERGENCY_PIN_TURNS = 3
+
+
+class _Outbox:
+    """Ordered, bounded send queue for one WebSocket.
+
+    A single sender task writes frames in order. A ``stream`` delta is merged
+    into the newest queued ``stream`` frame of the same agent while that frame
+    is still waiting, so a slow client receives fewer, larger frames instead of
+    stalling the model; other frames wait once ``_OUTBOX_LIMIT`` are queued.
+    After the client goes away, sends are dropped.
+    """
+
+    def __init__(self, websocket: WebSocket) -> None:
+        self._websocket = websocket
+        self._frames: deque[dict] = deque()
+        self._pending = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self._closed = False
+        self._sender = asyncio.create_task(self._run())
+
+    async def send(self, frame: dict) -> None:
+        if self._closed:
+            return
+        if frame.get("type") == "stream" and self._frames:
+            tail = self._frames[-1]
+            if tail.get("type") == "stream" and tail.get("agent") == frame.get("agent"):
+                tail["content"] += frame.get("content", "")
+                return
+        while len(self._frames) >= _OUTBOX_LIMIT and not self._closed:
+            self._room.clear()
+            await self._room.wait()
+        if self._closed:
+            return
+        self._frames.append(dict(frame))
+        self._pending.set()
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                while not self._frames:
+                    self._pending.clear()
+                    await self._pending.wait()
+                frame = self._frames.popleft()
+                self._room.set()
+                await self._websocket.send_json(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info("Chat send stopped: %s", e)
+            self._close()
+
+    def _close(self) -> None:
+        self._closed = True
+        self._frames.clear()
+        self._room.set()
+
+    def close(self) -> None:
+        self._close()
+        self._sender.cancel()
+
+
+class _ChatSession:
+    """Per-connection chat state shared by the turns of one WebSocket."""
+
+    def __init__(self, session_id: str) -> None:
+        self.session_id = session_id
+        self.provider: str = settings.chat_provider
+        self.agent = None  # Lazily initialised; model swapped on provider switch
+        # Bounded conversation context for the agent
+        self.memory = create_conversation_memory(lambda: self.provider)
+        # Client most recently named in a chat message (Safety First fallback)
+        self.mentioned_client: str | None = None
+        # Non-crisis turns since the last crisis message
+        self.calm_turns = 0
+        # Client profile bundles shared by the agent's search tools
+        self.client_context = client_context.ClientContext()
+
 
 @router.websocket("/ws")
 async def chat_websocket(websocket: WebSocket):
     await websocket.accept()
-    session_id = str(uuid.uuid4())
-    current_provider: str = settings.chat_provider
-    agent = None  # Lazily initialised; recreated on provider switch
-
-    # Conversation history for Safety First client-name extraction
-    message_history: list[str] = []
+    session = _ChatSession(str(uuid.uuid4()))
+    outbox = _Outbox(websocket)
+    turn: asyncio.Task | None = None
+    turn_cancellable = True
 
     try:
         while True:
             data = await websocket.receive_text()
-            try:
-                msg = json.loads(data)
-                user_text: str = msg.get("content", "")
-                mode: str = msg.get("mode", "chat")
-                # session_id はサーバー生成のみ使用（クライアント指定は無視）
-
-                # 入力長制限（10,000文字）
-                if len(user_text) > 10000:
-                    user_text = user_text[:10000]
-
-                if not user_text:
-                    await websocket.send_json({"type": "done", "session_id": session_id})
-                    continue
-
-                # -----------------------------------------------------------
-                # 1. Model switch detection (checked on every message)
-                # -----------------------------------------------------------
-                switch = detect_model_switch(user_text)
-                if switch:
-                    provider, display_name = switch
-                    current_provider = provider
-                    agent = None  # Force recreation with new provider
-                    await websocket.send_json({
-                        "type": "model_switched",
-                        "provider": provider,
-                        "model": display_name,
-                    })
-                    await websocket.send_json({
-                        "type": "stream",
-                        "content": f"{display_name} に切り替えました。",
-                        "agent": provider,
-                    })
-                    await websocket.send_json({"type": "done", "session_id": session_id})
-                    continue
-
-                # -----------------------------------------------------------
-                # 2. Intake mode
-                # -----------------------------------------------------------
-                if mode == "intake":
-                    result = await handle_intake_message(session_id, user_text)
-
-                    # Progress update
-                    if result.get("progress"):
-                        await websocket.send_json({
-                            "type": "intake_progress",
-                            **result["progress"],
-                        })
-
-                    # Stream response text in chunks
-                    response_text = result.get("response", "")
-                    for i in range(0, len(response_text), 30):
-                        await websocket.send_json({
-                            "type": "stream",
-                            "content": response_text[i : i + 30],
-                            "agent": "intake",
-                        })
-
-                    # Graph preview (after safety-critical phases or final)
-                    if result.get("preview"):
-                        await websocket.send_json({
-                            "type": "intake_preview",
-                            "nodes": result["preview"].get("nodes", []),
-                            "relationships": result["preview"].get("relationships", []),
-                        })
-
-                    # Registration complete
-                    if result.get("complete"):
-                        await websocket.send_json({
-                            "type": "intake_complete",
-                            "registered_count": result.get("registered_count", 0),
-                        })
-
-                    await websocket.send_json({"type": "done", "session_id": session_id})
-                    continue
-
-                # -----------------------------------------------------------
-                # 3. Emergency routing (Safety First -- bypasses LLM)
-                # -----------------------------------------------------------
-                if is_emergency(user_text):
-                    await websocket.send_json({
-                        "type": "routing",
-                        "agent": "safety_first",
-                        "decision": "emergency_search",
-                        "reason": "現在進行中の危機を検知",
-                    })
-                    response = handle_emergency(user_text, message_history)
+            if turn is not None and not turn.done():
+                if turn_cancellable:
+                    turn.cancel()
+                    await asyncio.gather(turn, return_exceptions=True)
+                    await outbox.send({"type": "cancelled", "session_id": session.session_id})
                 else:
-                    # -------------------------------------------------------
-                    # 4. Normal chat (with session-aware agent)
-                    # -------------------------------------------------------
-                    label = _PROVIDER_LABELS.get(current_provider, current_provider)
-                    await websocket.send_json({
-                        "type": "routing",
-                        "agent": current_provider,
-                        "decision": "chat",
-                        "reason": f"{label}（DB検索ツール付き）",
-                    })
-
-                    # Create or reuse session agent
-                    if agent is None:
-                        agent = _create_session_agent_for_provider(
-                            session_id, current_provider
-                        )
-
-                    response = await chat(user_text, agent=agent)
-
-                # Record message for Safety First history
-                message_history.append(user_text)
-
-                # Stream response text in chunks
-                for i in range(0, len(response), 30):
-                    await websocket.send_json({
-                        "type": "stream",
-                        "content": response[i : i + 30],
-                        "agent": current_provider,
-                    })
-
-                await websocket.send_json({"type": "done", "session_id": session_id})
-
-            except json.JSONDecodeError:
-                await websocket.send_json({
-                    "type": "stream",
-                    "content": "無効なメッセージ形式です。",
-                    "agent": "system",
-                })
-                await websocket.send_json({"type": "done", "session_id": session_id})
-            except Exception as e:
-                logger.error("Chat processing error: %s", e, exc_info=True)
-                await websocket.send_json({
-                    "type": "stream",
-                    "content": "エラーが発生しました。もう一度お試しください。",
-                    "agent": "system",
-                })
-                await websocket.send_json({"type": "done", "session_id": session_id})
+                    await asyncio.gather(turn, return_exceptions=True)
+            turn_cancellable = _is_cancellable(data)
+            turn = asyncio.create_task(_handle_message(data, session, outbox))
 
     except WebSocketDisconnect:
-        logger.info("Chat session %s disconnected", session_id)
-        cleanup_session(session_id)
-
+        logger.info("Chat session %s disconnected", session.session_id)
+    finally:
+        if turn is not None and not turn.done() and turn_cancellable:
+            turn.cancel()
+        outbox.close()
+        if turn is not None and not turn.done() and not turn_cancellable:
+            # The intake turn writes its session back when it finishes
+            turn.add_done_callback(lambda _: cleanup_session(session.session_id))
+        else:
+            cleanup_session(session.session_id)
+        await session.memory.aclose()
+        logger.info("Chat session %s report: %s", session.session_id, session.memory.report())
+
+
+def _is_cancellable(data: str) -> bool:
+    """Intake turns may be mid-registration and run to completion."""
+    try:
+        return json.loads(data).get("mode", "chat") != "intake"
+    except (ValueError, AttributeError):
+        return True
 
-# ---------------------------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------------------------
 
+async def _handle_message(data: str, session: _ChatSession, outbox: _Outbox) -> None:
+    """Process one client message and stream its reply through ``outbox``."""
+    session_id = session.session_id
+    try:
+        msg = json.loads(data)
+        user_text: str = msg.get("content", "")
+        mode: str = msg.get("mode", "chat")
+        # session_id はサーバー生成のみ使用（クライアント指定は無視）
+
+        # 入力長制限（10,000文字）
+        if len(user_text) > 10000:
+            user_text = user_text[:10000]
+
+        if not user_text:
+            await outbox.send({"type": "done", "session_id": session_id})
+            return
+
+        # -----------------------------------------------------------
+        # 1. Model switch detection (checked on every message)
+        # -----------------------------------------------------------
+        switch = detect_model_switch(user_text)
+        if switch:
+            provider, display_name = switch
+            session.provider = provider
+            if session.agent is not None:
+                # Pooled model swap; the conversation history stays with the session
+                switch_session_model(session.agent, provider)
+            await outbox.send({
+                "type": "model_switched",
+                "provider": provider,
+                "model": display_name,
+            })
+            await outbox.send({
+                "type": "stream",
+                "content": f"{display_name} に切り替えました。",
+                "agent": provider,
+            })
+            await outbox.send({"type": "done", "session_id": session_id})
+            return
+
+        # -----------------------------------------------------------
+        # 2. Intake mode
+        # -----------------------------------------------------------
+        if mode == "intake":
+            result = await handle_intake_message(session_id, user_text)
+
+            # Progress update
+            if result.get("progress"):
+                await outbox.send({
+                    "type": "intake_progress",
+                    **result["progress"],
+                })
 
-def _create_session_agent_for_provider(session_id: str, provider: str):
-    """Create a session-aware Agno Agent for the given provider."""
-    from agno.agent import Agent
-    from agno.db.in_memory import InMemoryDb
+            # Fixed questions / follow-up text (already complete; sent as one frame)
+            response_text = result.get("response", "")
+            if response_text:
+                await outbox.send({"type": "stream", "content": response_text, "agent": "intake"})
+
+            # Graph preview (after safety-critical phases or final)
+            if result.get("preview"):
+                await outbox.send({
+                    "type": "intake_preview",
+                    "nodes": result["preview"].get("nodes", []),
+                    "relationships": result["preview"].get("relationships", []),
+                })
 
-    model = _create_model(provider)
+            # Registration complete
+            if result.get("complete"):
+                await outbox.send({
+                    "type": "intake_complete",
+                    "registered_count": result.get("registered_count", 0),
+                })
 
-    return Agent(
-        model=model,
-        tools=TOOLS,
-        instructions=[CHAT_SYSTEM_PROMPT],
-        markdown=True,
-        db=InMemoryDb(),
-        session_id=session_id,
-        add_history_to_context=True,
-        num_history_runs=6,
-    )
+            await outbox.send({"type": "done", "session_id": session_id})
+            return
+
+        # -----------------------------------------------------------
+        # 3. Emergency routing (Safety First -- bypasses LLM)
+        # -----------------------------------------------------------
+        # One pass over the message: crisis / inquiry keywords and client name
+        found = scan(user_text)
+        if found.is_emergency:
+            await outbox.send({
+                "type": "routing",
+                "agent": "safety_first",
+                "decision": "emergency_search",
+                "reason": "現在進行中の危機を検知",
+            })
+            response = handle_emergency(user_text, client_name=found.client or session.mentioned_client)
+            if found.client:
+                session.mentioned_client = found.client
+            # Keep the crisis in front of the agent for the next few turns
+            session.memory.pin(_EMERGENCY_PIN, user_text[:200])
+            session.calm_turns = 0
+            session.memory.add_turn(user_text, response)
+            await outbox.send({"type": "stream", "content": response, "agent": session.provider})
+            await outbox.send({"type": "done", "session_id": session_id})
+            return
+        if found.client:
+            session.mentioned_client = found.client
+        if _EMERGENCY_PIN in session.memory.pins:
+            session.calm_turns += 1
+            if session.calm_turns > _EMERGENCY_PIN_TURNS:
+                session.memory.unpin(_EMERGENCY_PIN)
+
+        # Model calls for this turn: ahead of everything while an emergency is open
+        emergency_open = _EMERGENCY_PIN in session.memory.pins
+        rate_limit.set_priority(
+            rate_limit.Priority.EMERGENCY if emergency_open else rate_limit.Priority.INTERACTIVE
+        )
+
+        # -----------------------------------------------------------
+        # 4. Repeated question (answer cache -- bypasses LLM), except while
+        #    an emergency is in progress
+        # -----------------------------------------------------------
+        # A question naming no client is keyed on the client the conversation is
+        # about (resolved by the tools, else named earlier). With no such client,
+        # only a fresh conversation's answer can be shared with other sessions.
+        probe = None
+        context_client = session.client_context.last_client or session.mentioned_client
+        shareable = bool(found.client or context_client) or session.memory.is_empty
+        if not emergency_open and shareable:
+            cached, probe = await lookup_cached_answer(user_text, found.client, context_client)
+            if cached is not None:
+                await outbox.send({
+                    "type": "routing",
+                    "agent": session.provider,
+                    "decision": "cached_answer",
+                    "reason": "同じ質問への回答を再利用（データ変更なし）",
+                })
+                await outbox.send({"type": "stream", "content": cached, "agent": session.provider})
+                session.memory.add_turn(user_text, cached)
+                await outbox.send({"type": "done", "session_id": session_id})
+                return
+
+        # -----------------------------------------------------------
+        # 5. Normal chat (session-aware agent, streamed as it runs)
+        # -----------------------------------------------------------
+        label = _PROVIDER_LABELS.get(session.provider, session.provider)
+        await outbox.send({
+            "type": "routing",
+            "agent": session.provider,
+            "decision": "chat",
+            "reason": f"{label}（DB検索ツール付き）",
+        })
+
+        # Create or reuse session agent
+        if session.agent is None:
+            session.agent = create_session_agent(session_id, session.provider)
+
+        # Tools answer from this session's profile bundles (scoped to this turn's task)
+        client_context.activate(session.client_context)
+        async for event in chat_events(
+            user_text, agent=session.agent, memory=session.memory, cache_probe=probe
+        ):
+            await outbox.send({**event, "agent": session.provider})
+        if session.client_context.last_client:
+            session.memory.pin("対象クライアント", session.client_context.last_client)
+
+        await outbox.send({"type": "done", "session_id": session_id})
+
+    except json.JSONDecodeError:
+        await outbox.send({
+            "type": "stream",
+            "content": "無効なメッセージ形式です。",
+            "agent": "system",
+        })
+        await outbox.send({"type": "done", "session_id": session_id})
+    except Exception as e:
+        logger.error("Chat processing error: %s", e, exc_info=True)
+        await outbox.send({
+            "type": "stream",
+            "content": "エラーが発生しました。もう一度お試しください。",
+            "agent": "system",
+        })
+        await outbox.send({"type": "done", "session_id": session_id})
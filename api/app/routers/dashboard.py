@@ -7,6 +7,7 @@ from datetime import date, timedelta
 
 from fastapi import APIRouter, HTTPException
 
+from app.lib import stats
 from app.lib.db_operations import run_query
 from app.schemas.client import ActivityEntry, DashboardStats, RenewalAlert
 
@@ -17,44 +18,12 @@ router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 @router.get("/stats", response_model=DashboardStats)
 def get_stats() -> DashboardStats:
-    """クライアント数、今月のログ数、更新アラート件数を返す。"""
-    try:
-        # Client count
-        client_rows = run_query("MATCH (c:Client) RETURN count(c) AS cnt")
-        client_count = client_rows[0]["cnt"] if client_rows else 0
-
-        # Support logs this month
-        today = date.today()
-        month_start = today.replace(day=1).isoformat()
-        log_rows = run_query(
-            """
-            MATCH (sl:SupportLog)
-            WHERE sl.date >= $month_start
-            RETURN count(sl) AS cnt
-            """,
-            {"month_start": month_start},
-        )
-        log_count = log_rows[0]["cnt"] if log_rows else 0
+    """クライアント数、今月のログ数、更新アラート件数を返す。
 
-        # Renewal alerts (certificates expiring within 90 days)
-        threshold = (today + timedelta(days=90)).isoformat()
-        alert_rows = run_query(
-            """
-            MATCH (c:Client)-[:HAS_CERTIFICATE]->(cert:Certificate)
-            WHERE cert.nextRenewalDate IS NOT NULL
-              AND cert.nextRenewalDate <= $threshold
-              AND cert.nextRenewalDate >= $today
-            RETURN count(cert) AS cnt
-            """,
-            {"threshold": threshold, "today": today.isoformat()},
-        )
-        renewal_count = alert_rows[0]["cnt"] if alert_rows else 0
-
-        return DashboardStats(
-            client_count=client_count,
-            log_count_this_month=log_count,
-            renewal_alerts=renewal_count,
-        )
+    毎回の集計はせず、書き込み時に更新される app.lib.stats の集計値を読む。
+    """
+    try:
+        return DashboardStats(**stats.dashboard_stats())
 
     except Exception as exc:
         logger.error("get_stats failed: %s", exc, exc_info=True)
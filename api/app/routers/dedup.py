@@ -4,8 +4,9 @@ from __future__ import annotations
 import logging
 from fastapi import APIRouter
 
-from app.schemas.dedup import DedupCheckRequest, DedupCheckResponse
-from app.services.dedup_service import check_duplicates
+from app.schemas.dedup import DedupCheckRequest, DedupCheckResponse, DedupGraphCheckResponse
+from app.schemas.narrative import ExtractedGraph
+from app.services.dedup_service import check_duplicates, check_graph_duplicates
 
 logger = logging.getLogger(__name__)
 
@@ -20,3 +21,19 @@ async def check_dedup(request: DedupCheckRequest) -> DedupCheckResponse:
     to find potential duplicates before node creation.
     """
     return await check_duplicates(request.label, request.properties)
+
+
+@router.post("/check-graph", response_model=DedupGraphCheckResponse)
+async def check_dedup_graph(graph: ExtractedGraph) -> DedupGraphCheckResponse:
+    """Duplicate candidate check for every node of an extracted graph.
+
+    Runs the same checks as /check for all nodes in one request and returns
+    the results keyed by temp_id.
+    """
+    results = await check_graph_duplicates(
+        [(node.temp_id, node.label, node.properties) for node in graph.nodes]
+    )
+    return DedupGraphCheckResponse(
+        hasCandidates=any(r.hasCandidates for r in results.values()),
+        results=results,
+    )
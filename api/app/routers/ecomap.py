@@ -1,6 +1,13 @@
-from fastapi import APIRouter, Query
-from app.lib.ecomap import fetch_ecomap_data, TEMPLATES, CATEGORY_COLORS
-from app.schemas.ecomap import EcomapData, EcomapTemplate
+import asyncio
+import json
+from typing import Iterator
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.lib import compact
+from app.lib.ecomap import fetch_ecomap_data, iter_ecomap, TEMPLATES, CATEGORY_COLORS
+from app.schemas.ecomap import EcomapData, EcomapNode, EcomapTemplate
 
 router = APIRouter(prefix="/api/ecomap", tags=["ecomap"])
 
@@ -16,5 +23,39 @@ async def get_category_colors():
 
 
 @router.get("/{client_name}", response_model=EcomapData)
-async def get_ecomap(client_name: str, template: str = Query("full_view")):
-    return fetch_ecomap_data(client_name, template)
+async def get_ecomap(
+    client_name: str,
+    request: Request,
+    template: str = Query("full_view"),
+    format: str = Query("json", pattern="^(json|compact)$"),
+):
+    """エコマップデータを返す。format=compact で列指向の圧縮形式（app.lib.compact）。"""
+    # Off the event loop, so concurrent requests for the same map share one fetch
+    data = await asyncio.to_thread(fetch_ecomap_data, client_name, template)
+    if format == "compact":
+        return compact.render(compact.encode_ecomap(data), request)
+    return data
+
+
+@router.get("/{client_name}/stream")
+def get_ecomap_stream(client_name: str, template: str = Query("full_view")):
+    """エコマップを NDJSON で逐次返す（1 行 1 JSON）。
+
+    {"type": "node"|"edge", "data": ...} をカテゴリのクエリ結果が届いた順に送り、
+    最後に {"type": "end", "client_name": ..., "template": ...} を送る。
+    """
+    def generate() -> Iterator[str]:
+        try:
+            for item in iter_ecomap(client_name, template):
+                kind = "node" if isinstance(item, EcomapNode) else "edge"
+                yield json.dumps({"type": kind, "data": item.model_dump()}, ensure_ascii=False) + "\n"
+        except Exception as exc:
+            yield json.dumps({"type": "error", "message": str(exc)}, ensure_ascii=False) + "\n"
+            return
+        yield json.dumps({"type": "end", "client_name": client_name, "template": template}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
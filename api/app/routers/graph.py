@@ -1,11 +1,15 @@
 """Graph exploration endpoints for interactive knowledge graph UI."""
 from __future__ import annotations
 
+import json
 import logging
+from typing import Iterator
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
-from app.lib.db_operations import run_query
+from app.lib import compact, graph_overview, stats
+from app.lib.db_operations import run_query, stream_query
 from app.schemas.graph import (
     GraphEdge,
     GraphExploreResponse,
@@ -37,6 +41,8 @@ _ALLOWED_LABELS = {
     "MeetingRecord",
 }
 
+graph_overview.configure(_ALLOWED_LABELS)
+
 
 def _build_node(row: dict) -> GraphNode:
     """Convert a Cypher-level transformed node dict to GraphNode."""
@@ -73,16 +79,21 @@ def _build_edge(row: dict) -> GraphEdge:
 
 @router.get("/explore", response_model=GraphExploreResponse)
 async def explore_graph(
+    request: Request,
     startLabel: str | None = Query(None, description="Starting node label"),
     startName: str | None = Query(None, description="Starting node name (for Client/KeyPerson)"),
     maxDepth: int = Query(2, ge=1, le=4, description="Graph traversal depth"),
     maxNodes: int = Query(100, ge=10, le=500, description="Max nodes to return"),
-) -> GraphExploreResponse:
+    format: str = Query("json", pattern="^(json|compact)$", description="json or compact (columnar)"),
+):
     """Fetch a subgraph for visualization.
 
     - If startLabel + startName: start from that specific node
-    - If only startLabel: return sample of nodes with that label
+    - If only startLabel: return the highest-degree nodes with that label
     - If neither: return high-connectivity nodes across all labels
+
+    The last two modes are served from the cached ranking in app.lib.graph_overview.
+    ``format=compact`` returns the columnar encoding from app.lib.compact.
     """
     if startLabel and startLabel not in _ALLOWED_LABELS:
         raise HTTPException(400, detail=f"Unsupported label: {startLabel}")
@@ -112,67 +123,23 @@ async def explore_graph(
                 }}] AS edges
             """
             params: dict = {"name": startName, "depth": maxDepth, "max_nodes": maxNodes}
-
-        elif startLabel:
-            # Label-based sample
-            cypher = f"""
-            MATCH (n:{startLabel})
-            WITH n LIMIT $max_nodes
-            OPTIONAL MATCH (n)-[r]-(m)
-            WITH
-                collect(DISTINCT n) + collect(DISTINCT m) AS all_nodes,
-                collect(DISTINCT r) AS all_rels
-            RETURN
-                [n IN all_nodes WHERE n IS NOT NULL | {{
-                    id: elementId(n),
-                    labels: labels(n),
-                    properties: properties(n)
-                }}] AS nodes,
-                [r IN all_rels WHERE r IS NOT NULL | {{
-                    id: elementId(r),
-                    source: elementId(startNode(r)),
-                    target: elementId(endNode(r)),
-                    type: type(r),
-                    properties: properties(r)
-                }}] AS edges
-            """
-            params = {"max_nodes": maxNodes}
+            rows = run_query(cypher, params)
 
         else:
-            # Overview: highest-degree nodes across all allowed labels
-            cypher = """
-            MATCH (n)
-            WHERE any(lbl IN labels(n) WHERE lbl IN $allowed)
-            WITH n, size([(n)--() | 1]) AS degree
-            ORDER BY degree DESC
-            LIMIT $max_nodes
-            OPTIONAL MATCH (n)-[r]-(m)
-            WHERE any(lbl IN labels(m) WHERE lbl IN $allowed)
-            WITH
-                collect(DISTINCT n) + collect(DISTINCT m) AS all_nodes,
-                collect(DISTINCT r) AS all_rels
-            RETURN
-                [n IN all_nodes WHERE n IS NOT NULL | {
-                    id: elementId(n),
-                    labels: labels(n),
-                    properties: properties(n)
-                }] AS nodes,
-                [r IN all_rels WHERE r IS NOT NULL | {
-                    id: elementId(r),
-                    source: elementId(startNode(r)),
-                    target: elementId(endNode(r)),
-                    type: type(r),
-                    properties: properties(r)
-                }] AS edges
-            """
-            params = {"allowed": list(_ALLOWED_LABELS), "max_nodes": maxNodes}
-
-        rows = run_query(cypher, params)
+            # Label sample / overview: highest-degree nodes from the cached ranking
+            rows = graph_overview.get_rows(startLabel, maxNodes)
 
     except Exception as exc:
         logger.warning("Graph explore query failed: %s", exc)
         raise HTTPException(500, detail=f"Graph query failed: {exc}")
 
+    result = _to_explore_response(rows, maxNodes)
+    if format == "compact":
+        return compact.render(compact.encode_graph(result), request)
+    return result
+
+
+def _to_explore_response(rows: list[dict], max_nodes: int) -> GraphExploreResponse:
     if not rows:
         return GraphExploreResponse(nodes=[], edges=[])
 
@@ -202,26 +169,122 @@ async def explore_graph(
         seen_edge_ids.add(edge_id)
         edges.append(_build_edge(e))
 
-    truncated = len(nodes) >= maxNodes
+    truncated = len(nodes) >= max_nodes
     return GraphExploreResponse(nodes=nodes, edges=edges, truncated=truncated)
 
 
+def _iter_subgraph_items(start_label: str, start_name: str, max_depth: int, max_nodes: int) -> Iterator[dict]:
+    """Stream the APOC subgraph as one row per node, then one row per edge."""
+    cypher = f"""
+    MATCH (start:{start_label} {{name: $name}})
+    CALL apoc.path.subgraphAll(start, {{
+        maxLevel: $depth,
+        limit: $max_nodes
+    }})
+    YIELD nodes, relationships
+    CALL {{
+        WITH nodes
+        UNWIND nodes AS n
+        RETURN 'node' AS kind, {{
+            id: elementId(n),
+            labels: labels(n),
+            properties: properties(n)
+        }} AS item
+        UNION ALL
+        WITH relationships
+        UNWIND relationships AS r
+        RETURN 'edge' AS kind, {{
+            id: elementId(r),
+            source: elementId(startNode(r)),
+            target: elementId(endNode(r)),
+            type: type(r),
+            properties: properties(r)
+        }} AS item
+    }}
+    RETURN kind, item
+    """
+    params = {"name": start_name, "depth": max_depth, "max_nodes": max_nodes}
+    for row in stream_query(cypher, params):
+        yield {"kind": row["kind"], "item": row["item"]}
+
+
+def _iter_cached_items(start_label: str | None, max_nodes: int) -> Iterator[dict]:
+    """Emit the cached overview / label-sample rows item by item."""
+    for row in graph_overview.get_rows(start_label, max_nodes):
+        for n in row.get("nodes") or []:
+            yield {"kind": "node", "item": n}
+        for e in row.get("edges") or []:
+            yield {"kind": "edge", "item": e}
+
+
+@router.get("/explore/stream")
+def explore_graph_stream(
+    startLabel: str | None = Query(None, description="Starting node label"),
+    startName: str | None = Query(None, description="Starting node name (for Client/KeyPerson)"),
+    maxDepth: int = Query(2, ge=1, le=4, description="Graph traversal depth"),
+    maxNodes: int = Query(100, ge=10, le=500, description="Max nodes to return"),
+) -> StreamingResponse:
+    """Streaming variant of /explore as NDJSON (one JSON object per line).
+
+    Lines are ``{"type": "node", "data": GraphNode}`` and
+    ``{"type": "edge", "data": GraphEdge}`` in arrival order, followed by
+    ``{"type": "end", "truncated": bool}`` (or ``{"type": "error", ...}``).
+    Nodes always precede the edges that reference them.
+    """
+    if startLabel and startLabel not in _ALLOWED_LABELS:
+        raise HTTPException(400, detail=f"Unsupported label: {startLabel}")
+
+    def ndjson(obj: dict) -> str:
+        return json.dumps(obj, ensure_ascii=False) + "\n"
+
+    def generate() -> Iterator[str]:
+        if startLabel and startName:
+            items = _iter_subgraph_items(startLabel, startName, maxDepth, maxNodes)
+        else:
+            items = _iter_cached_items(startLabel, maxNodes)
+
+        seen_node_ids: set[str] = set()
+        seen_edge_ids: set[str] = set()
+        try:
+            for entry in items:
+                raw = entry["item"]
+                if not raw:
+                    continue
+                item_id = str(raw.get("id") or "")
+                if entry["kind"] == "node":
+                    if item_id in seen_node_ids:
+                        continue
+                    seen_node_ids.add(item_id)
+                    yield ndjson({"type": "node", "data": _build_node(raw).model_dump()})
+                else:
+                    if item_id in seen_edge_ids:
+                        continue
+                    seen_edge_ids.add(item_id)
+                    yield ndjson({"type": "edge", "data": _build_edge(raw).model_dump()})
+        except Exception as exc:
+            logger.warning("Graph explore stream failed: %s", exc)
+            yield ndjson({"type": "error", "message": f"Graph query failed: {exc}"})
+            return
+        yield ndjson({"type": "end", "truncated": len(seen_node_ids) >= maxNodes})
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/labels", response_model=GraphLabelsResponse)
 async def list_labels() -> GraphLabelsResponse:
-    """List all node labels with counts."""
+    """List all node labels with counts (from the materialized stats projection)."""
     try:
-        rows = run_query(
-            """
-            MATCH (n)
-            UNWIND labels(n) AS lbl
-            WITH lbl, count(n) AS cnt
-            WHERE lbl IN $allowed
-            RETURN lbl AS label, cnt AS count
-            ORDER BY cnt DESC
-            """,
-            {"allowed": list(_ALLOWED_LABELS)},
-        )
-        return GraphLabelsResponse(labels=[dict(r) for r in rows])
+        label_counts = stats.graph_stats()["label_counts"]
+        labels = [
+            {"label": label, "count": count}
+            for label, count in sorted(label_counts.items(), key=lambda kv: kv[1], reverse=True)
+            if label in _ALLOWED_LABELS and count
+        ]
+        return GraphLabelsResponse(labels=labels)
     except Exception as exc:
         logger.warning("labels query failed: %s", exc)
         return GraphLabelsResponse(labels=[])
@@ -229,13 +292,12 @@ async def list_labels() -> GraphLabelsResponse:
 
 @router.get("/stats", response_model=GraphStatsResponse)
 async def graph_stats() -> GraphStatsResponse:
-    """Return total node/edge counts."""
+    """Return total node/edge counts (from the materialized stats projection)."""
     try:
-        node_rows = run_query("MATCH (n) RETURN count(n) AS c")
-        rel_rows = run_query("MATCH ()-[r]->() RETURN count(r) AS c")
+        snapshot = stats.graph_stats()
         return GraphStatsResponse(
-            total_nodes=node_rows[0]["c"] if node_rows else 0,
-            total_edges=rel_rows[0]["c"] if rel_rows else 0,
+            total_nodes=snapshot["total_nodes"],
+            total_edges=snapshot["total_edges"],
         )
     except Exception as exc:
         logger.warning("stats query failed: %s", exc)
@@ -0,0 +1,47 @@
+"""Jobs router — status polling and SSE progress for background jobs."""
+
+from __future__ import annotations
+
+import json
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.lib import jobs
+from app.lib.jobs import Job
+from app.schemas.job import JobStatus
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+def _get_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str) -> JobStatus:
+    """ジョブの現在の状態を返す（ポーリング用）。"""
+    return JobStatus(**_get_job(job_id).snapshot())
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str):
+    """ジョブの進捗を SSE で配信する。complete / error を送ったら終了する。"""
+    job = _get_job(job_id)
+
+    async def event_generator():
+        async for snapshot in jobs.events(job):
+            yield f"data: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
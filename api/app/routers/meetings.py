@@ -1,11 +1,23 @@
-"""Meetings router — audio upload, Gemini transcription, and meeting record retrieval."""
+"""Meetings router — audio upload, Gemini transcription, and meeting record retrieval.
+
+アップロードはチャンク単位でディスクへ書き出し（SHA-256 を同時に計算）、
+バイト列が揃った時点で応答する。文字起こし・登録・埋め込みは
+app.lib.jobs のバックグラウンドジョブとして実行し、進捗は
+GET /api/jobs/{job_id}（ポーリング）または /api/jobs/{job_id}/events（SSE）で取得する。
+"""
+import asyncio
+import hashlib
 import logging
 import uuid
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
 from fastapi import APIRouter, File, Form, UploadFile
 
+from app.agents.gemini_agent import get_generative_model
+from app.config import settings
+from app.lib import jobs, rate_limit, transcription
 from app.lib.db_operations import register_to_database, run_query
 from app.lib.embedding import embed_text
 from app.schemas.meeting import MeetingRecord, MeetingUploadResponse
@@ -13,6 +25,10 @@ from app.schemas.meeting import MeetingRecord, MeetingUploadResponse
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/meetings", tags=["meetings"])
 UPLOAD_DIR = Path(__file__).resolve().parents[2] / "uploads" / "meetings"
+# セグメント単位の文字起こしキャッシュ（内容ハッシュ → テキスト）
+TRANSCRIPT_CACHE_DIR = Path(__file__).resolve().parents[2] / "uploads" / "transcripts"
+
+_TRANSCRIBE_INSTRUCTION = "この音声を正確に日本語で文字起こししてください。"
 
 SUPPORTED_AUDIO_TYPES = {
     "audio/mpeg", "audio/mp3", "audio/mp4", "audio/wav", "audio/ogg",
@@ -20,55 +36,90 @@ SUPPORTED_AUDIO_TYPES = {
 }
 SUPPORTED_AUDIO_EXTENSIONS = {".mp3", ".mp4", ".wav", ".ogg", ".webm", ".flac", ".aac", ".m4a"}
 
+# Bytes read from the upload per iteration
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _transcribe_sync(file_path: str) -> str:
+    """1 ファイル（またはセグメント）を Gemini で文字起こしする。
+
+    セグメントはワーカースレッドで並列に呼ばれる。文字起こしは常に
+    バックグラウンドジョブなので、チャットより後ろに並ぶ。
+    """
+    model = get_generative_model()
+    governor = rate_limit.gemini()
+    with rate_limit.priority(rate_limit.Priority.BATCH):
+        if settings.llm_backend == "fake":
+            # No upload offline: the path stands in for the uploaded file
+            audio_file = file_path
+        else:
+            import google.generativeai as genai
+            audio_file = governor.call(genai.upload_file, file_path)
+        response = governor.call(model.generate_content, [_TRANSCRIBE_INSTRUCTION, audio_file])
+    return response.text
+
 
 async def _transcribe_with_gemini(file_path: str) -> str | None:
+    """長い音声は分割して並列に文字起こしする（app.lib.transcription）。"""
     try:
-        import google.generativeai as genai
-        from app.config import settings
-        genai.configure(api_key=settings.gemini_api_key or settings.google_api_key)
-        model = genai.GenerativeModel(settings.gemini_model)
-        audio_file = genai.upload_file(file_path)
-        response = model.generate_content(
-            ["この音声を正確に日本語で文字起こししてください。", audio_file],
+        return await asyncio.to_thread(
+            transcription.transcribe_segmented,
+            file_path,
+            _transcribe_sync,
+            cache_dir=TRANSCRIPT_CACHE_DIR,
+            namespace=f"{settings.gemini_model}\n{_TRANSCRIBE_INSTRUCTION}",
+            max_workers=settings.transcription_concurrency,
+            segment_seconds=settings.transcription_segment_seconds,
         )
-        return response.text
     except Exception as e:
         logger.error(f"Gemini transcription failed: {e}")
         return None
 
 
-@router.post("/upload", response_model=MeetingUploadResponse)
-async def upload_meeting(
-    file: UploadFile = File(...),
-    client_name: str = Form(...),
-    title: str = Form(""),
-    note: str = Form(""),
-):
-    # Validate file type
-    suffix = Path(file.filename or "").suffix.lower()
-    content_type = file.content_type or ""
-    if suffix not in SUPPORTED_AUDIO_EXTENSIONS and content_type not in SUPPORTED_AUDIO_TYPES:
-        return MeetingUploadResponse(
-            status="error",
-            message=f"Unsupported file format: {suffix or content_type}. Please upload an audio file.",
-        )
+async def _save_upload(file: UploadFile, dest: Path) -> tuple[int, str]:
+    """アップロードをチャンク単位で dest に書き出し、(バイト数, SHA-256) を返す。
+
+    書き込み中は ``.part`` に出力し、完了後にリネームする。
+    """
+    digest = hashlib.sha256()
+    size = 0
+    part = dest.with_name(dest.name + ".part")
+    try:
+        with part.open("wb") as out:
+            while chunk := await file.read(_CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        part.replace(dest)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
 
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-    file_id = uuid.uuid4().hex[:8]
-    safe_filename = Path(file.filename).name.replace("..", "").replace("/", "").replace("\\", "")
-    file_path = UPLOAD_DIR / f"{file_id}_{safe_filename}"
-    content = await file.read()
-    file_path.write_bytes(content)
 
+async def _process_meeting(
+    job: jobs.Job,
+    *,
+    file_path: Path,
+    file_id: str,
+    sha256: str,
+    client_name: str,
+    title: str,
+    note: str,
+) -> dict:
+    """文字起こし → 登録 → 埋め込み（バックグラウンドジョブ本体）。"""
+    job.update("transcribing", 10, "文字起こし中...")
     transcript = await _transcribe_with_gemini(str(file_path))
 
+    job.update("registering", 60, "面談記録を登録中...")
     graph = {
         "nodes": [
             {"temp_id": "c1", "label": "Client", "properties": {"name": client_name}},
             {"temp_id": "mr1", "label": "MeetingRecord", "properties": {
                 "date": datetime.now().strftime("%Y-%m-%d"),
-                "title": title or file.filename,
+                "title": title,
                 "filePath": str(file_path),
+                "sha256": sha256,
                 "transcript": transcript or "",
                 "note": note,
             }},
@@ -77,17 +128,54 @@ async def upload_meeting(
             {"source_temp_id": "mr1", "target_temp_id": "c1", "type": "ABOUT", "properties": {}},
         ],
     }
-    register_to_database(graph)
+    await asyncio.to_thread(register_to_database, graph)
 
     if transcript:
+        job.update("embedding", 80, "埋め込みを生成中...")
         embedding = await embed_text(transcript)
         if embedding:
-            run_query(
+            await asyncio.to_thread(
+                run_query,
                 "MATCH (mr:MeetingRecord {filePath: $path}) SET mr.textEmbedding = $embedding",
                 {"path": str(file_path), "embedding": embedding},
             )
 
-    return MeetingUploadResponse(status="success", transcript=transcript, meeting_id=file_id)
+    return {"meeting_id": file_id, "transcript": transcript}
+
+
+@router.post("/upload", response_model=MeetingUploadResponse)
+async def upload_meeting(
+    file: UploadFile = File(...),
+    client_name: str = Form(...),
+    title: str = Form(""),
+    note: str = Form(""),
+):
+    # Validate file type
+    suffix = Path(file.filename or "").suffix.lower()
+    content_type = file.content_type or ""
+    if suffix not in SUPPORTED_AUDIO_EXTENSIONS and content_type not in SUPPORTED_AUDIO_TYPES:
+        return MeetingUploadResponse(
+            status="error",
+            message=f"Unsupported file format: {suffix or content_type}. Please upload an audio file.",
+        )
+
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    file_id = uuid.uuid4().hex[:8]
+    safe_filename = Path(file.filename).name.replace("..", "").replace("/", "").replace("\\", "")
+    file_path = UPLOAD_DIR / f"{file_id}_{safe_filename}"
+    size, sha256 = await _save_upload(file, file_path)
+    logger.info("Meeting audio saved: %s (%d bytes)", file_path.name, size)
+
+    job = jobs.submit("meeting", partial(
+        _process_meeting,
+        file_path=file_path,
+        file_id=file_id,
+        sha256=sha256,
+        client_name=client_name,
+        title=title or file.filename,
+        note=note,
+    ))
+    return MeetingUploadResponse(status="accepted", meeting_id=file_id, job_id=job.id, sha256=sha256)
 
 
 @router.get("/{client_name}", response_model=list[MeetingRecord])
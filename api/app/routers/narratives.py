@@ -9,10 +9,10 @@ from io import BytesIO
 from fastapi import APIRouter, File, HTTPException, UploadFile
 from fastapi.responses import StreamingResponse
 
-from app.agents.gemini_agent import extract_from_text, check_safety_compliance
+from app.agents.gemini_agent import extract_from_text_chunked, check_safety_compliance
 from app.agents.validator import validate_schema
 from app.lib.db_operations import register_to_database
-from app.lib.dedup import find_semantic_duplicates
+from app.lib.dedup import SemanticQuery, find_semantic_duplicates_batch
 from app.lib.file_readers import read_file
 from app.schemas.narrative import (
     ExtractionRequest,
@@ -41,7 +41,7 @@ _SEMANTIC_CHECK_CONFIG: dict[str, dict[str, str]] = {
 async def extract(request: ExtractionRequest):
     """ナラティブテキストから構造化データを抽出する。"""
     try:
-        result = await extract_from_text(request.text, request.client_name)
+        result = await extract_from_text_chunked(request.text, request.client_name)
         if result is None:
             raise HTTPException(
                 status_code=422,
@@ -70,14 +70,38 @@ async def extract_stream(request: ExtractionRequest):
             yield sse({"stage": "started", "progress": 0, "message": "処理を開始しました"})
             await asyncio.sleep(0.01)
 
-            # Stage 1: chunking
-            yield sse({"stage": "chunking", "progress": 15, "message": "テキストを解析しています"})
-            await asyncio.sleep(0.01)
-
-            # Stage 2: extraction (Gemini call)
-            yield sse({"stage": "extracting", "progress": 30, "message": "Gemini でエンティティを抽出中..."})
+            # Stage 1-2: chunking + per-chunk extraction (progress 10 → 60)
+            progress_queue: asyncio.Queue[tuple[int, int]] = asyncio.Queue()
+            task = asyncio.create_task(
+                extract_from_text_chunked(
+                    request.text,
+                    request.client_name,
+                    on_progress=lambda done, total: progress_queue.put_nowait((done, total)),
+                )
+            )
+            while True:
+                getter = asyncio.ensure_future(progress_queue.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    if progress_queue.empty():
+                        break
+                    continue
+                done, total = getter.result()
+                if done == 0:
+                    yield sse({
+                        "stage": "chunking",
+                        "progress": 10,
+                        "message": f"テキストを {total} チャンクに分割しました",
+                    })
+                else:
+                    yield sse({
+                        "stage": "extracting",
+                        "progress": 10 + 50 * done // total,
+                        "message": f"Gemini でエンティティを抽出中... ({done}/{total})",
+                    })
             try:
-                result = await extract_from_text(request.text, request.client_name)
+                result = task.result()
             except Exception as exc:
                 yield sse({"stage": "error", "progress": 0, "message": f"抽出失敗: {exc}"})
                 return
@@ -108,29 +132,28 @@ async def extract_stream(request: ExtractionRequest):
             # Stage 4: semantic dedup check
             yield sse({"stage": "dedup_check", "progress": 85, "message": "意味的重複を検査中..."})
             semantic_warnings = []
+            queries = []
             for node in result.get("nodes", []):
                 config = _SEMANTIC_CHECK_CONFIG.get(node.get("label"))
                 if not config:
                     continue
                 text = node.get("properties", {}).get(config["prop"], "")
-                if not text:
-                    continue
-                try:
-                    candidates = await find_semantic_duplicates(
-                        text,
-                        label=node["label"],
-                        index_name=config["index"],
-                    )
-                    for c in candidates:
-                        semantic_warnings.append({
-                            "new_text": text,
-                            "existing_text": c.get("text", ""),
-                            "similarity_score": c.get("score", 0.0),
-                            "label": node["label"],
-                            "node_id": c.get("nodeId", ""),
-                        })
-                except Exception as exc:
-                    logger.warning("dedup check failed: %s", exc)
+                if text:
+                    queries.append(SemanticQuery(text, node["label"], config["index"]))
+            try:
+                matches = await find_semantic_duplicates_batch(queries)
+            except Exception as exc:
+                logger.warning("dedup check failed: %s", exc)
+                matches = [[] for _ in queries]
+            for query, candidates in zip(queries, matches):
+                for c in candidates:
+                    semantic_warnings.append({
+                        "new_text": query.text,
+                        "existing_text": c.get("text", ""),
+                        "similarity_score": c.get("score", 0.0),
+                        "label": query.label,
+                        "node_id": c.get("nodeId", ""),
+                    })
             await asyncio.sleep(0.01)
 
             # Stage 5: complete
@@ -222,70 +245,57 @@ async def _check_ngaction_duplicates(nodes) -> list[SemanticDuplicateWarning]:
 
     完全一致テキストはMERGEで処理されるためスキップする。
     """
+    queries = [
+        SemanticQuery(node.properties["action"], "NgAction", "ng_action_embedding")
+        for node in nodes
+        if node.label == "NgAction" and node.properties.get("action")
+    ]
+    try:
+        matches = await find_semantic_duplicates_batch(queries)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("NgAction dedup check failed: %s", exc)
+        return []
     dups: list[SemanticDuplicateWarning] = []
-    for node in nodes:
-        if node.label != "NgAction":
-            continue
-        text = node.properties.get("action", "")
-        if not text:
-            continue
-        try:
-            candidates = await find_semantic_duplicates(
-                text,
-                label="NgAction",
-                index_name="ng_action_embedding",
-            )
-            for c in candidates:
-                # Skip exact text match — MERGE handles deduplication
-                if c.get("text") == text:
-                    continue
-                dups.append(
-                    SemanticDuplicateWarning(
-                        new_text=text,
-                        existing_text=c.get("text", ""),
-                        similarity_score=c.get("score", 0.0),
-                        label="NgAction",
-                        node_id=c.get("nodeId", ""),
-                    )
+    for query, candidates in zip(queries, matches):
+        for c in candidates:
+            # Skip exact text match — MERGE handles deduplication
+            if c.get("text") == query.text:
+                continue
+            dups.append(
+                SemanticDuplicateWarning(
+                    new_text=query.text,
+                    existing_text=c.get("text", ""),
+                    similarity_score=c.get("score", 0.0),
+                    label="NgAction",
+                    node_id=c.get("nodeId", ""),
                 )
-        except Exception as exc:  # noqa: BLE001
-            logger.warning("NgAction dedup check failed: %s", exc)
+            )
     return dups
 
 
 async def _collect_semantic_warnings(nodes) -> list[SemanticDuplicateWarning]:
     """CarePreference などの非ブロッキングセマンティック警告を収集する。"""
-    warnings: list[SemanticDuplicateWarning] = []
+    queries = []
     for node in nodes:
         config = _SEMANTIC_CHECK_CONFIG.get(node.label)
-        if not config:
-            continue
-        text = node.properties.get(config["prop"], "")
-        if not text:
-            continue
-        try:
-            candidates = await find_semantic_duplicates(
-                text,
-                label=node.label,
-                index_name=config["index"],
-            )
-            for c in candidates:
-                warnings.append(
-                    SemanticDuplicateWarning(
-                        new_text=text,
-                        existing_text=c.get("text", ""),
-                        similarity_score=c.get("score", 0.0),
-                        label=node.label,
-                        node_id=c.get("nodeId", ""),
-                    )
-                )
-        except Exception as exc:  # noqa: BLE001
-            logger.warning(
-                "semantic dedup failed for label=%s: %s",
-                node.label,
-                exc,
-            )
-    return warnings
+        if config and node.properties.get(config["prop"]):
+            queries.append(SemanticQuery(node.properties[config["prop"]], node.label, config["index"]))
+    try:
+        matches = await find_semantic_duplicates_batch(queries)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("semantic dedup failed: %s", exc)
+        return []
+    return [
+        SemanticDuplicateWarning(
+            new_text=query.text,
+            existing_text=c.get("text", ""),
+            similarity_score=c.get("score", 0.0),
+            label=query.label,
+            node_id=c.get("nodeId", ""),
+        )
+        for query, candidates in zip(queries, matches)
+        for c in candidates
+    ]
 
 
 @router.post("/upload")
@@ -1,9 +1,10 @@
-"""System router — AI provider and Neo4j availability status."""
+"""System router — AI provider and Neo4j availability status, cache, rate-limit and coalescing statistics."""
 from fastapi import APIRouter
 
 from app.config import settings
+from app.lib import rate_limit, singleflight
 from app.lib.db_operations import is_db_available
-from app.schemas.agent import SystemStatus
+from app.schemas.agent import CacheStats, RateLimitStats, SingleFlightStats, SystemStatus
 
 router = APIRouter(prefix="/api/system", tags=["system"])
 
@@ -37,3 +38,23 @@ async def get_system_status():
         chat_model=chat_model,
         embedding_model=settings.embedding_model,
     )
+
+
+@router.get("/caches", response_model=list[CacheStats])
+async def get_cache_stats():
+    """アプリ内キャッシュのヒット率（プロセス起動以降）とエントリ数を返す。"""
+    from app.agents.gemini_agent import get_extraction_cache, get_response_cache
+
+    return [CacheStats(**get_extraction_cache().stats()), CacheStats(**get_response_cache().stats())]
+
+
+@router.get("/rate-limits", response_model=list[RateLimitStats])
+async def get_rate_limit_stats():
+    """モデルごとのレート制御の状態（同時実行上限・待ち行列・429 の回数など）を返す。"""
+    return [RateLimitStats(**stats) for stats in rate_limit.stats()]
+
+
+@router.get("/single-flight", response_model=list[SingleFlightStats])
+async def get_single_flight_stats():
+    """同一の同時呼び出しをまとめた割合（dedup_ratio = 共有できた呼び出し / 全呼び出し）を返す。"""
+    return [SingleFlightStats(**stats) for stats in singleflight.stats()]
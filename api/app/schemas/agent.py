@@ -21,3 +21,36 @@ class SystemStatus(BaseModel):
     chat_provider: str = "gemini"
     chat_model: str = ""
     embedding_model: str = ""
+
+
+class CacheStats(BaseModel):
+    name: str
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    saved_llm_calls: int | None = None
+
+
+class RateLimitStats(BaseModel):
+    name: str
+    concurrency_limit: int
+    max_concurrency: int
+    rate_per_minute: float
+    in_flight: int
+    queued: int
+    calls: int
+    throttled: int
+    errors: int
+    retries: int
+    wait_ms_avg: float
+    wait_ms_max: float
+    paused_ms: int
+
+
+class SingleFlightStats(BaseModel):
+    name: str
+    calls: int
+    shared: int
+    dedup_ratio: float
+    in_flight: int
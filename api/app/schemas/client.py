@@ -34,6 +34,7 @@ class EmergencyInfo(BaseModel):
     care_preferences: list[CarePreference] = []
     key_persons: list[KeyPerson] = []
     hospital: dict | None = None
+    hospitals: list[dict] = []
     guardian: dict | None = None
 
 
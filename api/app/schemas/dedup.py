@@ -25,3 +25,11 @@ class DedupCheckResponse(BaseModel):
     candidates: list[DedupCandidate] = Field(default_factory=list)
     checkedLabel: str
     checksPerformed: list[str] = Field(default_factory=list)
+
+
+class DedupGraphCheckResponse(BaseModel):
+    """Duplicate check results for every node of an extracted graph."""
+    hasCandidates: bool = False
+    results: dict[str, DedupCheckResponse] = Field(
+        default_factory=dict, description="temp_id → node check result"
+    )
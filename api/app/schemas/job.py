@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    stage: str          # queued | running | <job-specific stages> | complete | error
+    progress: int = 0   # 0-100
+    message: str = ""
+    result: dict | None = None
+    error: str | None = None
+    created_at: float
+    updated_at: float
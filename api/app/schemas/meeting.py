@@ -12,7 +12,9 @@ class MeetingRecord(BaseModel):
 
 
 class MeetingUploadResponse(BaseModel):
-    status: str
+    status: str                     # accepted | error
     transcript: str | None = None
     meeting_id: str | None = None
+    job_id: str | None = None       # GET /api/jobs/{job_id} で進捗・結果を取得
+    sha256: str | None = None
     message: str | None = None
@@ -1,11 +1,12 @@
 """Service layer for pre-registration duplicate detection."""
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any
 
 from app.lib.db_operations import run_query, MERGE_KEYS
-from app.lib.dedup import find_similar_by_kana, find_semantic_duplicates
+from app.lib.dedup import SemanticQuery, find_similar_by_kana, find_semantic_duplicates_batch
 from app.lib.normalize import normalize_name, normalize_text, normalize_condition
 from app.schemas.dedup import DedupCandidate, DedupCheckResponse
 
@@ -26,22 +27,40 @@ async def check_duplicates(
     properties: dict[str, Any],
 ) -> DedupCheckResponse:
     """Run all applicable duplicate checks for a given node."""
-    candidates: list[DedupCandidate] = []
-    checks: list[str] = []
+    results = await check_graph_duplicates([("node", label, properties)])
+    return results["node"]
+
+
+async def check_graph_duplicates(
+    nodes: list[tuple[str, str, dict[str, Any]]],
+) -> dict[str, DedupCheckResponse]:
+    """Run all applicable duplicate checks for many nodes at once.
+
+    ``nodes`` is a list of ``(key, label, properties)``; the result maps each
+    key (temp_id) to its DedupCheckResponse. Exact matches use one UNWIND
+    query per label, semantic matches share one embedding batch, and the
+    three checks run concurrently.
+    """
+    exact, kana, semantic = await asyncio.gather(
+        asyncio.to_thread(_check_exact_matches, nodes),
+        asyncio.to_thread(_check_kana_matches, nodes),
+        _check_semantic_matches(nodes),
+    )
 
-    # 1. Exact match check (for MERGE-key labels)
-    if label in MERGE_KEYS:
-        checks.append("exact")
-        exact = _check_exact_match(label, properties)
-        candidates.extend(exact)
+    results: dict[str, DedupCheckResponse] = {}
+    for i, (key, label, properties) in enumerate(nodes):
+        candidates: list[DedupCandidate] = []
+        checks: list[str] = []
 
-    # 2. Kana fuzzy match (for name-based labels)
-    if label in _KANA_LABELS:
-        name = properties.get("name", "")
-        if name:
+        # 1. Exact match check (for MERGE-key labels)
+        if label in MERGE_KEYS:
+            checks.append("exact")
+            candidates.extend(exact.get(i, []))
+
+        # 2. Kana fuzzy match (for name-based labels)
+        if i in kana:
             checks.append("kana")
-            kana_matches = find_similar_by_kana(name, label=label, threshold=0.8)
-            for m in kana_matches:
+            for m in kana[i]:
                 # Skip if already found as exact match
                 if not any(c.nodeId == m["nodeId"] for c in candidates):
                     candidates.append(DedupCandidate(
@@ -51,52 +70,37 @@ async def check_duplicates(
                         nodeId=m["nodeId"],
                     ))
 
-    # 3. Semantic match (for embeddable labels)
-    config = _SEMANTIC_CONFIG.get(label)
-    if config:
-        text = properties.get(config["prop"], "")
-        if text:
+        # 3. Semantic match (for embeddable labels)
+        if i in semantic:
             checks.append("semantic")
-            try:
-                sem_matches = await find_semantic_duplicates(
-                    text, label, config["index"], threshold=0.85
-                )
-                for m in sem_matches:
-                    if not any(c.nodeId == m["nodeId"] for c in candidates):
-                        candidates.append(DedupCandidate(
-                            text=m["text"],
-                            similarity=m["score"],
-                            matchType="semantic",
-                            nodeId=m["nodeId"],
-                        ))
-            except Exception as exc:
-                logger.warning("Semantic dedup check failed: %s", exc)
-
-    # Sort by similarity descending
-    candidates.sort(key=lambda c: c.similarity, reverse=True)
-
-    return DedupCheckResponse(
-        hasCandidates=len(candidates) > 0,
-        candidates=candidates,
-        checkedLabel=label,
-        checksPerformed=checks,
-    )
+            for m in semantic[i]:
+                if not any(c.nodeId == m["nodeId"] for c in candidates):
+                    candidates.append(DedupCandidate(
+                        text=m["text"],
+                        similarity=m["score"],
+                        matchType="semantic",
+                        nodeId=m["nodeId"],
+                    ))
 
+        # Sort by similarity descending
+        candidates.sort(key=lambda c: c.similarity, reverse=True)
+
+        results[key] = DedupCheckResponse(
+            hasCandidates=len(candidates) > 0,
+            candidates=candidates,
+            checkedLabel=label,
+            checksPerformed=checks,
+        )
+    return results
 
-def _check_exact_match(label: str, properties: dict[str, Any]) -> list[DedupCandidate]:
-    """Check for exact MERGE-key match."""
-    keys = MERGE_KEYS.get(label, [])
-    if not keys:
-        return []
 
-    # Build match conditions
-    conditions = []
-    params = {}
-    for k in keys:
+def _normalized_merge_values(label: str, properties: dict[str, Any]) -> dict[str, str] | None:
+    """Normalized MERGE-key values, or None if a key is missing."""
+    values = {}
+    for k in MERGE_KEYS.get(label, []):
         val = properties.get(k)
         if not val:
-            return []  # Missing merge key = can't check
-        # Normalize the value
+            return None  # Missing merge key = can't check
         if k == "name":
             if label == "Condition":
                 val = normalize_condition(val)
@@ -104,31 +108,78 @@ def _check_exact_match(label: str, properties: dict[str, Any]) -> list[DedupCand
                 val = normalize_name(val)
         else:
             val = normalize_text(str(val))
-        param_name = f"p_{k}"
-        conditions.append(f"n.{k} = ${param_name}")
-        params[param_name] = val
-
-    # Validate label
-    if not label.isidentifier():
-        return []
-
-    where = " AND ".join(conditions)
+        values[k] = val
+    return values or None
+
+
+def _check_exact_matches(
+    nodes: list[tuple[str, str, dict[str, Any]]],
+) -> dict[int, list[DedupCandidate]]:
+    """Exact MERGE-key matches, one UNWIND query per label."""
+    by_label: dict[str, list[dict[str, Any]]] = {}
+    for i, (_, label, properties) in enumerate(nodes):
+        # Validate label
+        if label not in MERGE_KEYS or not label.isidentifier():
+            continue
+        values = _normalized_merge_values(label, properties)
+        if values is not None:
+            by_label.setdefault(label, []).append({"i": i, **values})
+
+    found: dict[int, list[DedupCandidate]] = {}
+    for label, items in by_label.items():
+        where = " AND ".join(f"n.{k} = item.{k}" for k in MERGE_KEYS[label])
+        try:
+            rows = run_query(
+                "UNWIND $items AS item "
+                "CALL { WITH item "
+                f"MATCH (n:{label}) WHERE {where} "
+                "RETURN n.name AS name, elementId(n) AS nodeId LIMIT 5 } "
+                "RETURN item.i AS i, name, nodeId",
+                {"items": items},
+            )
+        except Exception as exc:
+            logger.warning("Exact match check failed for %s: %s", label, exc)
+            continue
+        for row in rows:
+            found.setdefault(row["i"], []).append(DedupCandidate(
+                name=row.get("name"),
+                similarity=1.0,
+                matchType="exact",
+                nodeId=row["nodeId"],
+            ))
+    return found
+
+
+def _check_kana_matches(
+    nodes: list[tuple[str, str, dict[str, Any]]],
+) -> dict[int, list[dict[str, Any]]]:
+    """Kana fuzzy matches for name-based labels (served from the in-memory kana index)."""
+    found: dict[int, list[dict[str, Any]]] = {}
+    for i, (_, label, properties) in enumerate(nodes):
+        name = properties.get("name", "")
+        if label in _KANA_LABELS and name:
+            found[i] = find_similar_by_kana(name, label=label, threshold=0.8)
+    return found
+
+
+async def _check_semantic_matches(
+    nodes: list[tuple[str, str, dict[str, Any]]],
+) -> dict[int, list[dict[str, Any]]]:
+    """Semantic matches for embeddable labels, one embedding batch for all nodes."""
+    positions: list[int] = []
+    queries: list[SemanticQuery] = []
+    for i, (_, label, properties) in enumerate(nodes):
+        config = _SEMANTIC_CONFIG.get(label)
+        text = properties.get(config["prop"], "") if config else ""
+        if text:
+            positions.append(i)
+            queries.append(SemanticQuery(text, label, config["index"], threshold=0.85))
+    found: dict[int, list[dict[str, Any]]] = {i: [] for i in positions}
     try:
-        rows = run_query(
-            f"MATCH (n:{label}) WHERE {where} "
-            f"RETURN n.name AS name, elementId(n) AS nodeId LIMIT 5",
-            params,
-        )
+        matches = await find_semantic_duplicates_batch(queries)
     except Exception as exc:
-        logger.warning("Exact match check failed: %s", exc)
-        return []
-
-    return [
-        DedupCandidate(
-            name=row.get("name"),
-            similarity=1.0,
-            matchType="exact",
-            nodeId=row["nodeId"],
-        )
-        for row in rows
-    ]
+        logger.warning("Semantic dedup check failed: %s", exc)
+        return found
+    for i, candidates in zip(positions, matches):
+        found[i] = candidates
+    return found
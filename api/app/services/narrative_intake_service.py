@@ -2,7 +2,7 @@
 
 Claude skill 経路と Gemini 経路を統一するための中核サービス。
 既存の `db_operations.register_to_database` と `gemini_agent.check_safety_compliance`、
-`embedding.embed_text` を再利用し、以下の責務を負う:
+`embedding.embed_texts_batch` を再利用し、以下の責務を負う:
 
 1. allowlist 二重検証 (defense in depth)
 2. 既存 NgAction との安全性コンプライアンスチェック
@@ -19,7 +19,7 @@ from datetime import datetime, timezone
 from typing import Any
 
 from app.agents.gemini_agent import check_safety_compliance
-from app.lib.dedup import find_semantic_duplicates
+from app.lib.dedup import SemanticQuery, find_semantic_duplicates_batch
 from app.lib.db_operations import (
     ALLOWED_CREATE_LABELS,
     ALLOWED_LABELS,
@@ -28,7 +28,7 @@ from app.lib.db_operations import (
     register_to_database,
     run_query,
 )
-from app.lib.embedding import embed_text
+from app.lib.embedding import embed_texts_batch
 from app.schemas.narrative_intake import (
     DuplicateCheckResult,
     NarrativeIntakeRequest,
@@ -258,7 +258,7 @@ async def check_semantic_duplicates(
 
     ベストエフォート: 失敗しても空リストを返し、通常フローをブロックしない。
     """
-    warnings: list[SemanticDuplicateWarning] = []
+    queries: list[SemanticQuery] = []
     for n in validated["nodes"]:
         config = _SEMANTIC_CHECK_CONFIG.get(n.label)
         if not config:
@@ -272,28 +272,26 @@ async def check_semantic_duplicates(
         else:
             continue
 
-        if not text.strip():
-            continue
+        if text.strip():
+            queries.append(SemanticQuery(text, n.label, config["index"], config["threshold"]))
 
-        try:
-            candidates = await find_semantic_duplicates(
-                text,
-                n.label,
-                config["index"],
-                threshold=config["threshold"],
-            )
-        except Exception as exc:
-            logger.warning("Semantic dedup check failed for %s: %s", n.label, exc)
-            continue
+    # 全ノードをまとめて 1 回の埋め込み呼び出し + インデックスごとに 1 クエリで照合
+    try:
+        matches = await find_semantic_duplicates_batch(queries)
+    except Exception as exc:
+        logger.warning("Semantic dedup check failed: %s", exc)
+        return []
 
+    warnings: list[SemanticDuplicateWarning] = []
+    for query, candidates in zip(queries, matches):
         for c in candidates:
-            if c["text"] != text:  # Skip exact matches (handled by MERGE)
+            if c["text"] != query.text:  # Skip exact matches (handled by MERGE)
                 warnings.append(
                     SemanticDuplicateWarning(
-                        new_text=text,
+                        new_text=query.text,
                         existing_text=c["text"],
                         similarity_score=c["score"],
-                        label=n.label,
+                        label=query.label,
                         node_id=c["nodeId"],
                     )
                 )
@@ -376,80 +374,71 @@ def _inject_source_hash(
     return {"nodes": out_nodes, "relationships": out_rels}
 
 
-async def _embed_targets(validated: dict[str, list]) -> int:
-    """SupportLog / NgAction / CarePreference に embedding を付与する。
-
-    既に登録済みのノードを mergeKey または特徴プロパティで検索し、
-    Gemini Embedding 2 で生成した 768次元ベクトルを UPDATE する。
-    """
-    embedded = 0
-
-    for n in validated["nodes"]:
-        if n.label not in _EMBEDDING_TARGET_LABELS:
-            continue
-
-        props = n.properties or {}
-
-        # 埋め込み対象テキストを組み立て
-        if n.label == "SupportLog":
-            text_parts = [
-                str(props.get("action", "")),
-                str(props.get("note", "")),
-                str(props.get("situation", "")),
-                str(props.get("nextAction", "")),
-            ]
-            match_key = "date"
-            match_value = props.get("date", "")
-        elif n.label == "NgAction":
-            text_parts = [
-                str(props.get("action", "")),
-                str(props.get("reason", "")),
-                str(props.get("riskLevel", "")),
-            ]
-            match_key = "action"
-            match_value = props.get("action", "")
-        elif n.label == "CarePreference":
-            text_parts = [
-                str(props.get("category", "")),
-                str(props.get("instruction", "")),
-            ]
-            match_key = "instruction"
-            match_value = props.get("instruction", "")
-        else:
-            continue
+def _embedding_text(label: str, props: dict[str, Any]) -> str:
+    """Embedding 対象テキスト（対象外ラベルは空文字）。"""
+    if label == "SupportLog":
+        keys = ("action", "note", "situation", "nextAction")
+    elif label == "NgAction":
+        keys = ("action", "reason", "riskLevel")
+    elif label == "CarePreference":
+        keys = ("category", "instruction")
+    else:
+        return ""
+    return " / ".join(str(props[k]) for k in keys if props.get(k))
+
+
+# ラベル付きで MATCH するので、書き込み通知が対象ラベルに限定される
+_EMBEDDING_WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (n:{label}) WHERE elementId(n) = row.id
+SET n.embedding = row.embedding,
+    n.embeddingUpdatedAt = $ts
+RETURN count(n) AS updated
+"""
 
-        text = " / ".join(p for p in text_parts if p)
-        if not text.strip() or not match_value:
-            continue
 
-        try:
-            vec = await embed_text(text)
-        except Exception as exc:
-            logger.warning("embed_text failed for %s: %s", n.label, exc)
-            continue
+async def _embed_targets(
+    validated: dict[str, list],
+    node_ids: list[str | None],
+    client_name: str | None = None,
+) -> int:
+    """SupportLog / NgAction / CarePreference に embedding を付与する。
 
-        if not vec:
+    register_to_database が返した elementId（``node_ids``、validated["nodes"] と
+    同順）を対象に、全テキストを 1 回のバッチ呼び出しで埋め込み、ラベルごとに
+    1 回の UNWIND で書き込む。ノード数が増えても往復回数は増えない。
+    ``client_name`` を渡すと、キャッシュの無効化がそのクライアントに限定される。
+    """
+    targets: list[tuple[str, str, str]] = []
+    for n, element_id in zip(validated["nodes"], node_ids):
+        if n.label not in _EMBEDDING_TARGET_LABELS or not element_id:
             continue
-
-        # ベクトルを該当ノードへ付与
+        text = _embedding_text(n.label, n.properties or {})
+        if text.strip():
+            targets.append((n.label, element_id, text))
+    if not targets:
+        return 0
+
+    vectors = await embed_texts_batch([text for _, _, text in targets])
+    rows_by_label: dict[str, list[dict]] = {}
+    for (label, element_id, _), vec in zip(targets, vectors):
+        if vec:
+            rows_by_label.setdefault(label, []).append({"id": element_id, "embedding": vec})
+
+    ts = datetime.now(timezone.utc).isoformat()
+    updated = 0
+    for label, rows in rows_by_label.items():
         try:
-            run_query(
-                f"""
-                MATCH (n:{n.label} {{{match_key}: $v}})
-                SET n.embedding = $emb,
-                    n.embeddingUpdatedAt = $ts
-                """,
-                {
-                    "v": match_value,
-                    "emb": vec,
-                    "ts": datetime.now(timezone.utc).isoformat(),
-                },
+            result = run_query(
+                _EMBEDDING_WRITE_QUERY.format(label=label),
+                {"rows": rows, "ts": ts},
+                client_names={client_name} if client_name else None,
             )
-            embedded += 1
         except Exception as exc:
-            logger.warning("embedding update failed for %s: %s", n.label, exc)
-
-    return embedded
+            logger.warning("embedding update failed for %s: %s", label, exc)
+            continue
+        updated += int(result[0]["updated"]) if result else 0
+    return updated
 
 
 async def register_narrative(
@@ -498,7 +487,9 @@ async def register_narrative(
 
     # Embedding 付与 (ベストエフォート)
     try:
-        embedded_count = await _embed_targets(validated)
+        embedded_count = await _embed_targets(
+            validated, result.get("node_ids") or [], result.get("client_name")
+        )
     except Exception as exc:
         logger.warning("Embedding phase failed: %s", exc)
         embedded_count = 0
@@ -18,6 +18,7 @@ from app.agents.gemini_agent import (
     search_guardian,
     search_support_logs,
     check_safety_compliance,
+    extract_from_text,
 )
 
 
@@ -81,25 +82,33 @@ class TestGetExtractionPrompt:
         assert "json" in prompt.lower() or "JSON" in prompt
 
 
+def _profile(**sections):
+    """Profile bundle row as returned by app.lib.client_context's single query."""
+    row = {
+        "name": "田中太郎", "dob": None, "bloodType": None, "conditions": [],
+        "ng_actions": [], "care_preferences": [], "contacts": [], "hospitals": [], "guardians": [],
+    }
+    row.update(sections)
+    return [row]
+
+
 class TestSearchClientInfo:
     """Test search_client_info tool function.
 
-    run_query is imported locally inside each tool function,
-    so we patch at the source module: app.lib.db_operations.run_query
+    Per-client tools answer from the profile bundle loaded by
+    app.lib.client_context, so run_query is patched there.
     """
 
     def test_client_found(self):
-        mock_records = [
-            {"name": "田中太郎", "dob": "1990-01-01", "bloodType": "A", "conditions": ["自閉症"]},
-        ]
-        with patch("app.lib.db_operations.run_query", return_value=mock_records):
+        mock_records = _profile(dob="1990-01-01", bloodType="A", conditions=["自閉症"])
+        with patch("app.lib.client_context.run_query", return_value=mock_records):
             result = json.loads(search_client_info("田中太郎"))
 
         assert result["name"] == "田中太郎"
         assert result["bloodType"] == "A"
 
     def test_client_not_found(self):
-        with patch("app.lib.db_operations.run_query", return_value=[]):
+        with patch("app.lib.client_context.run_query", return_value=[]):
             result = json.loads(search_client_info("存在しない人"))
 
         assert "error" in result
@@ -110,19 +119,28 @@ class TestSearchNgActions:
     """Test search_ng_actions tool function."""
 
     def test_ng_actions_found(self):
-        mock_records = [
+        mock_records = _profile(ng_actions=[
             {"action": "大声を出す", "reason": "パニック誘発", "riskLevel": "Panic"},
-        ]
-        with patch("app.agents.gemini_agent._resolve_client_name", return_value=("田中太郎", None)), \
-             patch("app.lib.db_operations.run_query", return_value=mock_records):
+        ])
+        with patch("app.lib.client_context.run_query", return_value=mock_records):
             result = json.loads(search_ng_actions("田中太郎"))
 
         assert result["client_name"] == "田中太郎"
         assert len(result["ng_actions"]) == 1
         assert result["ng_actions"][0]["riskLevel"] == "Panic"
 
+    def test_ng_actions_sorted_by_risk(self):
+        mock_records = _profile(ng_actions=[
+            {"action": "強い光", "reason": None, "riskLevel": "Discomfort"},
+            {"action": "ナッツ", "reason": "アナフィラキシー", "riskLevel": "LifeThreatening"},
+        ])
+        with patch("app.lib.client_context.run_query", return_value=mock_records):
+            result = json.loads(search_ng_actions("田中太郎"))
+
+        assert [ng["action"] for ng in result["ng_actions"]] == ["ナッツ", "強い光"]
+
     def test_ng_actions_empty(self):
-        with patch("app.lib.db_operations.run_query", return_value=[]):
+        with patch("app.lib.client_context.run_query", return_value=[]):
             result = json.loads(search_ng_actions("テスト"))
 
         assert result["ng_actions"] == []
@@ -132,11 +150,10 @@ class TestSearchCarePreferences:
     """Test search_care_preferences tool function."""
 
     def test_care_preferences_found(self):
-        mock_records = [
+        mock_records = _profile(care_preferences=[
             {"category": "コミュニケーション", "instruction": "ゆっくり話す", "priority": "高"},
-        ]
-        with patch("app.agents.gemini_agent._resolve_client_name", return_value=("田中太郎", None)), \
-             patch("app.lib.db_operations.run_query", return_value=mock_records):
+        ])
+        with patch("app.lib.client_context.run_query", return_value=mock_records):
             result = json.loads(search_care_preferences("田中太郎"))
 
         assert len(result["care_preferences"]) == 1
@@ -147,17 +164,17 @@ class TestSearchEmergencyContacts:
     """Test search_emergency_contacts tool function."""
 
     def test_contacts_found(self):
-        mock_records = [
+        mock_records = _profile(contacts=[
             {"name": "田中花子", "relationship": "母", "phone": "090-1234-5678", "rank": 1},
-        ]
-        with patch("app.lib.db_operations.run_query", return_value=mock_records):
+        ])
+        with patch("app.lib.client_context.run_query", return_value=mock_records):
             result = json.loads(search_emergency_contacts("田中太郎"))
 
         assert len(result["contacts"]) == 1
         assert result["contacts"][0]["name"] == "田中花子"
 
     def test_contacts_empty(self):
-        with patch("app.lib.db_operations.run_query", return_value=[]):
+        with patch("app.lib.client_context.run_query", return_value=[]):
             result = json.loads(search_emergency_contacts("テスト"))
 
         assert result["contacts"] == []
@@ -167,10 +184,10 @@ class TestSearchHospital:
     """Test search_hospital tool function."""
 
     def test_hospital_found(self):
-        mock_records = [
+        mock_records = _profile(hospitals=[
             {"name": "中央病院", "phone": "03-1234-5678", "address": "東京都"},
-        ]
-        with patch("app.lib.db_operations.run_query", return_value=mock_records):
+        ])
+        with patch("app.lib.client_context.run_query", return_value=mock_records):
             result = json.loads(search_hospital("田中太郎"))
 
         assert len(result["hospitals"]) == 1
@@ -181,10 +198,10 @@ class TestSearchGuardian:
     """Test search_guardian tool function."""
 
     def test_guardian_found(self):
-        mock_records = [
+        mock_records = _profile(guardians=[
             {"name": "山田法律事務所", "type": "成年後見人", "phone": None, "organization": None},
-        ]
-        with patch("app.lib.db_operations.run_query", return_value=mock_records):
+        ])
+        with patch("app.lib.client_context.run_query", return_value=mock_records):
             result = json.loads(search_guardian("田中太郎"))
 
         assert len(result["guardians"]) == 1
@@ -261,3 +278,291 @@ class TestCheckSafetyCompliance:
             )
 
         assert result["is_violation"] is False
+
+
+class TestExtractFromTextCache:
+    """extract_from_text reuses cached results for identical inputs."""
+
+    def _model(self, text):
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value = MagicMock(text=text)
+        return mock_model
+
+    def test_second_call_served_from_cache(self, extraction_cache):
+        import asyncio
+        mock_model = self._model('{"nodes": [{"label": "Client"}], "relationships": []}')
+
+        with patch("google.generativeai.configure"), \
+             patch("google.generativeai.GenerativeModel", return_value=mock_model):
+            loop = asyncio.get_event_loop()
+            first = loop.run_until_complete(extract_from_text("今日は散歩した", "田中太郎"))
+            second = loop.run_until_complete(extract_from_text("今日は散歩した", "田中太郎"))
+            other = loop.run_until_complete(extract_from_text("今日は散歩した", "佐藤花子"))
+
+        assert first == second == {"nodes": [{"label": "Client"}], "relationships": []}
+        assert other == first
+        assert mock_model.generate_content.call_count == 2
+        assert extraction_cache.stats()["hits"] == 1
+
+    def test_failed_parse_not_cached(self, extraction_cache):
+        import asyncio
+        mock_model = self._model("not json")
+
+        with patch("google.generativeai.configure"), \
+             patch("google.generativeai.GenerativeModel", return_value=mock_model):
+            loop = asyncio.get_event_loop()
+            assert loop.run_until_complete(extract_from_text("テキスト")) is None
+            assert loop.run_until_complete(extract_from_text("テキスト")) is None
+
+        assert mock_model.generate_content.call_count == 2
+        assert extraction_cache.stats()["entries"] == 0
+
+
+class TestExtractFromTextChunked:
+    """Map-reduce extraction over text chunks."""
+
+    def test_chunks_extracted_concurrently_and_merged(self):
+        import asyncio
+        from app.agents.gemini_agent import extract_from_text_chunked
+
+        running = 0
+        peak = 0
+
+        async def fake_extract(chunk, client_name=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {
+                "nodes": [
+                    {"temp_id": "c1", "label": "Client", "properties": {"name": client_name}},
+                    {"temp_id": "ng1", "label": "NgAction", "properties": {"action": chunk[:4]}},
+                ],
+                "relationships": [{"source_temp_id": "c1", "target_temp_id": "ng1", "type": "MUST_AVOID"}],
+            }
+
+        progress = []
+        with patch("app.agents.gemini_agent.extract_from_text", side_effect=fake_extract), \
+             patch("app.lib.chunking.split_into_chunks", return_value=["大声禁止。", "接触禁止。", "強い光。"]), \
+             patch("app.agents.gemini_agent.settings.extraction_concurrency", 2):
+            result = asyncio.get_event_loop().run_until_complete(
+                extract_from_text_chunked("長文", "田中太郎", on_progress=lambda d, t: progress.append((d, t)))
+            )
+
+        assert peak == 2
+        assert progress == [(0, 3), (1, 3), (2, 3), (3, 3)]
+        assert [n["label"] for n in result["nodes"]] == ["Client", "NgAction", "NgAction", "NgAction"]
+        assert len(result["relationships"]) == 3
+
+    def test_any_failed_chunk_fails_extraction(self):
+        import asyncio
+        from app.agents.gemini_agent import extract_from_text_chunked
+
+        with patch("app.agents.gemini_agent.extract_from_text", new_callable=AsyncMock,
+                   side_effect=[{"nodes": [], "relationships": []}, None]), \
+             patch("app.lib.chunking.split_into_chunks", return_value=["a", "b"]):
+            result = asyncio.get_event_loop().run_until_complete(extract_from_text_chunked("ab"))
+
+        assert result is None
+
+
+class TestChatEvents:
+    """chat_events maps Agno run events to WebSocket frames."""
+
+    @staticmethod
+    def _collect(events):
+        import asyncio
+        from types import SimpleNamespace
+        from app.agents.gemini_agent import chat_events
+
+        async def arun(message, stream=False, stream_events=False):
+            for event in events:
+                if isinstance(event, Exception):
+                    raise event
+                yield SimpleNamespace(**event)
+
+        agent = SimpleNamespace(arun=arun)
+
+        async def collect():
+            return [frame async for frame in chat_events("質問", agent=agent)]
+
+        return asyncio.run(collect())
+
+    def test_content_and_tool_events(self):
+        from types import SimpleNamespace
+        from agno.agent import RunEvent
+
+        tool = SimpleNamespace(tool_name="search_ng_actions", tool_call_id="t1", tool_call_error=None)
+        frames = self._collect([
+            {"event": RunEvent.run_started, "content": None},
+            {"event": RunEvent.tool_call_started, "content": None, "tool": tool},
+            {"event": RunEvent.tool_call_completed, "content": "[]", "tool": tool},
+            {"event": RunEvent.run_content, "content": "禁忌は"},
+            {"event": RunEvent.run_content, "content": "ありません。"},
+            {"event": RunEvent.run_completed, "content": "禁忌はありません。"},
+        ])
+        assert frames == [
+            {"type": "tool_start", "tool": "search_ng_actions", "call_id": "t1"},
+            {"type": "tool_end", "tool": "search_ng_actions", "call_id": "t1", "error": False},
+            {"type": "stream", "content": "禁忌は"},
+            {"type": "stream", "content": "ありません。"},
+        ]
+
+    def test_exception_becomes_error_text(self):
+        from agno.agent import RunEvent
+
+        frames = self._collect([
+            {"event": RunEvent.run_content, "content": "途中"},
+            RuntimeError("quota exceeded"),
+        ])
+        assert frames[0] == {"type": "stream", "content": "途中"}
+        assert "quota exceeded" in frames[1]["content"]
+
+    def test_empty_run_yields_fallback(self):
+        from agno.agent import RunEvent
+
+        frames = self._collect([{"event": RunEvent.run_completed, "content": None}])
+        assert frames == [{"type": "stream", "content": "回答を生成できませんでした。"}]
+
+    def test_memory_supplies_context_and_records_turn(self):
+        import asyncio
+        from types import SimpleNamespace
+        from agno.agent import RunEvent
+        from app.agents.gemini_agent import chat_events
+        from app.lib.conversation_memory import ConversationMemory
+
+        memory = ConversationMemory()
+        memory.add_turn("田中太郎さんについて", "田中太郎さんの情報です。")
+        memory.pin("対象クライアント", "田中太郎")
+        seen = {}
+
+        async def arun(message, stream=False, stream_events=False):
+            seen["input"] = agent.additional_input
+            seen["context"] = agent.additional_context
+            yield SimpleNamespace(event=RunEvent.run_content, content="禁忌はありません。")
+            yield SimpleNamespace(
+                event=RunEvent.run_completed, content=None,
+                metrics=SimpleNamespace(input_tokens=420, output_tokens=12),
+            )
+
+        agent = SimpleNamespace(arun=arun, additional_input=None, additional_context=None)
+
+        async def collect():
+            return [frame async for frame in chat_events("禁忌は？", agent=agent, memory=memory)]
+
+        asyncio.run(collect())
+
+        assert [m["role"] for m in seen["input"]] == ["user", "assistant"]
+        assert "田中太郎" in seen["context"]
+        assert memory.context_messages()[-1] == {"role": "assistant", "content": "禁忌はありません。"}
+        report = memory.report()
+        assert report["turns"] == 1
+        assert (report["input_tokens"], report["output_tokens"]) == (420, 12)
+
+    def test_failed_run_is_not_remembered(self):
+        import asyncio
+        from types import SimpleNamespace
+        from app.agents.gemini_agent import chat_events
+        from app.lib.conversation_memory import ConversationMemory
+
+        memory = ConversationMemory()
+
+        async def arun(message, stream=False, stream_events=False):
+            raise RuntimeError("quota exceeded")
+            yield  # pragma: no cover
+
+        agent = SimpleNamespace(arun=arun, additional_input=None, additional_context=None)
+
+        async def collect():
+            return [frame async for frame in chat_events("質問", agent=agent, memory=memory)]
+
+        asyncio.run(collect())
+        assert memory.context_messages() == []
+        assert memory.report()["turns"] == 1
+
+
+class TestChatEventsAnswerCache:
+    """Completed answers are stored under the lookup probe; tool failures are not."""
+
+    @staticmethod
+    def _run(events, probe):
+        import asyncio
+        from types import SimpleNamespace
+        from app.agents.gemini_agent import chat_events
+
+        async def arun(message, stream=False, stream_events=False):
+            for event in events:
+                yield SimpleNamespace(**event)
+
+        agent = SimpleNamespace(arun=arun)
+
+        async def collect():
+            return [frame async for frame in chat_events("更新期限が近い手帳は？", agent=agent, cache_probe=probe)]
+
+        asyncio.run(collect())
+
+    def test_answer_stored(self, response_cache):
+        from agno.agent import RunEvent
+        from app.lib.response_cache import make_probe
+
+        probe = make_probe("更新期限が近い手帳は？")
+        self._run([{"event": RunEvent.run_content, "content": "2件あります。"}], probe)
+        assert response_cache.get_exact(make_probe("更新期限が近い手帳は？")) == "2件あります。"
+
+    def test_tool_error_not_stored(self, response_cache):
+        from types import SimpleNamespace
+        from agno.agent import RunEvent
+        from app.lib.response_cache import make_probe
+
+        tool = SimpleNamespace(tool_name="check_renewal_deadlines", tool_call_id="t1", tool_call_error=True)
+        self._run([
+            {"event": RunEvent.tool_call_completed, "content": None, "tool": tool},
+            {"event": RunEvent.run_content, "content": "取得できませんでした。"},
+        ], make_probe("更新期限が近い手帳は？"))
+        assert response_cache.stats()["entries"] == 0
+
+
+class TestModelPool:
+    """Per-provider pooled models share one pre-built SDK client."""
+
+    def setup_method(self):
+        from app.agents.gemini_agent import reset_model_pool
+        reset_model_pool()
+
+    def teardown_method(self):
+        from app.agents.gemini_agent import reset_model_pool
+        reset_model_pool()
+
+    def test_client_built_once_per_provider(self):
+        from types import SimpleNamespace
+        from app.agents.gemini_agent import get_pooled_model
+
+        def make(provider):
+            model = SimpleNamespace(provider=provider, client=None)
+            model.get_client = lambda: setattr(model, "client", object()) or model.client
+            return model
+
+        with patch("app.agents.gemini_agent._create_model", side_effect=make) as create:
+            a = get_pooled_model("gemini")
+            b = get_pooled_model("gemini")
+            c = get_pooled_model("claude")
+
+        assert create.call_count == 2
+        assert a is not b
+        assert a.client is b.client is not None
+        assert c.client is not a.client
+
+    def test_session_agent_switch_keeps_session(self):
+        from app.agents.gemini_agent import create_session_agent, switch_session_model
+
+        from agno.models.google import Gemini
+
+        with patch("app.agents.gemini_agent._create_model", side_effect=lambda p: Gemini(id=p, api_key="test")):
+            agent = create_session_agent("s1", "gemini-a")
+            switch_session_model(agent, "gemini-b")
+
+        # History comes from the session's ConversationMemory, not Agno's db
+        assert agent.add_history_to_context is False
+        assert agent.session_id == "s1"
+        assert agent.model.id == "gemini-b"
@@ -322,3 +322,38 @@ class TestHandleIntakeMessage:
         result = await handle_intake_message("session-wait", "ちょっと待って")
         assert result["complete"] is False
         assert "登録" in result["response"]
+
+
+class TestSharedSessionStore:
+    """Intake sessions round-trip through a shared (SQLite) store."""
+
+    def test_session_serialization_round_trip(self):
+        session = IntakeSession(session_id="rt-1")
+        session.current_phase = 3
+        session.add_response("田中太郎、A型")
+        session.extracted_graph = {"nodes": [{"label": "Client", "properties": {"name": "田中太郎"}}]}
+        session._awaiting_confirmation = True
+
+        restored = IntakeSession.from_bytes(session.to_bytes())
+        assert restored.session_id == "rt-1"
+        assert restored.current_phase == 3
+        assert restored.phase_responses == {3: ["田中太郎、A型"]}
+        assert restored.collected_text == ["田中太郎、A型"]
+        assert restored.extracted_graph == session.extracted_graph
+        assert restored._awaiting_confirmation is True
+
+    @pytest.mark.asyncio
+    async def test_conversation_continues_on_another_worker(self, tmp_path):
+        from app.lib.session_store import SqliteSessionStore
+
+        def worker_store():
+            return SqliteSessionStore(
+                tmp_path / "intake.sqlite3", 1800,
+                encode=IntakeSession.to_bytes, decode=IntakeSession.from_bytes,
+            )
+
+        with patch("app.agents.intake_agent._sessions", worker_store()):
+            await handle_intake_message("shared-1", "開始")
+        with patch("app.agents.intake_agent._sessions", worker_store()):
+            result = await handle_intake_message("shared-1", "スキップ")
+        assert result["progress"]["phase"] == 2
@@ -2,6 +2,8 @@
 
 from unittest.mock import patch
 
+import pytest
+
 from app.agents.safety_first import is_emergency, handle_emergency
 
 
@@ -77,24 +79,28 @@ class TestIsEmergency:
 class TestHandleEmergency:
     """Test emergency response generation with DB mocking."""
 
+    @pytest.fixture(autouse=True)
+    def _fresh_bundles(self, fresh_emergency):
+        yield
+
     def test_handle_emergency_with_client_name(self):
         mock_records = [
             {
-                "c": {"name": "田中太郎"},
+                "name": "田中太郎",
                 "ng_actions": [
                     {"action": "大声を出す", "riskLevel": "Panic", "reason": "パニック誘発"},
                 ],
-                "care_prefs": [
+                "care_preferences": [
                     {"category": "落ち着かせ方", "instruction": "静かな部屋に移動"},
                 ],
                 "key_persons": [
                     {"name": "田中花子", "relationship": "母", "phone": "090-1234-5678"},
                 ],
-                "h": None,
-                "g": None,
+                "hospitals": [],
+                "guardian": None,
             }
         ]
-        with patch("app.agents.safety_first.run_query", return_value=mock_records):
+        with patch("app.lib.emergency.run_query", return_value=mock_records):
             result = handle_emergency("田中太郎さんがパニック中です")
 
         assert "田中太郎" in result
@@ -109,7 +115,7 @@ class TestHandleEmergency:
         assert "特定できません" in result
 
     def test_handle_emergency_client_not_found(self):
-        with patch("app.agents.safety_first.run_query", return_value=[]):
+        with patch("app.lib.emergency.run_query", return_value=[]):
             result = handle_emergency("田中太郎さんがパニック中")
 
         assert "見つかりません" in result
@@ -118,17 +124,17 @@ class TestHandleEmergency:
     def test_handle_emergency_with_care_prefs(self):
         mock_records = [
             {
-                "c": {"name": "山田花子"},
+                "name": "山田花子",
                 "ng_actions": [],
-                "care_prefs": [
+                "care_preferences": [
                     {"category": "コミュニケーション", "instruction": "ゆっくり話す"},
                 ],
                 "key_persons": [],
-                "h": None,
-                "g": None,
+                "hospitals": [],
+                "guardian": None,
             }
         ]
-        with patch("app.agents.safety_first.run_query", return_value=mock_records):
+        with patch("app.lib.emergency.run_query", return_value=mock_records):
             result = handle_emergency("山田花子さんが倒れた")
 
         assert "推奨ケア" in result
@@ -137,36 +143,56 @@ class TestHandleEmergency:
     def test_handle_emergency_with_key_persons(self):
         mock_records = [
             {
-                "c": {"name": "佐藤一郎"},
+                "name": "佐藤一郎",
                 "ng_actions": [],
-                "care_prefs": [],
+                "care_preferences": [],
                 "key_persons": [
                     {"name": "佐藤花子", "relationship": "妻", "phone": "090-9999-8888"},
                 ],
-                "h": None,
-                "g": None,
+                "hospitals": [],
+                "guardian": None,
             }
         ]
-        with patch("app.agents.safety_first.run_query", return_value=mock_records):
+        with patch("app.lib.emergency.run_query", return_value=mock_records):
             result = handle_emergency("佐藤一郎さんが倒れた")
 
         assert "緊急連絡先" in result
         assert "佐藤花子" in result
         assert "妻" in result
 
+    def test_handle_emergency_lists_every_hospital(self):
+        mock_records = [
+            {
+                "name": "佐藤一郎",
+                "ng_actions": [],
+                "care_preferences": [],
+                "key_persons": [],
+                "hospitals": [
+                    {"name": "中央病院", "phone": "03-1111-1111"},
+                    {"name": "こころのクリニック", "phone": "03-2222-2222"},
+                ],
+                "guardian": None,
+            }
+        ]
+        with patch("app.lib.emergency.run_query", return_value=mock_records):
+            result = handle_emergency("佐藤一郎さんが倒れた")
+
+        assert "中央病院 TEL: 03-1111-1111" in result
+        assert "こころのクリニック TEL: 03-2222-2222" in result
+
     def test_handle_emergency_minimal_data(self):
         """Client exists but has no related data."""
         mock_records = [
             {
-                "c": {"name": "最小太郎"},
+                "name": "最小太郎",
                 "ng_actions": [],
-                "care_prefs": [],
+                "care_preferences": [],
                 "key_persons": [],
-                "h": None,
-                "g": None,
+                "hospitals": [],
+                "guardian": None,
             }
         ]
-        with patch("app.agents.safety_first.run_query", return_value=mock_records):
+        with patch("app.lib.emergency.run_query", return_value=mock_records):
             result = handle_emergency("最小太郎さんがパニック中")
 
         assert "最小太郎" in result
@@ -174,19 +200,19 @@ class TestHandleEmergency:
 
     def test_handle_emergency_2char_name(self):
         """2-character kanji name is extracted correctly."""
-        with patch("app.agents.safety_first.run_query", return_value=[]):
+        with patch("app.lib.emergency.run_query", return_value=[]):
             result = handle_emergency("田中さんが倒れた")
         assert "田中" in result
 
     def test_handle_emergency_3char_name(self):
         """3-character kanji name is extracted correctly."""
-        with patch("app.agents.safety_first.run_query", return_value=[]):
+        with patch("app.lib.emergency.run_query", return_value=[]):
             result = handle_emergency("長谷川さんが倒れた")
         assert "長谷川" in result
 
     def test_handle_emergency_4char_name(self):
         """4-character kanji name is extracted correctly."""
-        with patch("app.agents.safety_first.run_query", return_value=[]):
+        with patch("app.lib.emergency.run_query", return_value=[]):
             result = handle_emergency("西園寺太さんが倒れた")
         assert "西園寺太" in result
 
@@ -204,3 +230,64 @@ class TestHandleEmergency:
         """Single-character names (1 kanji) are not matched."""
         result = handle_emergency("張さんが倒れた")
         assert "特定できません" in result
+
+
+class TestScanWithRegisteredNames:
+    """One pass yields the crisis flag and the registered client."""
+
+    @pytest.fixture(autouse=True)
+    def _names(self, fresh_client_names):
+        rows = [
+            {"name": "田中太郎", "kana": "たなかたろう", "aliases": ["タロちゃん"]},
+            {"name": "山田 花子", "kana": "やまだはなこ", "aliases": None},
+            {"name": "田中", "kana": None, "aliases": None},
+        ]
+        with patch("app.lib.client_names.run_query", return_value=rows):
+            fresh_client_names.warm()
+        yield
+
+    def test_kana_name_and_crisis(self):
+        from app.agents.safety_first import scan
+
+        found = scan("タナカタロウが倒れた")
+        assert found.is_emergency
+        assert found.client == "田中太郎"
+
+    def test_alias_without_honorific(self):
+        from app.agents.safety_first import scan
+
+        assert scan("タロちゃん、発作が出ています").client == "田中太郎"
+
+    def test_longest_match_wins_at_same_position(self):
+        from app.agents.safety_first import scan
+
+        assert scan("田中太郎さんの件").client == "田中太郎"
+        assert scan("田中さんの件").client == "田中"
+
+    def test_name_written_without_space(self):
+        from app.agents.safety_first import scan
+
+        assert scan("山田花子さんが意識がない").client == "山田 花子"
+
+    def test_inquiry_still_suppresses_crisis(self):
+        from app.agents.safety_first import scan
+
+        found = scan("たなかたろうさんが倒れた時の対応を教えて")
+        assert found.crisis and found.inquiry
+        assert not found.is_emergency
+        assert found.client == "田中太郎"
+
+    def test_unregistered_name_falls_back_to_regex(self):
+        from app.agents.safety_first import scan
+
+        assert scan("長谷川さんが倒れた").client == "長谷川"
+
+    def test_client_write_refreshes_matcher(self):
+        from app.agents.safety_first import scan
+        from app.lib.client_names import _on_write
+
+        rows = [{"name": "佐藤一郎", "kana": "さとういちろう", "aliases": ["いっちゃん"]}]
+        with patch("app.lib.client_names.run_query", return_value=rows):
+            _on_write({"Client"}, {"佐藤一郎"})
+        assert scan("いっちゃんが倒れた").client == "佐藤一郎"
+        assert scan("タナカタロウ").client == "田中太郎"
@@ -15,6 +15,10 @@ def client():
     with patch("app.lib.db_operations.get_driver") as mock_get_driver:
         mock_driver = MagicMock()
         mock_driver.verify_connectivity = MagicMock()
+        # Startup queries against the mock must not look like writes (they would
+        # notify the write listeners and start background cache refreshes)
+        session = mock_driver.session.return_value.__enter__.return_value
+        session.run.return_value.consume.return_value.counters.contains_updates = False
         mock_get_driver.return_value = mock_driver
 
         from app.main import app
@@ -22,6 +26,35 @@ def client():
             yield c
 
 
+@pytest.fixture
+def offline_client():
+    """TestClient over the fake LLM and a seeded in-memory graph (no mocks)."""
+    from app.agents.gemini_agent import reset_model_pool
+    from app.config import settings
+    from app.lib import client_names, emergency, fake_llm, graph_overview, kana_index, memory_graph, stats
+
+    def reset():
+        reset_model_pool()
+        memory_graph.reset()
+        fake_llm.reset()
+        for module in (client_names, emergency, graph_overview, kana_index, stats):
+            module.reset()
+
+    with patch.multiple(
+        settings,
+        llm_backend="fake",
+        graph_backend="memory",
+        fake_latency_ms=0,
+        fake_latency_jitter_ms=0,
+        memory_graph_clients=10,
+    ), patch("app.lib.db_operations._driver", None):
+        reset()
+        from app.main import app
+        with TestClient(app) as c:
+            yield c
+        reset()
+
+
 @pytest.fixture
 def mock_db():
     """Mock run_query to return empty results by default."""
@@ -36,6 +69,69 @@ def mock_db_unavailable():
         yield
 
 
+@pytest.fixture
+def fresh_stats():
+    """Reset the materialized dashboard/graph stats projection around a test."""
+    from app.lib import stats
+    stats.reset()
+    yield stats
+    stats.reset()
+
+
+@pytest.fixture(autouse=True)
+def extraction_cache(tmp_path):
+    """Point the LLM extraction cache at a per-test SQLite file."""
+    from app.lib.extraction_cache import ExtractionCache
+    cache = ExtractionCache(tmp_path / "extraction.sqlite3", ttl_seconds=3600, max_entries=100)
+    with patch("app.agents.gemini_agent._extraction_cache", cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def response_cache():
+    """Give each test an empty chat answer cache."""
+    from app.lib.response_cache import ResponseCache
+    cache = ResponseCache()
+    with patch("app.agents.gemini_agent._response_cache", cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def rate_limits():
+    """Start each test with fresh (unthrottled) rate-limit governors."""
+    from app.lib import rate_limit
+    rate_limit.reset()
+    yield rate_limit
+    rate_limit.reset()
+
+
+@pytest.fixture
+def fresh_kana_index():
+    """Reset the in-memory kana similarity index around a test."""
+    from app.lib import kana_index
+    kana_index.reset()
+    yield kana_index
+    kana_index.reset()
+
+
+@pytest.fixture
+def fresh_emergency():
+    """Reset the in-memory emergency bundle store around a test."""
+    from app.lib import emergency
+    emergency.reset()
+    yield emergency
+    emergency.reset()
+
+
+@pytest.fixture
+def fresh_client_names():
+    """Reset the registered client-name table around a test."""
+    from app.lib import client_names
+    client_names.reset()
+    yield client_names
+    client_names.reset()
+
+
 @pytest.fixture
 def sample_client_row():
     """Minimal client row as returned by a list query."""
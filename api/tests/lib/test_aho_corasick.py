@@ -0,0 +1,39 @@
+"""Tests for app.lib.aho_corasick"""
+
+import random
+
+from app.lib.aho_corasick import AhoCorasick
+
+
+def _naive(patterns, text):
+    return sorted(
+        (i, i + len(p), v)
+        for p, v in patterns
+        for i in range(len(text) - len(p) + 1)
+        if p and text.startswith(p, i)
+    )
+
+
+class TestAhoCorasick:
+    def test_overlapping_patterns(self):
+        patterns = [("he", 1), ("she", 2), ("his", 3), ("hers", 4)]
+        matches = list(AhoCorasick(patterns).iter("ushers"))
+        assert [(m.start, m.end, m.value) for m in matches] == [(1, 4, 2), (2, 4, 1), (2, 6, 4)]
+
+    def test_duplicate_pattern_yields_every_value(self):
+        automaton = AhoCorasick([("たなか", "田中太郎"), ("たなか", "田中花子"), ("", "ignored")])
+        assert sorted(m.value for m in automaton.iter("たなかさん")) == ["田中太郎", "田中花子"]
+        assert automaton.size == 2
+
+    def test_matches_naive_search(self):
+        rng = random.Random(3)
+        alphabet = "あいうアイ倒れ"
+        patterns = [("".join(rng.choices(alphabet, k=rng.randint(1, 4))), i) for i in range(40)]
+        automaton = AhoCorasick(patterns)
+        for _ in range(50):
+            text = "".join(rng.choices(alphabet, k=rng.randint(0, 60)))
+            got = sorted((m.start, m.end, m.value) for m in automaton.iter(text))
+            assert got == _naive(patterns, text)
+
+    def test_no_patterns(self):
+        assert list(AhoCorasick([]).iter("anything")) == []
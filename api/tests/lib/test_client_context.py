@@ -0,0 +1,122 @@
+"""Tests for app.lib.client_context (per-session profile bundles)"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+from app.agents.gemini_agent import (
+    search_client_info,
+    search_emergency_contacts,
+    search_hospital,
+    search_ng_actions,
+)
+from app.lib import client_context
+from app.lib.client_context import ClientContext, _on_write
+
+
+def _row(name="田中太郎", **sections):
+    row = {
+        "name": name, "dob": "1990-01-01", "bloodType": "A", "conditions": ["てんかん"],
+        "ng_actions": [{"action": "大声", "reason": None, "riskLevel": "Panic"}],
+        "care_preferences": [], "hospitals": [{"name": "中央病院", "phone": "03", "address": None}],
+        "guardians": [], "contacts": [
+            {"name": "田中次郎", "relationship": "兄", "phone": "090", "rank": None},
+            {"name": "田中花子", "relationship": "母", "phone": "080", "rank": 1},
+        ],
+    }
+    row.update(sections)
+    return row
+
+
+def _fake_db(rows_by_name):
+    def run_query(query, params=None):
+        if "CONTAINS" in query:
+            return [{"name": n} for n in rows_by_name if params["partial"] in n]
+        row = rows_by_name.get(params["name"])
+        return [row] if row else []
+    return run_query
+
+
+class TestClientContext:
+    def test_emergency_turn_is_one_round_trip(self):
+        context = ClientContext()
+        with patch("app.lib.client_context.run_query", side_effect=_fake_db({"田中太郎": _row()})) as rq:
+            client_context.activate(context)
+            try:
+                search_ng_actions("田中太郎")
+                search_emergency_contacts("田中太郎")
+                contacts = json.loads(search_emergency_contacts("田中太郎"))["contacts"]
+                search_hospital("田中太郎")
+            finally:
+                client_context._current.set(None)
+        assert rq.call_count == 1
+        assert [c["name"] for c in contacts] == ["田中花子", "田中次郎"]
+
+    def test_write_for_client_invalidates_only_that_client(self):
+        context = ClientContext()
+        db = {"田中太郎": _row(), "佐藤一郎": _row("佐藤一郎")}
+        with patch("app.lib.client_context.run_query", side_effect=_fake_db(db)) as rq:
+            context.lookup("田中太郎")
+            context.lookup("佐藤一郎")
+            _on_write({"NgAction"}, {"田中太郎"})
+            context.lookup("田中太郎")
+            context.lookup("佐藤一郎")
+        assert rq.call_count == 3
+
+    def test_bundle_is_refetched_after_max_age(self):
+        now = [0.0]
+        context = ClientContext(clock=lambda: now[0])
+        with patch("app.lib.client_context.run_query", side_effect=_fake_db({"田中太郎": _row()})) as rq:
+            context.lookup("田中太郎")
+            now[0] = client_context._MAX_AGE_SECONDS
+            context.lookup("田中太郎")
+            assert rq.call_count == 1
+            # Another process may have written since: no notification, so go by age
+            now[0] = client_context._MAX_AGE_SECONDS + 1
+            context.lookup("田中太郎")
+        assert rq.call_count == 2
+
+    def test_unknown_write_invalidates_everything(self):
+        context = ClientContext()
+        with patch("app.lib.client_context.run_query", side_effect=_fake_db({"田中太郎": _row()})) as rq:
+            context.lookup("田中太郎")
+            _on_write(None, None)
+            context.lookup("田中太郎")
+            _on_write({"SupportLog"}, None)  # not part of the bundle
+            context.lookup("田中太郎")
+        assert rq.call_count == 2
+
+    def test_partial_match_suggestion_cached_under_requested_name(self):
+        context = ClientContext()
+        with patch("app.lib.client_context.run_query", side_effect=_fake_db({"田中太郎": _row()})) as rq:
+            first = context.lookup("田中")
+            second = context.lookup("田中")
+        profile, note = second
+        assert first == second
+        assert profile["name"] == "田中太郎"
+        assert "田中太郎" in note
+        assert rq.call_count == 3  # exact miss, partial, profile
+
+        with patch("app.lib.client_context.run_query", side_effect=_fake_db({"田中太郎": _row()})):
+            _on_write({"Client"}, {"田中太郎"})
+            assert context.lookup("田中") == first
+        assert context.fetches == 2
+
+    def test_context_propagates_to_tool_threads(self):
+        context = ClientContext()
+
+        async def turn():
+            client_context.activate(context)
+            await asyncio.to_thread(search_client_info, "田中太郎")
+            await asyncio.to_thread(search_client_info, "田中太郎")
+
+        with patch("app.lib.client_context.run_query", side_effect=_fake_db({"田中太郎": _row()})) as rq:
+            asyncio.run(turn())
+        assert rq.call_count == 1
+        assert client_context._current.get() is None
+
+    def test_without_active_context_each_call_fetches(self):
+        with patch("app.lib.client_context.run_query", side_effect=_fake_db({"田中太郎": _row()})) as rq:
+            search_client_info("田中太郎")
+            search_client_info("田中太郎")
+        assert rq.call_count == 2
@@ -0,0 +1,104 @@
+"""Tests for the compact columnar wire format."""
+
+import gzip
+import json
+from unittest.mock import MagicMock, patch
+
+from app.lib import compact
+from app.schemas.ecomap import EcomapData, EcomapEdge, EcomapNode
+from app.schemas.graph import GraphEdge, GraphExploreResponse, GraphNode
+
+
+def _request(accept: str = "", accept_encoding: str = ""):
+    req = MagicMock()
+    req.headers = {"accept": accept, "accept-encoding": accept_encoding}
+    return req
+
+
+GRAPH = GraphExploreResponse(
+    nodes=[
+        GraphNode(id="4:abc:1", label="Client", name="田中", properties={"name": "田中", "dob": "1990"}),
+        GraphNode(id="4:abc:2", label="NgAction", name="大声", properties={"action": "大声"}),
+        GraphNode(id="4:abc:3", label="NgAction", name="暗所", properties={"action": "暗所"}),
+    ],
+    edges=[
+        GraphEdge(id="5:abc:1", source="4:abc:1", target="4:abc:2", type="MUST_AVOID", properties={}),
+        GraphEdge(id="5:abc:2", source="4:abc:1", target="4:abc:3", type="MUST_AVOID", properties={}),
+        GraphEdge(id="5:abc:3", source="4:abc:1", target="4:zzz:9", type="MUST_AVOID", properties={}),
+    ],
+    truncated=True,
+)
+
+
+class TestEncodeGraph:
+    def test_labels_and_types_are_dictionary_encoded(self):
+        out = compact.encode_graph(GRAPH)
+        assert out["labels"] == ["Client", "NgAction"]
+        assert out["nodes"]["label"] == [0, 1, 1]
+        assert out["types"] == ["MUST_AVOID"]
+        assert out["truncated"] is True
+
+    def test_edges_reference_node_positions(self):
+        out = compact.encode_graph(GRAPH)
+        # The edge to a node outside the payload is dropped
+        assert out["edges"]["source"] == [0, 0]
+        assert out["edges"]["target"] == [1, 2]
+
+    def test_properties_use_key_indices(self):
+        out = compact.encode_graph(GRAPH)
+        keys = out["keys"]
+        props = out["nodes"]["props"][0]
+        decoded = {keys[props[i]]: props[i + 1] for i in range(0, len(props), 2)}
+        assert decoded == {"name": "田中", "dob": "1990"}
+
+
+class TestEncodeEcomap:
+    def test_colors_sent_once_per_category(self):
+        data = EcomapData(
+            client_name="田中", template="full_view",
+            nodes=[
+                EcomapNode(id="client", label="田中", node_label="Client", category="client", color="#111", properties={}),
+                EcomapNode(id="ng-1", label="a", node_label="NgAction", category="ngActions", color="#222", properties={}),
+                EcomapNode(id="ng-2", label="b", node_label="NgAction", category="ngActions", color="#222", properties={}),
+            ],
+            edges=[
+                EcomapEdge(source="client", target="ng-1", label="MUST_AVOID"),
+                EcomapEdge(source="client", target="ng-2", label="MUST_AVOID"),
+            ],
+        )
+        out = compact.encode_ecomap(data)
+        assert out["categories"] == ["client", "ngActions"]
+        assert out["colors"] == ["#111", "#222"]
+        assert out["nodes"]["category"] == [0, 1, 1]
+        assert out["edges"] == {"source": [0, 0], "target": [1, 2], "label": [0, 0]}
+
+
+class TestRender:
+    def test_plain_json_without_accept_encoding(self):
+        resp = compact.render({"v": 1}, _request())
+        assert resp.media_type == "application/json"
+        assert json.loads(resp.body) == {"v": 1}
+        assert "content-encoding" not in resp.headers
+
+    def test_gzip_when_accepted_and_large(self):
+        payload = {"names": ["田中太郎"] * 200}
+        resp = compact.render(payload, _request(accept_encoding="gzip, deflate"))
+        assert resp.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(resp.body)) == payload
+
+    def test_small_bodies_not_compressed(self):
+        resp = compact.render({"v": 1}, _request(accept_encoding="gzip"))
+        assert "content-encoding" not in resp.headers
+
+    def test_msgpack_falls_back_to_json_when_unavailable(self):
+        with patch("app.lib.compact._msgpack", return_value=None):
+            resp = compact.render({"v": 1}, _request(accept=compact.MSGPACK_MEDIA_TYPE))
+        assert resp.media_type == "application/json"
+
+    def test_msgpack_when_available(self):
+        packer = MagicMock()
+        packer.packb.return_value = b"\x81\xa1v\x01"
+        with patch("app.lib.compact._msgpack", return_value=packer):
+            resp = compact.render({"v": 1}, _request(accept=compact.MSGPACK_MEDIA_TYPE))
+        assert resp.media_type == compact.MSGPACK_MEDIA_TYPE
+        assert resp.body == b"\x81\xa1v\x01"
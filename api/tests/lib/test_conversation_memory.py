@@ -0,0 +1,122 @@
+"""Tests for app.lib.conversation_memory (bounded, summarized chat context)"""
+
+import asyncio
+
+from app.lib.chunking import count_tokens_approximate
+from app.lib.conversation_memory import ConversationMemory, Turn, extractive_summary
+
+
+def _turn(i: int) -> tuple[str, str]:
+    return f"質問{i}：田中さんの支援記録を教えてください", f"回答{i}：" + "記録があります。" * 10
+
+
+class TestWindow:
+    def test_window_stays_within_budget(self):
+        memory = ConversationMemory(token_budget=300, summary_budget=100)
+        for i in range(50):
+            memory.add_turn(*_turn(i))
+            assert memory.report()["window_tokens"] <= 300
+            assert memory.context_tokens() <= 300 + 100 + 20
+
+        messages = memory.context_messages()
+        assert messages[-1]["content"].startswith("回答49")
+        assert memory.summarized_turns + memory.report()["window_turns"] == 50
+
+    def test_newest_turn_kept_even_when_oversized(self):
+        memory = ConversationMemory(token_budget=10)
+        memory.add_turn("長い質問", "とても長い回答" * 50)
+        assert len(memory.context_messages()) == 2
+
+    def test_pins_and_summary_in_system_context(self):
+        memory = ConversationMemory(token_budget=100)
+        assert memory.system_context() is None
+        memory.pin("対象クライアント", "田中太郎")
+        for i in range(5):
+            memory.add_turn(*_turn(i))  # no running loop: folded synchronously
+
+        context = memory.system_context()
+        assert context.index("田中太郎") < context.index("これまでの会話の要約")
+        assert "質問0" in context
+
+
+class TestSummarization:
+    def test_background_summary_folds_evicted_turns(self):
+        calls = []
+
+        async def summarize(summary: str, turns: list[Turn]) -> str:
+            calls.append([t.user for t in turns])
+            await asyncio.sleep(0)
+            return (summary + " / " if summary else "") + f"{len(turns)}件の相談"
+
+        async def run():
+            memory = ConversationMemory(token_budget=150, summary_budget=100, summarize=summarize)
+            for i in range(6):
+                memory.add_turn(*_turn(i))
+            # Until the summarizer finishes, evicted turns appear as an excerpt
+            assert "質問4" in memory.summary
+            await memory.wait_for_summary()
+            return memory
+
+        memory = asyncio.run(run())
+        assert calls
+        assert sum(len(c) for c in calls) == memory.summarized_turns
+        assert memory.summary.endswith("件の相談")
+        assert memory.report()["summary_failures"] == 0
+
+    def test_summarizer_failure_falls_back_to_excerpt(self):
+        async def summarize(summary, turns):
+            raise RuntimeError("model unavailable")
+
+        async def run():
+            memory = ConversationMemory(token_budget=150, summarize=summarize)
+            for i in range(4):
+                memory.add_turn(*_turn(i))
+            await memory.wait_for_summary()
+            return memory
+
+        memory = asyncio.run(run())
+        assert memory.report()["summary_failures"] >= 1
+        assert "質問0" in memory.summary
+
+    def test_summary_is_truncated_to_budget(self):
+        memory = ConversationMemory(token_budget=50, summary_budget=40)
+        for i in range(30):
+            memory.add_turn(*_turn(i))
+        assert count_tokens_approximate(memory.summary) <= 41  # plus the ellipsis
+        assert "質問" in memory.summary
+
+    def test_aclose_cancels_running_summary(self):
+        async def run():
+            gate = asyncio.Event()
+
+            async def summarize(summary, turns):
+                gate.set()
+                await asyncio.Event().wait()
+
+            memory = ConversationMemory(token_budget=100, summarize=summarize)
+            for i in range(4):
+                memory.add_turn(*_turn(i))
+            await gate.wait()
+            await memory.aclose()
+            return memory
+
+        memory = asyncio.run(run())
+        assert memory.summarized_turns == 0
+
+
+def test_extractive_summary_keeps_user_excerpts():
+    turns = [Turn("田中さん　が\nパニック", "対応しました", 10)]
+    assert extractive_summary("前回まで", turns) == "前回まで\n- 田中さん が パニック"
+
+
+def test_report_aggregates_turn_stats():
+    memory = ConversationMemory()
+    memory.record_stats(100, 800, 500, 20)
+    memory.record_stats(120, 1200, None, None)
+    memory.record_stats(110, 900, 520, 25)
+    report = memory.report()
+    assert report["turns"] == 3
+    assert report["latency_ms_p50"] == 900
+    assert report["latency_ms_max"] == 1200
+    assert report["context_tokens_max"] == 120
+    assert report["input_tokens"] == 1020
@@ -265,6 +265,25 @@ class TestRegisterToDatabaseValidation:
         assert "registered_types" in result
         assert isinstance(result["registered_types"], list)
 
+    def test_node_ids_aligned_with_input_nodes(self):
+        mock_driver = _make_mock_driver()
+        session = mock_driver.session.return_value
+        result_mock = MagicMock()
+        result_mock.single.side_effect = [{"id": "4:x:1"}, {"id": "4:x:2"}]
+        session.run = MagicMock(return_value=result_mock)
+        graph = {
+            "nodes": [
+                {"temp_id": "c1", "label": "Client", "properties": {"name": "テスト"}},
+                {"temp_id": "bad", "label": "INVALID_LABEL", "properties": {"name": "x"}},
+                {"temp_id": "ng1", "label": "NgAction", "properties": {"action": "大声"}},
+            ],
+            "relationships": [],
+        }
+        with patch("app.lib.db_operations.get_driver", return_value=mock_driver):
+            result = register_to_database(graph)
+        assert result["node_ids"] == ["4:x:1", None, "4:x:2"]
+        assert "elementId(n) AS id" in session.run.call_args_list[0].args[0]
+
     def test_driver_error_returns_error_status(self):
         mock_driver = MagicMock()
         mock_driver.session.side_effect = Exception("Connection refused")
@@ -610,6 +629,7 @@ class TestClientKanaAutoGeneration:
         extra_props = merge_call.args[1]["extra_props"]
         assert "kana" in extra_props
         assert extra_props["kana"] == "たなかたろう"
+        assert extra_props["kanaRow"] == "た"
 
     def test_client_preserves_existing_kana(self):
         mock_driver = _make_mock_driver()
@@ -688,3 +708,102 @@ class TestCertificateCompositeMerge:
         calls = mock_session.run.call_args_list
         merge_call = [c for c in calls if "Certificate" in str(c.args[0]) and "MERGE" in str(c.args[0])][0]
         assert merge_call.args[1]["type"] == "療育手帳"
+
+
+# ---------------------------------------------------------------------------
+# Write listeners
+# ---------------------------------------------------------------------------
+
+class TestWriteListeners:
+    @pytest.fixture(autouse=True)
+    def _isolated_listeners(self):
+        # Read caches subscribe at import time; keep them out of these assertions
+        with patch("app.lib.db_operations._write_listeners", []):
+            yield
+
+    def test_register_notifies_labels_and_clients(self):
+        from app.lib.db_operations import add_write_listener, remove_write_listener
+
+        events = []
+        listener = lambda labels, clients: events.append((labels, clients))  # noqa: E731
+        add_write_listener(listener)
+        try:
+            graph = {
+                "nodes": [
+                    {"temp_id": "c1", "label": "Client", "properties": {"name": "田中太郎さん"}},
+                    {"temp_id": "n1", "label": "NgAction", "properties": {"action": "大声"}},
+                ],
+                "relationships": [
+                    {"source_temp_id": "c1", "target_temp_id": "n1", "type": "MUST_AVOID"},
+                ],
+            }
+            with patch("app.lib.db_operations.get_driver", return_value=_make_mock_driver()):
+                register_to_database(graph)
+        finally:
+            remove_write_listener(listener)
+
+        assert events == [({"Client", "NgAction"}, {"田中太郎"})]
+
+    def test_shared_node_update_notifies_its_other_clients(self):
+        from app.lib.db_operations import add_write_listener, remove_write_listener
+        from app.lib.memory_graph import MemoryDriver, MemoryGraph
+
+        store = MemoryGraph()
+        store.run(
+            "CREATE (:Client {name: '佐藤一郎'})-[:TREATED_AT]->(:Hospital {name: '中央病院', phone: '03-0000-0000'})"
+        )
+        events = []
+        listener = lambda labels, clients: events.append((labels, clients))  # noqa: E731
+        add_write_listener(listener)
+        try:
+            graph = {
+                "nodes": [
+                    {"temp_id": "c1", "label": "Client", "properties": {"name": "田中太郎"}},
+                    {"temp_id": "h1", "label": "Hospital", "properties": {"name": "中央病院", "phone": "03-1111-1111"}},
+                ],
+                "relationships": [
+                    {"source_temp_id": "c1", "target_temp_id": "h1", "type": "TREATED_AT"},
+                ],
+            }
+            with patch("app.lib.db_operations.get_driver", return_value=MemoryDriver(store)):
+                register_to_database(graph)
+        finally:
+            remove_write_listener(listener)
+
+        assert events == [({"Client", "Hospital"}, {"田中太郎", "佐藤一郎"})]
+
+    def test_run_query_write_notifies_referenced_labels(self):
+        from app.lib.db_operations import add_write_listener, remove_write_listener, run_query
+
+        events = []
+        listener = lambda labels, clients: events.append((labels, clients))  # noqa: E731
+        add_write_listener(listener)
+        mock_driver = _make_mock_driver()
+        session = mock_driver.session.return_value
+        session.run.return_value = MagicMock(__iter__=lambda self: iter([]))
+        try:
+            with patch("app.lib.db_operations.get_driver", return_value=mock_driver):
+                run_query("MATCH (c:Client {name: $name}) SET c.dob = $dob", {"name": "x"})
+        finally:
+            remove_write_listener(listener)
+
+        assert events == [({"Client"}, None)]
+
+
+# ---------------------------------------------------------------------------
+# Client kana backfill
+# ---------------------------------------------------------------------------
+
+class TestBackfillClientKana:
+    def test_nameless_client_is_keyed_and_not_revisited(self):
+        from app.lib.db_operations import backfill_client_kana
+        from app.lib.memory_graph import MemoryDriver, MemoryGraph
+
+        graph = MemoryGraph()
+        graph.run("CREATE (:Client {dob: '1990-01-01'}), (:Client {name: '田中太郎'}), (:Client {dob: '1985-05-05'})")
+        with patch("app.lib.db_operations.get_driver", return_value=MemoryDriver(graph)):
+            # Full batches: a row that is never updated would come back forever
+            assert backfill_client_kana(batch_size=1) == 3
+
+        rows, _ = graph.run("MATCH (c:Client) RETURN c.name AS name, c.kanaRow AS row ORDER BY name")
+        assert rows == [{"name": "田中太郎", "row": "た"}, {"name": None, "row": ""}, {"name": None, "row": ""}]
@@ -219,7 +219,73 @@ class TestFindSemanticDuplicates:
         assert result == []
 
 
+class TestFindSemanticDuplicatesBatch:
+    """Tests for find_semantic_duplicates_batch() — one embedding call, one query per index."""
+
+    @pytest.mark.asyncio
+    async def test_one_embedding_call_and_one_query_per_index(self):
+        from unittest.mock import AsyncMock, patch
+        from app.lib.dedup import SemanticQuery, find_semantic_duplicates_batch
+
+        queries = [
+            SemanticQuery("大声", "NgAction", "ng_action_embedding"),
+            SemanticQuery("ゆっくり話す", "CarePreference", "care_preference_embedding", threshold=0.9),
+            SemanticQuery("大声", "NgAction", "ng_action_embedding"),
+            SemanticQuery("", "NgAction", "ng_action_embedding"),
+        ]
+
+        def fake_query(cypher, params):
+            if params["index_name"] == "ng_action_embedding":
+                assert [item["i"] for item in params["items"]] == [0, 2]
+                return [
+                    {"i": 0, "text": "大きな声", "score": 0.93, "nodeId": "4:a:1"},
+                    {"i": 2, "text": "大きな声", "score": 0.93, "nodeId": "4:a:1"},
+                ]
+            return [{"i": 1, "text": "ゆっくり", "score": 0.88, "nodeId": "4:a:2"}]
+
+        embed = AsyncMock(return_value=[[0.1] * 768, [0.2] * 768])
+        with (
+            patch("app.lib.dedup.embed_texts_batch", new=embed),
+            patch("app.lib.dedup.run_query", side_effect=fake_query) as mock_query,
+        ):
+            result = await find_semantic_duplicates_batch(queries)
+
+        embed.assert_awaited_once()
+        assert sorted(embed.call_args.args[0]) == ["ゆっくり話す", "大声"]
+        assert mock_query.call_count == 2
+        assert "UNWIND $items" in mock_query.call_args_list[0].args[0]
+        assert result[0] == [{"text": "大きな声", "score": 0.93, "nodeId": "4:a:1"}]
+        assert result[1] == []  # below the query's own threshold
+        assert result[2] == result[0]
+        assert result[3] == []
+
+    @pytest.mark.asyncio
+    async def test_failed_index_query_yields_empty_lists(self):
+        from unittest.mock import AsyncMock, patch
+        from app.lib.dedup import SemanticQuery, find_semantic_duplicates_batch
+
+        with (
+            patch("app.lib.dedup.embed_texts_batch", new=AsyncMock(return_value=[[0.1] * 768])),
+            patch("app.lib.dedup.run_query", side_effect=RuntimeError("Neo4j error")),
+        ):
+            result = await find_semantic_duplicates_batch([SemanticQuery("大声", "NgAction", "ng_action_embedding")])
+        assert result == [[]]
+
+    @pytest.mark.asyncio
+    async def test_no_texts_skips_embedding(self):
+        from unittest.mock import AsyncMock, patch
+        from app.lib.dedup import find_semantic_duplicates_batch
+
+        with patch("app.lib.dedup.embed_texts_batch", new=AsyncMock()) as embed:
+            assert await find_semantic_duplicates_batch([]) == []
+        embed.assert_not_called()
+
+
 class TestFindSimilarByKana:
+    @pytest.fixture(autouse=True)
+    def _fresh_index(self, fresh_kana_index):
+        yield
+
     def test_finds_exact_kana_match(self):
         from app.lib.dedup import find_similar_by_kana
 
@@ -228,7 +294,7 @@ class TestFindSimilarByKana:
         mock_rows = [
             {"name": "田中太郎", "kana": "たなかたろう", "nodeId": "4:abc:1"},
         ]
-        with patch("app.lib.dedup.run_query", return_value=mock_rows):
+        with patch("app.lib.kana_index.run_query", return_value=mock_rows):
             result = find_similar_by_kana("田中太郎")  # exact same name → exact kana match
         assert len(result) == 1
         assert result[0]["name"] == "田中太郎"
@@ -242,7 +308,7 @@ class TestFindSimilarByKana:
             {"name": "田中太郎", "kana": "たなかたろう", "nodeId": "4:abc:1"},
             {"name": "佐藤花子", "kana": "さとうはなこ", "nodeId": "4:abc:2"},
         ]
-        with patch("app.lib.dedup.run_query", return_value=mock_rows):
+        with patch("app.lib.kana_index.run_query", return_value=mock_rows):
             result = find_similar_by_kana("田中次郎")  # たなかじろう - similar
         # 田中太郎 should be found (たなかたろう vs たなかじろう = high similarity)
         assert len(result) >= 1
@@ -254,7 +320,7 @@ class TestFindSimilarByKana:
         mock_rows = [
             {"name": "佐藤花子", "kana": "さとうはなこ", "nodeId": "4:abc:1"},
         ]
-        with patch("app.lib.dedup.run_query", return_value=mock_rows):
+        with patch("app.lib.kana_index.run_query", return_value=mock_rows):
             result = find_similar_by_kana("山田健太", threshold=0.9)
         assert result == []
 
@@ -269,7 +335,7 @@ class TestFindSimilarByKana:
     def test_handles_db_error_gracefully(self):
         from app.lib.dedup import find_similar_by_kana
 
-        with patch("app.lib.dedup.run_query", side_effect=Exception("DB error")):
+        with patch("app.lib.kana_index.run_query", side_effect=Exception("DB error")):
             result = find_similar_by_kana("田中太郎")
         assert result == []
 
@@ -280,7 +346,7 @@ class TestFindSimilarByKana:
             {"name": f"田中{i}郎", "kana": f"たなか{chr(0x305F + i)}ろう", "nodeId": f"4:abc:{i}"}
             for i in range(10)
         ]
-        with patch("app.lib.dedup.run_query", return_value=mock_rows):
+        with patch("app.lib.kana_index.run_query", return_value=mock_rows):
             result = find_similar_by_kana("田中太郎", limit=3)
         assert len(result) <= 3
 
@@ -291,7 +357,7 @@ class TestFindSimilarByKana:
             {"name": "田中太郎", "kana": "たなかたろう", "nodeId": "4:abc:1"},
             {"name": "田中次郎", "kana": "たなかじろう", "nodeId": "4:abc:2"},
         ]
-        with patch("app.lib.dedup.run_query", return_value=mock_rows):
+        with patch("app.lib.kana_index.run_query", return_value=mock_rows):
             result = find_similar_by_kana("田中太郎")
         if len(result) >= 2:
             assert result[0]["similarity"] >= result[1]["similarity"]
@@ -299,7 +365,7 @@ class TestFindSimilarByKana:
     def test_rejects_invalid_label(self):
         from app.lib.dedup import find_similar_by_kana
 
-        with patch("app.lib.dedup.run_query") as mock_query:
+        with patch("app.lib.kana_index.run_query") as mock_query:
             result = find_similar_by_kana("田中太郎", label="Client; DROP TABLE")
         assert result == []
         mock_query.assert_not_called()
@@ -311,6 +377,6 @@ class TestFindSimilarByKana:
             {"name": "田中太郎", "kana": None, "nodeId": "4:abc:1"},
             {"name": "佐藤花子", "kana": "", "nodeId": "4:abc:2"},
         ]
-        with patch("app.lib.dedup.run_query", return_value=mock_rows):
+        with patch("app.lib.kana_index.run_query", return_value=mock_rows):
             result = find_similar_by_kana("田中太郎")
         assert result == []
@@ -0,0 +1,105 @@
+"""Tests for app.lib.duplicate_detection (MinHash/LSH + union-find clustering)"""
+
+import random
+from difflib import SequenceMatcher
+
+from app.lib.duplicate_detection import (
+    UnionFind,
+    _score_pairs,
+    cluster_pairs,
+    cluster_similar_strings,
+    lsh_candidates,
+    minhash,
+)
+
+_KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわん"
+_FAMILY = ["たなか", "さとう", "すずき", "たかはし", "わたなべ", "やまもと", "なかむら", "こばやし"]
+_GIVEN = ["たろう", "はなこ", "ゆうき", "さくら", "けんた", "だいすけ", "しょうた", "ななみ"]
+
+
+def _names(n: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    names = []
+    for _ in range(n):
+        kana = rng.choice(_FAMILY) + rng.choice(_GIVEN)
+        for _ in range(rng.randint(0, 2)):
+            pos = rng.randrange(len(kana))
+            kana = kana[:pos] + rng.choice(_KANA) + kana[pos + 1:]
+        names.append(kana)
+    return names
+
+
+class TestUnionFind:
+    def test_groups_only_multi_member_sets(self):
+        uf = UnionFind()
+        uf.union("a", "b")
+        uf.union("c", "b")
+        uf.find("d")
+        uf.union("e", "f")
+        assert uf.groups() == [["a", "b", "c"], ["e", "f"]]
+
+    def test_union_is_idempotent(self):
+        uf = UnionFind()
+        uf.union(1, 2)
+        uf.union(2, 1)
+        assert uf.groups() == [[1, 2]]
+
+
+class TestMinHash:
+    def test_signature_is_deterministic(self):
+        assert minhash("やまだたろう") == minhash("やまだたろう")
+        assert len(minhash("やまだたろう", num_perm=32)) == 32
+
+    def test_near_duplicates_share_a_band(self):
+        sigs = {"a": minhash("やまだたろう"), "b": minhash("やまだたろお"), "c": minhash("すずきはなこ")}
+        candidates = lsh_candidates(sigs)
+        assert ("a", "b") in candidates
+        assert ("a", "c") not in candidates
+
+
+class TestScorePairs:
+    def test_count_filter_is_lossless(self):
+        names = sorted(set(_names(300)))
+        pairs = [(a, b) for i, a in enumerate(names) for b in names[i + 1:]]
+        expected = {
+            (a, b) for a, b in pairs if SequenceMatcher(None, a, b).ratio() >= 0.8
+        }
+        assert {(a, b) for a, b, _ in _score_pairs(pairs, 0.8)} == expected
+
+
+class TestClusterSimilarStrings:
+    def test_exact_and_similar_texts_cluster(self):
+        clusters, ratios = cluster_similar_strings(
+            [(1, "やまだたろう"), (2, "やまだたろう"), (3, "やまだたろー"), (4, "すずきはなこ"), (5, "")],
+            threshold=0.8,
+        )
+        assert clusters == [[1, 2, 3]]
+        assert ratios == {("やまだたろう", "やまだたろー"): 0.833}
+
+    def test_matches_brute_force_on_synthetic_names(self):
+        names = _names(600)
+        items = list(enumerate(names))
+        clusters, _ = cluster_similar_strings(items, threshold=0.9)
+
+        uf = UnionFind()
+        distinct = sorted(set(names))
+        first = {}
+        for i, name in items:
+            uf.find(i)
+            first.setdefault(name, i)
+            uf.union(first[name], i)
+        for i, a in enumerate(distinct):
+            for b in distinct[i + 1:]:
+                if SequenceMatcher(None, a, b).ratio() >= 0.9:
+                    uf.union(first[a], first[b])
+        assert clusters == uf.groups()
+
+
+class TestClusterPairs:
+    def test_combines_scored_pairs_and_groups(self):
+        clusters = cluster_pairs(
+            [("a", "b", 0.95), ("b", "c", 0.5), ("d", "e", 0.91)],
+            threshold=0.9,
+            groups=[["c", "x"], ["y"]],
+        )
+        assert clusters == [["a", "b"], ["c", "x"], ["d", "e"]]
@@ -9,3 +9,31 @@ def test_vector_indexes_defined():
     assert "support_log_vector_index" in VECTOR_INDEXES
     assert "ng_action_embedding" in VECTOR_INDEXES
     assert "client_summary_embedding" in VECTOR_INDEXES
+
+
+def test_embed_texts_batch_single_request_aligned_results():
+    import asyncio
+    from unittest.mock import MagicMock, patch
+    from app.lib.embedding import embed_texts_batch
+
+    client = MagicMock()
+    client.models.embed_content.return_value = MagicMock(
+        embeddings=[MagicMock(values=[1.0]), MagicMock(values=[2.0])]
+    )
+    with patch("app.lib.embedding._get_client", return_value=client):
+        result = asyncio.run(embed_texts_batch(["a", " ", "b"]))
+
+    assert result == [[1.0], None, [2.0]]
+    client.models.embed_content.assert_called_once()
+    assert client.models.embed_content.call_args.kwargs["contents"] == ["a", "b"]
+
+
+def test_embed_texts_batch_failure_returns_none():
+    import asyncio
+    from unittest.mock import MagicMock, patch
+    from app.lib.embedding import embed_texts_batch
+
+    client = MagicMock()
+    client.models.embed_content.side_effect = RuntimeError("quota")
+    with patch("app.lib.embedding._get_client", return_value=client):
+        assert asyncio.run(embed_texts_batch(["a", "b"])) == [None, None]
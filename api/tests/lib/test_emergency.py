@@ -0,0 +1,150 @@
+"""Tests for the in-memory emergency bundle store."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.lib import emergency
+
+
+def _row(name, **overrides):
+    row = {"name": name, "ng_actions": [], "care_preferences": [], "key_persons": [],
+           "hospitals": [], "guardian": None}
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def store(fresh_emergency):
+    with patch("app.lib.emergency._schedule_refresh") as schedule:
+        yield schedule
+
+
+class TestRender:
+    def test_bundle_orders_ng_actions_and_key_persons(self, store):
+        row = _row(
+            "田中太郎",
+            ng_actions=[
+                {"action": "触る", "riskLevel": "Discomfort"},
+                {"action": "大声", "riskLevel": "LifeThreatening"},
+                {"action": None, "riskLevel": "Panic"},
+            ],
+            key_persons=[
+                {"name": "父", "rank": 2},
+                {"name": "母", "rank": 1},
+            ],
+            hospitals=[{"name": "中央病院"}, {"name": "東クリニック"}],
+        )
+        with patch("app.lib.emergency.run_query", return_value=[row]):
+            bundle = emergency.get_bundle("田中太郎")
+
+        assert [ng.action for ng in bundle.ng_actions] == ["大声", "触る"]
+        assert [kp.name for kp in bundle.key_persons] == ["母", "父"]
+        assert bundle.hospital == {"name": "中央病院"}
+        assert [h["name"] for h in bundle.hospitals] == ["中央病院", "東クリニック"]
+
+
+class TestGetBundle:
+    def test_warm_then_served_without_query(self, store):
+        with patch("app.lib.emergency.run_query", return_value=[_row("田中太郎"), _row("山田花子")]):
+            assert emergency.warm() == 2
+        with patch("app.lib.emergency.run_query", side_effect=AssertionError("no live query")):
+            assert emergency.get_bundle("山田花子").client_name == "山田花子"
+        store.assert_not_called()
+
+    def test_miss_falls_back_to_live_query_and_is_stored(self, store):
+        with patch("app.lib.emergency.run_query", return_value=[_row("田中太郎")]) as mock_rq:
+            emergency.get_bundle("田中太郎")
+            emergency.get_bundle("田中太郎")
+        assert mock_rq.call_count == 1
+        assert mock_rq.call_args[0][1] == {"names": ["田中太郎"]}
+
+    def test_unknown_client_returns_none(self, store):
+        with patch("app.lib.emergency.run_query", return_value=[]):
+            assert emergency.get_bundle("存在しない") is None
+
+    def test_expired_bundle_served_while_refreshing(self, store):
+        with patch("app.lib.emergency.run_query", return_value=[_row("田中太郎")]):
+            emergency.warm()
+        with patch("app.lib.emergency._MAX_AGE_SECONDS", -1):
+            assert emergency.get_bundle("田中太郎") is not None
+        store.assert_called_once()
+
+
+class TestWriteInvalidation:
+    def test_client_write_rebuilds_that_bundle(self, store):
+        with patch("app.lib.emergency.run_query", return_value=[_row("田中太郎")]):
+            emergency.warm()
+        updated = _row("田中太郎", ng_actions=[{"action": "大声", "riskLevel": "Panic"}])
+        with patch("app.lib.emergency.run_query", return_value=[updated]) as mock_rq:
+            emergency._on_write({"NgAction", "Client"}, {"田中太郎"})
+        assert mock_rq.call_args[0][1] == {"names": ["田中太郎"]}
+        with patch("app.lib.emergency.run_query", side_effect=AssertionError("no live query")):
+            assert emergency.get_bundle("田中太郎").ng_actions[0].action == "大声"
+
+    def test_deleted_client_is_dropped(self, store):
+        with patch("app.lib.emergency.run_query", return_value=[_row("田中太郎")]):
+            emergency.warm()
+        with patch("app.lib.emergency.run_query", return_value=[]):
+            emergency._on_write({"Client"}, {"田中太郎"})
+            assert emergency.get_bundle("田中太郎") is None
+
+    def test_unrelated_labels_ignored(self, store):
+        with patch("app.lib.emergency.run_query") as mock_rq:
+            emergency._on_write({"SupportLog"}, {"田中太郎"})
+        mock_rq.assert_not_called()
+        store.assert_not_called()
+
+    def test_unknown_clients_schedule_full_refresh(self, store):
+        emergency._on_write({"KeyPerson"}, set())
+        emergency._on_write(None, None)
+        assert store.call_count == 2
+
+    def test_write_for_unknown_clients_is_visible_on_next_read(self, store):
+        with patch("app.lib.emergency.run_query", return_value=[_row("田中太郎")]):
+            emergency.warm()
+        emergency._on_write({"KeyPerson"}, None)
+        updated = _row("田中太郎", key_persons=[{"name": "母", "rank": 1}])
+        with patch("app.lib.emergency.run_query", return_value=[updated]) as mock_rq:
+            assert emergency.get_bundle("田中太郎").key_persons[0].name == "母"
+        assert mock_rq.call_args[0][1] == {"names": ["田中太郎"]}
+
+    def test_live_read_racing_a_write_is_not_stored(self, store):
+        def snapshot(query, params):
+            # An untargeted write lands while the live query is running
+            emergency._on_write(None, None)
+            return [_row("田中太郎")]
+
+        with patch("app.lib.emergency.run_query", side_effect=snapshot):
+            assert emergency.get_bundle("田中太郎") is not None
+        with patch("app.lib.emergency.run_query", return_value=[_row("田中太郎")]) as mock_rq:
+            emergency.get_bundle("田中太郎")
+        mock_rq.assert_called_once()
+
+    def test_full_refresh_keeps_bundles_rebuilt_meanwhile(self, store):
+        with patch("app.lib.emergency.run_query", return_value=[_row("田中太郎")]):
+            emergency.warm()
+        old = _row("田中太郎")
+        fresh = _row("田中太郎", ng_actions=[{"action": "大声", "riskLevel": "Panic"}])
+
+        def slow_snapshot(query, params):
+            # The per-client rebuild lands while the full refresh is loading
+            with patch("app.lib.emergency.run_query", return_value=[fresh]):
+                emergency._on_write({"NgAction"}, {"田中太郎"})
+            return [old, _row("山田花子")]
+
+        with patch("app.lib.emergency.run_query", side_effect=slow_snapshot):
+            emergency._rebuild_all()
+        with patch("app.lib.emergency.run_query", side_effect=AssertionError("no live query")):
+            assert emergency.get_bundle("田中太郎").ng_actions[0].action == "大声"
+            assert emergency.get_bundle("山田花子") is not None
+
+    def test_reset_discards_in_flight_refresh(self, store):
+        def snapshot(query, params):
+            emergency.reset()
+            return [_row("田中太郎")]
+
+        with patch("app.lib.emergency.run_query", side_effect=snapshot):
+            emergency._rebuild_all()
+        with patch("app.lib.emergency.run_query", return_value=[]):
+            assert emergency.get_bundle("田中太郎") is None
@@ -0,0 +1,57 @@
+"""Tests for the persistent LLM extraction cache."""
+
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.lib.extraction_cache import ExtractionCache, make_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(tmp_path / "extraction.sqlite3", ttl_seconds=60, max_entries=3)
+
+
+class TestMakeKey:
+    def test_key_changes_with_each_component(self):
+        base = make_key("h", "田中", "gemini", "prompt v1")
+        assert base == make_key("h", "田中", "gemini", "prompt v1")
+        assert base != make_key("h2", "田中", "gemini", "prompt v1")
+        assert base != make_key("h", None, "gemini", "prompt v1")
+        assert base != make_key("h", "田中", "claude", "prompt v1")
+        assert base != make_key("h", "田中", "gemini", "prompt v2")
+
+
+class TestExtractionCache:
+    def test_roundtrip_and_hit_rate(self, cache):
+        assert cache.get("k") is None
+        cache.put("k", {"nodes": [{"label": "Client"}], "relationships": []})
+        assert cache.get("k") == {"nodes": [{"label": "Client"}], "relationships": []}
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_persists_across_instances(self, cache, tmp_path):
+        cache.put("k", {"a": 1})
+        reopened = ExtractionCache(tmp_path / "extraction.sqlite3", ttl_seconds=60, max_entries=3)
+        assert reopened.get("k") == {"a": 1}
+
+    def test_expired_entry_is_a_miss(self, cache):
+        cache.put("k", {"a": 1})
+        with patch("app.lib.extraction_cache.time.time", return_value=time.time() + 120):
+            assert cache.get("k") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_least_recently_used_evicted(self, cache):
+        for i, key in enumerate(["a", "b", "c"]):
+            with patch("app.lib.extraction_cache.time.time", return_value=1000.0 + i):
+                cache.put(key, {"v": key})
+        cache.ttl_seconds = 1e12
+        with patch("app.lib.extraction_cache.time.time", return_value=2000.0):
+            cache.get("a")
+        with patch("app.lib.extraction_cache.time.time", return_value=2001.0):
+            cache.put("d", {"v": "d"})
+        assert cache.get("b") is None
+        assert cache.get("a") == {"v": "a"}
+        assert cache.stats()["entries"] == 3
@@ -0,0 +1,102 @@
+"""Tests for app.lib.fake_llm (deterministic Gemini stand-ins)."""
+
+import asyncio
+import json
+import math
+from unittest.mock import patch
+
+import pytest
+
+from app.config import settings
+from app.lib import fake_llm
+from app.lib.fake_llm import FakeChatModel, FakeGenaiClient, FakeGenerativeModel, embedding_vector
+from app.lib.provider_sim import SimulatedError
+
+
+@pytest.fixture(autouse=True)
+def instant_endpoint():
+    with patch.multiple(settings, fake_latency_ms=0, fake_latency_jitter_ms=0, fake_error_rate=0.0, fake_max_concurrency=0):
+        fake_llm.reset()
+        yield
+        fake_llm.reset()
+
+
+def _cos(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+class TestEmbedding:
+    def test_deterministic_unit_vector(self):
+        a = embedding_vector("パニック時は静かな部屋へ移動")
+        assert a == embedding_vector("パニック時は静かな部屋へ移動")
+        assert len(a) == 768
+        assert math.isclose(math.sqrt(sum(v * v for v in a)), 1.0)
+
+    def test_similar_texts_are_closer(self):
+        base = embedding_vector("パニック時は静かな部屋へ移動する")
+        near = embedding_vector("パニックの時は静かな部屋に移動")
+        far = embedding_vector("来月の受給者証の更新手続き")
+        assert _cos(base, near) > _cos(base, far)
+
+    def test_client_matches_genai_shape(self):
+        result = FakeGenaiClient().models.embed_content(
+            model="x", contents=["田中", "佐藤"], config={"output_dimensionality": 16}
+        )
+        assert [len(e.values) for e in result.embeddings] == [16, 16]
+        assert result.embeddings[0].values == embedding_vector("田中", 16)
+
+
+class TestGeneration:
+    def test_extraction_prompt_returns_graph_json(self):
+        text = FakeGenerativeModel().generate_content('出力は "nodes" を含む JSON\n【対象クライアント: 田中太郎】今日は落ち着いていた').text
+        data = json.loads(text.strip("`").removeprefix("json"))
+        client = next(n for n in data["nodes"] if n["label"] == "Client")
+        assert client["properties"]["name"] == "田中太郎"
+        assert {r["type"] for r in data["relationships"]} == {"LOGGED", "ABOUT"}
+
+    def test_prompt_kinds(self):
+        assert fake_llm.generate_text("SUFFICIENT か INSUFFICIENT で答えて") == "SUFFICIENT"
+        assert json.loads(fake_llm.generate_text('{"is_violation": ...}'))["is_violation"] is False
+        assert "擬似文字起こし" in fake_llm.generate_text("音声を文字起こししてください")
+
+    def test_file_parts_are_ignored(self):
+        model = FakeGenerativeModel()
+        assert model.generate_content([object(), "文字起こし"]).text == model.generate_content("文字起こし").text
+
+
+class TestEndpoint:
+    def test_error_rate_raises_503(self):
+        with patch.object(settings, "fake_error_rate", 1.0):
+            fake_llm.reset()
+            with pytest.raises(SimulatedError) as exc:
+                FakeGenaiClient().models.embed_content(model="x", contents="田中")
+        assert exc.value.code == 503
+        assert fake_llm.get_endpoint().stats()["failed"] == 1
+
+    def test_calls_are_counted(self):
+        FakeGenerativeModel().generate_content("こんにちは")
+        assert fake_llm.get_endpoint().stats()["served"] == 1
+
+
+class TestChatModel:
+    def test_calls_lookup_tool_then_answers(self):
+        from agno.agent import Agent
+
+        looked_up = []
+
+        def search_client_info(client_name: str) -> str:
+            """Look up a client."""
+            looked_up.append(client_name)
+            return "禁忌: 大声を出す"
+
+        agent = Agent(model=FakeChatModel(), tools=[search_client_info])
+        response = asyncio.run(agent.arun("田中さんの禁忌事項を教えて"))
+        assert looked_up == ["田中"]
+        assert response.content.startswith("（擬似回答）")
+
+    def test_stream_is_chunked(self):
+        from agno.models.message import Message
+
+        deltas = list(FakeChatModel().invoke_stream([Message(role="user", content="こんにちは")]))
+        assert len(deltas) > 1
+        assert all(len(d.content) <= fake_llm._STREAM_CHUNK for d in deltas)
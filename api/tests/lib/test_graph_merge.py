@@ -0,0 +1,65 @@
+"""Tests for merging graphs extracted from text chunks."""
+
+from app.lib.graph_merge import merge_graphs, node_identity
+
+
+def _node(temp_id, label, **props):
+    return {"temp_id": temp_id, "label": label, "properties": props}
+
+
+def _rel(source, target, rel_type):
+    return {"source_temp_id": source, "target_temp_id": target, "type": rel_type, "properties": {}}
+
+
+class TestNodeIdentity:
+    def test_merge_keys_are_normalized(self):
+        assert node_identity("Client", {"name": "田中さん"}) == node_identity("Client", {"name": "田中"})
+        assert node_identity("Condition", {"name": "ASD"}) == node_identity("Condition", {"name": "自閉症"})
+        assert node_identity("NgAction", {"action": "大声　を出す"}) == node_identity("NgAction", {"action": "大声 を出す"})
+
+    def test_create_only_labels_compare_content(self):
+        a = node_identity("SupportLog", {"situation": "散歩", "date": "2024-01-01"})
+        b = node_identity("SupportLog", {"date": "2024-01-01", "situation": "散歩 "})
+        c = node_identity("SupportLog", {"situation": "入浴", "date": "2024-01-01"})
+        assert a == b
+        assert a != c
+
+
+class TestMergeGraphs:
+    def test_dedupes_nodes_and_reconciles_temp_ids(self):
+        chunk1 = {
+            "nodes": [_node("c1", "Client", name="田中太郎"), _node("ng1", "NgAction", action="大声")],
+            "relationships": [_rel("c1", "ng1", "MUST_AVOID")],
+        }
+        chunk2 = {
+            "nodes": [
+                _node("c1", "Client", name="田中太郎さん", bloodType="A"),
+                _node("ng1", "NgAction", action="後ろから触る"),
+                _node("ng2", "NgAction", action="大声", reason="パニック"),
+            ],
+            "relationships": [_rel("c1", "ng1", "MUST_AVOID"), _rel("c1", "ng2", "MUST_AVOID")],
+        }
+
+        merged = merge_graphs([chunk1, chunk2])
+
+        assert [(n["temp_id"], n["label"]) for n in merged["nodes"]] == [
+            ("c1", "Client"), ("ng1", "NgAction"), ("ng1_c1", "NgAction"),
+        ]
+        assert merged["nodes"][0]["properties"] == {"name": "田中太郎", "bloodType": "A"}
+        assert merged["nodes"][1]["properties"] == {"action": "大声", "reason": "パニック"}
+        assert [(r["source_temp_id"], r["target_temp_id"]) for r in merged["relationships"]] == [
+            ("c1", "ng1"), ("c1", "ng1_c1"),
+        ]
+
+    def test_drops_relationships_to_unknown_nodes(self):
+        merged = merge_graphs([{"nodes": [_node("c1", "Client", name="A")], "relationships": [_rel("c1", "x", "MUST_AVOID")]}])
+        assert merged["relationships"] == []
+
+    def test_is_deterministic(self):
+        chunks = [
+            {"nodes": [_node("a", "Client", name="A"), _node("b", "SupportLog", situation="s")], "relationships": [_rel("a", "b", "LOGGED")]},
+            {"nodes": [_node("a", "Client", name="A"), _node("b", "SupportLog", situation="s")], "relationships": [_rel("a", "b", "LOGGED")]},
+        ]
+        assert merge_graphs(chunks) == merge_graphs(chunks)
+        assert len(merge_graphs(chunks)["nodes"]) == 2
+        assert len(merge_graphs(chunks)["relationships"]) == 1
@@ -0,0 +1,92 @@
+"""Tests for the cached degree ranking behind the graph explorer overview."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.lib import graph_overview
+
+
+def _fake_db(ranking: dict[str, list[tuple[str, int]]]):
+    """run_query stand-in: ranking queries per label, then the neighbour expansion."""
+    def fake(query, params=None):
+        if "COUNT {" in query:
+            label = query.split("MATCH (n:")[1].split(")")[0]
+            return [{"id": i, "degree": d} for i, d in ranking.get(label, [])]
+        if "elementId(n) IN $ids" in query:
+            return [{"nodes": [{"id": i, "labels": [], "properties": {}} for i in params["ids"]], "edges": []}]
+        return []
+    return fake
+
+
+@pytest.fixture
+def overview():
+    graph_overview.reset()
+    graph_overview.configure({"Client", "NgAction"})
+    yield graph_overview
+    graph_overview.reset()
+
+
+RANKING = {
+    "Client": [("c1", 9), ("c2", 3)],
+    "NgAction": [("n1", 5), ("n2", 1)],
+}
+
+
+class TestRanking:
+    def test_overview_merges_labels_by_degree(self, overview):
+        with patch("app.lib.graph_overview.run_query", side_effect=_fake_db(RANKING)) as mock_rq:
+            rows = overview.get_rows(None, 3)
+        ids = [n["id"] for n in rows[0]["nodes"]]
+        assert ids == ["c1", "n1", "c2"]
+        expand_query = mock_rq.call_args.args[0]
+        assert "lbl IN $allowed" in expand_query
+
+    def test_label_sample_reuses_ranking(self, overview):
+        with patch("app.lib.graph_overview.run_query", side_effect=_fake_db(RANKING)) as mock_rq:
+            overview.get_rows(None, 3)
+            calls = mock_rq.call_count
+            rows = overview.get_rows("NgAction", 10)
+        # Only the neighbour expansion runs; the ranking is not recomputed
+        assert mock_rq.call_count == calls + 1
+        assert [n["id"] for n in rows[0]["nodes"]] == ["n1", "n2"]
+        assert "lbl IN $allowed" not in mock_rq.call_args.args[0]
+
+    def test_repeat_request_served_from_cache(self, overview):
+        with patch("app.lib.graph_overview.run_query", side_effect=_fake_db(RANKING)) as mock_rq:
+            first = overview.get_rows(None, 3)
+            calls = mock_rq.call_count
+            second = overview.get_rows(None, 3)
+        assert second == first
+        assert mock_rq.call_count == calls
+
+    def test_empty_graph_returns_no_rows(self, overview):
+        with patch("app.lib.graph_overview.run_query", side_effect=_fake_db({})):
+            assert overview.get_rows(None, 10) == []
+
+
+class TestInvalidation:
+    def test_write_to_shown_label_serves_stale_and_refreshes(self, overview):
+        with patch("app.lib.graph_overview.run_query", side_effect=_fake_db(RANKING)):
+            first = overview.get_rows(None, 3)
+        overview._on_write({"Client"}, {"c1"})
+        with patch("app.lib.graph_overview._schedule_refresh") as mock_refresh:
+            assert overview.get_rows(None, 3) == first
+        mock_refresh.assert_called_once()
+
+    def test_write_to_other_label_keeps_cache_fresh(self, overview):
+        with patch("app.lib.graph_overview.run_query", side_effect=_fake_db(RANKING)):
+            overview.get_rows(None, 3)
+        overview._on_write({"AuditLog"}, set())
+        with patch("app.lib.graph_overview._schedule_refresh") as mock_refresh:
+            overview.get_rows(None, 3)
+        mock_refresh.assert_not_called()
+
+    def test_rebuild_replaces_cached_payloads(self, overview):
+        with patch("app.lib.graph_overview.run_query", side_effect=_fake_db(RANKING)):
+            overview.get_rows(None, 1)
+        updated = {"Client": [("c1", 9)], "NgAction": [("n9", 50)]}
+        with patch("app.lib.graph_overview.run_query", side_effect=_fake_db(updated)):
+            overview._rebuild()
+            rows = overview.get_rows(None, 1)
+        assert rows[0]["nodes"][0]["id"] == "n9"
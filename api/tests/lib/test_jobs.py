@@ -0,0 +1,95 @@
+"""Tests for the in-process background job queue."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.lib import jobs
+
+
+@pytest.fixture(autouse=True)
+def fresh_jobs():
+    jobs.reset()
+    yield
+    jobs.reset()
+
+
+class TestSubmit:
+    @pytest.mark.asyncio
+    async def test_job_completes_with_result(self):
+        async def runner(job):
+            job.update("working", 50, "half")
+            return {"answer": 42}
+
+        job = jobs.submit("test", runner)
+        assert jobs.get(job.id) is job
+        await job._task
+        assert job.stage == "complete"
+        assert job.progress == 100
+        assert job.result == {"answer": 42}
+
+    @pytest.mark.asyncio
+    async def test_job_failure_recorded(self):
+        async def runner(job):
+            raise RuntimeError("boom")
+
+        job = jobs.submit("test", runner)
+        await job._task
+        assert job.stage == "error"
+        assert job.error == "boom"
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped(self):
+        running = 0
+        peak = 0
+
+        async def runner(job):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return None
+
+        with patch("app.lib.jobs.settings.job_concurrency", 2):
+            submitted = [jobs.submit("test", runner) for _ in range(5)]
+            await asyncio.gather(*(j._task for j in submitted))
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_oldest_finished_jobs_evicted(self):
+        async def runner(job):
+            return None
+
+        with patch("app.lib.jobs._MAX_JOBS", 2):
+            first = jobs.submit("test", runner)
+            await first._task
+            second = jobs.submit("test", runner)
+            third = jobs.submit("test", runner)
+            await asyncio.gather(second._task, third._task)
+        assert jobs.get(first.id) is None
+        assert jobs.get(third.id) is third
+
+
+class TestEvents:
+    @pytest.mark.asyncio
+    async def test_events_follow_updates_until_done(self):
+        gate = asyncio.Event()
+
+        async def runner(job):
+            job.update("step", 40, "waiting")
+            await gate.wait()
+            return {"ok": True}
+
+        job = jobs.submit("test", runner)
+
+        async def collect():
+            return [s["stage"] async for s in jobs.events(job)]
+
+        collector = asyncio.create_task(collect())
+        await asyncio.sleep(0.01)
+        gate.set()
+        stages = await collector
+        assert stages[-1] == "complete"
+        assert "step" in stages
@@ -0,0 +1,97 @@
+"""Tests for the kana bigram similarity index."""
+
+import random
+from difflib import SequenceMatcher
+from unittest.mock import patch
+
+from app.lib.kana_index import KanaIndex, _min_shared
+
+_KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわん"
+
+
+def _brute_force(entries, kana, threshold):
+    return {
+        node_id
+        for node_id, other in entries.items()
+        if SequenceMatcher(None, kana, other).ratio() >= threshold
+    }
+
+
+class TestKanaIndex:
+    def test_matches_brute_force_scan(self):
+        rng = random.Random(7)
+        entries = {}
+        for i in range(500):
+            base = "".join(rng.choice(_KANA) for _ in range(rng.randint(3, 8)))
+            entries[f"n{i}"] = base
+            # Near-duplicates with one substituted character
+            if i % 10 == 0:
+                pos = rng.randrange(len(base))
+                entries[f"d{i}"] = base[:pos] + rng.choice(_KANA) + base[pos + 1:]
+        index = KanaIndex()
+        for node_id, kana in entries.items():
+            index.add(node_id, node_id, kana)
+
+        for query in rng.sample(list(entries.values()), 40):
+            for threshold in (0.7, 0.8, 0.9):
+                expected = _brute_force(entries, query, threshold)
+                found = {m["nodeId"] for m in index.search(query, threshold, limit=len(entries))}
+                assert found == expected
+
+    def test_results_sorted_and_limited(self):
+        index = KanaIndex()
+        index.add("1", "田中太郎", "たなかたろう")
+        index.add("2", "田中次郎", "たなかじろう")
+        index.add("3", "佐藤花子", "さとうはなこ")
+        result = index.search("たなかたろう", threshold=0.5, limit=1)
+        assert [m["nodeId"] for m in result] == ["1"]
+        assert result[0]["similarity"] == 1.0
+
+    def test_add_replaces_and_remove_deletes(self):
+        index = KanaIndex()
+        index.add("1", "田中", "たなか")
+        index.add("1", "田仲", "たなかa")
+        assert len(index) == 1
+        assert index.search("たなか", threshold=1.0) == []
+        index.remove("1")
+        assert len(index) == 0
+        assert index.search("たなかa", threshold=0.5) == []
+
+    def test_min_shared_is_a_lower_bound(self):
+        from app.lib.kana_index import _grams
+
+        rng = random.Random(3)
+        for _ in range(2000):
+            a = "".join(rng.choice("あいうかき") for _ in range(rng.randint(1, 8)))
+            b = "".join(rng.choice("あいうかき") for _ in range(rng.randint(1, 8)))
+            ratio = SequenceMatcher(None, a, b).ratio()
+            shared = sum((_grams(a) & _grams(b)).values())
+            for threshold in (0.6, 0.8):
+                if ratio >= threshold:
+                    assert shared >= _min_shared(len(a), len(b), threshold)
+
+
+class TestKanaIndexStore:
+    def test_loads_every_row_without_limit(self, fresh_kana_index):
+        rows = [{"name": f"n{i}", "kana": f"たなか{i}", "nodeId": f"4:x:{i}"} for i in range(600)]
+        with patch("app.lib.kana_index.run_query", return_value=rows) as mock_query:
+            result = fresh_kana_index.search("Client", "たなか599", threshold=1.0)
+        assert [m["nodeId"] for m in result] == ["4:x:599"]
+        assert "LIMIT" not in mock_query.call_args.args[0]
+
+    def test_client_write_updates_only_those_names(self, fresh_kana_index):
+        from app.lib.db_operations import _notify_write
+
+        with patch("app.lib.kana_index.run_query", return_value=[
+            {"name": "田中太郎", "kana": "たなかたろう", "nodeId": "4:x:1"},
+        ]):
+            fresh_kana_index.get_index("Client")
+
+        new_rows = [{"name": "山田花子", "kana": "やまだはなこ", "nodeId": "4:x:2"}]
+        with patch("app.lib.kana_index.run_query", return_value=new_rows) as mock_query:
+            _notify_write({"Client"}, {"山田花子"})
+            result = fresh_kana_index.search("Client", "やまだはなこ", threshold=1.0)
+
+        assert mock_query.call_args.args[1] == {"names": ["山田花子"]}
+        assert [m["nodeId"] for m in result] == ["4:x:2"]
+        assert len(fresh_kana_index.get_index("Client")) == 2
@@ -0,0 +1,155 @@
+"""Tests for app.lib.memory_graph (in-memory Neo4j stand-in)."""
+
+import pytest
+
+from app.lib import client_context, emergency
+from app.lib.fake_llm import embedding_vector
+from app.lib.memory_graph import CypherError, MemoryDriver, MemoryGraph, seed
+
+
+@pytest.fixture
+def graph():
+    g = MemoryGraph()
+    g.run(
+        "CREATE (c:Client {name: '田中太郎', dob: '1990-01-01'})"
+        "-[:MUST_AVOID]->(:NgAction {action: '大声を出す', riskLevel: 'Panic'}) "
+        "CREATE (c)-[:HAS_KEY_PERSON {rank: 2}]->(:KeyPerson {name: '田中次郎'}) "
+        "CREATE (c)-[:HAS_KEY_PERSON {rank: 1}]->(:KeyPerson {name: '田中花子'}) "
+        "CREATE (:Client {name: '佐藤花子'})"
+    )
+    return g
+
+
+def _rows(g, query, **params):
+    return g.run(query, params)[0]
+
+
+class TestQueries:
+    def test_match_where_order(self, graph):
+        rows = _rows(graph, "MATCH (c:Client) WHERE c.name STARTS WITH $p RETURN c.name AS name ORDER BY name", p="田")
+        assert rows == [{"name": "田中太郎"}]
+
+    def test_optional_match_and_aggregation(self, graph):
+        rows = _rows(
+            graph,
+            "MATCH (c:Client) OPTIONAL MATCH (c)-[:MUST_AVOID]->(ng:NgAction) "
+            "RETURN c.name AS name, count(ng) AS n ORDER BY n DESC",
+        )
+        assert rows == [{"name": "田中太郎", "n": 1}, {"name": "佐藤花子", "n": 0}]
+
+    def test_relationship_properties_and_collect(self, graph):
+        rows = _rows(
+            graph,
+            "MATCH (:Client {name: $name})-[r:HAS_KEY_PERSON]->(kp) WITH kp, r ORDER BY r.rank "
+            "RETURN collect(kp.name) AS names",
+            name="田中太郎",
+        )
+        assert rows == [{"names": ["田中花子", "田中次郎"]}]
+
+    def test_pattern_comprehension_style_subqueries(self, graph):
+        rows = _rows(
+            graph,
+            "MATCH (c:Client) RETURN c.name AS name, "
+            "COUNT { (c)-[:HAS_KEY_PERSON]->() } AS persons, "
+            "[x IN COLLECT { MATCH (c)-[:MUST_AVOID]->(ng) RETURN ng.action } | x] AS ng "
+            "ORDER BY persons DESC",
+        )
+        assert rows[0] == {"name": "田中太郎", "persons": 2, "ng": ["大声を出す"]}
+        assert rows[1] == {"name": "佐藤花子", "persons": 0, "ng": []}
+
+    def test_unwind_union_and_quantifier(self, graph):
+        rows = _rows(
+            graph,
+            "UNWIND $xs AS x WITH x WHERE any(y IN $xs WHERE y > x) RETURN x "
+            "UNION RETURN 99 AS x",
+            xs=[1, 2, 3],
+        )
+        assert rows == [{"x": 1}, {"x": 2}, {"x": 99}]
+
+    def test_unsupported_syntax_raises(self, graph):
+        with pytest.raises(CypherError):
+            graph.run("MATCH (c:Client) DETACH DELETE c")
+        assert graph.stats()["errors"] == 1
+
+
+class TestWrites:
+    def test_merge_is_idempotent_and_counted(self, graph):
+        query = (
+            "MERGE (c:Client {name: $name}) ON CREATE SET c.created = true "
+            "ON MATCH SET c.seen = true RETURN c.created AS created, c.seen AS seen"
+        )
+        first, counters = graph.run(query, {"name": "鈴木健太"})
+        assert first == [{"created": True, "seen": None}]
+        assert counters.nodes_created == 1 and counters.contains_updates
+        second, counters = graph.run(query, {"name": "鈴木健太"})
+        assert second == [{"created": True, "seen": True}]
+        assert counters.nodes_created == 0 and counters.properties_set == 1
+
+    def test_reads_do_not_report_updates(self, graph):
+        _, counters = graph.run("MATCH (c:Client) RETURN c")
+        assert not counters.contains_updates
+
+    def test_driver_records_convert_nodes(self, graph):
+        with MemoryDriver(graph).session() as session:
+            result = session.run("MATCH (c:Client {name: $name}) RETURN c", name="田中太郎")
+            record = result.single()
+        assert record["c"] == {"name": "田中太郎", "dob": "1990-01-01"}
+
+
+class TestProcedures:
+    def test_vector_index_ranks_by_similarity(self):
+        g = MemoryGraph()
+        seed(g, clients=3, embed=embedding_vector)
+        g.run(
+            "CREATE VECTOR INDEX support_log_vector_index IF NOT EXISTS "
+            "FOR (n:SupportLog) ON (n.embedding)"
+        )
+        note = g.with_label("SupportLog")[0].props["note"]
+        rows = _rows(
+            g,
+            "CALL db.index.vector.queryNodes('support_log_vector_index', 3, $v) "
+            "YIELD node, score RETURN node.note AS note, score",
+            v=embedding_vector(note),
+        )
+        assert rows[0]["note"] == note
+        assert rows[0]["score"] == pytest.approx(1.0)
+        assert [r["score"] for r in rows] == sorted((r["score"] for r in rows), reverse=True)
+
+    def test_fulltext_index(self):
+        g = MemoryGraph()
+        seed(g, clients=3)
+        rows = _rows(
+            g,
+            "CALL db.index.fulltext.queryNodes('idx_supportlog_fulltext', $q) "
+            "YIELD node, score RETURN node.situation AS s",
+            q="パニック",
+        )
+        assert rows and all(r["s"] == "パニック" for r in rows)
+
+
+class TestAppQueries:
+    """The routers' own Cypher runs unchanged on the seeded graph."""
+
+    @pytest.fixture
+    def seeded(self):
+        g = MemoryGraph()
+        seed(g, clients=5)
+        return g
+
+    def test_profile_query(self, seeded):
+        name = seeded.with_label("Client")[0].props["name"]
+        rows = MemoryDriver(seeded).session().run(client_context._PROFILE_QUERY, {"name": name}).data()
+        assert len(rows) == 1
+        assert seeded.stats()["errors"] == 0
+
+    def test_emergency_bundle_query(self, seeded):
+        names = [c.props["name"] for c in seeded.with_label("Client")]
+        rows = MemoryDriver(seeded).session().run(emergency._BUNDLE_QUERY, {"names": names}).data()
+        assert sorted(r["name"] for r in rows) == sorted(names)
+        assert seeded.stats()["errors"] == 0
+
+    def test_seed_is_deterministic(self):
+        a, b = MemoryGraph(), MemoryGraph()
+        seed(a, clients=4, seed=7)
+        seed(b, clients=4, seed=7)
+        assert [n.props for n in a.with_label("Client")] == [n.props for n in b.with_label("Client")]
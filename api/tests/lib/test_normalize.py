@@ -1,5 +1,5 @@
 import pytest
-from app.lib.normalize import name_to_kana
+from app.lib.normalize import kana_row, name_to_kana
 
 
 class TestNameToKana:
@@ -30,3 +30,22 @@ class TestNameToKana:
         result = name_to_kana("ＡＢＣ")
         # pykakasi preserves ASCII as-is in hira output
         assert "abc" in result.lower() or "ABC" in result
+
+
+class TestKanaRow:
+    def test_kanji_name_row(self):
+        assert kana_row("田中太郎") == "た"
+
+    def test_dakuten_grouped_with_base_row(self):
+        assert kana_row("ごとう", "ごとう") == "か"
+
+    def test_katakana_reading_folded(self):
+        assert kana_row("山田", "ヤマダ") == "や"
+
+    def test_alpha_name_is_abc_row(self):
+        assert kana_row("M・K") == "ABC"
+        assert kana_row("ＭＫ") == "ABC"
+
+    def test_empty_returns_none(self):
+        assert kana_row("") is None
+        assert kana_row(None) is None
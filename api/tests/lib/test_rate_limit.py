@@ -0,0 +1,272 @@
+"""Tests for app.lib.rate_limit (and the provider_sim stand-in it is load-tested with)."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.lib import rate_limit
+from app.lib.provider_sim import SimulatedEndpoint, SimulatedError
+from app.lib.rate_limit import Governor, Priority
+
+
+def _fast(**kwargs) -> Governor:
+    defaults = dict(rate_per_minute=60_000, max_concurrency=8, base_backoff=0.01, max_backoff=0.05)
+    defaults.update(kwargs)
+    return Governor("test", **defaults)
+
+
+class TestIsThrottle:
+    def test_status_codes(self):
+        assert rate_limit.is_throttle(SimulatedError(429, "RESOURCE_EXHAUSTED"))
+        assert rate_limit.is_throttle(SimulatedError(503, "UNAVAILABLE"))
+        assert not rate_limit.is_throttle(SimulatedError(400, "INVALID_ARGUMENT"))
+
+    def test_message_markers(self):
+        assert rate_limit.is_throttle(RuntimeError("429 Resource has been exhausted (e.g. check quota)."))
+        assert rate_limit.is_throttle("RESOURCE_EXHAUSTED")
+        assert not rate_limit.is_throttle(ValueError("bad json"))
+
+
+class TestAimd:
+    def test_throttle_halves_limit_and_pauses(self):
+        gov = _fast(max_concurrency=8)
+        slot = gov.acquire()
+        gov.release(slot, "throttled")
+        assert gov.limit == 4
+        assert gov.stats()["paused_ms"] > 0
+        assert gov.stats()["throttled"] == 1
+
+    def test_one_decrease_per_window(self):
+        gov = _fast(max_concurrency=8)
+        slots = [gov.acquire() for _ in range(3)]
+        for slot in slots:
+            gov.release(slot, "throttled")
+        # The three calls were already running when the first 429 arrived
+        assert gov.limit == 4
+
+    def test_success_increases_additively_up_to_max(self):
+        gov = _fast(max_concurrency=4)
+        gov.release(gov.acquire(), "throttled")
+        assert gov.limit == 2
+        time.sleep(0.02)
+        for _ in range(3):
+            gov.release(gov.acquire(), "ok")
+        assert 3 <= gov.limit < 4
+        for _ in range(20):
+            gov.release(gov.acquire(), "ok")
+        assert gov.limit == 4
+
+    def test_limit_never_below_minimum(self):
+        gov = _fast(max_concurrency=4, min_concurrency=1, base_backoff=0.001, max_backoff=0.001)
+        for _ in range(5):
+            gov.release(gov.acquire(), "throttled")
+            time.sleep(0.002)
+        assert gov.limit == 1
+
+    def test_errors_and_cancellations_do_not_change_limit(self):
+        gov = _fast(max_concurrency=4)
+        gov.release(gov.acquire(), "error")
+        gov.release(gov.acquire(), "cancelled")
+        assert gov.limit == 4
+        assert gov.stats()["errors"] == 1
+
+
+class TestScheduling:
+    def test_token_bucket_spaces_calls(self):
+        gov = Governor("test", rate_per_minute=1200, max_concurrency=4, burst=1)  # 20/s
+        started = time.monotonic()
+        for _ in range(4):
+            gov.release(gov.acquire(), "ok")
+        assert time.monotonic() - started >= 0.14
+
+    def test_priority_order_on_release(self):
+        gov = _fast(max_concurrency=1)
+        order = []
+
+        async def waiter(name, level):
+            async with gov.aslot(level):
+                order.append(name)
+
+        async def run():
+            held = await gov.acquire_async()
+            tasks = [asyncio.create_task(waiter("backfill", Priority.BATCH))]
+            await asyncio.sleep(0.01)
+            tasks.append(asyncio.create_task(waiter("chat", Priority.INTERACTIVE)))
+            tasks.append(asyncio.create_task(waiter("emergency", Priority.EMERGENCY)))
+            await asyncio.sleep(0.01)
+            assert gov.stats()["queued"] == 3
+            gov.release(held)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        assert order == ["emergency", "chat", "backfill"]
+
+    def test_priority_from_context(self):
+        gov = _fast(max_concurrency=1)
+        order = []
+
+        async def waiter(name, level):
+            rate_limit.set_priority(level)
+            async with gov.aslot():
+                order.append(name)
+
+        async def run():
+            held = await gov.acquire_async()
+            tasks = [asyncio.create_task(waiter("batch", Priority.BATCH))]
+            await asyncio.sleep(0.01)
+            tasks.append(asyncio.create_task(waiter("emergency", Priority.EMERGENCY)))
+            await asyncio.sleep(0.01)
+            gov.release(held)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        assert order == ["emergency", "batch"]
+
+    def test_sync_and_async_callers_share_the_limit(self):
+        gov = _fast(max_concurrency=1)
+        held = gov.acquire()
+        done = threading.Event()
+
+        def thread_call():
+            gov.call(lambda: None)
+            done.set()
+
+        worker = threading.Thread(target=thread_call)
+        worker.start()
+
+        async def run():
+            task = asyncio.create_task(gov.acall(asyncio.sleep, 0))
+            await asyncio.sleep(0.02)
+            assert not task.done() and not done.is_set()
+            gov.release(held)
+            await task
+
+        asyncio.run(run())
+        worker.join(timeout=2)
+        assert done.is_set()
+        assert gov.stats()["in_flight"] == 0
+
+    def test_cancelled_waiter_leaves_queue(self):
+        gov = _fast(max_concurrency=1)
+
+        async def run():
+            held = await gov.acquire_async()
+            task = asyncio.create_task(gov.acquire_async())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            assert gov.stats()["queued"] == 0
+            gov.release(held)
+            # The slot is free for the next caller
+            gov.release(await asyncio.wait_for(gov.acquire_async(), 1))
+
+        asyncio.run(run())
+        assert gov.stats()["in_flight"] == 0
+
+
+class TestRetries:
+    def test_call_retries_throttled_attempts(self):
+        gov = _fast(retries=3)
+        fn = MagicMock(side_effect=[SimulatedError(429, "RESOURCE_EXHAUSTED"), "ok"])
+        assert gov.call(fn, "x") == "ok"
+        assert fn.call_count == 2
+        assert gov.stats()["retries"] == 1
+
+    def test_call_raises_after_retries(self):
+        gov = _fast(retries=2)
+        fn = MagicMock(side_effect=SimulatedError(429, "RESOURCE_EXHAUSTED"))
+        with pytest.raises(SimulatedError):
+            gov.call(fn)
+        assert fn.call_count == 3
+
+    def test_other_errors_are_not_retried(self):
+        gov = _fast(retries=3)
+        fn = MagicMock(side_effect=ValueError("bad request"))
+        with pytest.raises(ValueError):
+            gov.call(fn)
+        assert fn.call_count == 1
+        assert gov.limit == 8
+
+    def test_acall_retries(self):
+        gov = _fast(retries=3)
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise SimulatedError(503, "UNAVAILABLE")
+            return "ok"
+
+        assert asyncio.run(gov.acall(flaky)) == "ok"
+        assert len(attempts) == 3
+
+
+class TestOfflineLoad:
+    def test_threads_converge_under_endpoint_quota(self):
+        endpoint = SimulatedEndpoint(max_concurrency=3, latency=0.005)
+        gov = _fast(max_concurrency=12, retries=10)
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            results = list(pool.map(lambda i: gov.call(endpoint, f"text-{i}"), range(60)))
+        assert len(set(results)) == 60
+        assert endpoint.served == 60
+        assert gov.limit < 12
+        assert gov.stats()["in_flight"] == 0
+
+    def test_async_burst_converges(self):
+        endpoint = SimulatedEndpoint(max_concurrency=2, latency=0.005)
+        gov = _fast(max_concurrency=16, retries=10)
+
+        async def run():
+            return await asyncio.gather(*(gov.acall(endpoint.acall, f"q{i}") for i in range(40)))
+
+        results = asyncio.run(run())
+        assert len(results) == 40
+        assert endpoint.served == 40
+        assert gov.stats()["throttled"] == endpoint.throttled
+
+    def test_endpoint_is_deterministic(self):
+        a = SimulatedEndpoint(failure_rate=0.3, seed=7)
+        b = SimulatedEndpoint(failure_rate=0.3, seed=7)
+
+        def outcome(endpoint, payload):
+            try:
+                return endpoint(payload)
+            except SimulatedError as e:
+                return e.code
+
+        payloads = [f"p{i}" for i in range(20)]
+        first = [outcome(a, p) for p in payloads]
+        assert first == [outcome(b, p) for p in payloads]
+        assert 503 in first
+
+
+class TestRegistry:
+    def test_one_governor_per_provider_and_model(self):
+        assert rate_limit.governor("Google", "m1") is rate_limit.governor("google", "m1")
+        assert rate_limit.governor("google", "m1") is not rate_limit.governor("google", "m2")
+        assert {s["name"] for s in rate_limit.stats()} == {"google/m1", "google/m2"}
+
+    def test_for_model_reads_agno_model(self):
+        model = SimpleNamespace(provider="Google", id="gemini-x")
+        assert rate_limit.for_model(model) is rate_limit.governor("google", "gemini-x")
+
+
+class TestEmbeddingThroughGovernor:
+    def test_throttled_embedding_is_retried_not_none(self):
+        from app.lib import embedding
+
+        client = MagicMock()
+        client.models.embed_content.side_effect = [
+            SimulatedError(429, "RESOURCE_EXHAUSTED"),
+            SimpleNamespace(embeddings=[SimpleNamespace(values=[0.1, 0.2])]),
+        ]
+        gov = _fast()
+        with patch.object(embedding, "_get_client", return_value=client), \
+             patch.object(rate_limit, "gemini_embedding", return_value=gov):
+            assert asyncio.run(embedding.embed_text("テキスト")) == [0.1, 0.2]
+        assert gov.stats()["throttled"] == 1
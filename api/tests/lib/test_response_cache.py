@@ -0,0 +1,94 @@
+"""Tests for app.lib.response_cache (semantic chat answer cache)"""
+
+from app.lib.response_cache import _MAX_AGE_SECONDS, ResponseCache, _on_write, is_cacheable, make_probe, question_topics
+
+
+def _probe(question, client=None, context_client=None, vector=None):
+    probe = make_probe(question, client, context_client)
+    probe.vector = vector
+    return probe
+
+
+class TestLookup:
+    def test_exact_question_hits_without_embedding(self):
+        cache = ResponseCache()
+        cache.put(_probe("田中太郎さんの禁忌事項は？", "田中太郎"), "大声を出さない")
+        assert cache.get_exact(_probe("田中太郎さんの禁忌事項は?", "田中太郎")) == "大声を出さない"
+        assert cache.get_exact(_probe("田中太郎さんの禁忌事項は？", "佐藤一郎")) is None
+
+    def test_similar_question_hits_above_threshold(self):
+        cache = ResponseCache(threshold=0.9)
+        cache.put(_probe("田中太郎さんの禁忌事項は？", "田中太郎", vector=[1.0, 0.0, 0.0]), "大声を出さない")
+
+        assert cache.get_similar(_probe("田中太郎さんのNGは？", "田中太郎", vector=[0.95, 0.2, 0.0])) == "大声を出さない"
+        assert cache.get_similar(_probe("田中太郎さんの病院は？", "田中太郎", vector=[0.5, 0.8, 0.0])) is None
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["saved_llm_calls"]) == (1, 1, 1)
+
+    def test_other_topic_of_same_client_misses_despite_similar_embedding(self):
+        cache = ResponseCache(threshold=0.9)
+        cache.put(_probe("田中太郎さんの禁忌事項は？", "田中太郎", vector=[1.0, 0.0, 0.0]), "大声を出さない")
+
+        assert cache.get_similar(_probe("田中太郎さんのかかりつけ病院は？", "田中太郎", vector=[0.99, 0.1, 0.0])) is None
+        assert cache.get_similar(_probe("田中太郎さんの連絡先は？", "田中太郎", vector=[1.0, 0.0, 0.0])) is None
+
+    def test_ttl_and_lru_bounds(self):
+        now = [0.0]
+        cache = ResponseCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+        for i in range(3):
+            cache.put(_probe(f"質問番号{i}です"), f"回答{i}")
+        assert cache.stats()["entries"] == 2
+        assert cache.get_exact(_probe("質問番号0です")) is None
+        assert cache.get_exact(_probe("質問番号2です")) == "回答2"
+        now[0] = 11
+        assert cache.get_exact(_probe("質問番号2です")) is None
+
+    def test_age_is_capped_for_writes_from_other_processes(self):
+        now = [0.0]
+        cache = ResponseCache(ttl_seconds=3600, clock=lambda: now[0])
+        cache.put(_probe("田中さんの禁忌事項"), "大声を出さない")
+        now[0] = _MAX_AGE_SECONDS - 1
+        assert cache.get_exact(_probe("田中さんの禁忌事項")) == "大声を出さない"
+        now[0] = _MAX_AGE_SECONDS + 1
+        assert cache.get_exact(_probe("田中さんの禁忌事項")) is None
+
+
+class TestInvalidation:
+    def test_write_for_client_invalidates_only_that_client(self):
+        cache = ResponseCache()
+        cache.put(_probe("田中太郎さんの禁忌事項は？", "田中太郎"), "旧")
+        cache.put(_probe("佐藤一郎さんの禁忌事項は？", "佐藤一郎"), "佐藤")
+
+        _on_write({"NgAction"}, {"田中太郎"})
+
+        assert cache.get_exact(_probe("田中太郎さんの禁忌事項は？", "田中太郎")) is None
+        assert cache.get_exact(_probe("佐藤一郎さんの禁忌事項は？", "佐藤一郎")) == "佐藤"
+
+    def test_unnamed_questions_expire_on_any_write(self):
+        cache = ResponseCache()
+        cache.put(_probe("更新期限が近い手帳は？"), "3件")
+        cache.put(_probe("禁忌事項を教えて", context_client="田中太郎"), "大声")
+
+        _on_write({"Certificate"}, {"佐藤一郎"})
+
+        assert cache.get_exact(_probe("更新期限が近い手帳は？")) is None
+        assert cache.get_exact(_probe("禁忌事項を教えて", context_client="田中太郎")) is None
+
+    def test_untargeted_write_invalidates_named_clients(self):
+        cache = ResponseCache()
+        cache.put(_probe("田中太郎さんの禁忌事項は？", "田中太郎"), "旧")
+        _on_write(None, None)
+        assert cache.get_exact(_probe("田中太郎さんの禁忌事項は？", "田中太郎")) is None
+
+
+def test_question_topics():
+    assert question_topics("田中さんのＮＧ行動は？") == {"禁忌"}
+    assert question_topics("主治医と緊急連絡先を教えて") == {"病院", "連絡先"}
+    assert question_topics("田中さんについて教えて") == frozenset()
+
+
+def test_follow_up_questions_are_not_cacheable():
+    assert is_cacheable("更新期限が近い手帳は？")
+    assert not is_cacheable("もっと詳しく")
+    assert not is_cacheable("その人の病院は？")
+    assert not is_cacheable("はい")
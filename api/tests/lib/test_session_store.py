@@ -0,0 +1,90 @@
+"""Tests for app.lib.session_store (memory heap TTL and shared SQLite backends)"""
+
+import json
+
+import pytest
+
+from app.lib.session_store import MemorySessionStore, SqliteSessionStore
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _sqlite(tmp_path, clock, ttl=60):
+    return SqliteSessionStore(
+        tmp_path / "sessions.sqlite3", ttl,
+        encode=lambda v: json.dumps(v).encode(), decode=json.loads,
+        sweep_interval=0, clock=clock,
+    )
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    clock = FakeClock()
+    if request.param == "memory":
+        yield MemorySessionStore(60, clock=clock), clock
+    else:
+        yield _sqlite(tmp_path, clock), clock
+
+
+class TestSessionStore:
+    def test_dict_interface(self, store):
+        s, _ = store
+        s["a"] = {"phase": 1}
+        assert "a" in s
+        assert s["a"] == {"phase": 1}
+        assert len(s) == 1
+        assert s.pop("a") == {"phase": 1}
+        assert "a" not in s
+        with pytest.raises(KeyError):
+            s["a"]
+        with pytest.raises(KeyError):
+            del s["a"]
+
+    def test_expires_after_ttl_since_last_access(self, store):
+        s, clock = store
+        s.put("a", 1)
+        s.put("b", 2)
+        clock.now += 50
+        assert s.get("a") == 1  # touch extends a
+        clock.now += 20
+        assert s.get("b") is None
+        assert s.get("a") == 1
+        clock.now += 61
+        assert s.get("a") is None
+        assert len(s) == 0
+
+    def test_clear(self, store):
+        s, _ = store
+        s.put("a", 1)
+        s.clear()
+        assert len(s) == 0
+
+
+class TestMemorySessionStore:
+    def test_heap_stays_bounded_under_repeated_touches(self):
+        clock = FakeClock()
+        s = MemorySessionStore(60, clock=clock)
+        for i in range(10):
+            s.put(f"k{i}", i)
+        for _ in range(1000):
+            clock.now += 0.01
+            s.get("k0")
+        assert len(s._heap) <= 2 * len(s) + 65
+        assert s.get("k9") == 9
+
+
+class TestSqliteSessionStore:
+    def test_shared_between_instances(self, tmp_path):
+        clock = FakeClock()
+        worker_a = _sqlite(tmp_path, clock)
+        worker_b = _sqlite(tmp_path, clock)
+        worker_a.put("s1", {"phase": 3})
+        assert worker_b.get("s1") == {"phase": 3}
+        worker_b.pop("s1")
+        assert worker_a.get("s1") is None
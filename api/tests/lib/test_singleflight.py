@@ -0,0 +1,262 @@
+"""Tests for app.lib.singleflight and its use by run_query / embed_text / fetch_ecomap_data."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.lib import singleflight
+from app.lib.singleflight import SingleFlight
+
+
+def _slow(result, calls, delay=0.05):
+    def fn(*args):
+        calls.append(args)
+        time.sleep(delay)
+        return result
+    return fn
+
+
+class TestSync:
+    def test_concurrent_identical_calls_share_one_execution(self):
+        flight = SingleFlight("test-sync")
+        calls = []
+        fn = _slow([{"name": "田中"}], calls)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: flight.do("k", fn, "q"), range(8)))
+        assert len(calls) == 1
+        assert all(r == [{"name": "田中"}] for r in results)
+        stats = flight.stats()
+        assert stats["calls"] == 8 and stats["shared"] == 7
+        assert stats["dedup_ratio"] == pytest.approx(7 / 8)
+        assert stats["in_flight"] == 0
+
+    def test_followers_get_independent_copies(self):
+        flight = SingleFlight("test-copy")
+        fn = _slow([{"n": 1}], [])
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: flight.do("k", fn), range(4)))
+        results[0][0]["n"] = 99
+        assert all(r == [{"n": 1}] for r in results[1:])
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight("test-keys")
+        calls = []
+        fn = _slow("x", calls, delay=0.02)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda i: flight.do(i % 2, fn, i % 2), range(4)))
+        assert sorted(calls) == [(0,), (1,)]
+
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight("test-seq")
+        fn = MagicMock(return_value=1)
+        flight.do("k", fn)
+        flight.do("k", fn)
+        assert fn.call_count == 2
+        assert flight.stats()["shared"] == 0
+
+    def test_error_reaches_every_caller(self):
+        flight = SingleFlight("test-error")
+        started = threading.Event()
+
+        def boom():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError("db down")
+
+        def follower():
+            started.wait()
+            return flight.do("k", boom)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(flight.do, "k", boom), pool.submit(follower)]
+            for future in futures:
+                with pytest.raises(ValueError):
+                    future.result()
+        assert flight.stats()["shared"] == 1
+
+
+class TestAsync:
+    def test_concurrent_identical_awaits_share_one_execution(self):
+        flight = SingleFlight("test-async")
+        calls = []
+
+        async def fetch(text):
+            calls.append(text)
+            await asyncio.sleep(0.02)
+            return [0.1, 0.2]
+
+        async def run():
+            return await asyncio.gather(*(flight.do_async("k", fetch, "質問") for _ in range(5)))
+
+        results = asyncio.run(run())
+        assert calls == ["質問"]
+        assert results == [[0.1, 0.2]] * 5
+        assert flight.stats()["shared"] == 4
+
+    def test_leader_cancellation_does_not_fail_followers(self):
+        flight = SingleFlight("test-cancel")
+
+        async def fetch():
+            await asyncio.sleep(0.03)
+            return "done"
+
+        async def run():
+            leader = asyncio.create_task(flight.do_async("k", fetch))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flight.do_async("k", fetch))
+            await asyncio.sleep(0.005)
+            leader.cancel()
+            await asyncio.gather(leader, return_exceptions=True)
+            return await follower
+
+        assert asyncio.run(run()) == "done"
+
+    def test_abandoned_leader_cancels_the_work(self):
+        flight = SingleFlight("test-abandon")
+        finished = []
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            finished.append(True)
+
+        async def run():
+            leader = asyncio.create_task(flight.do_async("k", fetch))
+            await asyncio.sleep(0.005)
+            leader.cancel()
+            await asyncio.gather(leader, return_exceptions=True)
+            await asyncio.sleep(0.07)
+
+        asyncio.run(run())
+        assert finished == []
+        assert flight.stats()["in_flight"] == 0
+
+    def test_async_follower_of_a_thread_leader(self):
+        flight = SingleFlight("test-mixed")
+        calls = []
+        started = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return {"ok": True}
+
+        async def follower():
+            await asyncio.to_thread(started.wait)
+
+            async def never():
+                raise AssertionError("follower must not execute")
+
+            return await flight.do_async("k", never)
+
+        thread = threading.Thread(target=flight.do, args=("k", fetch))
+        thread.start()
+        assert asyncio.run(follower()) == {"ok": True}
+        thread.join()
+        assert calls == [1]
+
+
+class TestRunQuery:
+    def _driver(self, delay=0.05):
+        calls = []
+
+        def run(query, params):
+            calls.append(query)
+            time.sleep(delay)
+            result = MagicMock()
+            result.__iter__.return_value = iter([SimpleNamespace(data=lambda: {"name": "田中"})])
+            result.consume.return_value.counters.contains_updates = False
+            return result
+
+        driver = MagicMock()
+        driver.session.return_value.__enter__.return_value.run.side_effect = run
+        return driver, calls
+
+    def test_identical_reads_are_coalesced(self):
+        from app.lib import db_operations
+        driver, calls = self._driver()
+        with patch.object(db_operations, "get_driver", return_value=driver):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(
+                    lambda _: db_operations.run_query("MATCH (c:Client {name: $n}) RETURN c.name AS name", {"n": "田中"}),
+                    range(4),
+                ))
+        assert len(calls) == 1
+        assert results == [[{"name": "田中"}]] * 4
+
+    def test_writes_are_never_coalesced(self):
+        from app.lib import db_operations
+        driver, calls = self._driver()
+        with patch.object(db_operations, "get_driver", return_value=driver):
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                list(pool.map(lambda _: db_operations.run_query("MATCH (c:Client) SET c.seen = true"), range(3)))
+        assert len(calls) == 3
+
+    def test_writes_bump_the_generation_in_the_key(self):
+        from app.lib import db_operations
+        before = db_operations.write_generation()
+        with patch.object(db_operations, "_write_listeners", []):
+            db_operations._notify_write({"Client"}, None)
+        assert db_operations.write_generation() == before + 1
+
+    def test_read_detection(self):
+        from app.lib.db_operations import is_read_query
+        assert is_read_query("MATCH (c:Client) RETURN c.name")
+        assert is_read_query("CALL db.index.vector.queryNodes($i, 5, $v) YIELD node RETURN node")
+        assert not is_read_query("MERGE (c:Client {name: $n})")
+        assert not is_read_query("MATCH (n) DETACH DELETE n")
+        assert not is_read_query("CALL apoc.create.node(['X'], {})")
+
+    def test_disabled_by_setting(self):
+        from app.lib import db_operations
+        driver, calls = self._driver(delay=0.02)
+        with patch.object(db_operations, "get_driver", return_value=driver), \
+             patch.object(db_operations.settings, "single_flight_enabled", False):
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                list(pool.map(lambda _: db_operations.run_query("MATCH (c:Client) RETURN c"), range(3)))
+        assert len(calls) == 3
+
+
+class TestEmbedAndEcomap:
+    def test_concurrent_embed_text_shares_one_request(self):
+        from app.lib import embedding
+
+        def embed_content(**kwargs):
+            time.sleep(0.03)
+            return SimpleNamespace(embeddings=[SimpleNamespace(values=[0.5])])
+
+        client = MagicMock()
+        client.models.embed_content.side_effect = embed_content
+
+        async def run():
+            return await asyncio.gather(*(embedding.embed_text("同じ質問", "RETRIEVAL_QUERY") for _ in range(4)))
+
+        with patch.object(embedding, "_get_client", return_value=client):
+            results = asyncio.run(run())
+        assert results == [[0.5]] * 4
+        assert client.models.embed_content.call_count == 1
+
+    def test_concurrent_ecomap_fetches_share_one_fetch(self):
+        from app.lib import ecomap
+        calls = []
+
+        def stream_query(query, params):
+            calls.append(query)
+            time.sleep(0.01)
+            return iter([])
+
+        with patch.object(ecomap, "stream_query", side_effect=stream_query):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(lambda _: ecomap.fetch_ecomap_data("田中", "emergency"), range(4)))
+        assert len(calls) == len(ecomap.TEMPLATES["emergency"]["categories"])
+        assert all(r.client_name == "田中" and len(r.nodes) == 1 for r in results)
+
+
+def test_stats_lists_registered_flights():
+    names = {s["name"] for s in singleflight.stats()}
+    assert {"run_query", "embed_text", "fetch_ecomap_data"} <= names
@@ -0,0 +1,101 @@
+"""Tests for the materialized dashboard/graph stats projection."""
+
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.lib import stats
+
+
+@pytest.fixture
+def seeded(fresh_stats):
+    """Projection reconciled from a small fake database."""
+    soon = (date.today() + timedelta(days=5)).isoformat()
+
+    def fake(query, params=None):
+        if "UNION ALL" in query:
+            return [{"label": "Client", "cnt": 3}, {"label": "SupportLog", "cnt": 10}]
+        if query == "MATCH (n) RETURN count(n) AS cnt":
+            return [{"cnt": 13}]
+        if query == "MATCH ()-[r]->() RETURN count(r) AS cnt":
+            return [{"cnt": 20}]
+        if "SupportLog" in query:
+            return [{"cnt": 4}]
+        if "HAS_CERTIFICATE" in query:
+            return [{"renewal_date": soon, "cnt": 1}]
+        return []
+
+    with patch("app.lib.stats.run_query", side_effect=fake) as mock_rq:
+        stats.reconcile()
+        yield mock_rq
+
+
+class TestWriteHooks:
+    def test_created_support_log_this_month_increments(self, seeded):
+        stats.record_node_created("SupportLog", {"date": date.today().isoformat()})
+        result = stats.dashboard_stats()
+        assert result["log_count_this_month"] == 5
+        assert stats.graph_stats()["total_nodes"] == 14
+
+    def test_old_support_log_does_not_count_for_month(self, seeded):
+        stats.record_node_created("SupportLog", {"date": "2000-01-01"})
+        assert stats.dashboard_stats()["log_count_this_month"] == 4
+        assert stats.graph_stats()["label_counts"]["SupportLog"] == 11
+
+    def test_created_client_increments_without_query(self, seeded):
+        calls = seeded.call_count
+        stats.record_node_created("Client", {"name": "新規"})
+        assert stats.dashboard_stats()["client_count"] == 4
+        assert seeded.call_count == calls
+
+    def test_relationships_increment_edges(self, seeded):
+        stats.record_relationships_created("ABOUT", 2)
+        assert stats.graph_stats()["total_edges"] == 22
+
+    def test_certificate_link_reloads_renewals_only(self, seeded):
+        stats.record_relationships_created("HAS_CERTIFICATE")
+        calls = seeded.call_count
+        stats.dashboard_stats()
+        assert seeded.call_count == calls + 1
+        assert "HAS_CERTIFICATE" in seeded.call_args.args[0]
+
+    def test_adhoc_write_marks_labels_dirty(self, seeded):
+        counters = SimpleNamespace(nodes_created=1)
+        stats.record_write("MERGE (c:Client {name: $name})", counters)
+        calls = seeded.call_count
+        stats.graph_stats()
+        # label UNION + total nodes + total edges
+        assert seeded.call_count == calls + 3
+
+    def test_property_only_write_triggers_no_recount(self, seeded):
+        counters = SimpleNamespace(properties_set=1)
+        stats.record_write("MATCH (c:Client {name: $name}) SET c.dob = $dob", counters)
+        calls = seeded.call_count
+        stats.dashboard_stats()
+        assert seeded.call_count == calls
+
+    def test_hooks_are_noop_before_first_reconcile(self, fresh_stats):
+        stats.record_node_created("Client", {})
+        stats.record_relationships_created("ABOUT")
+        with patch("app.lib.stats.run_query", return_value=[]):
+            assert stats.dashboard_stats()["client_count"] == 0
+
+
+class TestRenewalWindow:
+    def test_only_dates_within_window_are_counted(self, fresh_stats):
+        today = date.today()
+        renewals = {
+            today.isoformat(): 1,
+            (today + timedelta(days=stats.RENEWAL_WINDOW_DAYS)).isoformat(): 2,
+            (today + timedelta(days=stats.RENEWAL_WINDOW_DAYS + 1)).isoformat(): 4,
+        }
+
+        def fake(query, params=None):
+            if "HAS_CERTIFICATE" in query:
+                return [{"renewal_date": d, "cnt": c} for d, c in renewals.items()]
+            return []
+
+        with patch("app.lib.stats.run_query", side_effect=fake):
+            assert stats.dashboard_stats()["renewal_alerts"] == 3
@@ -0,0 +1,123 @@
+"""Tests for segmented parallel transcription."""
+
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.lib import transcription
+from app.lib.transcription import merge_transcripts, plan_segments, transcribe_segmented
+
+
+class TestPlanSegments:
+    def test_short_audio_is_one_segment(self):
+        assert plan_segments(300, segment_seconds=600) == [(0.0, 300)]
+
+    def test_fixed_windows_overlap(self):
+        segments = plan_segments(1500, segment_seconds=600, overlap_seconds=5)
+        assert segments == [(0.0, 600.0), (595.0, 1195.0), (1190.0, 1500)]
+
+    def test_cuts_on_nearby_silence_without_overlap(self):
+        segments = plan_segments(1900, silences=[580.0, 1230.0], segment_seconds=600,
+                                 overlap_seconds=5, search_seconds=60)
+        assert segments == [(0.0, 580.0), (580.0, 1230.0), (1230.0, 1900)]
+
+    def test_no_tiny_tail_segment(self):
+        assert plan_segments(700, segment_seconds=600) == [(0.0, 700)]
+
+    def test_distant_silence_ignored(self):
+        segments = plan_segments(1300, silences=[300.0], segment_seconds=600,
+                                 overlap_seconds=5, search_seconds=60)
+        assert segments[0] == (0.0, 600.0)
+
+
+class TestMergeTranscripts:
+    def test_overlap_removed(self):
+        merged = merge_transcripts(["今日は天気が良いので散歩に行きました", "散歩に行きました。公園で休憩"])
+        assert merged == "今日は天気が良いので散歩に行きました\n。公園で休憩"
+
+    def test_short_coincidence_kept(self):
+        merged = merge_transcripts(["はい", "はい、そうです"])
+        assert merged == "はい\nはい、そうです"
+
+    def test_empty_parts_skipped(self):
+        assert merge_transcripts(["", "  前半  ", "", "後半"]) == "前半\n後半"
+
+
+@pytest.fixture
+def segmented(tmp_path):
+    """Pretend the audio is 30 minutes long and ffmpeg cuts 10-minute segments."""
+    source = tmp_path / "meeting.wav"
+    source.write_bytes(b"full audio")
+
+    def fake_cut(path, start, end, dest):
+        Path(dest).write_bytes(f"{start:.0f}-{end:.0f}".encode())
+
+    with patch("app.lib.transcription.probe_duration", return_value=1800.0), \
+         patch("app.lib.transcription.detect_silences", return_value=[]), \
+         patch("app.lib.transcription.cut_segment", side_effect=fake_cut):
+        yield source
+
+
+class TestTranscribeSegmented:
+    def test_segments_transcribed_and_stitched_in_order(self, segmented):
+        def transcribe(path):
+            time.sleep(0.01 if path.endswith("0000.wav") else 0)
+            return Path(path).read_text()
+
+        text = transcribe_segmented(str(segmented), transcribe, segment_seconds=600, overlap_seconds=5)
+        assert text.splitlines() == ["0-600", "595-1195", "1190-1800"]
+
+    def test_concurrency_capped(self, segmented):
+        lock = threading.Lock()
+        running = peak = 0
+
+        def transcribe(path):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+            return "x" * 10
+
+        transcribe_segmented(str(segmented), transcribe, max_workers=2, segment_seconds=300, overlap_seconds=0)
+        assert peak == 2
+
+    def test_retry_only_redoes_failed_segments(self, segmented, tmp_path):
+        calls = []
+        failed = set()
+
+        def flaky(path):
+            text = Path(path).read_text()
+            calls.append(text)
+            if text.startswith("595") and text not in failed:
+                failed.add(text)
+                return None
+            return text
+
+        cache = tmp_path / "cache"
+        kwargs = dict(cache_dir=cache, namespace="m", segment_seconds=600, overlap_seconds=5)
+        assert transcribe_segmented(str(segmented), flaky, **kwargs) is None
+        calls.clear()
+        assert transcribe_segmented(str(segmented), flaky, **kwargs) is not None
+        assert calls == ["595-1195"]
+
+    def test_short_audio_single_call(self, tmp_path):
+        source = tmp_path / "short.wav"
+        source.write_bytes(b"short")
+        with patch("app.lib.transcription.probe_duration", return_value=120.0), \
+             patch("app.lib.transcription.cut_segment") as mock_cut:
+            assert transcribe_segmented(str(source), lambda p: "全文") == "全文"
+        mock_cut.assert_not_called()
+
+    def test_segmentation_failure_falls_back_to_whole_file(self, tmp_path):
+        source = tmp_path / "long.wav"
+        source.write_bytes(b"long")
+        with patch("app.lib.transcription.probe_duration", return_value=3600.0), \
+             patch("app.lib.transcription.detect_silences", return_value=[]), \
+             patch("app.lib.transcription.cut_segment", side_effect=FileNotFoundError("ffmpeg")):
+            assert transcribe_segmented(str(source), lambda p: Path(p).name) == "long.wav"
@@ -0,0 +1,353 @@
+"""Tests for the chat WebSocket: streaming, cancellation and backpressure."""
+
+import asyncio
+import json
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.routers.chat import _Outbox
+
+
+def _receive_until(ws, frame_type: str) -> list[dict]:
+    frames = []
+    while True:
+        frame = ws.receive_json()
+        frames.append(frame)
+        if frame["type"] == frame_type:
+            return frames
+
+
+@pytest.fixture(autouse=True)
+def no_embedding():
+    """Answer-cache lookups see no embedding (exact-question hits only)."""
+    with patch("app.lib.embedding.embed_text", AsyncMock(return_value=None)) as mock:
+        yield mock
+
+
+@pytest.fixture
+def session_agent():
+    with patch("app.routers.chat.create_session_agent", return_value=MagicMock()) as mock:
+        yield mock
+
+
+class TestChatStreaming:
+    def test_forwards_deltas_and_tool_events_in_order(self, client, session_agent):
+        async def fake_events(message, agent=None, memory=None, cache_probe=None):
+            yield {"type": "tool_start", "tool": "search_client_info", "call_id": "c1"}
+            yield {"type": "tool_end", "tool": "search_client_info", "call_id": "c1", "error": False}
+            yield {"type": "stream", "content": "山田さんの"}
+            yield {"type": "stream", "content": "情報です。"}
+
+        with patch("app.routers.chat.chat_events", fake_events):
+            with client.websocket_connect("/api/chat/ws") as ws:
+                ws.send_text(json.dumps({"type": "message", "content": "山田さんについて"}))
+                frames = _receive_until(ws, "done")
+
+        types = [f["type"] for f in frames]
+        assert types[0] == "routing"
+        assert types.index("tool_start") < types.index("tool_end") < types.index("stream")
+        assert "".join(f["content"] for f in frames if f["type"] == "stream") == "山田さんの情報です。"
+        assert session_agent.call_count == 1
+
+    def test_emergency_reply_is_one_frame(self, client):
+        with patch("app.routers.chat.handle_emergency", return_value="緊急連絡先: 090-0000-0000"):
+            with client.websocket_connect("/api/chat/ws") as ws:
+                ws.send_text(json.dumps({"type": "message", "content": "山田さんが倒れた"}))
+                frames = _receive_until(ws, "done")
+
+        streams = [f for f in frames if f["type"] == "stream"]
+        assert frames[0]["agent"] == "safety_first"
+        assert [s["content"] for s in streams] == ["緊急連絡先: 090-0000-0000"]
+
+    def test_emergency_is_pinned_for_later_turns(self, client, session_agent):
+        seen = {}
+
+        async def fake_events(message, agent=None, memory=None, cache_probe=None):
+            seen["context"] = memory.system_context()
+            seen["messages"] = memory.context_messages()
+            yield {"type": "stream", "content": "ok"}
+
+        with patch("app.routers.chat.handle_emergency", return_value="緊急連絡先: 090-0000-0000"), \
+             patch("app.routers.chat.chat_events", fake_events):
+            with client.websocket_connect("/api/chat/ws") as ws:
+                ws.send_text(json.dumps({"type": "message", "content": "山田さんが倒れた"}))
+                _receive_until(ws, "done")
+                ws.send_text(json.dumps({"type": "message", "content": "次に何をすれば？"}))
+                _receive_until(ws, "done")
+
+        assert "進行中の緊急事態" in seen["context"]
+        assert "山田さんが倒れた" in seen["context"]
+        assert seen["messages"][0] == {"role": "user", "content": "山田さんが倒れた"}
+
+    def test_emergency_is_unpinned_after_calm_turns(self, client, session_agent):
+        from app.lib import rate_limit
+        from app.routers.chat import _EMERGENCY_PIN_TURNS
+
+        seen = []
+
+        async def fake_events(message, agent=None, memory=None, cache_probe=None):
+            seen.append(("進行中の緊急事態" in memory.pins, rate_limit.current_priority()))
+            yield {"type": "stream", "content": "ok"}
+
+        with patch("app.routers.chat.handle_emergency", return_value="緊急連絡先: 090-0000-0000"), \
+             patch("app.routers.chat.chat_events", fake_events):
+            with client.websocket_connect("/api/chat/ws") as ws:
+                ws.send_text(json.dumps({"type": "message", "content": "山田さんが倒れた"}))
+                _receive_until(ws, "done")
+                for i in range(_EMERGENCY_PIN_TURNS + 1):
+                    ws.send_text(json.dumps({"type": "message", "content": f"次の予定{i}を確認したい"}))
+                    _receive_until(ws, "done")
+
+        open_turns = [(True, rate_limit.Priority.EMERGENCY)] * _EMERGENCY_PIN_TURNS
+        assert seen == open_turns + [(False, rate_limit.Priority.INTERACTIVE)]
+
+    def test_emergency_without_name_uses_last_mentioned_client(self, client, session_agent):
+        async def fake_events(message, agent=None, memory=None, cache_probe=None):
+            yield {"type": "stream", "content": "ok"}
+
+        with patch("app.routers.chat.handle_emergency", return_value="緊急情報") as handle, \
+             patch("app.routers.chat.chat_events", fake_events):
+            with client.websocket_connect("/api/chat/ws") as ws:
+                ws.send_text(json.dumps({"type": "message", "content": "田中太郎さんの様子はどう？"}))
+                _receive_until(ws, "done")
+                ws.send_text(json.dumps({"type": "message", "content": "助けて！倒れた"}))
+                _receive_until(ws, "done")
+
+        assert handle.call_args.kwargs["client_name"] == "田中太郎"
+
+    def test_repeated_question_served_from_cache_until_data_changes(self, client, session_agent):
+        from app.lib.response_cache import _on_write
+
+        runs = []
+
+        async def fake_events(message, agent=None, memory=None, cache_probe=None):
+            runs.append(message)
+            from app.agents.gemini_agent import get_response_cache
+            get_response_cache().put(cache_probe, f"回答{len(runs)}")
+            yield {"type": "stream", "content": f"回答{len(runs)}"}
+
+        def ask(ws, text):
+            ws.send_text(json.dumps({"type": "message", "content": text}))
+            return _receive_until(ws, "done")
+
+        with patch("app.routers.chat.chat_events", fake_events):
+            with client.websocket_connect("/api/chat/ws") as ws:
+                ask(ws, "田中太郎さんの禁忌事項は？")
+                frames = ask(ws, "田中太郎さんの禁忌事項は？")
+                _on_write({"NgAction"}, {"田中太郎"})
+                ask(ws, "田中太郎さんの禁忌事項は？")
+
+        assert frames[0]["decision"] == "cached_answer"
+        assert [f["content"] for f in frames if f["type"] == "stream"] == ["回答1"]
+        assert len(runs) == 2
+
+        stats = {c["name"]: c for c in client.get("/api/system/caches").json()}
+        assert stats["chat_response"]["saved_llm_calls"] == 1
+
+    def test_context_answer_is_not_shared_with_other_sessions(self, client, session_agent):
+        from app.lib import client_context
+
+        runs, probes = [], []
+
+        async def fake_events(message, agent=None, memory=None, cache_probe=None):
+            runs.append(message)
+            probes.append(cache_probe)
+            if "やまだ" in message:
+                # The tools resolve a client the message scan did not find
+                client_context._current.get().last_client = "山田一郎"
+            answer = f"回答{len(runs)}"
+            if cache_probe is not None:
+                from app.agents.gemini_agent import get_response_cache
+                get_response_cache().put(cache_probe, answer)
+            memory.add_turn(message, answer)
+            yield {"type": "stream", "content": answer}
+
+        def ask(ws, text):
+            ws.send_text(json.dumps({"type": "message", "content": text}))
+            return [f["content"] for f in _receive_until(ws, "done") if f["type"] == "stream"]
+
+        with patch("app.routers.chat.chat_events", fake_events):
+            with client.websocket_connect("/api/chat/ws") as a:
+                ask(a, "やまだいちろうの最近の様子")
+                assert ask(a, "禁忌事項を教えて") == ["回答2"]
+            with client.websocket_connect("/api/chat/ws") as b:
+                assert ask(b, "禁忌事項を教えて") == ["回答3"]
+                ask(b, "更新期限が近い手帳を教えて")
+
+        assert probes[1].key[:2] == ("context", "山田一郎")
+        assert probes[2].key[:2] == ("context", None)
+        # No client and an earlier turn: the answer is this session's own
+        assert probes[3] is None
+
+    def test_new_message_cancels_running_turn(self, client, session_agent):
+        cancelled = threading.Event()
+
+        async def fake_events(message, agent=None, memory=None, cache_probe=None):
+            if message == "first":
+                yield {"type": "stream", "content": "partial"}
+                try:
+                    await asyncio.Event().wait()
+                finally:
+                    cancelled.set()
+            yield {"type": "stream", "content": f"reply to {message}"}
+
+        with patch("app.routers.chat.chat_events", fake_events):
+            with client.websocket_connect("/api/chat/ws") as ws:
+                ws.send_text(json.dumps({"type": "message", "content": "first"}))
+                assert _receive_until(ws, "stream")[-1]["content"] == "partial"
+                ws.send_text(json.dumps({"type": "message", "content": "second"}))
+                frames = _receive_until(ws, "done")
+
+        assert cancelled.is_set()
+        assert frames[0]["type"] == "cancelled"
+        streams = [f["content"] for f in frames if f["type"] == "stream"]
+        assert streams == ["reply to second"]
+
+    def test_disconnect_cancels_running_turn(self, client, session_agent):
+        cancelled = threading.Event()
+
+        async def fake_events(message, agent=None, memory=None, cache_probe=None):
+            yield {"type": "stream", "content": "partial"}
+            try:
+                await asyncio.Event().wait()
+            finally:
+                cancelled.set()
+
+        with patch("app.routers.chat.chat_events", fake_events):
+            with client.websocket_connect("/api/chat/ws") as ws:
+                ws.send_text(json.dumps({"type": "message", "content": "hello"}))
+                _receive_until(ws, "stream")
+
+        assert cancelled.wait(timeout=2)
+
+    def test_model_switch_keeps_session_agent(self, client, session_agent):
+        async def fake_events(message, agent=None, memory=None, cache_probe=None):
+            yield {"type": "stream", "content": "ok"}
+
+        with patch("app.routers.chat.chat_events", fake_events), \
+             patch("app.routers.chat.switch_session_model") as switch:
+            with client.websocket_connect("/api/chat/ws") as ws:
+                ws.send_text(json.dumps({"type": "message", "content": "こんにちは"}))
+                _receive_until(ws, "done")
+                ws.send_text(json.dumps({"type": "message", "content": "Claudeに切り替えて"}))
+                _receive_until(ws, "done")
+                ws.send_text(json.dumps({"type": "message", "content": "続けて"}))
+                frames = _receive_until(ws, "done")
+
+        assert session_agent.call_count == 1
+        switch.assert_called_once_with(session_agent.return_value, "claude")
+        assert frames[0]["agent"] == "claude"
+
+    def test_model_switch(self, client):
+        with client.websocket_connect("/api/chat/ws") as ws:
+            ws.send_text(json.dumps({"type": "message", "content": "Claudeに切り替えて"}))
+            frames = _receive_until(ws, "done")
+        assert frames[0]["type"] == "model_switched"
+        assert frames[0]["provider"] == "claude"
+
+
+class _SlowSocket:
+    def __init__(self):
+        self.sent: list[dict] = []
+        self.release = asyncio.Event()
+
+    async def send_json(self, frame):
+        await self.release.wait()
+        self.sent.append(frame)
+
+
+class TestOutbox:
+    @pytest.mark.asyncio
+    async def test_coalesces_stream_deltas_while_client_is_slow(self):
+        ws = _SlowSocket()
+        outbox = _Outbox(ws)
+        await outbox.send({"type": "routing", "agent": "gemini"})
+        await asyncio.sleep(0)  # sender picks up the routing frame and blocks
+        for i in range(500):
+            await outbox.send({"type": "stream", "content": str(i % 10), "agent": "gemini"})
+        await outbox.send({"type": "done"})
+        ws.release.set()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        outbox.close()
+
+        assert [f["type"] for f in ws.sent] == ["routing", "stream", "done"]
+        assert ws.sent[1]["content"] == "0123456789" * 50
+
+    @pytest.mark.asyncio
+    async def test_non_stream_frames_wait_for_room(self, monkeypatch):
+        monkeypatch.setattr("app.routers.chat._OUTBOX_LIMIT", 2)
+        ws = _SlowSocket()
+        outbox = _Outbox(ws)
+        await outbox.send({"type": "a"})
+        await asyncio.sleep(0)
+        await outbox.send({"type": "b"})
+        await outbox.send({"type": "c"})
+        blocked = asyncio.create_task(outbox.send({"type": "d"}))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+
+        ws.release.set()
+        await asyncio.wait_for(blocked, timeout=1)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        outbox.close()
+        assert [f["type"] for f in ws.sent] == ["a", "b", "c", "d"]
+
+
+class _ScriptedSocket:
+    """Sends one message, then disconnects once ``disconnect`` is set."""
+
+    def __init__(self, message: str):
+        self.message = message
+        self.disconnect = asyncio.Event()
+        self.received = False
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        from fastapi import WebSocketDisconnect
+
+        if not self.received:
+            self.received = True
+            return self.message
+        await self.disconnect.wait()
+        raise WebSocketDisconnect()
+
+    async def send_json(self, frame):
+        pass
+
+
+class TestDisconnectDuringIntake:
+    @pytest.mark.asyncio
+    async def test_intake_session_removed_after_running_turn_finishes(self):
+        from app.agents import intake_agent
+        from app.routers.chat import chat_websocket
+
+        release = asyncio.Event()
+        seen = {}
+
+        async def slow_handle(session, user_text):
+            seen["id"] = session.session_id
+            await release.wait()
+            return {"response": "登録しました"}
+
+        ws = _ScriptedSocket(json.dumps({"mode": "intake", "content": "はい"}))
+        with patch("app.agents.intake_agent._handle", slow_handle):
+            endpoint = asyncio.create_task(chat_websocket(ws))
+            while "id" not in seen:
+                await asyncio.sleep(0.01)
+            ws.disconnect.set()
+            await endpoint
+            # The turn is still running and keeps its session until it is done
+            assert seen["id"] in intake_agent._sessions
+            release.set()
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                if seen["id"] not in intake_agent._sessions:
+                    break
+
+        assert seen["id"] not in intake_agent._sessions
@@ -4,6 +4,7 @@ All Neo4j queries are mocked — no running database required.
 """
 
 from unittest.mock import patch, call
+from urllib.parse import unquote
 
 
 class TestListClients:
@@ -28,26 +29,29 @@ class TestListClients:
         assert resp.json() == []
 
     def test_list_clients_kana_filter_ta(self, client, sample_client_row):
-        """た行フィルタで田中太郎（たなかたろう）がマッチする。"""
-        with patch("app.routers.clients.run_query", return_value=[sample_client_row]):
+        """た行フィルタは kanaRow の等価条件として Cypher に渡される。"""
+        with patch("app.routers.clients.run_query", return_value=[sample_client_row]) as mock_rq:
             resp = client.get("/api/clients?kana_prefix=た")
 
         assert resp.status_code == 200
         data = resp.json()
         assert len(data) == 1
         assert data[0]["name"] == "田中太郎"
+        query, params = mock_rq.call_args.args
+        assert "c.kanaRow = $kana_row" in query
+        assert params["kana_row"] == "た"
 
-    def test_list_clients_kana_filter_no_match(self, client, sample_client_row):
-        """あ行フィルタで田中太郎はマッチしない。"""
-        with patch("app.routers.clients.run_query", return_value=[sample_client_row]):
+    def test_list_clients_kana_filter_no_match(self, client):
+        """あ行フィルタで該当なしの場合、DB が空を返しそのまま空リストになる。"""
+        with patch("app.routers.clients.run_query", return_value=[]) as mock_rq:
             resp = client.get("/api/clients?kana_prefix=あ")
 
         assert resp.status_code == 200
-        data = resp.json()
-        assert len(data) == 0
+        assert resp.json() == []
+        assert mock_rq.call_args.args[1]["kana_row"] == "あ"
 
-    def test_list_clients_abc_filter_matches_alpha_name(self, client):
-        """ABCフィルタでアルファベット名がマッチする。"""
+    def test_list_clients_abc_filter_uses_alpha_row(self, client):
+        """ABCフィルタは kanaRow = "ABC" で絞り込む。"""
         alpha_row = {
             "name": "M・K",
             "dob": "2000-01-01",
@@ -55,22 +59,53 @@ class TestListClients:
             "kana": None,
             "conditions": [],
         }
-        with patch("app.routers.clients.run_query", return_value=[alpha_row]):
+        with patch("app.routers.clients.run_query", return_value=[alpha_row]) as mock_rq:
             resp = client.get("/api/clients?kana_prefix=ABC")
 
         assert resp.status_code == 200
         data = resp.json()
         assert len(data) == 1
         assert data[0]["name"] == "M・K"
+        assert mock_rq.call_args.args[1]["kana_row"] == "ABC"
 
-    def test_list_clients_abc_filter_excludes_kanji_name(self, client, sample_client_row):
-        """ABCフィルタで漢字名は除外される。"""
+    def test_list_clients_non_row_prefix_matches_first_char(self, client):
+        """行頭以外の文字は kana の先頭文字で絞り込む。"""
+        with patch("app.routers.clients.run_query", return_value=[]) as mock_rq:
+            resp = client.get("/api/clients?kana_prefix=ち")
+
+        assert resp.status_code == 200
+        query, params = mock_rq.call_args.args
+        assert "left(c.kana, 1) IN $kana_chars" in query
+        assert params["kana_chars"] == ["ち"]
+
+    def test_list_clients_no_filter_omits_row_condition(self, client):
+        with patch("app.routers.clients.run_query", return_value=[]) as mock_rq:
+            client.get("/api/clients")
+
+        query, params = mock_rq.call_args.args
+        assert "kanaRow" not in query
+        assert params["after"] is None
+
+    def test_list_clients_keyset_cursor(self, client):
+        """ページが埋まれば X-Next-Cursor に最後の名前を返し、after で次ページを引ける。"""
+        rows = [
+            {"name": f"テスト{i}", "dob": None, "blood_type": None, "kana": "てすと", "conditions": []}
+            for i in range(2)
+        ]
+        with patch("app.routers.clients.run_query", return_value=rows) as mock_rq:
+            resp = client.get("/api/clients?limit=2&after=テスト")
+
+        assert resp.status_code == 200
+        assert unquote(resp.headers["X-Next-Cursor"]) == "テスト1"
+        assert mock_rq.call_args.args[1]["after"] == "テスト"
+        assert mock_rq.call_args.args[1]["limit"] == 2
+
+    def test_list_clients_last_page_has_no_cursor(self, client, sample_client_row):
         with patch("app.routers.clients.run_query", return_value=[sample_client_row]):
-            resp = client.get("/api/clients?kana_prefix=ABC")
+            resp = client.get("/api/clients?limit=2")
 
         assert resp.status_code == 200
-        data = resp.json()
-        assert len(data) == 0
+        assert "X-Next-Cursor" not in resp.headers
 
     def test_list_clients_calculates_age(self, client):
         row = {
@@ -208,7 +243,7 @@ class TestGetClient:
 class TestGetEmergency:
     """GET /api/clients/{name}/emergency"""
 
-    def test_get_emergency_success(self, client):
+    def test_get_emergency_success(self, client, fresh_emergency):
         row = {
             "name": "田中太郎",
             "ng_actions": [
@@ -220,10 +255,10 @@ class TestGetEmergency:
             "key_persons": [
                 {"name": "田中花子", "relationship": "母", "phone": "090-1234-5678", "rank": 1},
             ],
-            "hospital": {"name": "中央病院", "phone": "03-1234-5678"},
+            "hospitals": [{"name": "中央病院", "phone": "03-1234-5678"}],
             "guardian": {"name": "山田法律事務所", "type": "成年後見人"},
         }
-        with patch("app.routers.clients.run_query", return_value=[row]):
+        with patch("app.lib.emergency.run_query", return_value=[row]):
             resp = client.get("/api/clients/田中太郎/emergency")
 
         assert resp.status_code == 200
@@ -232,24 +267,25 @@ class TestGetEmergency:
         assert len(data["ng_actions"]) == 1
         assert len(data["key_persons"]) == 1
         assert data["hospital"]["name"] == "中央病院"
+        assert [h["name"] for h in data["hospitals"]] == ["中央病院"]
 
-    def test_get_emergency_not_found(self, client):
-        with patch("app.routers.clients.run_query", return_value=[]):
+    def test_get_emergency_not_found(self, client, fresh_emergency):
+        with patch("app.lib.emergency.run_query", return_value=[]):
             resp = client.get("/api/clients/存在しない人/emergency")
 
         assert resp.status_code == 404
 
-    def test_get_emergency_minimal_data(self, client):
+    def test_get_emergency_minimal_data(self, client, fresh_emergency):
         """Client exists but has no related nodes."""
         row = {
             "name": "最小テスト",
             "ng_actions": [],
             "care_preferences": [],
             "key_persons": [],
-            "hospital": None,
+            "hospitals": [],
             "guardian": None,
         }
-        with patch("app.routers.clients.run_query", return_value=[row]):
+        with patch("app.lib.emergency.run_query", return_value=[row]):
             resp = client.get("/api/clients/最小テスト/emergency")
 
         assert resp.status_code == 200
@@ -259,6 +295,25 @@ class TestGetEmergency:
         assert data["hospital"] is None
 
 
+    def test_get_emergency_served_from_memory(self, client, fresh_emergency):
+        row = {"name": "田中太郎", "ng_actions": [], "care_preferences": [],
+               "key_persons": [], "hospital": None, "guardian": None}
+        with patch("app.lib.emergency.run_query", return_value=[row]):
+            fresh_emergency.warm()
+        # Neo4j が落ちていてもメモリ上のバンドルを返す
+        with patch("app.lib.emergency.run_query", side_effect=Exception("down")):
+            resp = client.get("/api/clients/田中太郎/emergency")
+
+        assert resp.status_code == 200
+        assert resp.json()["client_name"] == "田中太郎"
+
+    def test_get_emergency_db_error_returns_500(self, client, fresh_emergency):
+        with patch("app.lib.emergency.run_query", side_effect=Exception("down")):
+            resp = client.get("/api/clients/田中太郎/emergency")
+
+        assert resp.status_code == 500
+
+
 class TestGetLogs:
     """GET /api/clients/{name}/logs"""
 
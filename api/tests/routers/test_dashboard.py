@@ -3,19 +3,35 @@
 All Neo4j queries are mocked — no running database required.
 """
 
+from datetime import date, timedelta
 from unittest.mock import patch
 
 
+def _stats_db(labels=None, logs=0, renewals=None, total_nodes=0, total_edges=0):
+    """run_query stand-in for app.lib.stats recount queries."""
+    def fake(query, params=None):
+        if "UNION ALL" in query:
+            return [{"label": k, "cnt": v} for k, v in (labels or {}).items()]
+        if "MATCH (n) RETURN count(n)" in query:
+            return [{"cnt": total_nodes}]
+        if "MATCH ()-[r]->()" in query:
+            return [{"cnt": total_edges}]
+        if "SupportLog" in query:
+            return [{"cnt": logs}]
+        if "HAS_CERTIFICATE" in query:
+            return [{"renewal_date": d, "cnt": c} for d, c in (renewals or {}).items()]
+        return []
+    return fake
+
+
 class TestGetStats:
     """GET /api/dashboard/stats"""
 
-    def test_get_stats_success(self, client):
-        side_effects = [
-            [{"cnt": 15}],          # client count
-            [{"cnt": 42}],          # log count this month
-            [{"cnt": 3}],           # renewal alerts
-        ]
-        with patch("app.routers.dashboard.run_query", side_effect=side_effects):
+    def test_get_stats_success(self, client, fresh_stats):
+        soon = (date.today() + timedelta(days=10)).isoformat()
+        later = (date.today() + timedelta(days=200)).isoformat()
+        fake = _stats_db(labels={"Client": 15}, logs=42, renewals={soon: 3, later: 5})
+        with patch("app.lib.stats.run_query", side_effect=fake):
             resp = client.get("/api/dashboard/stats")
 
         assert resp.status_code == 200
@@ -24,8 +40,8 @@ class TestGetStats:
         assert data["log_count_this_month"] == 42
         assert data["renewal_alerts"] == 3
 
-    def test_get_stats_empty_db(self, client):
-        with patch("app.routers.dashboard.run_query", return_value=[]):
+    def test_get_stats_empty_db(self, client, fresh_stats):
+        with patch("app.lib.stats.run_query", return_value=[]):
             resp = client.get("/api/dashboard/stats")
 
         assert resp.status_code == 200
@@ -34,15 +50,24 @@ class TestGetStats:
         assert data["log_count_this_month"] == 0
         assert data["renewal_alerts"] == 0
 
-    def test_get_stats_db_error_returns_500(self, client):
-        with patch("app.routers.dashboard.run_query", side_effect=Exception("Connection refused")):
+    def test_get_stats_db_error_returns_500(self, client, fresh_stats):
+        with patch("app.lib.stats.run_query", side_effect=Exception("Connection refused")):
             resp = client.get("/api/dashboard/stats")
 
         assert resp.status_code == 500
 
-    def test_get_stats_response_fields(self, client):
-        side_effects = [[{"cnt": 0}], [{"cnt": 0}], [{"cnt": 0}]]
-        with patch("app.routers.dashboard.run_query", side_effect=side_effects):
+    def test_get_stats_served_from_projection(self, client, fresh_stats):
+        """2回目以降は DB を再集計せずメモリ上の集計値を返す。"""
+        with patch("app.lib.stats.run_query", side_effect=_stats_db(labels={"Client": 2})) as mock_rq:
+            client.get("/api/dashboard/stats")
+            calls = mock_rq.call_count
+            resp = client.get("/api/dashboard/stats")
+
+        assert resp.json()["client_count"] == 2
+        assert mock_rq.call_count == calls
+
+    def test_get_stats_response_fields(self, client, fresh_stats):
+        with patch("app.lib.stats.run_query", return_value=[]):
             resp = client.get("/api/dashboard/stats")
 
         data = resp.json()
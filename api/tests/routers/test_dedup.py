@@ -33,7 +33,7 @@ class TestDedupCheck:
         assert "kana" in data["checksPerformed"]
 
     def test_check_includes_semantic_for_ngaction(self, client, mock_db):
-        with patch("app.services.dedup_service.find_semantic_duplicates", new_callable=AsyncMock, return_value=[]):
+        with patch("app.services.dedup_service.find_semantic_duplicates_batch", new_callable=AsyncMock, return_value=[]):
             response = client.post("/api/dedup/check", json={
                 "label": "NgAction",
                 "properties": {"action": "大きな音を出す"},
@@ -42,10 +42,53 @@ class TestDedupCheck:
         assert "semantic" in data["checksPerformed"]
 
     def test_check_no_kana_for_ngaction(self, client, mock_db):
-        with patch("app.services.dedup_service.find_semantic_duplicates", new_callable=AsyncMock, return_value=[]):
+        with patch("app.services.dedup_service.find_semantic_duplicates_batch", new_callable=AsyncMock, return_value=[]):
             response = client.post("/api/dedup/check", json={
                 "label": "NgAction",
                 "properties": {"action": "test"},
             })
         data = response.json()
         assert "kana" not in data["checksPerformed"]
+
+
+class TestDedupCheckGraph:
+    def test_results_keyed_by_temp_id_with_shared_queries(self, client):
+        def fake_query(cypher, params):
+            assert "UNWIND $items" in cypher
+            if "MATCH (n:Client)" in cypher:
+                return [{"i": 0, "name": "田中太郎", "nodeId": "4:x:1"}]
+            return []
+
+        async def fake_semantic(queries, top_k=5):
+            return [[{"text": "大きな声", "score": 0.9, "nodeId": "4:x:9"}] for _ in queries]
+
+        with patch("app.services.dedup_service.run_query", side_effect=fake_query) as mock_query, \
+             patch("app.services.dedup_service.find_similar_by_kana", return_value=[]), \
+             patch("app.services.dedup_service.find_semantic_duplicates_batch", side_effect=fake_semantic) as mock_semantic:
+            response = client.post("/api/dedup/check-graph", json={
+                "nodes": [
+                    {"temp_id": "c1", "label": "Client", "properties": {"name": "田中太郎さん"}},
+                    {"temp_id": "ng1", "label": "NgAction", "properties": {"action": "大声"}},
+                    {"temp_id": "ng2", "label": "NgAction", "properties": {"action": "強い光"}},
+                ],
+                "relationships": [],
+            })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["hasCandidates"] is True
+        assert set(data["results"]) == {"c1", "ng1", "ng2"}
+        assert data["results"]["c1"]["candidates"][0]["matchType"] == "exact"
+        assert data["results"]["c1"]["checksPerformed"] == ["exact", "kana"]
+        assert data["results"]["ng2"]["candidates"][0]["matchType"] == "semantic"
+        # One exact query per label, one semantic batch for both NgActions
+        assert mock_query.call_count == 2
+        assert mock_semantic.call_count == 1
+        assert len(mock_semantic.call_args.args[0]) == 2
+        ng_items = next(c.args[1]["items"] for c in mock_query.call_args_list if "NgAction" in c.args[0])
+        assert [item["i"] for item in ng_items] == [1, 2]
+
+    def test_empty_graph(self, client):
+        response = client.post("/api/dedup/check-graph", json={"nodes": [], "relationships": []})
+        assert response.status_code == 200
+        assert response.json() == {"hasCandidates": False, "results": {}}
@@ -85,6 +85,27 @@ class TestGetEcomap:
         assert data["nodes"][0]["category"] == "client"
         assert len(data["edges"]) == 1
 
+    def test_get_ecomap_compact_format(self, client):
+        mock_data = EcomapData(
+            client_name="テスト",
+            template="full_view",
+            nodes=[
+                EcomapNode(id="client", label="テスト", node_label="Client",
+                           category="client", color="#569480", properties={}),
+                EcomapNode(id="ng-1", label="大声を出す", node_label="NgAction",
+                           category="ngActions", color="#df4b26", properties={}),
+            ],
+            edges=[EcomapEdge(source="client", target="ng-1", label="MUST_AVOID")],
+        )
+        with patch("app.routers.ecomap.fetch_ecomap_data", return_value=mock_data):
+            resp = client.get("/api/ecomap/テスト?format=compact")
+
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["categories"] == ["client", "ngActions"]
+        assert data["colors"] == ["#569480", "#df4b26"]
+        assert data["edges"] == {"source": [0], "target": [1], "label": [0]}
+
     def test_get_ecomap_default_template(self, client):
         mock_data = EcomapData(
             client_name="テスト",
@@ -136,3 +157,36 @@ class TestGetEcomap:
         assert len(data["nodes"]) >= 1
         assert data["nodes"][0]["id"] == "client"
         assert data["nodes"][0]["category"] == "client"
+
+
+class TestGetEcomapStream:
+    """GET /api/ecomap/{client_name}/stream"""
+
+    def test_stream_emits_client_then_category_nodes(self, client):
+        import json
+
+        def fake_stream(query, params=None):
+            if "MUST_AVOID" in query:
+                return iter([{"node": {"action": "大声を出す"}, "eid": "4:x:1"}])
+            return iter([])
+
+        with patch("app.lib.ecomap.stream_query", side_effect=fake_stream):
+            resp = client.get("/api/ecomap/テスト/stream?template=emergency")
+
+        assert resp.status_code == 200
+        lines = [json.loads(line) for line in resp.text.splitlines() if line]
+        assert [ln["type"] for ln in lines] == ["node", "node", "edge", "end"]
+        assert lines[0]["data"]["id"] == "client"
+        assert lines[1]["data"]["id"] == "4-x-1"
+        assert lines[2]["data"] == {"source": "client", "target": "4-x-1", "label": "MUST_AVOID"}
+        assert lines[3]["template"] == "emergency"
+
+    def test_fetch_ecomap_data_collects_stream(self):
+        from app.lib.ecomap import fetch_ecomap_data
+
+        rows = [{"node": {"name": "母"}, "eid": "4:x:2"}, {"node": {"name": "母"}, "eid": "4:x:2"}]
+        with patch("app.lib.ecomap.stream_query", side_effect=lambda q, p=None: iter(rows if "KeyPerson" in q else [])):
+            data = fetch_ecomap_data("テスト", "support_meeting")
+
+        assert [n.id for n in data.nodes] == ["client", "4-x-2"]
+        assert len(data.edges) == 1
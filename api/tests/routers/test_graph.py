@@ -20,7 +20,7 @@ class TestGraphExplore:
 
     def test_explore_with_valid_label_returns_200(self, client, mock_db):
         mock_result = [{"nodes": [], "edges": []}]
-        with patch("app.routers.graph.run_query", return_value=mock_result):
+        with patch("app.routers.graph.graph_overview.get_rows", return_value=mock_result):
             response = client.get("/api/graph/explore?startLabel=Client")
         assert response.status_code == 200
 
@@ -59,7 +59,7 @@ class TestGraphExplore:
                 ],
             }
         ]
-        with patch("app.routers.graph.run_query", return_value=mock_result):
+        with patch("app.routers.graph.graph_overview.get_rows", return_value=mock_result):
             response = client.get("/api/graph/explore?startLabel=Client")
         assert response.status_code == 200
         data = response.json()
@@ -72,17 +72,40 @@ class TestGraphExplore:
         assert data["edges"][0]["source"] == "4:abc:1"
         assert data["edges"][0]["target"] == "4:abc:2"
 
+    def test_explore_compact_format(self, client, mock_db):
+        rows = [{
+            "nodes": [
+                {"id": "4:abc:1", "labels": ["Client"], "properties": {"name": "田中太郎"}},
+                {"id": "4:abc:2", "labels": ["NgAction"], "properties": {"action": "大声を出す"}},
+            ],
+            "edges": [
+                {"id": "5:abc:1", "source": "4:abc:1", "target": "4:abc:2", "type": "MUST_AVOID", "properties": {}},
+            ],
+        }]
+        with patch("app.routers.graph.graph_overview.get_rows", return_value=rows):
+            response = client.get("/api/graph/explore?startLabel=Client&format=compact")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["labels"] == ["Client", "NgAction"]
+        assert data["nodes"]["name"] == ["田中太郎", "大声を出す"]
+        assert data["edges"]["source"] == [0]
+        assert data["edges"]["target"] == [1]
+
+    def test_explore_unknown_format_returns_422(self, client, mock_db):
+        response = client.get("/api/graph/explore?format=xml")
+        assert response.status_code == 422
+
     def test_explore_deduplicates_nodes(self, client, mock_db):
         """Duplicate node IDs in the result should be deduplicated."""
         dup_node = {"id": "4:abc:1", "labels": ["Client"], "properties": {"name": "dup"}}
         mock_result = [{"nodes": [dup_node, dup_node], "edges": []}]
-        with patch("app.routers.graph.run_query", return_value=mock_result):
+        with patch("app.routers.graph.graph_overview.get_rows", return_value=mock_result):
             response = client.get("/api/graph/explore?startLabel=Client")
         assert response.status_code == 200
         assert len(response.json()["nodes"]) == 1
 
     def test_explore_empty_result_returns_empty_lists(self, client, mock_db):
-        with patch("app.routers.graph.run_query", return_value=[]):
+        with patch("app.routers.graph.graph_overview.get_rows", return_value=[]):
             response = client.get("/api/graph/explore")
         assert response.status_code == 200
         data = response.json()
@@ -98,13 +121,13 @@ class TestGraphExplore:
                 "edges": [],
             }
         ]
-        with patch("app.routers.graph.run_query", return_value=mock_result):
+        with patch("app.routers.graph.graph_overview.get_rows", return_value=mock_result):
             response = client.get("/api/graph/explore?startLabel=Certificate")
         assert response.status_code == 200
         assert response.json()["nodes"][0]["name"] == "?"
 
     def test_explore_db_error_returns_500(self, client, mock_db):
-        with patch("app.routers.graph.run_query", side_effect=Exception("Connection refused")):
+        with patch("app.routers.graph.graph_overview.get_rows", side_effect=Exception("Connection refused")):
             response = client.get("/api/graph/explore")
         assert response.status_code == 500
 
@@ -126,6 +149,16 @@ class TestGraphExplore:
         response = client.get("/api/graph/explore?maxNodes=1000")
         assert response.status_code == 422
 
+    def test_explore_overview_uses_cached_ranking(self, client, mock_db):
+        """Overview / label-sample modes never hit run_query from the router."""
+        with patch("app.routers.graph.graph_overview.get_rows", return_value=[]) as mock_rows, \
+                patch("app.routers.graph.run_query") as mock_rq:
+            client.get("/api/graph/explore?maxNodes=20")
+            client.get("/api/graph/explore?startLabel=NgAction")
+        assert mock_rows.call_args_list[0].args == (None, 20)
+        assert mock_rows.call_args_list[1].args == ("NgAction", 100)
+        mock_rq.assert_not_called()
+
     def test_explore_truncated_flag_set_when_at_limit(self, client, mock_db):
         # Generate exactly maxNodes nodes to trigger truncated=True
         nodes = [
@@ -133,7 +166,7 @@ class TestGraphExplore:
             for i in range(10)  # maxNodes minimum is 10
         ]
         mock_result = [{"nodes": nodes, "edges": []}]
-        with patch("app.routers.graph.run_query", return_value=mock_result):
+        with patch("app.routers.graph.graph_overview.get_rows", return_value=mock_result):
             response = client.get("/api/graph/explore?maxNodes=10")
         assert response.status_code == 200
         assert response.json()["truncated"] is True
@@ -142,29 +175,32 @@ class TestGraphExplore:
 class TestGraphLabels:
     """GET /api/graph/labels"""
 
-    def test_list_labels_returns_200(self, client, mock_db):
-        mock_result = [
-            {"label": "Client", "count": 10},
-            {"label": "NgAction", "count": 50},
-        ]
-        with patch("app.routers.graph.run_query", return_value=mock_result):
+    def test_list_labels_returns_200(self, client, fresh_stats):
+        def fake(query, params=None):
+            if "UNION ALL" in query:
+                return [{"label": "Client", "cnt": 10}, {"label": "NgAction", "cnt": 50},
+                        {"label": "AuditLog", "cnt": 99}]
+            return []
+
+        with patch("app.lib.stats.run_query", side_effect=fake):
             response = client.get("/api/graph/labels")
         assert response.status_code == 200
         data = response.json()
         assert "labels" in data
+        # AuditLog は探索対象外なので含まれない。件数の多い順に並ぶ。
         assert len(data["labels"]) == 2
-        assert data["labels"][0]["label"] == "Client"
-        assert data["labels"][0]["count"] == 10
+        assert data["labels"][0]["label"] == "NgAction"
+        assert data["labels"][1] == {"label": "Client", "count": 10}
 
-    def test_list_labels_empty_db_returns_empty_list(self, client, mock_db):
-        with patch("app.routers.graph.run_query", return_value=[]):
+    def test_list_labels_empty_db_returns_empty_list(self, client, fresh_stats):
+        with patch("app.lib.stats.run_query", return_value=[]):
             response = client.get("/api/graph/labels")
         assert response.status_code == 200
         assert response.json()["labels"] == []
 
-    def test_list_labels_db_error_returns_empty_gracefully(self, client, mock_db):
+    def test_list_labels_db_error_returns_empty_gracefully(self, client, fresh_stats):
         """Labels endpoint should not raise 500 — it returns empty list on error."""
-        with patch("app.routers.graph.run_query", side_effect=Exception("Timeout")):
+        with patch("app.lib.stats.run_query", side_effect=Exception("Timeout")):
             response = client.get("/api/graph/labels")
         assert response.status_code == 200
         assert response.json()["labels"] == []
@@ -182,30 +218,81 @@ class TestGraphStats:
         assert isinstance(data["total_nodes"], int)
         assert isinstance(data["total_edges"], int)
 
-    def test_stats_returns_correct_values(self, client, mock_db):
-        with patch(
-            "app.routers.graph.run_query",
-            side_effect=[[{"c": 42}], [{"c": 123}]],
-        ):
+    def test_stats_returns_correct_values(self, client, fresh_stats):
+        def fake(query, params=None):
+            if query == "MATCH (n) RETURN count(n) AS cnt":
+                return [{"cnt": 42}]
+            if query == "MATCH ()-[r]->() RETURN count(r) AS cnt":
+                return [{"cnt": 123}]
+            return []
+
+        with patch("app.lib.stats.run_query", side_effect=fake):
             response = client.get("/api/graph/stats")
         assert response.status_code == 200
         data = response.json()
         assert data["total_nodes"] == 42
         assert data["total_edges"] == 123
 
-    def test_stats_db_error_returns_zeros_gracefully(self, client, mock_db):
+    def test_stats_db_error_returns_zeros_gracefully(self, client, fresh_stats):
         """Stats endpoint should not raise 500 — it returns zeros on error."""
-        with patch("app.routers.graph.run_query", side_effect=Exception("Connection refused")):
+        with patch("app.lib.stats.run_query", side_effect=Exception("Connection refused")):
             response = client.get("/api/graph/stats")
         assert response.status_code == 200
         data = response.json()
         assert data["total_nodes"] == 0
         assert data["total_edges"] == 0
 
-    def test_stats_empty_db_returns_zeros(self, client, mock_db):
-        with patch("app.routers.graph.run_query", return_value=[]):
+    def test_stats_empty_db_returns_zeros(self, client, fresh_stats):
+        with patch("app.lib.stats.run_query", return_value=[]):
             response = client.get("/api/graph/stats")
         assert response.status_code == 200
         data = response.json()
         assert data["total_nodes"] == 0
         assert data["total_edges"] == 0
+
+
+class TestGraphExploreStream:
+    """GET /api/graph/explore/stream"""
+
+    @staticmethod
+    def _lines(response):
+        import json
+        return [json.loads(line) for line in response.text.splitlines() if line]
+
+    def test_stream_specific_node_emits_ndjson(self, client, mock_db):
+        streamed = [
+            {"kind": "node", "item": {"id": "4:abc:1", "labels": ["Client"], "properties": {"name": "田中太郎"}}},
+            {"kind": "node", "item": {"id": "4:abc:1", "labels": ["Client"], "properties": {"name": "田中太郎"}}},
+            {"kind": "node", "item": {"id": "4:abc:2", "labels": ["NgAction"], "properties": {"action": "大声"}}},
+            {"kind": "edge", "item": {"id": "5:abc:1", "source": "4:abc:1", "target": "4:abc:2",
+                                      "type": "MUST_AVOID", "properties": {}}},
+        ]
+        with patch("app.routers.graph.stream_query", return_value=iter(streamed)) as mock_sq:
+            response = client.get("/api/graph/explore/stream?startLabel=Client&startName=田中太郎&maxDepth=3")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = self._lines(response)
+        assert [ln["type"] for ln in lines] == ["node", "node", "edge", "end"]
+        assert lines[0]["data"]["name"] == "田中太郎"
+        assert lines[2]["data"]["type"] == "MUST_AVOID"
+        assert lines[-1]["truncated"] is False
+        assert mock_sq.call_args.args[1]["depth"] == 3
+
+    def test_stream_overview_uses_cached_rows(self, client, mock_db):
+        rows = [{"nodes": [{"id": "4:abc:1", "labels": ["Client"], "properties": {"name": "A"}}], "edges": []}]
+        with patch("app.routers.graph.graph_overview.get_rows", return_value=rows):
+            response = client.get("/api/graph/explore/stream")
+        lines = self._lines(response)
+        assert [ln["type"] for ln in lines] == ["node", "end"]
+
+    def test_stream_error_emits_error_line(self, client, mock_db):
+        with patch("app.routers.graph.graph_overview.get_rows", side_effect=Exception("boom")):
+            response = client.get("/api/graph/explore/stream?startLabel=Client")
+        assert response.status_code == 200
+        lines = self._lines(response)
+        assert lines[-1]["type"] == "error"
+        assert "boom" in lines[-1]["message"]
+
+    def test_stream_invalid_label_returns_400(self, client, mock_db):
+        response = client.get("/api/graph/explore/stream?startLabel=Nope")
+        assert response.status_code == 400
@@ -1,27 +1,95 @@
 """Comprehensive tests for /api/meetings endpoints."""
 
+import hashlib
+import json
+import time
 from unittest.mock import patch, AsyncMock, MagicMock
 
 
+def _wait_job(client, job_id: str, timeout: float = 5.0) -> dict:
+    """Poll GET /api/jobs/{id} until the job finishes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["stage"] in ("complete", "error"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
 class TestUploadMeeting:
     """POST /api/meetings/upload"""
 
     def test_upload_success(self, client):
         with patch("app.routers.meetings._transcribe_with_gemini", new_callable=AsyncMock, return_value="テスト文字起こし"), \
-             patch("app.routers.meetings.register_to_database", return_value={"status": "success"}), \
+             patch("app.routers.meetings.register_to_database", return_value={"status": "success"}) as mock_register, \
              patch("app.routers.meetings.embed_text", new_callable=AsyncMock, return_value=[0.1] * 768), \
-             patch("app.routers.meetings.run_query", return_value=[]):
+             patch("app.routers.meetings.run_query", return_value=[]) as mock_rq:
             resp = client.post(
                 "/api/meetings/upload",
                 data={"client_name": "田中太郎", "title": "初回面談", "note": "テストメモ"},
                 files={"file": ("test.mp3", b"fake audio content", "audio/mpeg")},
             )
+            assert resp.status_code == 200
+            data = resp.json()
+            assert data["status"] == "accepted"
+            assert data["meeting_id"] is not None
+            assert data["sha256"] == hashlib.sha256(b"fake audio content").hexdigest()
+
+            job = _wait_job(client, data["job_id"])
+
+        assert job["stage"] == "complete"
+        assert job["result"] == {"meeting_id": data["meeting_id"], "transcript": "テスト文字起こし"}
+        props = mock_register.call_args[0][0]["nodes"][1]["properties"]
+        assert props["sha256"] == data["sha256"]
+        assert mock_rq.call_count == 1  # embedding SET
+
+    def test_upload_streams_file_to_disk(self, client, tmp_path):
+        payload = b"x" * (2 * 1024 * 1024 + 17)
+        with patch("app.routers.meetings.UPLOAD_DIR", tmp_path), \
+             patch("app.routers.meetings._CHUNK_SIZE", 64 * 1024), \
+             patch("app.routers.meetings._process_meeting", new_callable=AsyncMock, return_value={}):
+            resp = client.post(
+                "/api/meetings/upload",
+                data={"client_name": "田中太郎"},
+                files={"file": ("long.wav", payload, "audio/wav")},
+            )
+            _wait_job(client, resp.json()["job_id"])
 
-        assert resp.status_code == 200
-        data = resp.json()
-        assert data["status"] == "success"
-        assert data["transcript"] == "テスト文字起こし"
-        assert data["meeting_id"] is not None
+        saved = list(tmp_path.iterdir())
+        assert len(saved) == 1
+        assert saved[0].name.endswith("_long.wav")
+        assert saved[0].read_bytes() == payload
+        assert resp.json()["sha256"] == hashlib.sha256(payload).hexdigest()
+
+    def test_upload_job_events_stream(self, client):
+        with patch("app.routers.meetings._transcribe_with_gemini", new_callable=AsyncMock, return_value="ok"), \
+             patch("app.routers.meetings.register_to_database", return_value={"status": "success"}), \
+             patch("app.routers.meetings.embed_text", new_callable=AsyncMock, return_value=None):
+            resp = client.post(
+                "/api/meetings/upload",
+                data={"client_name": "田中太郎"},
+                files={"file": ("test.mp3", b"audio", "audio/mpeg")},
+            )
+            events_resp = client.get(f"/api/jobs/{resp.json()['job_id']}/events")
+
+        assert events_resp.headers["content-type"].startswith("text/event-stream")
+        events = [json.loads(line[len("data: "):]) for line in events_resp.text.splitlines() if line.startswith("data: ")]
+        assert events[-1]["stage"] == "complete"
+        assert events[-1]["result"]["transcript"] == "ok"
+
+    def test_upload_job_failure_reported(self, client):
+        with patch("app.routers.meetings._transcribe_with_gemini", new_callable=AsyncMock, return_value="ok"), \
+             patch("app.routers.meetings.register_to_database", side_effect=Exception("neo4j down")):
+            resp = client.post(
+                "/api/meetings/upload",
+                data={"client_name": "田中太郎"},
+                files={"file": ("test.mp3", b"audio", "audio/mpeg")},
+            )
+            job = _wait_job(client, resp.json()["job_id"])
+
+        assert job["stage"] == "error"
+        assert "neo4j down" in job["error"]
 
     def test_upload_unsupported_format(self, client):
         resp = client.post(
@@ -38,17 +106,18 @@ class TestUploadMeeting:
     def test_upload_transcription_failure(self, client):
         """If transcription fails, meeting is still registered (transcript is empty)."""
         with patch("app.routers.meetings._transcribe_with_gemini", new_callable=AsyncMock, return_value=None), \
-             patch("app.routers.meetings.register_to_database", return_value={"status": "success"}):
+             patch("app.routers.meetings.register_to_database", return_value={"status": "success"}) as mock_register:
             resp = client.post(
                 "/api/meetings/upload",
                 data={"client_name": "田中太郎", "title": "テスト", "note": ""},
                 files={"file": ("test.wav", b"fake wav", "audio/wav")},
             )
+            assert resp.status_code == 200
+            job = _wait_job(client, resp.json()["job_id"])
 
-        assert resp.status_code == 200
-        data = resp.json()
-        assert data["status"] == "success"
-        assert data["transcript"] is None
+        assert job["stage"] == "complete"
+        assert job["result"]["transcript"] is None
+        mock_register.assert_called_once()
 
     def test_upload_various_audio_formats(self, client):
         """All supported audio formats should be accepted."""
@@ -70,8 +139,9 @@ class TestUploadMeeting:
                     data={"client_name": "テスト", "title": "", "note": ""},
                     files={"file": (filename, b"audio data", mime_type)},
                 )
-            assert resp.status_code == 200, f"Failed for {filename}"
-            assert resp.json()["status"] == "success", f"Failed for {filename}"
+                assert resp.status_code == 200, f"Failed for {filename}"
+                assert resp.json()["status"] == "accepted", f"Failed for {filename}"
+                _wait_job(client, resp.json()["job_id"])
 
     def test_upload_unsupported_extensions(self, client):
         """Non-audio files should be rejected."""
@@ -7,6 +7,13 @@ import json
 from unittest.mock import patch, AsyncMock, MagicMock
 
 
+def _per_query(candidates):
+    """find_semantic_duplicates_batch stand-in returning ``candidates`` for every query."""
+    async def fake(queries, top_k=5):
+        return [list(candidates) for _ in queries]
+    return fake
+
+
 class TestExtract:
     """POST /api/narratives/extract"""
 
@@ -20,7 +27,7 @@ class TestExtract:
                 {"source_temp_id": "c1", "target_temp_id": "ng1", "type": "MUST_AVOID", "properties": {}},
             ],
         }
-        with patch("app.routers.narratives.extract_from_text", new_callable=AsyncMock, return_value=mock_result):
+        with patch("app.routers.narratives.extract_from_text_chunked", new_callable=AsyncMock, return_value=mock_result):
             resp = client.post("/api/narratives/extract", json={
                 "text": "田中太郎さんは大声を出すとパニックになります。",
                 "client_name": "田中太郎",
@@ -33,7 +40,7 @@ class TestExtract:
 
     def test_extract_failure_returns_422(self, client):
         """When Gemini extraction returns None, API returns 422 with error message."""
-        with patch("app.routers.narratives.extract_from_text", new_callable=AsyncMock, return_value=None):
+        with patch("app.routers.narratives.extract_from_text_chunked", new_callable=AsyncMock, return_value=None):
             resp = client.post("/api/narratives/extract", json={
                 "text": "解析不能テキスト",
                 "client_name": None,
@@ -47,7 +54,7 @@ class TestExtract:
             "nodes": [{"temp_id": "c1", "label": "Client", "properties": {"name": "不明"}}],
             "relationships": [],
         }
-        with patch("app.routers.narratives.extract_from_text", new_callable=AsyncMock, return_value=mock_result):
+        with patch("app.routers.narratives.extract_from_text_chunked", new_callable=AsyncMock, return_value=mock_result):
             resp = client.post("/api/narratives/extract", json={
                 "text": "テストテキスト",
             })
@@ -61,7 +68,7 @@ class TestExtract:
 
     def test_extract_server_error(self, client):
         """Unexpected exception returns 500."""
-        with patch("app.routers.narratives.extract_from_text", new_callable=AsyncMock, side_effect=RuntimeError("unexpected")):
+        with patch("app.routers.narratives.extract_from_text_chunked", new_callable=AsyncMock, side_effect=RuntimeError("unexpected")):
             resp = client.post("/api/narratives/extract", json={
                 "text": "テスト",
             })
@@ -166,7 +173,7 @@ class TestRegister:
             "registered_types": ["Client", "NgAction"],
         }
         with patch("app.routers.narratives.register_to_database", return_value=mock_result), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=[]):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query([])):
             graph = {
                 "nodes": [
                     {"temp_id": "c1", "label": "Client", "properties": {"name": "田中太郎"}},
@@ -190,7 +197,7 @@ class TestRegister:
             "registered_types": ["Client"],
         }
         with patch("app.routers.narratives.register_to_database", return_value=mock_result), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=[]):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query([])):
             graph = {
                 "nodes": [
                     {"temp_id": "c1", "label": "Client", "properties": {"name": "佐藤花子"}},
@@ -216,7 +223,7 @@ class TestRegister:
             {"text": "静かな環境を好む", "score": 0.92, "nodeId": "4:abc123:0"},
         ]
         with patch("app.routers.narratives.register_to_database", return_value=mock_result), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=mock_candidates):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query(mock_candidates)):
             graph = {
                 "nodes": [
                     {"temp_id": "c1", "label": "Client", "properties": {"name": "田中太郎"}},
@@ -248,7 +255,7 @@ class TestRegister:
             {"text": "大声を出す", "score": 0.92, "nodeId": "4:abc123:0"},
         ]
         with patch("app.routers.narratives.register_to_database", return_value=mock_result), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=mock_candidates):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query(mock_candidates)):
             graph = {
                 "nodes": [
                     {"temp_id": "c1", "label": "Client", "properties": {"name": "田中太郎"}},
@@ -278,7 +285,7 @@ class TestRegister:
             "registered_types": ["Client", "NgAction"],
         }
         with patch("app.routers.narratives.register_to_database", return_value=mock_result), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, side_effect=RuntimeError("embedding service unavailable")):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", new_callable=AsyncMock, side_effect=RuntimeError("embedding service unavailable")):
             graph = {
                 "nodes": [
                     {"temp_id": "c1", "label": "Client", "properties": {"name": "田中太郎"}},
@@ -361,7 +368,7 @@ class TestRegisterNgActionBlocking:
     def test_ngaction_duplicate_returns_409(self, client):
         """When semantic duplicate found for NgAction, returns 409."""
         mock_candidates = [{"text": "大きな音", "score": 0.92, "nodeId": "4:abc:1"}]
-        with patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=mock_candidates):
+        with patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query(mock_candidates)):
             response = client.post("/api/narratives/register", json={
                 "nodes": [{"temp_id": "ng1", "label": "NgAction", "properties": {"action": "騒音"}}],
                 "relationships": [],
@@ -383,7 +390,7 @@ class TestRegisterNgActionBlocking:
             "registered_types": ["NgAction"],
             "client_name": None,
         }
-        with patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=[]), \
+        with patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query([])), \
              patch("app.routers.narratives.register_to_database", return_value=mock_result):
             response = client.post("/api/narratives/register", json={
                 "nodes": [{"temp_id": "ng1", "label": "NgAction", "properties": {"action": "騒音"}}],
@@ -401,7 +408,7 @@ class TestRegisterNgActionBlocking:
             "client_name": "テスト",
         }
         with patch("app.routers.narratives.register_to_database", return_value=mock_result), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=[]):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query([])):
             response = client.post("/api/narratives/register", json={
                 "nodes": [{"temp_id": "c1", "label": "Client", "properties": {"name": "テスト"}}],
                 "relationships": [],
@@ -417,7 +424,7 @@ class TestRegisterNgActionBlocking:
             "registered_types": ["NgAction"],
             "client_name": None,
         }
-        with patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=mock_candidates), \
+        with patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query(mock_candidates)), \
              patch("app.routers.narratives.register_to_database", return_value=mock_result):
             response = client.post("/api/narratives/register", json={
                 "nodes": [{"temp_id": "ng1", "label": "NgAction", "properties": {"action": "騒音"}}],
@@ -435,7 +442,7 @@ class TestRegisterNgActionBlocking:
             "client_name": None,
         }
         with patch("app.routers.narratives.register_to_database", return_value=mock_result), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=[]):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query([])):
             response = client.post("/api/narratives/register", json={
                 "nodes": [{"temp_id": "ng1", "label": "NgAction", "properties": {"riskLevel": "Panic"}}],
                 "relationships": [],
@@ -450,7 +457,7 @@ class TestRegisterNgActionBlocking:
             "registered_types": ["NgAction"],
             "client_name": None,
         }
-        with patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, side_effect=RuntimeError("embedding service down")), \
+        with patch("app.routers.narratives.find_semantic_duplicates_batch", new_callable=AsyncMock, side_effect=RuntimeError("embedding service down")), \
              patch("app.routers.narratives.register_to_database", return_value=mock_result):
             response = client.post("/api/narratives/register", json={
                 "nodes": [{"temp_id": "ng1", "label": "NgAction", "properties": {"action": "騒音"}}],
@@ -467,9 +474,9 @@ class TestExtractStream:
             "nodes": [{"label": "Client", "properties": {"name": "テスト"}}],
             "relationships": [],
         }
-        with patch("app.routers.narratives.extract_from_text", new_callable=AsyncMock, return_value=mock_result), \
+        with patch("app.routers.narratives.extract_from_text_chunked", new_callable=AsyncMock, return_value=mock_result), \
              patch("app.routers.narratives.validate_schema", return_value={"is_valid": True}), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=[]):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query([])):
             response = client.post(
                 "/api/narratives/extract-stream",
                 json={"text": "テストテキスト", "client_name": None},
@@ -482,7 +489,7 @@ class TestExtractStream:
         assert "complete" in body
 
     def test_extract_stream_handles_extraction_failure(self, client, mock_db):
-        with patch("app.routers.narratives.extract_from_text", new_callable=AsyncMock, return_value=None):
+        with patch("app.routers.narratives.extract_from_text_chunked", new_callable=AsyncMock, return_value=None):
             response = client.post(
                 "/api/narratives/extract-stream",
                 json={"text": "テスト", "client_name": None},
@@ -492,7 +499,7 @@ class TestExtractStream:
         assert "error" in body
 
     def test_extract_stream_handles_extraction_exception(self, client, mock_db):
-        with patch("app.routers.narratives.extract_from_text", new_callable=AsyncMock, side_effect=RuntimeError("Gemini down")):
+        with patch("app.routers.narratives.extract_from_text_chunked", new_callable=AsyncMock, side_effect=RuntimeError("Gemini down")):
             response = client.post(
                 "/api/narratives/extract-stream",
                 json={"text": "テスト", "client_name": None},
@@ -510,27 +517,38 @@ class TestExtractStream:
             ],
             "relationships": [],
         }
-        with patch("app.routers.narratives.extract_from_text", new_callable=AsyncMock, return_value=mock_result), \
+
+        async def fake_extract(text, client_name=None, on_progress=None):
+            for done in range(3):
+                on_progress(done, 2)
+            return mock_result
+
+        with patch("app.routers.narratives.extract_from_text_chunked", side_effect=fake_extract), \
              patch("app.routers.narratives.validate_schema", return_value={"is_valid": True}), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=[]):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query([])):
             response = client.post(
                 "/api/narratives/extract-stream",
                 json={"text": "田中さんは大声が禁忌です", "client_name": "田中"},
             )
         assert response.status_code == 200
-        body = response.text
-        # Verify all expected stages are present
+        events = [json.loads(line[len("data:"):]) for line in response.text.split("\n") if line.startswith("data:")]
+        stages = [e["stage"] for e in events]
+        # Verify all expected stages are present, in order
         for stage in ("started", "chunking", "extracting", "validating", "dedup_check", "complete"):
-            assert stage in body, f"Stage '{stage}' not found in SSE body"
+            assert stage in stages, f"Stage '{stage}' not found in SSE body"
+        assert stages.index("chunking") < stages.index("extracting") < stages.index("validating")
+        # Per-chunk extraction progress
+        assert [e["progress"] for e in events if e["stage"] == "extracting"] == [35, 60, 60]
+        assert "(1/2)" in events[stages.index("extracting")]["message"]
 
     def test_extract_stream_complete_event_includes_graph(self, client, mock_db):
         mock_result = {
             "nodes": [{"label": "Client", "properties": {"name": "花子"}}],
             "relationships": [],
         }
-        with patch("app.routers.narratives.extract_from_text", new_callable=AsyncMock, return_value=mock_result), \
+        with patch("app.routers.narratives.extract_from_text_chunked", new_callable=AsyncMock, return_value=mock_result), \
              patch("app.routers.narratives.validate_schema", return_value={"is_valid": True}), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=[]):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query([])):
             response = client.post(
                 "/api/narratives/extract-stream",
                 json={"text": "花子さんの支援記録", "client_name": None},
@@ -557,9 +575,9 @@ class TestExtractStream:
             "relationships": [],
         }
         mock_candidates = [{"text": "大きな音", "score": 0.91, "nodeId": "4:abc:1"}]
-        with patch("app.routers.narratives.extract_from_text", new_callable=AsyncMock, return_value=mock_result), \
+        with patch("app.routers.narratives.extract_from_text_chunked", new_callable=AsyncMock, return_value=mock_result), \
              patch("app.routers.narratives.validate_schema", return_value={"is_valid": True}), \
-             patch("app.routers.narratives.find_semantic_duplicates", new_callable=AsyncMock, return_value=mock_candidates):
+             patch("app.routers.narratives.find_semantic_duplicates_batch", side_effect=_per_query(mock_candidates)):
             response = client.post(
                 "/api/narratives/extract-stream",
                 json={"text": "騒音が禁忌", "client_name": None},
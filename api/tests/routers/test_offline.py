@@ -0,0 +1,72 @@
+"""End-to-end checks of the API on the offline backends (fake LLM + in-memory graph).
+
+Nothing is mocked: every router runs its real Cypher against
+app.lib.memory_graph, so a query the interpreter cannot handle fails here.
+"""
+
+import json
+from urllib.parse import quote
+
+import pytest
+
+from app.lib import memory_graph
+
+
+def _receive_until(ws, final_type):
+    frames = []
+    while True:
+        frame = json.loads(ws.receive_text())
+        frames.append(frame)
+        if frame["type"] in (final_type, "error"):
+            return frames
+
+
+@pytest.fixture
+def name(offline_client):
+    return offline_client.get("/api/clients").json()[0]["name"]
+
+
+def test_read_endpoints(offline_client, name):
+    path = quote(name)
+    for url in [
+        "/api/clients",
+        f"/api/clients/{path}",
+        f"/api/clients/{path}/emergency",
+        f"/api/clients/{path}/logs",
+        f"/api/ecomap/{path}",
+        "/api/dashboard/stats",
+        "/api/dashboard/alerts",
+        "/api/graph/explore",
+        "/api/graph/stats",
+        "/api/search/fulltext?q=パニック",
+    ]:
+        assert offline_client.get(url).status_code == 200, url
+    assert len(offline_client.get("/api/clients").json()) == 10
+    assert memory_graph.get_graph().stats()["errors"] == 0
+
+
+def test_semantic_search_finds_logs(offline_client, name):
+    resp = offline_client.post("/api/search/semantic", json={
+        "query": f"{name}さん パニック", "index_name": "support_log_vector_index", "top_k": 3,
+    })
+    assert resp.status_code == 200
+    assert memory_graph.get_graph().stats()["errors"] == 0
+
+
+def test_quicklog_write_is_visible(offline_client, name):
+    before = len(offline_client.get(f"/api/clients/{quote(name)}/logs").json())
+    resp = offline_client.post("/api/quicklog", json={"client_name": name, "note": "オフライン試験の記録"})
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "success"
+    logs = offline_client.get(f"/api/clients/{quote(name)}/logs").json()
+    assert len(logs) == before + 1
+
+
+def test_chat_round_trip(offline_client, name):
+    with offline_client.websocket_connect("/api/chat/ws") as ws:
+        ws.send_text(json.dumps({"type": "message", "content": f"{name}さんの禁忌事項を教えて"}))
+        frames = _receive_until(ws, "done")
+    types = [f["type"] for f in frames]
+    assert types[-1] == "done"
+    assert "tool_start" in types and "stream" in types
+    assert memory_graph.get_graph().stats()["errors"] == 0
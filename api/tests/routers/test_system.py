@@ -79,3 +79,46 @@ class TestHealth:
 
         assert resp.status_code == 200
         assert resp.json()["status"] == "ok"
+
+
+class TestCacheStats:
+    """GET /api/system/caches"""
+
+    def test_reports_extraction_cache(self, client, extraction_cache):
+        extraction_cache.put("k", {"nodes": []})
+        extraction_cache.get("k")
+        extraction_cache.get("missing")
+
+        resp = client.get("/api/system/caches")
+
+        assert resp.status_code == 200
+        assert resp.json()[0] == {
+            "name": "extraction", "hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1, "saved_llm_calls": None,
+        }
+
+
+class TestRateLimitStats:
+    """GET /api/system/rate-limits"""
+
+    def test_reports_each_governor(self, client, rate_limits):
+        gov = rate_limits.governor("google", "gemini-test")
+        gov.release(gov.acquire(), "throttled")
+
+        resp = client.get("/api/system/rate-limits")
+
+        assert resp.status_code == 200
+        stats = {s["name"]: s for s in resp.json()}
+        assert stats["google/gemini-test"]["throttled"] == 1
+        assert stats["google/gemini-test"]["concurrency_limit"] == gov.max_concurrency // 2
+
+
+class TestSingleFlightStats:
+    """GET /api/system/single-flight"""
+
+    def test_reports_dedup_ratio(self, client):
+        resp = client.get("/api/system/single-flight")
+
+        assert resp.status_code == 200
+        stats = {s["name"]: s for s in resp.json()}
+        assert {"run_query", "embed_text", "fetch_ecomap_data"} <= set(stats)
+        assert 0.0 <= stats["run_query"]["dedup_ratio"] <= 1.0
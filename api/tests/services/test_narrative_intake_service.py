@@ -0,0 +1,49 @@
+"""Tests for the narrative intake embedding stage."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from app.schemas.narrative_intake import NarrativeNode
+from app.services.narrative_intake_service import _embed_targets
+
+
+def _validated(*nodes):
+    return {"nodes": [NarrativeNode(temp_id=f"n{i}", label=label, properties=props) for i, (label, props) in enumerate(nodes)], "relationships": []}
+
+
+class TestEmbedTargets:
+    def test_one_batch_embed_and_one_unwind_write_per_label(self):
+        validated = _validated(
+            ("Client", {"name": "田中"}),
+            ("NgAction", {"action": "大声", "reason": "パニック"}),
+            ("SupportLog", {"date": "2024-01-01", "action": "散歩"}),
+            ("CarePreference", {"category": "食事", "instruction": "刻み食"}),
+        )
+        node_ids = ["4:x:0", "4:x:1", "4:x:2", None]
+        embed = AsyncMock(return_value=[[0.1], [0.2]])
+
+        with patch("app.services.narrative_intake_service.embed_texts_batch", new=embed), \
+             patch("app.services.narrative_intake_service.run_query", return_value=[{"updated": 1}]) as mock_query:
+            count = asyncio.run(_embed_targets(validated, node_ids, "田中"))
+
+        assert count == 2
+        embed.assert_awaited_once_with(["大声 / パニック", "散歩"])
+        assert mock_query.call_count == 2
+        writes = {}
+        for call in mock_query.call_args_list:
+            cypher, params = call.args
+            assert "UNWIND $rows" in cypher and "elementId(n) = row.id" in cypher
+            # Label-scoped MATCH + client keep the write notification narrow
+            assert call.kwargs["client_names"] == {"田中"}
+            writes[cypher.split("MATCH (n:")[1].split(")")[0]] = params["rows"]
+        assert writes == {
+            "NgAction": [{"id": "4:x:1", "embedding": [0.1]}],
+            "SupportLog": [{"id": "4:x:2", "embedding": [0.2]}],
+        }
+
+    def test_failed_embeddings_are_not_written(self):
+        validated = _validated(("NgAction", {"action": "大声"}))
+        with patch("app.services.narrative_intake_service.embed_texts_batch", new=AsyncMock(return_value=[None])), \
+             patch("app.services.narrative_intake_service.run_query") as mock_query:
+            assert asyncio.run(_embed_targets(validated, ["4:x:0"])) == 0
+        mock_query.assert_not_called()
@@ -8,6 +8,16 @@ import { Badge } from "@/components/ui/badge";
 import { api } from "@/lib/api";
 
 const ACCEPTED = ".mp3,.wav,.m4a,.ogg,.flac,.aac,.webm";
+const POLL_INTERVAL_MS = 2000;
+
+async function waitForJob(jobId: string, onProgress: (message: string) => void) {
+  for (;;) {
+    const job = await api.jobs.get(jobId);
+    if (job.stage === "complete" || job.stage === "error") return job;
+    onProgress(job.message);
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+  }
+}
 
 interface Props {
   clients: { name: string }[];
@@ -19,6 +29,7 @@ export function AudioUploader({ clients, onUploaded }: Props) {
   const [title, setTitle] = useState("");
   const [note, setNote] = useState("");
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState("");
   const [result, setResult] = useState<{ status: string; transcript?: string } | null>(null);
   const fileRef = useRef<HTMLInputElement>(null);
 
@@ -29,15 +40,26 @@ export function AudioUploader({ clients, onUploaded }: Props) {
     setResult(null);
     try {
       const res = await api.meetings.upload(file, selectedClient, title, note);
-      setResult(res);
-      onUploaded?.();
+      if (res.status !== "accepted") {
+        setResult({ status: res.status, transcript: res.message });
+        return;
+      }
       setTitle("");
       setNote("");
       if (fileRef.current) fileRef.current.value = "";
+      // アップロード完了後、文字起こしジョブの終了を待つ
+      const job = await waitForJob(res.job_id, setProgress);
+      if (job.stage === "error") {
+        setResult({ status: "error", transcript: job.error ?? undefined });
+      } else {
+        setResult({ status: "success", transcript: (job.result?.transcript as string | null) ?? undefined });
+        onUploaded?.();
+      }
     } catch (e) {
       setResult({ status: "error", transcript: String(e) });
     } finally {
       setLoading(false);
+      setProgress("");
     }
   };
 
@@ -81,7 +103,7 @@ export function AudioUploader({ clients, onUploaded }: Props) {
           rows={2}
         />
         <Button onClick={handleUpload} disabled={!selectedClient || loading}>
-          {loading ? "アップロード・文字起こし中..." : "アップロード"}
+          {loading ? progress || "アップロード中..." : "アップロード"}
         </Button>
         {result && (
           <div className="mt-3">
@@ -46,6 +46,8 @@ export function useChat() {
       registered_count?: number;
       provider?: string;
       model?: string;
+      tool?: string;
+      error?: boolean;
     };
     try {
       msg = JSON.parse(event.data);
@@ -66,6 +68,14 @@ export function useChat() {
         }
         return [...prev, { role: "assistant", content: text }];
       });
+    } else if (msg.type === "tool_start") {
+      // エージェントのツール呼び出し開始（DB検索中の表示）
+      setAgentInfo((prev) => ({ agent: msg.agent ?? prev?.agent ?? "", decision: `ツール実行中: ${msg.tool ?? ""}` }));
+    } else if (msg.type === "tool_end") {
+      setAgentInfo((prev) => ({ agent: msg.agent ?? prev?.agent ?? "", decision: "chat" }));
+    } else if (msg.type === "cancelled") {
+      // 新しいメッセージで前の応答が打ち切られた
+      currentResponseRef.current = "";
     } else if (msg.type === "done") {
       currentResponseRef.current = "";
       setIsLoading(false);
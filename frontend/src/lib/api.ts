@@ -93,6 +93,13 @@ export const api = {
         body: JSON.stringify(graph),
       }),
   },
+  dedup: {
+    checkGraph: (graph: import("./types").ExtractedGraph) =>
+      fetchApi<import("./types").DedupGraphCheckResponse>("/api/dedup/check-graph", {
+        method: "POST",
+        body: JSON.stringify(graph),
+      }),
+  },
   quicklog: {
     create: (data: { client_name: string; note: string; situation?: string }) =>
       fetchApi("/api/quicklog", { method: "POST", body: JSON.stringify(data) }),
@@ -118,6 +125,9 @@ export const api = {
     list: (clientName: string) =>
       fetchApi<import("./types").MeetingRecord[]>(`/api/meetings/${encodeURIComponent(clientName)}`),
   },
+  jobs: {
+    get: (jobId: string) => fetchApi<import("./types").JobStatus>(`/api/jobs/${encodeURIComponent(jobId)}`),
+  },
   ecomap: {
     templates: () => fetchApi<import("./types").EcomapTemplate[]>("/api/ecomap/templates"),
     colors: () => fetchApi<Record<string, string>>("/api/ecomap/colors"),
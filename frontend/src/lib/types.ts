@@ -100,6 +100,26 @@ export interface ExtractedGraph {
   relationships: { source_temp_id: string; target_temp_id: string; type: string; properties: Record<string, unknown> }[];
 }
 
+export interface DedupCandidate {
+  name: string | null;
+  text: string | null;
+  similarity: number;
+  matchType: "exact" | "kana" | "semantic";
+  nodeId: string;
+}
+
+export interface DedupCheckResponse {
+  hasCandidates: boolean;
+  candidates: DedupCandidate[];
+  checkedLabel: string;
+  checksPerformed: string[];
+}
+
+export interface DedupGraphCheckResponse {
+  hasCandidates: boolean;
+  results: Record<string, DedupCheckResponse>;
+}
+
 export interface EcomapNode {
   id: string;
   label: string;
@@ -167,3 +187,15 @@ export interface MeetingRecord {
   note: string | null;
   client_name: string | null;
 }
+
+export interface JobStatus {
+  job_id: string;
+  kind: string;
+  stage: string;
+  progress: number;
+  message: string;
+  result: Record<string, unknown> | null;
+  error: string | null;
+  created_at: number;
+  updated_at: number;
+}
@@ -3,10 +3,12 @@
 テキストからの情報抽出、JSON構造化処理
 """
 
+import hashlib
 import os
 import re
 import json
 import sys
+from pathlib import Path
 from dotenv import load_dotenv
 from agno.agent import Agent
 from agno.models.google import Gemini
@@ -123,6 +125,8 @@ name, dob, bloodType, riskLevel, date, situation, action, effectiveness, note, t
 """
 
 # --- AIエージェント ---
+EXTRACTION_MODEL = "gemini-2.0-flash"
+
 _agent = None
 
 def get_agent():
@@ -130,7 +134,7 @@ def get_agent():
     global _agent
     if _agent is None:
         _agent = Agent(
-            model=Gemini(id="gemini-2.0-flash", api_key=os.getenv("GEMINI_API_KEY")),
+            model=Gemini(id=EXTRACTION_MODEL, api_key=os.getenv("GEMINI_API_KEY")),
             description="ナラティブから構造化データを抽出する専門家",
             instructions=[EXTRACTION_PROMPT],
             markdown=True
@@ -138,6 +142,25 @@ def get_agent():
     return _agent
 
 
+# --- 抽出結果キャッシュ ---
+_extraction_cache = None
+
+
+def get_extraction_cache():
+    """抽出結果キャッシュを取得（シングルトン）。EXTRACTION_CACHE_PATH で保存先を変更可能"""
+    global _extraction_cache
+    if _extraction_cache is None:
+        from lib.extraction_cache import ExtractionCache
+
+        default_path = Path(__file__).resolve().parents[1] / ".cache" / "extraction.sqlite3"
+        _extraction_cache = ExtractionCache(
+            Path(os.getenv("EXTRACTION_CACHE_PATH") or default_path),
+            ttl_seconds=30 * 24 * 3600,
+            max_entries=2000,
+        )
+    return _extraction_cache
+
+
 def parse_json_from_response(response_text: str) -> dict | None:
     """
     AIレスポンスからJSONを抽出
@@ -197,6 +220,17 @@ def extract_from_text(text: str, client_name: str = None) -> dict | None:
     Returns:
         グラフ形式の dict {nodes: [...], relationships: [...]}、または失敗時は None
     """
+    from lib.extraction_cache import make_key
+
+    cache = get_extraction_cache()
+    cache_key = make_key(
+        hashlib.sha256(text.encode("utf-8")).hexdigest(), client_name, EXTRACTION_MODEL, EXTRACTION_PROMPT
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        log("抽出キャッシュにヒットしました")
+        return cached
+
     agent = get_agent()
 
     # 追記モードの場合、クライアント名を追加
@@ -217,6 +251,7 @@ def extract_from_text(text: str, client_name: str = None) -> dict | None:
             if client_name:
                 _set_client_name_in_graph(extracted, client_name)
             log(f"抽出成功: クライアント={_find_client_name_in_graph(extracted)}")
+            cache.put(cache_key, extracted)
             return extracted
 
         log("JSONパース失敗: AIレスポンスからJSONを抽出できませんでした", "WARN")
@@ -21,7 +21,7 @@ from datetime import date
 from typing import Optional
 from dotenv import load_dotenv
 from neo4j import GraphDatabase
-from lib.normalize import normalize_name, normalize_text, normalize_condition, name_to_kana
+from lib.normalize import normalize_name, normalize_text, normalize_condition, name_to_kana, kana_row
 
 load_dotenv()
 
@@ -307,6 +307,11 @@ def register_to_database(extracted_graph: dict, user_name: str = "system") -> di
                         kana = name_to_kana(name_val)
                         if kana:
                             props["kana"] = kana
+                # Kana-row key backs the server-side filter of GET /api/clients
+                if label == "Client" and props.get("name"):
+                    row = kana_row(props["name"], props.get("kana"))
+                    if row:
+                        props["kanaRow"] = row
             elif label == "Condition":
                 if "name" in props and isinstance(props["name"], str):
                     props["name"] = normalize_condition(props["name"])
@@ -870,7 +875,14 @@ def get_display_name(identifier: str, fallback: str = "不明") -> str:
 # =============================================================================
 
 def get_dashboard_stats():
-    """ダッシュボード用統計情報を取得"""
+    """ダッシュボード用統計情報を取得
+
+    呼び出し元はアーカイブ済みの Streamlit ダッシュボード（archive/pages/home.py）
+    だけなので、毎回の集計クエリのまま残している。現行のダッシュボードは
+    API の /api/dashboard/stats が書き込みで保守する集計（api/app/lib/stats.py）
+    から返す。集計はプロセス内の書き込み通知で保守されるため、このモジュール
+    （別プロセス）からは共有できない。
+    """
     try:
         monthly_logs = run_query("""
             MATCH (log:SupportLog)
@@ -300,50 +300,78 @@ def embed_audio(
         return None
 
 
+def _transcribe_file(audio_path: str, instruction: str) -> Optional[str]:
+    """1 ファイル（またはセグメント）を Gemini 2.0 Flash で文字起こし"""
+    client = get_genai_client()
+    if client is None:
+        return None
+
+    from google.genai import types
+    import mimetypes
+
+    mime_type, _ = mimetypes.guess_type(audio_path)
+    if mime_type is None:
+        ext = os.path.splitext(audio_path)[1].lower()
+        mime_type = _AUDIO_MIME_TYPES.get(ext, "audio/mpeg")
+
+    with open(audio_path, "rb") as f:
+        audio_bytes = f.read()
+
+    response = client.models.generate_content(
+        model="gemini-2.0-flash",
+        contents=[
+            types.Part.from_bytes(data=audio_bytes, mime_type=mime_type),
+            instruction,
+        ],
+    )
+    return response.text
+
+
 def transcribe_audio(
     audio_path: str,
     instruction: str = "この音声を正確に文字起こししてください。話者が複数いる場合は区別してください。",
+    max_workers: int = 4,
 ) -> Optional[str]:
     """
     Gemini 2.0 Flash で音声をテキストに文字起こし
 
+    長い音声は lib.transcription で無音位置（または固定長 + 重なり）で分割し、
+    max_workers 件ずつ並列に文字起こししてから連結する。セグメントの結果は
+    TRANSCRIPT_CACHE_DIR（既定は .cache/transcripts）にキャッシュするので、
+    一部が失敗しても再実行では残りのセグメントだけを文字起こしする。
+
     Args:
         audio_path: 音声ファイルパス
         instruction: 文字起こし指示
+        max_workers: 同時に文字起こしするセグメント数の上限
 
     Returns:
         文字起こしテキスト、失敗時は None
     """
-    client = get_genai_client()
-    if client is None:
+    if get_genai_client() is None:
         return None
 
-    from google.genai import types
-    import mimetypes
+    from pathlib import Path
 
-    mime_type, _ = mimetypes.guess_type(audio_path)
-    if mime_type is None:
-        import os
-        ext = os.path.splitext(audio_path)[1].lower()
-        mime_type = _AUDIO_MIME_TYPES.get(ext, "audio/mpeg")
+    from lib.transcription import transcribe_segmented
 
+    default_dir = Path(__file__).resolve().parents[1] / ".cache" / "transcripts"
     try:
-        with open(audio_path, "rb") as f:
-            audio_bytes = f.read()
-
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=[
-                types.Part.from_bytes(data=audio_bytes, mime_type=mime_type),
-                instruction,
-            ],
+        text = transcribe_segmented(
+            audio_path,
+            lambda path: _transcribe_file(path, instruction),
+            cache_dir=Path(os.getenv("TRANSCRIPT_CACHE_DIR") or default_dir),
+            namespace=f"gemini-2.0-flash\n{instruction}",
+            max_workers=max_workers,
         )
-        text = response.text
-        log(f"音声文字起こし完了: {len(text)}文字, {audio_path}")
-        return text
     except Exception as e:
         log(f"音声文字起こしエラー: {e}", "ERROR")
         return None
+    if text is None:
+        log(f"音声文字起こしエラー: 一部のセグメントが失敗しました, {audio_path}", "ERROR")
+        return None
+    log(f"音声文字起こし完了: {len(text)}文字, {audio_path}")
+    return text
 
 
 def _get_audio_duration(path: str) -> float:
@@ -1109,12 +1137,15 @@ def register_meeting_record(
     if text_for_embedding:
         text_embedding = embed_text(text_for_embedding, task_type="RETRIEVAL_DOCUMENT")
 
-    # Neo4j に登録
+    # Neo4j に登録（新規クライアントには一覧フィルタ用の kana / kanaRow も保存）
+    from lib.normalize import kana_row, name_to_kana
+    kana = name_to_kana(client_name)
     try:
         duration_int = int(duration) if duration > 0 else None
         _run_query(
             """
             MERGE (c:Client {name: $client_name})
+            ON CREATE SET c.kana = $kana, c.kanaRow = $kana_row
             MERGE (s:Supporter {name: $supporter_name})
             CREATE (m:MeetingRecord {
                 date: date($date),
@@ -1140,6 +1171,8 @@ def register_meeting_record(
             """,
             {
                 "client_name": client_name,
+                "kana": kana or None,
+                "kana_row": kana_row(client_name, kana) or "",
                 "supporter_name": supporter_name,
                 "date": date,
                 "title": title or f"面談記録 {date}",
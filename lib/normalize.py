@@ -79,6 +79,50 @@ def name_to_kana(name: str | None) -> str:
     return "".join(item["hira"] for item in kks.convert(text))
 
 
+# Kana row heads (あ行, か行, ...) → hiragana that belong to the row.
+# Dakuten/handakuten variants are grouped with their base row.
+KANA_ROWS: dict[str, str] = {
+    "あ": "あいうえおぁぃぅぇぉゔ",
+    "か": "かきくけこがぎぐげご",
+    "さ": "さしすせそざじずぜぞ",
+    "た": "たちつてとだぢづでど",
+    "な": "なにぬねの",
+    "は": "はひふへほばびぶべぼぱぴぷぺぽ",
+    "ま": "まみむめも",
+    "や": "やゆよゃゅょ",
+    "ら": "らりるれろ",
+    "わ": "わをん",
+}
+
+# Row key used for names that start with a Latin letter (initials etc.)
+ALPHA_ROW = "ABC"
+
+_KANA_TO_ROW: dict[str, str] = {
+    ch: head for head, chars in KANA_ROWS.items() for ch in chars
+}
+
+
+def kana_row(name: str | None, kana: str | None = None) -> str | None:
+    """Return the kana-row key (e.g. "た", or "ABC") used to index a name.
+
+    Names starting with a Latin letter map to ALPHA_ROW. Otherwise the
+    first character of ``kana`` (computed from the name when not given)
+    decides the row; katakana readings are folded to hiragana first. Returns None when no row applies.
+
+    Examples:
+        "田中太郎"          → "た"
+        "M・K"             → "ABC"
+        ("山田", "やまだ")  → "や"
+    """
+    text = normalize_text(name)
+    if text and text[0].isascii() and text[0].isalpha():
+        return ALPHA_ROW
+    reading = name_to_kana(kana) if kana else name_to_kana(text)
+    if not reading:
+        return None
+    return _KANA_TO_ROW.get(reading[0])
+
+
 def normalize_text(text: str | None) -> str:
     """Normalize a text string for consistent storage and comparison.
 
@@ -324,12 +324,14 @@ def create_client_with_identity(
         current_seq = (max_seq_result['maxSeq'] or 0) + 1 if max_seq_result else 1
         display_code = generate_display_code(current_seq)
 
-        # Client ノード作成
+        # Client ノード作成（実名は Identity 側だけに置くので、一覧フィルタ用の
+        # kanaRow は名前のないクライアントと同じ空文字にする）
         session.run("""
             CREATE (c:Client {
                 clientId: $clientId,
                 displayCode: $displayCode,
                 bloodType: $bloodType,
+                kanaRow: '',
                 createdAt: datetime()
             })
         """, {
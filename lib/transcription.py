@@ -0,0 +1,235 @@
+# NOTE: This is a copy of api/app/lib/transcription.py
+# Keep in sync when making changes to segmentation logic.
+# The canonical source is api/app/lib/transcription.py.
+"""Segmented parallel transcription for long audio.
+
+長い音声を 1 回の API 呼び出しで文字起こしすると、所要時間が録音時間に
+比例して直列に伸びる。ここでは:
+
+1. ffprobe で長さを取得し、``segment_seconds`` ごとの区切り位置を決める。
+   区切りの前後 ``search_seconds`` 以内に無音区間（ffmpeg silencedetect）が
+   あればその中央で切り、なければ固定位置で切って ``overlap_seconds`` だけ
+   前のセグメントと重ねる。
+2. ffmpeg で各セグメントを切り出し（再エンコードなし）、上限付きの
+   スレッドプールで並列に文字起こしする。
+3. セグメントの内容ハッシュごとに結果をキャッシュするので、リトライ時は
+   失敗したセグメントだけをやり直す。
+4. 順番通りに連結し、重なり部分で重複した文字列を取り除く。
+
+ffmpeg / ffprobe がない、または短い音声の場合はファイル全体を 1 回で処理する。
+文字起こし関数自体（Gemini 呼び出し）は呼び出し側から渡す。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SECONDS = 600.0
+OVERLAP_SECONDS = 5.0
+SEARCH_SECONDS = 60.0
+# The last segment may run this much longer than segment_seconds instead of
+# leaving a tiny tail segment.
+_TAIL_FACTOR = 1.25
+
+# Shortest repeated text treated as overlap when stitching segments
+_MIN_OVERLAP_CHARS = 6
+# Longest overlap considered (a few seconds of speech)
+_MAX_OVERLAP_CHARS = 400
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+Transcriber = Callable[[str], "str | None"]
+
+
+# ---------------------------------------------------------------------------
+# ffmpeg helpers
+# ---------------------------------------------------------------------------
+
+def probe_duration(path: str) -> float:
+    """ffprobe で音声の長さ（秒）を取得。取得できなければ -1。"""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", path],
+            capture_output=True, text=True, timeout=10,
+        )
+        return float(result.stdout.strip())
+    except Exception:
+        return -1
+
+
+def detect_silences(path: str, noise_db: int = -35, min_silence: float = 0.5) -> list[float]:
+    """無音区間の中央の時刻（秒）を返す。ffmpeg がなければ空リスト。"""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-nostats", "-i", path,
+             "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"],
+            capture_output=True, text=True, timeout=300,
+        )
+    except Exception:
+        return []
+    midpoints: list[float] = []
+    start: float | None = None
+    for kind, value in _SILENCE_RE.findall(result.stderr):
+        if kind == "start":
+            start = float(value)
+        elif start is not None:
+            midpoints.append((start + float(value)) / 2)
+            start = None
+    return midpoints
+
+
+def cut_segment(path: str, start: float, end: float, dest: Path) -> None:
+    """[start, end) を再エンコードせずに dest へ切り出す。"""
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+         "-i", path, "-c", "copy", str(dest)],
+        check=True, capture_output=True, timeout=120,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Planning and stitching
+# ---------------------------------------------------------------------------
+
+def plan_segments(
+    duration: float,
+    silences: list[float] | None = None,
+    segment_seconds: float = SEGMENT_SECONDS,
+    overlap_seconds: float = OVERLAP_SECONDS,
+    search_seconds: float = SEARCH_SECONDS,
+) -> list[tuple[float, float]]:
+    """(start, end) のリスト。無音で切れなかった境界だけ overlap_seconds 重ねる。"""
+    silences = sorted(silences or [])
+    segments: list[tuple[float, float]] = []
+    start = 0.0
+    while duration - start > segment_seconds * _TAIL_FACTOR:
+        target = start + segment_seconds
+        nearby = [s for s in silences if abs(s - target) <= search_seconds and s > start]
+        if nearby:
+            cut = min(nearby, key=lambda s: abs(s - target))
+            next_start = cut
+        else:
+            cut = target
+            next_start = target - overlap_seconds
+        segments.append((start, cut))
+        start = next_start
+    segments.append((start, duration))
+    return segments
+
+
+def merge_transcripts(parts: list[str]) -> str:
+    """セグメントの文字起こしを順に連結し、重なりで重複した先頭部分を取り除く。"""
+    merged = ""
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        if not merged:
+            merged = part
+            continue
+        limit = min(len(merged), len(part), _MAX_OVERLAP_CHARS)
+        overlap = 0
+        for k in range(limit, _MIN_OVERLAP_CHARS - 1, -1):
+            if merged.endswith(part[:k]):
+                overlap = k
+                break
+        rest = part[overlap:].lstrip()
+        if rest:
+            merged = f"{merged}\n{rest}"
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Cached, parallel transcription
+# ---------------------------------------------------------------------------
+
+def _content_key(path: Path, namespace: str) -> str:
+    digest = hashlib.sha256(namespace.encode("utf-8"))
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _transcribe_cached(path: Path, transcribe: Transcriber, cache_dir: Path | None, namespace: str) -> str | None:
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = cache_dir / f"{_content_key(path, namespace)}.txt"
+        if cache_file.exists():
+            return cache_file.read_text(encoding="utf-8")
+    text = transcribe(str(path))
+    if text is not None and cache_file is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(cache_file)
+    return text
+
+
+def transcribe_segmented(
+    path: str,
+    transcribe: Transcriber,
+    *,
+    cache_dir: Path | None = None,
+    namespace: str = "",
+    max_workers: int = 4,
+    segment_seconds: float = SEGMENT_SECONDS,
+    overlap_seconds: float = OVERLAP_SECONDS,
+) -> str | None:
+    """長い音声を分割して並列に文字起こしし、連結した全文を返す。
+
+    Args:
+        path: 音声ファイルパス
+        transcribe: 1 ファイルを文字起こしする関数（失敗時は None か例外）
+        cache_dir: セグメント単位のキャッシュ置き場（None ならキャッシュしない）
+        namespace: キャッシュキーに含める文字列（モデル名・指示文など）
+        max_workers: 同時に文字起こしするセグメント数の上限
+
+    Returns:
+        文字起こし全文。いずれかのセグメントが失敗した場合は None
+        （成功したセグメントはキャッシュ済みなので、再実行時は失敗分だけ処理する）。
+    """
+    source = Path(path)
+    duration = probe_duration(path)
+    if duration <= 0 or duration <= segment_seconds * _TAIL_FACTOR:
+        return _transcribe_cached(source, transcribe, cache_dir, namespace)
+
+    segments = plan_segments(duration, detect_silences(path), segment_seconds, overlap_seconds)
+    with tempfile.TemporaryDirectory(prefix="transcribe-") as tmp:
+        try:
+            pieces = []
+            for i, (start, end) in enumerate(segments):
+                dest = Path(tmp) / f"{i:04d}{source.suffix}"
+                cut_segment(path, start, end, dest)
+                pieces.append(dest)
+        except Exception as exc:
+            logger.warning("Audio segmentation failed, transcribing whole file: %s", exc)
+            return _transcribe_cached(source, transcribe, cache_dir, namespace)
+
+        logger.info("Transcribing %s in %d segments (%.0fs)", source.name, len(pieces), duration)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="transcribe") as pool:
+            futures = [
+                pool.submit(_transcribe_cached, piece, transcribe, cache_dir, namespace)
+                for piece in pieces
+            ]
+            texts = []
+            for i, future in enumerate(futures):
+                try:
+                    texts.append(future.result())
+                except Exception as exc:
+                    logger.warning("Segment %d of %s failed: %s", i, source.name, exc)
+                    texts.append(None)
+
+    if any(t is None for t in texts):
+        return None
+    return merge_transcripts(texts)
@@ -8,6 +8,9 @@
 // クライアント名での高速検索
 CREATE INDEX client_name_idx IF NOT EXISTS FOR (c:Client) ON (c.name);
 
+// クライアント一覧のかな行フィルタ + 名前順ページング
+CREATE INDEX client_kana_row_name_idx IF NOT EXISTS FOR (c:Client) ON (c.kanaRow, c.name);
+
 // 禁忌事項のリスクレベル別検索
 CREATE INDEX ng_action_risk_idx IF NOT EXISTS FOR (n:NgAction) ON (n.riskLevel);
 
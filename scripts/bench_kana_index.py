@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+かな類似検索のベンチマーク（インデックス vs 全件スキャン）
+
+合成した読み仮名 N 件に対し、以下の 3 方式で find_similar_by_kana 相当の
+検索を行い、全件スキャンを正解とした再現率と 1 クエリあたりの時間を比較する。
+
+- full:   全件に SequenceMatcher（正解）
+- limit:  旧実装（先頭 500 件だけ SequenceMatcher）
+- index:  api/app/lib/kana_index.KanaIndex（bigram 転置インデックス）
+
+使用例:
+    uv run python scripts/bench_kana_index.py
+    uv run python scripts/bench_kana_index.py --sizes 10000 100000 --queries 50
+"""
+
+import argparse
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from app.lib.kana_index import KanaIndex  # noqa: E402
+
+_FAMILY = [
+    "たなか", "さとう", "すずき", "たかはし", "わたなべ", "いとう", "やまもと", "なかむら",
+    "こばやし", "かとう", "よしだ", "やまだ", "ささき", "やまぐち", "まつもと", "いのうえ",
+    "きむら", "はやし", "しみず", "やまざき", "もり", "あべ", "いけだ", "はしもと",
+]
+_GIVEN = [
+    "たろう", "じろう", "はなこ", "ゆうき", "さくら", "けんた", "みさき", "だいすけ",
+    "あやか", "しょうた", "まい", "りょう", "ななみ", "かずや", "ゆい", "たくや",
+]
+_KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわん"
+
+
+def synth_names(n: int, rng: random.Random) -> list[str]:
+    """姓＋名の読みに 1〜2 文字のゆらぎを加えた読み仮名を n 件生成する。"""
+    names = []
+    for _ in range(n):
+        kana = rng.choice(_FAMILY) + rng.choice(_GIVEN)
+        for _ in range(rng.randint(0, 2)):
+            pos = rng.randrange(len(kana))
+            kana = kana[:pos] + rng.choice(_KANA) + kana[pos + 1:]
+        names.append(kana)
+    return names
+
+
+def scan(entries: list[tuple[str, str]], kana: str, threshold: float, limit: int) -> list[str]:
+    scored = []
+    for node_id, other in entries:
+        ratio = SequenceMatcher(None, kana, other).ratio()
+        if ratio >= threshold:
+            scored.append((-round(ratio, 3), other, node_id))
+    scored.sort()
+    return [node_id for _, _, node_id in scored[:limit]]
+
+
+def run(size: int, queries: int, threshold: float, limit: int, seed: int) -> None:
+    rng = random.Random(seed)
+    entries = [(f"4:bench:{i}", kana) for i, kana in enumerate(synth_names(size, rng))]
+
+    started = time.perf_counter()
+    index = KanaIndex()
+    for node_id, kana in entries:
+        index.add(node_id, kana, kana)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    sample = [kana for _, kana in rng.sample(entries, queries)]
+    timings = {"full": 0.0, "limit": 0.0, "index": 0.0}
+    hits = {"limit": 0, "index": 0}
+    relevant = 0
+    for kana in sample:
+        t0 = time.perf_counter()
+        expected = scan(entries, kana, threshold, limit)
+        t1 = time.perf_counter()
+        legacy = scan(entries[:500], kana, threshold, limit)
+        t2 = time.perf_counter()
+        found = [m["nodeId"] for m in index.search(kana, threshold, limit)]
+        t3 = time.perf_counter()
+
+        timings["full"] += t1 - t0
+        timings["limit"] += t2 - t1
+        timings["index"] += t3 - t2
+        relevant += len(expected)
+        hits["limit"] += len(set(expected) & set(legacy))
+        hits["index"] += len(set(expected) & set(found))
+
+    print(f"\n=== N={size:,}  queries={queries}  threshold={threshold}  top-k={limit} ===")
+    print(f"index build: {build_ms:,.0f} ms")
+    print(f"{'method':<8}{'recall':>10}{'ms/query':>12}")
+    for method in ("full", "limit", "index"):
+        recall = 1.0 if method == "full" else (hits[method] / relevant if relevant else 1.0)
+        print(f"{method:<8}{recall:>10.3f}{timings[method] / queries * 1000:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="かな類似検索のベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.queries, args.threshold, args.limit, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,24 +6,35 @@
     uv run python scripts/detect_merge_duplicates.py --scan
     uv run python scripts/detect_merge_duplicates.py --scan --label Client
     uv run python scripts/detect_merge_duplicates.py --scan --label NgAction
+    uv run python scripts/detect_merge_duplicates.py --scan --workers 8 --report dups.json
     uv run python scripts/detect_merge_duplicates.py --merge --label Condition --dry-run
 """
 
 import argparse
+import json
 import os
 import sys
+import time
 from collections import defaultdict
-from difflib import SequenceMatcher
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# duplicate_detection lives (and is tested) in the API package only
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
 
 from dotenv import load_dotenv
 load_dotenv()
 
 from neo4j import GraphDatabase
+from app.lib.duplicate_detection import cluster_pairs, cluster_similar_strings
 from lib.normalize import normalize_name, normalize_text, normalize_condition, name_to_kana
 
+# Embedded labels: text property and vector index (api/app/lib/embedding.VECTOR_INDEXES)
+EMBEDDED_LABELS = {
+    "NgAction": {"prop": "action", "index": "ng_action_embedding", "extra": "riskLevel"},
+    "CarePreference": {"prop": "instruction", "index": "care_preference_embedding", "extra": "category"},
+}
+
 def log(msg, level="INFO"):
     prefix = {"INFO": "  ", "OK": "✅", "WARN": "⚠️", "ERROR": "❌", "DUP": "🔴"}
     sys.stderr.write(f"{prefix.get(level, '  ')} {msg}\n")
@@ -36,46 +47,45 @@ def get_driver():
     return GraphDatabase.driver(uri, auth=(user, pw))
 
 
-def scan_client_duplicates(driver):
-    """Find Client nodes with identical or similar kana readings."""
+def scan_client_duplicates(driver, workers=1):
+    """Find Client nodes with identical or similar (ratio >= 0.9) kana readings.
+
+    Similar readings are blocked with MinHash/LSH instead of comparing every pair.
+    """
     log("Scanning Client duplicates (kana-based)...")
     with driver.session() as session:
         rows = session.run(
             "MATCH (c:Client) RETURN c.name AS name, c.kana AS kana, elementId(c) AS id"
         ).data()
 
-    # Group by exact kana
-    kana_groups = defaultdict(list)
+    by_id = {}
     for r in rows:
         kana = r.get("kana") or name_to_kana(r["name"])
         if kana:
-            kana_groups[kana].append(r)
+            by_id[r["id"]] = {**r, "kana": kana}
+
+    clusters, ratios = cluster_similar_strings(
+        [(node_id, r["kana"]) for node_id, r in by_id.items()], threshold=0.9, workers=workers,
+    )
+
+    ratios_by_kana = defaultdict(list)
+    for (a, _), ratio in ratios.items():
+        ratios_by_kana[a].append(ratio)
 
     duplicates = []
-    for kana, group in kana_groups.items():
-        if len(group) >= 2:
-            duplicates.append({
-                "kana": kana,
-                "nodes": group,
-                "type": "exact_kana",
-            })
-
-    # Also check near-matches (ratio >= 0.9) for remaining singletons
-    singletons = [g[0] for g in kana_groups.values() if len(g) == 1]
-    for i, a in enumerate(singletons):
-        kana_a = a.get("kana") or ""
-        for b in singletons[i+1:]:
-            kana_b = b.get("kana") or ""
-            if kana_a and kana_b:
-                ratio = SequenceMatcher(None, kana_a, kana_b).ratio()
-                if ratio >= 0.9:
-                    duplicates.append({
-                        "kana_a": kana_a,
-                        "kana_b": kana_b,
-                        "similarity": round(ratio, 3),
-                        "nodes": [a, b],
-                        "type": "similar_kana",
-                    })
+    for cluster in clusters:
+        nodes = [by_id[node_id] for node_id in cluster]
+        kanas = sorted({n["kana"] for n in nodes})
+        if len(kanas) == 1:
+            duplicates.append({"kana": kanas[0], "nodes": nodes, "type": "exact_kana"})
+            continue
+        scores = [ratio for kana in kanas for ratio in ratios_by_kana.get(kana, [])]
+        duplicates.append({
+            "kana": kanas[0],
+            "similarity": min(scores) if scores else None,
+            "nodes": nodes,
+            "type": "similar_kana",
+        })
 
     return duplicates
 
@@ -100,24 +110,62 @@ def scan_condition_duplicates(driver):
     ]
 
 
-def scan_ngaction_duplicates(driver):
-    """Find NgAction nodes with identical normalized action text."""
-    log("Scanning NgAction duplicates (text normalization)...")
+def scan_embedded_duplicates(driver, label, threshold=0.9, neighbours=10):
+    """Find NgAction/CarePreference nodes with identical normalized text or close embeddings.
+
+    Each embedded node is compared only with its ``neighbours`` nearest nodes in
+    the label's vector index; matches at or above ``threshold`` are clustered
+    together with the exact normalized-text groups.
+    """
+    spec = EMBEDDED_LABELS[label]
+    log(f"Scanning {label} duplicates (text normalization + vector neighbours)...")
     with driver.session() as session:
         rows = session.run(
-            "MATCH (ng:NgAction) RETURN ng.action AS action, ng.riskLevel AS riskLevel, elementId(ng) AS id"
+            f"MATCH (n:{label}) RETURN n.{spec['prop']} AS text, n.{spec['extra']} AS {spec['extra']}, "
+            "elementId(n) AS id"
+        ).data()
+        neighbour_rows = session.run(
+            f"MATCH (n:{label}) WHERE n.embedding IS NOT NULL "
+            "CALL db.index.vector.queryNodes($index, $k, n.embedding) YIELD node, score "
+            "WHERE elementId(node) > elementId(n) AND score >= $threshold "
+            "RETURN elementId(n) AS a, elementId(node) AS b, score",
+            {"index": spec["index"], "k": neighbours + 1, "threshold": threshold},
         ).data()
 
+    by_id = {}
     normalized_groups = defaultdict(list)
     for r in rows:
-        norm = normalize_text(r["action"])
-        normalized_groups[norm].append(r)
+        node = {spec["prop"]: r["text"], spec["extra"]: r.get(spec["extra"]), "id": r["id"]}
+        by_id[r["id"]] = node
+        if r["text"]:
+            normalized_groups[normalize_text(r["text"])].append(r["id"])
+
+    pairs = [(r["a"], r["b"], r["score"]) for r in neighbour_rows if r["a"] in by_id and r["b"] in by_id]
+    scores_by_id = defaultdict(list)
+    for a, _, score in pairs:
+        scores_by_id[a].append(score)
+
+    duplicates = []
+    for cluster in cluster_pairs(pairs, threshold, groups=normalized_groups.values()):
+        nodes = [by_id[node_id] for node_id in cluster]
+        norms = sorted({normalize_text(n[spec["prop"]] or "") for n in nodes})
+        if len(norms) == 1:
+            duplicates.append({spec["prop"]: norms[0], "nodes": nodes, "type": "normalized_text"})
+            continue
+        cluster_scores = [score for node_id in cluster for score in scores_by_id.get(node_id, [])]
+        duplicates.append({
+            spec["prop"]: norms[0],
+            "similarity": round(min(cluster_scores), 3) if cluster_scores else None,
+            "nodes": nodes,
+            "type": "semantic",
+        })
+
+    return duplicates
 
-    return [
-        {"action": norm, "nodes": group, "type": "normalized_text"}
-        for norm, group in normalized_groups.items()
-        if len(group) >= 2
-    ]
+
+def scan_ngaction_duplicates(driver, threshold=0.9):
+    """Find NgAction nodes with identical normalized action text or close embeddings."""
+    return scan_embedded_duplicates(driver, "NgAction", threshold)
 
 
 def merge_condition_duplicates(driver, duplicates, dry_run=True):
@@ -177,7 +225,7 @@ def print_report(label, duplicates):
         dup_type = dup.get("type", "unknown")
         print(f"\n  Group {i} ({dup_type}):")
         for node in dup["nodes"]:
-            name = node.get("name") or node.get("action") or "?"
+            name = node.get("name") or node.get("action") or node.get("instruction") or "?"
             extra = ""
             if "kana" in node:
                 extra = f" (kana: {node['kana']})"
@@ -185,9 +233,11 @@ def print_report(label, duplicates):
                 extra = f" → {node['canonical']}"
             elif "riskLevel" in node:
                 extra = f" [{node.get('riskLevel', '')}]"
+            elif "category" in node:
+                extra = f" [{node.get('category', '')}]"
             print(f"    - {name}{extra}  [id: {node['id'][:20]}...]")
 
-        if "similarity" in dup:
+        if dup.get("similarity") is not None:
             print(f"    similarity: {dup['similarity']}")
 
 
@@ -195,8 +245,11 @@ def main():
     parser = argparse.ArgumentParser(description="既存ノードの重複検出・マージツール")
     parser.add_argument("--scan", action="store_true", help="重複スキャンを実行")
     parser.add_argument("--merge", action="store_true", help="検出された重複をマージ（Conditionのみ対応）")
-    parser.add_argument("--label", type=str, help="特定ラベルのみ（Client/Condition/NgAction）")
+    parser.add_argument("--label", type=str, help="特定ラベルのみ（Client/Condition/NgAction/CarePreference）")
     parser.add_argument("--dry-run", action="store_true", help="マージ時、実際には変更しない")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="かな類似スコアリングの並列プロセス数")
+    parser.add_argument("--semantic-threshold", type=float, default=0.9, help="ベクトル近傍を重複とみなすコサイン類似度")
+    parser.add_argument("--report", type=str, help="スキャン結果を JSON で書き出すパス")
     args = parser.parse_args()
 
     if not args.scan and not args.merge:
@@ -211,19 +264,27 @@ def main():
         log(f"Connection failed: {e}", "ERROR")
         sys.exit(1)
 
-    labels = [args.label] if args.label else ["Client", "Condition", "NgAction"]
+    labels = [args.label] if args.label else ["Client", "Condition", "NgAction", "CarePreference"]
 
     if args.scan:
+        report = {}
         for label in labels:
+            started = time.monotonic()
             if label == "Client":
-                dups = scan_client_duplicates(driver)
-                print_report("Client", dups)
+                dups = scan_client_duplicates(driver, workers=args.workers)
             elif label == "Condition":
                 dups = scan_condition_duplicates(driver)
-                print_report("Condition", dups)
-            elif label == "NgAction":
-                dups = scan_ngaction_duplicates(driver)
-                print_report("NgAction", dups)
+            elif label in EMBEDDED_LABELS:
+                dups = scan_embedded_duplicates(driver, label, threshold=args.semantic_threshold)
+            else:
+                log(f"Unsupported label: {label}", "WARN")
+                continue
+            log(f"{label}: scanned in {time.monotonic() - started:.1f}s")
+            print_report(label, dups)
+            report[label] = dups
+        if args.report:
+            Path(args.report).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            log(f"Report written to {args.report}", "OK")
 
     if args.merge:
         if args.label == "Condition":
@@ -238,7 +299,7 @@ def main():
                 log("Condition: No duplicates to merge", "OK")
         else:
             log("Merge is currently only supported for Condition nodes.", "WARN")
-            log("Client and NgAction require manual review due to relationship complexity.", "INFO")
+            log("Client, NgAction and CarePreference require manual review due to relationship complexity.", "INFO")
 
     driver.close()
 
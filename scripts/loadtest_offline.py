@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+オフライン負荷試験（Gemini・Neo4j なし）
+
+API 全体をプロセス内で起動し、LLM / 埋め込みを app.lib.fake_llm、グラフを
+app.lib.memory_graph に差し替えて、一覧・詳細・緊急時情報・エコマップ・
+ダッシュボード・意味検索・クイック記録・チャットを混ぜたリクエストを並列に
+流す。擬似 API の遅延分布・故障率・同時実行上限を変えて、レート制御
+（app.lib.rate_limit）や同時読み取りの集約（app.lib.singleflight）の効き方を
+API の利用枠を使わずに比較できる。リクエスト列はシードで決まる。
+
+使用例:
+    uv run python scripts/loadtest_offline.py
+    uv run python scripts/loadtest_offline.py --workers 32 --requests 2000 --clients 200
+    uv run python scripts/loadtest_offline.py --latency-ms 300 --distribution exponential \\
+        --error-rate 0.05 --max-concurrency 4
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from app.config import settings  # noqa: E402
+
+# (名前, 重み)
+SCENARIOS = [
+    ("list", 20),
+    ("detail", 15),
+    ("emergency", 15),
+    ("logs", 10),
+    ("ecomap", 10),
+    ("dashboard", 10),
+    ("alerts", 5),
+    ("semantic", 5),
+    ("quicklog", 5),
+    ("chat", 5),
+]
+
+
+def request(client, kind: str, name: str) -> int:
+    """1 リクエストを送り、HTTP ステータスを返す（チャットは完了イベントで 200）。"""
+    path = quote(name)
+    if kind == "list":
+        return client.get("/api/clients").status_code
+    if kind == "detail":
+        return client.get(f"/api/clients/{path}").status_code
+    if kind == "emergency":
+        return client.get(f"/api/clients/{path}/emergency").status_code
+    if kind == "logs":
+        return client.get(f"/api/clients/{path}/logs").status_code
+    if kind == "ecomap":
+        return client.get(f"/api/ecomap/{path}").status_code
+    if kind == "dashboard":
+        return client.get("/api/dashboard/stats").status_code
+    if kind == "alerts":
+        return client.get("/api/dashboard/alerts").status_code
+    if kind == "semantic":
+        body = {"query": f"{name}さん パニック時の対応", "index_name": "support_log_vector_index", "top_k": 5}
+        return client.post("/api/search/semantic", json=body).status_code
+    if kind == "quicklog":
+        body = {"client_name": name, "note": f"負荷試験の記録 {random.random():.6f}", "situation": "日常記録"}
+        return client.post("/api/quicklog", json=body).status_code
+    with client.websocket_connect("/api/chat/ws") as ws:
+        ws.send_text(json.dumps({"content": f"{name}さんの禁忌事項を教えて"}))
+        while True:
+            event = json.loads(ws.receive_text())
+            if event["type"] == "done":
+                return 200
+            if event["type"] == "error":
+                return 500
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="オフライン負荷試験（fake LLM + in-memory graph）")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=50, help="合成クライアント数")
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--jitter-ms", type=int, default=50)
+    parser.add_argument("--distribution", choices=["uniform", "exponential"], default="uniform")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=0, help="擬似 API の同時実行上限（0 は無制限）")
+    parser.add_argument("--graph-latency-ms", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings.llm_backend = "fake"
+    settings.graph_backend = "memory"
+    settings.fake_latency_ms = args.latency_ms
+    settings.fake_latency_jitter_ms = args.jitter_ms
+    settings.fake_latency_distribution = args.distribution
+    settings.fake_error_rate = args.error_rate
+    settings.fake_max_concurrency = args.max_concurrency
+    settings.fake_seed = args.seed
+    settings.memory_graph_clients = args.clients
+    settings.memory_graph_latency_ms = args.graph_latency_ms
+
+    from fastapi.testclient import TestClient
+
+    from app.lib import fake_llm, memory_graph, rate_limit, singleflight
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    names = [n.props["name"] for n in memory_graph.get_graph().with_label("Client")]
+    kinds = [k for k, _ in SCENARIOS]
+    weights = [w for _, w in SCENARIOS]
+    plan = [(rng.choices(kinds, weights)[0], rng.choice(names)) for _ in range(args.requests)]
+
+    timings: dict[str, list[float]] = defaultdict(list)
+    failures: dict[str, int] = defaultdict(int)
+
+    with TestClient(app) as client:
+        def run(item):
+            kind, name = item
+            started = time.perf_counter()
+            try:
+                status = request(client, kind, name)
+            except Exception:
+                status = 0
+            timings[kind].append(time.perf_counter() - started)
+            if status >= 400 or status == 0:
+                failures[kind] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(run, plan))
+        elapsed = time.perf_counter() - started
+
+        print(f"\n=== {args.requests} requests / {args.workers} workers / {args.clients} clients ===")
+        print(f"fake LLM: {args.latency_ms}+{args.jitter_ms} ms ({args.distribution}), "
+              f"error rate {args.error_rate}, max concurrency {args.max_concurrency or '∞'}")
+        print(f"elapsed {elapsed:.2f} s, {args.requests / elapsed:.1f} req/s\n")
+        print(f"{'kind':<10}{'n':>6}{'fail':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for kind in kinds:
+            values = timings.get(kind)
+            if not values:
+                continue
+            print(f"{kind:<10}{len(values):>6}{failures[kind]:>6}"
+                  f"{statistics.median(values) * 1000:>10.1f}"
+                  f"{percentile(values, 0.95) * 1000:>10.1f}"
+                  f"{percentile(values, 0.99) * 1000:>10.1f}")
+
+        print("\nfake endpoint:", fake_llm.get_endpoint().stats())
+        print("graph:", memory_graph.get_graph().stats())
+        for gov in rate_limit.stats():
+            print("rate limit:", gov)
+        for flight in singleflight.stats():
+            print("single flight:", flight)
+
+
+if __name__ == "__main__":
+    main()